@@ -3,4 +3,6 @@ from django.apps import AppConfig
 
 class AbsensiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'apps.absensi'
\ No newline at end of file
+    name = 'apps.absensi'
+    def ready(self):
+        import apps.absensi.signals
@@ -0,0 +1,308 @@
+"""
+Jalur cepat check-in/check-out Absensi Fleksibel.
+
+Pada jam masuk pagi seluruh karyawan check-in dalam rentang yang sempit,
+sehingga setiap query di jalur ini berlipat ganda. Modul ini menjaga satu POST
+check-in tetap pada paling banyak tiga query baca ditambah satu upsert:
+
+1. Karyawan: dimuat sekali oleh CheckKaryawanStatusMiddleware dan ditempel ke
+   request (get_request_karyawan), tidak diambil ulang di view/form.
+2. Konteks hari (rule, hari WFA, lokasi kantor aktif): sama untuk semua
+   karyawan, di-cache per tanggal (get_konteks_hari) dan dihapus oleh signal
+   saat Rules/CutiBersama/LokasiKantor berubah.
+3. Status absensi karyawan: absensi hari ini dan absensi lupa check-out yang
+   belum dilengkapi diambil dalam satu query (muat_status_absensi).
+4. Izin Telat: hanya dicek setelah batas reminder.
+
+Upsert (simpan_checkin) memakai UPDATE bersyarat jam_masuk IS NULL untuk
+placeholder dari cron, atau INSERT dengan fallback ke UPDATE bila baris dibuat
+request lain lebih dulu (unique karyawan+tanggal), sehingga submit ganda tidak
+menimpa jam masuk pertama. Watermark 'absensi' dinaikkan sekali setelah commit
+(bump_watermark_on_commit, digabung dengan signal post_save), sehingga baris
+data_watermark hanya dikunci sesaat di luar transaksi check-in.
+
+Reverse geocoding (Nominatim, bisa sampai 10 detik) tidak lagi memblokir
+request: alamat diambil dari namespace cache 'geo' per koordinat (dibulatkan
+~11 m) atau diisi di background setelah commit (jadwalkan_isi_alamat).
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, time
+
+from django.conf import settings
+from django.db import IntegrityError, connections, transaction
+from django.db.models import Q
+from geopy.exc import GeocoderServiceError, GeocoderTimedOut
+from geopy.geocoders import Nominatim
+
+from apps.hrd.models import Izin, Karyawan
+from apps.hrd.utils.cache import get_cache, naikkan_penghitung
+from apps.hrd.utils.ringkasan_karyawan import invalidate_ringkasan_on_commit
+from apps.hrd.utils.watermark import bump_watermark_on_commit
+from .models import AbsensiMagang
+from .snapshot import invalidate_attendance_snapshot_on_commit
+from .utils import get_active_office_location, get_effective_rule_config, get_rule_for_date, is_wfa_day
+
+logger = logging.getLogger(__name__)
+
+# Fallback time restrictions (8.5 hour work system) - dipakai jika tidak ada rule
+MIN_CHECKIN_TIME = time(6, 0)   # 06:00 - earliest check-in allowed
+REMINDER_CHECKIN_TIME = time(10, 0)  # 10:00 - setelah ini wajib Izin Telat
+MAX_CHECKIN_TIME = time(11, 0)  # 11:00 - batas maksimal
+OVERTIME_THRESHOLD = time(18, 30)  # 6:30 PM - overtime alert threshold
+MIN_WORK_DURATION_HOURS = 8.5  # 8.5 hours minimum work duration
+
+KONTEKS_CACHE_PREFIX = 'absensi:konteks_hari'
+GEOCODE_CACHE_PREFIX = 'absensi:geocode'
+GEOCODE_TTL = 7 * 24 * 3600
+ALAMAT_TIDAK_DITEMUKAN = 'Alamat tidak ditemukan'
+
+
+# ============================================
+# KARYAWAN PER REQUEST
+# ============================================
+
+def get_request_karyawan(request):
+    """
+    Karyawan milik user yang login, dimuat sekali per request.
+
+    CheckKaryawanStatusMiddleware sudah mengisi request.karyawan; fungsi ini
+    hanya query bila dipanggil di luar middleware (mis. test/command).
+    """
+    if not hasattr(request, 'karyawan'):
+        request.karyawan = Karyawan.objects.filter(user=request.user).first()
+        if request.karyawan is not None:
+            request.karyawan.user = request.user
+    return request.karyawan
+
+
+# ============================================
+# KONTEKS HARI (RULE, WFA, KANTOR)
+# ============================================
+
+def _konteks_key(tanggal):
+    versi = get_cache('rules').get(f'{KONTEKS_CACHE_PREFIX}:versi', 0)
+    return f'{KONTEKS_CACHE_PREFIX}:{versi}:{tanggal.isoformat()}'
+
+
+def invalidate_konteks_hari():
+    """Buang semua konteks hari yang di-cache (dipanggil signal Rules/CutiBersama/LokasiKantor)."""
+    naikkan_penghitung(get_cache('rules'), f'{KONTEKS_CACHE_PREFIX}:versi', 0)
+
+
+def get_konteks_hari(tanggal=None):
+    """
+    Rule, konfigurasi jam, status WFA dan lokasi kantor aktif untuk satu tanggal.
+
+    Returns:
+        dict dengan key: tanggal, rule (Rules atau None), config (dict jam efektif,
+        fallback ke konstanta bila tidak ada rule), is_wfa, wfa_keterangan,
+        kantor (LokasiKantor atau None)
+    """
+    tanggal = tanggal or datetime.now().date()
+    key = _konteks_key(tanggal)
+    konteks = get_cache('rules').get(key)
+    if konteks is not None:
+        return konteks
+
+    rule = get_rule_for_date(tanggal)
+    config = get_effective_rule_config(rule, tanggal) if rule else None
+    is_wfa, wfa_keterangan = is_wfa_day(tanggal)
+    konteks = {
+        'tanggal': tanggal,
+        'rule': rule,
+        'config': config or {
+            'min_jam_masuk': MIN_CHECKIN_TIME,
+            'batas_checkin_reminder': REMINDER_CHECKIN_TIME,
+            'batas_deadline_checkin': MAX_CHECKIN_TIME,
+            'durasi_kerja_jam': MIN_WORK_DURATION_HOURS,
+            'batas_overtime': OVERTIME_THRESHOLD,
+        },
+        'is_wfa': is_wfa,
+        'wfa_keterangan': wfa_keterangan,
+        'kantor': get_active_office_location(),
+    }
+    get_cache('rules').set(key, konteks, getattr(settings, 'ABSENSI_KONTEKS_CACHE_SECONDS', 300))
+    return konteks
+
+
+# ============================================
+# STATUS ABSENSI KARYAWAN
+# ============================================
+
+def _lupa_co_belum_diisi():
+    return Q(co_auto_generated=True) & (Q(alasan_lupa_co__isnull=True) | Q(alasan_lupa_co=''))
+
+
+def muat_status_absensi(karyawan, tanggal):
+    """
+    Absensi hari ini dan status lupa check-out dalam satu query.
+
+    Returns:
+        Tuple (absensi_hari_ini atau None, ada_lupa_co_pending)
+    """
+    rows = list(
+        AbsensiMagang.objects.filter(id_karyawan=karyawan)
+        .filter(Q(tanggal=tanggal) | _lupa_co_belum_diisi())
+    )
+    absensi_hari_ini = next((a for a in rows if a.tanggal == tanggal), None)
+    ada_lupa_co = any(a.co_auto_generated and not a.alasan_lupa_co for a in rows)
+    if absensi_hari_ini is not None:
+        absensi_hari_ini.id_karyawan = karyawan
+    return absensi_hari_ini, ada_lupa_co
+
+
+def punya_izin_telat(karyawan, tanggal):
+    return Izin.objects.filter(
+        id_karyawan=karyawan,
+        tanggal_izin=tanggal,
+        jenis_izin='telat',
+        status='disetujui',
+    ).exists()
+
+
+# ============================================
+# UPSERT CHECK-IN
+# ============================================
+
+def _update_placeholder(karyawan, tanggal, filter_kwargs, fields):
+    updated = AbsensiMagang.objects.filter(jam_masuk__isnull=True, **filter_kwargs).update(**fields)
+    if updated:
+        # update() tidak memicu signal
+        bump_watermark_on_commit('absensi')
+        invalidate_attendance_snapshot_on_commit(tanggal)
+        invalidate_ringkasan_on_commit(karyawan.pk)
+    return updated
+
+
+def simpan_checkin(karyawan, tanggal, absensi_hari_ini=None, **fields):
+    """
+    Simpan check-in sebagai satu upsert.
+
+    Args:
+        karyawan: Karyawan yang check-in
+        tanggal: Tanggal check-in
+        absensi_hari_ini: Baris hari ini dari muat_status_absensi (placeholder
+            cron dengan jam_masuk NULL), atau None
+        **fields: Field AbsensiMagang yang diisi (jam_masuk, status, keterangan, ...)
+
+    Returns:
+        AbsensiMagang, atau None bila karyawan sudah check-in lebih dulu
+        (mis. submit ganda yang diproses worker lain)
+    """
+    # Satu transaksi: signal post_save dan _update_placeholder berbagi satu bump watermark
+    with transaction.atomic():
+        if absensi_hari_ini is not None:
+            if not _update_placeholder(karyawan, tanggal, {'pk': absensi_hari_ini.pk}, fields):
+                return None
+            for name, value in fields.items():
+                setattr(absensi_hari_ini, name, value)
+            return absensi_hari_ini
+
+        absensi = AbsensiMagang(id_karyawan=karyawan, tanggal=tanggal, **fields)
+        try:
+            with transaction.atomic():
+                absensi.save(force_insert=True)
+            return absensi
+        except IntegrityError:
+            # Baris hari ini dibuat request lain (submit ganda / placeholder cron)
+            # di antara baca status dan insert
+            if not _update_placeholder(karyawan, tanggal, {'id_karyawan': karyawan, 'tanggal': tanggal}, fields):
+                return None
+            return AbsensiMagang.objects.get(id_karyawan=karyawan, tanggal=tanggal)
+
+
+# ============================================
+# REVERSE GEOCODING
+# ============================================
+
+def _geocode_key(latitude, longitude):
+    # 4 desimal ~ 11 meter: check-in dari gedung yang sama memakai alamat yang sama
+    return f'{GEOCODE_CACHE_PREFIX}:{round(float(latitude), 4)}:{round(float(longitude), 4)}'
+
+
+def get_address_from_coordinates(latitude, longitude):
+    """Alamat dari koordinat lewat Nominatim; None bila gagal."""
+    geolocator = Nominatim(user_agent="cesgs_web_hr_app", timeout=10)
+    try:
+        location = geolocator.reverse(f"{latitude}, {longitude}", exactly_one=True, language='id')
+        if location:
+            return location.address
+    except (GeocoderTimedOut, GeocoderServiceError) as e:
+        logger.warning(f"Geocoding error untuk {latitude}, {longitude}: {e}")
+    except Exception as e:
+        logger.warning(f"Geocoding gagal untuk {latitude}, {longitude}: {e}")
+    return None
+
+
+def get_cached_address(latitude, longitude):
+    """Alamat dari cache koordinat tanpa memanggil Nominatim; None bila belum ada."""
+    return get_cache('geo').get(_geocode_key(latitude, longitude))
+
+
+def resolve_address(latitude, longitude):
+    """Alamat dari cache, atau Nominatim (hasil berhasil di-cache)."""
+    address = get_cached_address(latitude, longitude)
+    if address is None:
+        address = get_address_from_coordinates(latitude, longitude)
+        if address:
+            get_cache('geo').set(_geocode_key(latitude, longitude), address, GEOCODE_TTL)
+    return address
+
+
+_executor = None
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, 'ABSENSI_GEOCODE_WORKERS', 2),
+            thread_name_prefix='geocode',
+        )
+    return _executor
+
+
+def _isi_alamat(absensi_id, field, latitude, longitude):
+    address = resolve_address(latitude, longitude) or ALAMAT_TIDAK_DITEMUKAN
+    updated = AbsensiMagang.objects.filter(pk=absensi_id).update(**{field: address})
+    if updated:
+        bump_watermark_on_commit('absensi')
+        # Alamat tampil di absensi terbaru pada dashboard magang
+        invalidate_ringkasan_on_commit(
+            AbsensiMagang.objects.filter(pk=absensi_id).values_list('id_karyawan_id', flat=True).first()
+        )
+    return address
+
+
+def _isi_alamat_in_thread(absensi_id, field, latitude, longitude):
+    try:
+        _isi_alamat(absensi_id, field, latitude, longitude)
+    except Exception:
+        logger.exception("Gagal mengisi %s untuk absensi %s", field, absensi_id)
+    finally:
+        # Thread worker memakai koneksi DB sendiri, tutup agar tidak bocor
+        connections.close_all()
+
+
+def alamat_tanpa_menunggu(latitude, longitude):
+    """
+    Alamat untuk disimpan bersama check-in/check-out tanpa menunggu Nominatim.
+
+    Returns:
+        Alamat dari cache koordinat, atau None bila harus diisi di background
+        (jadwalkan_isi_alamat). ABSENSI_GEOCODE_ASYNC=False mengembalikan
+        perilaku sinkron.
+    """
+    address = get_cached_address(latitude, longitude)
+    if address is None and not getattr(settings, 'ABSENSI_GEOCODE_ASYNC', True):
+        address = resolve_address(latitude, longitude) or ALAMAT_TIDAK_DITEMUKAN
+    return address
+
+
+def jadwalkan_isi_alamat(absensi, field, latitude, longitude):
+    """Isi alamat_masuk/alamat_pulang di background setelah baris absensi ter-commit."""
+    absensi_id = absensi.pk
+    transaction.on_commit(
+        lambda: _get_executor().submit(_isi_alamat_in_thread, absensi_id, field, latitude, longitude)
+    )
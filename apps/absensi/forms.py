@@ -4,10 +4,13 @@ from datetime import datetime
 from apps.utils.validators import validate_file_size
 from django.core.exceptions import ValidationError
 from apps.hrd.models import Karyawan
+from apps.hrd.utils.upload_langsung import UploadLangsungFormMixin
 
 BULAN_CHOICES = [(str(i), datetime(2024, i, 1).strftime('%B')) for i in range(1, 13)]
 
-class UploadAbsensiForm(forms.Form):
+class UploadAbsensiForm(UploadLangsungFormMixin, forms.Form):
+    direct_upload_fields = {'file': 'absensi'}
+
     bulan = forms.ChoiceField(
         choices=BULAN_CHOICES,
         widget=forms.Select(attrs={'class': 'form-control'})
@@ -83,9 +86,12 @@ class AbsensiMagangForm(forms.ModelForm):
 
     def __init__(self, *args, **kwargs):
         user = kwargs.pop('user', None)
+        karyawan = kwargs.pop('karyawan', None)
         super(AbsensiMagangForm, self).__init__(*args, **kwargs)
         
-        if user:
+        if karyawan is not None:
+            self.fields['id_karyawan'].initial = karyawan.id
+        elif user:
             try:
                 karyawan = Karyawan.objects.get(user=user)
                 self.fields['id_karyawan'].initial = karyawan.id
@@ -105,9 +111,12 @@ class AbsensiPulangForm(forms.ModelForm):
 
     def __init__(self, *args, **kwargs):
         user = kwargs.pop('user', None)
+        karyawan = kwargs.pop('karyawan', None)
         super(AbsensiPulangForm, self).__init__(*args, **kwargs)
         
-        if user:
+        if karyawan is not None:
+            self.fields['id_karyawan'].initial = karyawan.id
+        elif user:
             try:
                 karyawan = Karyawan.objects.get(user=user)
                 self.fields['id_karyawan'].initial = karyawan.id
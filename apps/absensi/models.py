@@ -2,6 +2,7 @@ from random import choices
 from django.db import models
 from apps.hrd.models import Karyawan
 from apps.absensi.validators import validate_wfa_document_extension, validate_file_size_wfa
+from apps.utils.periode import PeriodQuerySet
 
 class Rules(models.Model):
     id_rules = models.AutoField(primary_key=True)
@@ -151,6 +152,8 @@ class AbsensiMagang(models.Model):
 
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = PeriodQuerySet.as_manager()
+
     class Meta:
         unique_together = ['id_karyawan', 'tanggal']
         verbose_name = 'Absensi Magang'
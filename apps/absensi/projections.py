@@ -0,0 +1,76 @@
+"""
+Proyeksi baris (row projection) untuk tabel absensi.
+
+Dipakai bersama oleh list view dan exporter sehingga tidak ada jalur yang
+menyentuh relasi lazy (a.id_karyawan.nama) per baris:
+- nama/role karyawan di-annotate lewat JOIN,
+- tanggal dan jam sudah diformat menjadi teks di SQL (Cast + Substr),
+- hasil berupa namedtuple (values_list(named=True)) tanpa instansiasi model.
+"""
+from django.db.models import CharField, F, Value
+from django.db.models.functions import Cast, Coalesce, Substr
+
+
+def jam_text(field, dengan_detik=False, kosong='-'):
+    """TimeField -> 'HH:MM' (atau 'HH:MM:SS'), '-' bila NULL. Diformat di SQL."""
+    panjang = 8 if dengan_detik else 5
+    return Coalesce(
+        Substr(Cast(field, output_field=CharField()), 1, panjang),
+        Value(kosong),
+        output_field=CharField(),
+    )
+
+
+def tanggal_text(field):
+    """DateField -> 'YYYY-MM-DD'. Diformat di SQL."""
+    return Cast(field, output_field=CharField())
+
+
+# ============================================
+# ABSENSI (upload mesin absensi)
+# ============================================
+
+ABSENSI_ROW_FIELDS = [
+    'id_absensi', 'id_karyawan_id', 'nama', 'tanggal', 'tanggal_text',
+    'jam_masuk_text', 'jam_keluar_text', 'status_absensi',
+]
+
+
+def absensi_rows(queryset):
+    """Proyeksi baris Absensi: list upload_absensi dan export_absensi_excel."""
+    return queryset.annotate(
+        nama=F('id_karyawan__nama'),
+        tanggal_text=tanggal_text('tanggal'),
+        jam_masuk_text=jam_text('jam_masuk'),
+        jam_keluar_text=jam_text('jam_keluar'),
+    ).values_list(*ABSENSI_ROW_FIELDS, named=True)
+
+
+# ============================================
+# ABSENSI FLEKSIBEL (AbsensiMagang)
+# ============================================
+
+ABSENSI_FLEKSIBEL_ROW_FIELDS = [
+    'id_absensi', 'id_karyawan_id', 'nama', 'role', 'tanggal', 'tanggal_text',
+    'jam_masuk', 'jam_pulang', 'jam_masuk_text', 'jam_pulang_text',
+    'keterangan', 'alamat_masuk', 'alamat_pulang', 'hr_keterangan', 'aktivitas_wfa',
+    'co_auto_generated', 'alasan_lupa_co', 'jam_pulang_kira', 'jam_pulang_kira_text',
+]
+
+
+def absensi_fleksibel_rows(queryset):
+    """
+    Proyeksi baris AbsensiMagang: riwayat_absensi_fleksibel_hr dan
+    export_absensi_fleksibel_excel.
+
+    jam_masuk/jam_pulang tetap berupa time (untuk hitung durasi dan filter
+    template), versi *_text sudah siap tulis ke Excel.
+    """
+    return queryset.annotate(
+        nama=F('id_karyawan__nama'),
+        role=F('id_karyawan__user__role'),
+        tanggal_text=tanggal_text('tanggal'),
+        jam_masuk_text=jam_text('jam_masuk', dengan_detik=True),
+        jam_pulang_text=jam_text('jam_pulang', dengan_detik=True),
+        jam_pulang_kira_text=jam_text('jam_pulang_kira'),
+    ).values_list(*ABSENSI_FLEKSIBEL_ROW_FIELDS, named=True)
@@ -0,0 +1,128 @@
+"""
+Builder rekap (pivot) absensi.
+
+Semua bucket status dihitung dalam SATU query GROUP BY id_karyawan memakai
+Count(filter=...), menggantikan pola count() per karyawan per status (6N + 1 query)
+dan pivot pandas di memori.
+"""
+from django.db.models import Count, F, Q
+
+from .models import Absensi
+
+# ============================================
+# REKAP ABSENSI (upload mesin absensi)
+# ============================================
+
+# (key, label kolom, kondisi)
+STATUS_ABSENSI_BUCKETS = [
+    ('tepat_waktu', 'Tepat Waktu', Q(status_absensi='Tepat Waktu')),
+    ('terlambat', 'Terlambat', Q(status_absensi='Terlambat')),
+    ('cuti', 'Cuti', Q(status_absensi__icontains='Cuti')),
+    ('izin', 'Izin', Q(status_absensi__icontains='Izin')),
+    ('tidak_hadir', 'Tidak Hadir', Q(status_absensi='Tidak Hadir')),
+    # Total hari kerja (tidak termasuk hari libur)
+    ('total', 'Total', ~Q(status_absensi='Libur')),
+]
+
+
+def build_pivot(queryset, group_fields, buckets, order_by=None, **group_expressions):
+    """
+    Bangun pivot dalam satu query: GROUP BY group_fields dengan satu
+    Count(filter=kondisi) per bucket.
+
+    Args:
+        queryset: queryset sumber (sudah difilter periode/nama/role)
+        group_fields: field untuk GROUP BY, mis. ['id_karyawan_id', 'id_karyawan__nama']
+        buckets: list (key, label, Q) seperti STATUS_ABSENSI_BUCKETS
+        order_by: urutan hasil (default: group_fields)
+        group_expressions: alias kolom GROUP BY, mis. nama=F('id_karyawan__nama')
+
+    Returns:
+        ValuesQuerySet berisi dict {group_field..., key_bucket: jumlah}
+    """
+    annotations = {key: Count('pk', filter=condition) for key, _label, condition in buckets}
+    return (
+        queryset
+        .values(*group_fields, **group_expressions)
+        .annotate(**annotations)
+        .order_by(*(order_by or group_fields))
+    )
+
+
+def rekap_absensi_bulanan(bulan, tahun, nama=''):
+    """
+    Rekap status absensi per karyawan untuk satu bulan (satu query).
+
+    Setiap item berisi: id_karyawan_id, nama, tepat_waktu, terlambat, cuti,
+    izin, tidak_hadir, total. Queryset bisa langsung dipaginasi.
+    """
+    absensi = Absensi.objects.filter(bulan=bulan, tahun=tahun)
+    if nama:
+        absensi = absensi.filter(id_karyawan__nama__icontains=nama)
+
+    return build_pivot(
+        absensi,
+        ['id_karyawan_id'],
+        STATUS_ABSENSI_BUCKETS,
+        order_by=['nama', 'id_karyawan_id'],
+        nama=F('id_karyawan__nama'),
+    )
+
+
+# ============================================
+# REKAP ABSENSI FLEKSIBEL (AbsensiMagang)
+# ============================================
+
+KETERANGAN_WAJIB = ['WFO', 'WFA']
+
+
+def keterangan_tersedia(absensi_query):
+    """Daftar keterangan yang muncul di queryset, selalu termasuk WFO dan WFA."""
+    tersedia = set(
+        absensi_query.order_by()
+        .exclude(keterangan__isnull=True)
+        .values_list('keterangan', flat=True)
+        .distinct()
+    )
+    return sorted(tersedia | set(KETERANGAN_WAJIB))
+
+
+def rekap_absensi_fleksibel(absensi_query, kolom_keterangan=None, dengan_role=False):
+    """
+    Rekap jumlah hari per keterangan (WFO/WFA/Izin ...) per karyawan.
+
+    Args:
+        absensi_query: queryset AbsensiMagang yang sudah difilter
+        kolom_keterangan: keterangan yang dijadikan kolom; None = semua yang tersedia
+        dengan_role: sertakan kolom role karyawan
+
+    Returns:
+        (headers, rows) - rows berupa list:
+        [nama, (role,) jumlah per keterangan..., total]
+        Total menghitung semua keterangan, bukan hanya kolom yang ditampilkan.
+    """
+    if kolom_keterangan is None:
+        kolom_keterangan = keterangan_tersedia(absensi_query)
+
+    # Nama keterangan bisa mengandung spasi, jadi pakai alias posisi
+    buckets = [
+        (f'ket_{idx}', ket, Q(keterangan=ket))
+        for idx, ket in enumerate(kolom_keterangan)
+    ]
+    buckets.append(('total', 'Total', Q(keterangan__isnull=False)))
+
+    group_fields = ['id_karyawan_id', 'id_karyawan__nama']
+    order_by = ['id_karyawan__nama', 'id_karyawan_id']
+    if dengan_role:
+        group_fields.append('id_karyawan__user__role')
+        order_by.insert(1, 'id_karyawan__user__role')
+
+    headers = ['Nama Karyawan'] + (['Role'] if dengan_role else []) + list(kolom_keterangan) + ['Total']
+    rows = []
+    for item in build_pivot(absensi_query, group_fields, buckets, order_by=order_by):
+        row = [item['id_karyawan__nama']]
+        if dengan_role:
+            row.append(item['id_karyawan__user__role'])
+        row.extend(item[key] for key, _label, _condition in buckets)
+        rows.append(row)
+    return headers, rows
@@ -0,0 +1,28 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.hrd.models import CutiBersama, Karyawan
+from .checkin import invalidate_konteks_hari
+from .models import AbsensiMagang, LokasiKantor, Rules
+from .snapshot import invalidate_attendance_snapshot_on_commit
+
+
+@receiver([post_save, post_delete], sender=AbsensiMagang)
+def invalidate_snapshot_absensi(sender, instance, **kwargs):
+    """Check-in, check-out, catatan HR atau hapus absensi: snapshot tanggal itu tidak valid lagi."""
+    invalidate_attendance_snapshot_on_commit(instance.tanggal)
+
+
+@receiver([post_save, post_delete], sender=Karyawan)
+def invalidate_snapshot_karyawan(sender, instance, **kwargs):
+    """Perubahan karyawan (status aktif, nama) memengaruhi KPI hari ini."""
+    invalidate_attendance_snapshot_on_commit()
+
+
+@receiver([post_save, post_delete], sender=Rules)
+@receiver([post_save, post_delete], sender=CutiBersama)
+@receiver([post_save, post_delete], sender=LokasiKantor)
+def invalidate_konteks_absensi(sender, **kwargs):
+    """Rule, hari WFA atau lokasi kantor berubah: konteks check-in yang di-cache tidak valid lagi."""
+    transaction.on_commit(invalidate_konteks_hari)
@@ -0,0 +1,162 @@
+"""
+Snapshot kehadiran harian untuk control center HR (riwayat_absensi_fleksibel_hr).
+
+Semua KPI (sudah absen, WFO, WFA, belum pulang, belum masuk), histogram durasi
+dan daftar potensi lembur dihitung dari SATU query AbsensiMagang per tanggal
+(durasi dihitung di SQL: jam_pulang - jam_masuk) ditambah satu query karyawan
+aktif. Hasil di-cache per tanggal dan dihapus oleh signal (setelah transaksi
+commit) saat check-in, check-out, catatan HR, atau data karyawan berubah (lihat
+apps.absensi.signals).
+
+Snapshot disimpan di namespace cache 'reports'. Catatan: invalidasi lewat
+signal hanya efektif lintas worker bila backend cache dipakai bersama
+(CACHE_BACKEND file/redis, bukan locmem per proses).
+"""
+from datetime import datetime, timedelta
+
+from django.db import transaction
+from django.db.models import DurationField, ExpressionWrapper, F
+from django.utils import timezone
+
+from apps.hrd.models import Karyawan
+from apps.hrd.utils.cache import get_cache
+from .models import AbsensiMagang
+
+SNAPSHOT_CACHE_PREFIX = 'absensi:snapshot'
+# TTL cadangan; snapshot hari ini juga dihapus oleh signal
+SNAPSHOT_TTL_TODAY = 300
+SNAPSHOT_TTL_PAST = 3600
+
+BATAS_DURASI_KURANG = 8.5
+BATAS_POTENSI_LEMBUR = 10
+
+# (label, batas bawah inklusif, batas atas eksklusif) dalam jam
+HISTOGRAM_BINS = [
+    ('< 4 jam', 0, 4),
+    ('4-6 jam', 4, 6),
+    ('6-8 jam', 6, 8),
+    ('8-8.5 jam', 8, 8.5),
+    ('8.5-10 jam', 8.5, 10),
+    ('>= 10 jam', 10, None),
+]
+
+
+def _cache_key(tanggal):
+    return f'{SNAPSHOT_CACHE_PREFIX}:{tanggal.isoformat()}'
+
+
+def invalidate_attendance_snapshot(tanggal=None):
+    """Hapus snapshot satu tanggal (default: hari ini)."""
+    tanggal = tanggal or timezone.localdate()
+    get_cache('reports').delete(_cache_key(tanggal))
+
+
+def invalidate_attendance_snapshot_on_commit(tanggal=None):
+    """
+    Hapus snapshot setelah transaksi commit. Bila dihapus lebih awal, request lain
+    bisa membangun ulang snapshot dari data sebelum commit dan menyimpannya sampai TTL.
+    """
+    tanggal = tanggal or timezone.localdate()
+    transaction.on_commit(lambda: invalidate_attendance_snapshot(tanggal))
+
+
+def _durasi_jam(durasi):
+    """timedelta dari SQL -> jam (1 desimal); None bila kosong/negatif, sama dengan calculate_work_duration."""
+    if durasi is None or durasi < timedelta(0):
+        return None
+    return round(durasi.total_seconds() / 3600, 1)
+
+
+def _build_snapshot(tanggal):
+    # Satu query: semua absensi tanggal ini + durasi dihitung di SQL
+    rows = list(
+        AbsensiMagang.objects.filter(tanggal=tanggal)
+        .annotate(
+            nama=F('id_karyawan__nama'),
+            durasi=ExpressionWrapper(F('jam_pulang') - F('jam_masuk'), output_field=DurationField()),
+        )
+        .order_by('nama')
+        .values('id_karyawan_id', 'nama', 'keterangan', 'jam_masuk', 'jam_pulang', 'hr_keterangan', 'durasi')
+    )
+
+    # Hanya yang benar-benar check-in (jam_masuk terisi). Abaikan placeholder dari cron reminder.
+    checkin = [r for r in rows if r['jam_masuk'] is not None]
+    belum_pulang = [r for r in checkin if r['jam_pulang'] is None]
+
+    # Exclude dari "belum masuk": yang sudah check-in ATAU sudah punya catatan HR
+    sudah_tercatat_ids = {r['id_karyawan_id'] for r in checkin}
+    sudah_tercatat_ids |= {r['id_karyawan_id'] for r in rows if r['hr_keterangan'] is not None}
+
+    karyawan_aktif = list(
+        Karyawan.objects.filter(status_keaktifan='Aktif')
+        .order_by('nama')
+        .values('id', 'nama', 'user__role')
+    )
+    belum_masuk = [
+        {'id': k['id'], 'nama': k['nama'], 'role': k['user__role']}
+        for k in karyawan_aktif
+        if k['id'] not in sudah_tercatat_ids
+    ]
+
+    durasi_list = []
+    durasi_kurang_8_jam = []
+    potensi_lembur = []
+    histogram = {label: 0 for label, _low, _high in HISTOGRAM_BINS}
+    for r in checkin:
+        durasi = _durasi_jam(r['durasi']) if r['jam_pulang'] is not None else None
+        if not durasi:
+            continue
+        durasi_list.append(durasi)
+        if durasi < BATAS_DURASI_KURANG:
+            durasi_kurang_8_jam.append({'nama': r['nama'], 'durasi': durasi})
+        elif durasi >= BATAS_POTENSI_LEMBUR:
+            potensi_lembur.append({'nama': r['nama'], 'durasi': durasi})
+        for label, low, high in HISTOGRAM_BINS:
+            if durasi >= low and (high is None or durasi < high):
+                histogram[label] += 1
+                break
+
+    return {
+        'tanggal': tanggal,
+        'total_karyawan_aktif': len(karyawan_aktif),
+        'sudah_absen_hari_ini': len(checkin),
+        'wfo_hari_ini': sum(1 for r in checkin if r['keterangan'] == 'WFO'),
+        'wfa_hari_ini': sum(1 for r in checkin if r['keterangan'] == 'WFA'),
+        'belum_pulang_count': len(belum_pulang),
+        'belum_pulang_list': [r['nama'] for r in belum_pulang[:5]],
+        # Disimpan agar durasi "masih kerja" bisa dihitung saat dibaca
+        'belum_pulang_jam_masuk': [(r['nama'], r['jam_masuk']) for r in belum_pulang],
+        'belum_masuk_count': len(belum_masuk),
+        'belum_masuk_list': [k['nama'] for k in belum_masuk[:5]],
+        'belum_masuk_all': belum_masuk,
+        'rata_rata_durasi': round(sum(durasi_list) / len(durasi_list), 1) if durasi_list else 0,
+        'durasi_kurang_8_jam': durasi_kurang_8_jam,
+        'potensi_lembur': potensi_lembur,
+        'histogram_durasi': [(label, histogram[label]) for label, _low, _high in HISTOGRAM_BINS],
+    }
+
+
+def get_attendance_snapshot(tanggal=None):
+    """
+    Snapshot kehadiran untuk satu tanggal (default: hari ini), dari cache bila ada.
+
+    Karyawan yang belum pulang dengan durasi >= 10 jam ditambahkan ke
+    potensi_lembur saat dibaca (bergantung jam sekarang, jadi tidak di-cache).
+    """
+    tanggal = tanggal or timezone.localdate()
+    key = _cache_key(tanggal)
+    snapshot = get_cache('reports').get(key)
+    if snapshot is None:
+        snapshot = _build_snapshot(tanggal)
+        ttl = SNAPSHOT_TTL_TODAY if tanggal >= timezone.localdate() else SNAPSHOT_TTL_PAST
+        get_cache('reports').set(key, snapshot, ttl)
+
+    snapshot = dict(snapshot)
+    sekarang = timezone.localtime().replace(tzinfo=None)
+    masih_kerja = []
+    for nama, jam_masuk in snapshot['belum_pulang_jam_masuk']:
+        durasi = (sekarang - datetime.combine(tanggal, jam_masuk)).total_seconds() / 3600
+        if durasi >= BATAS_POTENSI_LEMBUR:
+            masih_kerja.append({'nama': nama, 'durasi': round(durasi, 1), 'masih_kerja': True})
+    snapshot['potensi_lembur'] = snapshot['potensi_lembur'] + masih_kerja
+    return snapshot
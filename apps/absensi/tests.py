@@ -1,3 +1,184 @@
+from datetime import date, time
+from unittest import mock
+
 from django.test import TestCase
+from django.urls import reverse
+
+from apps.absensi.checkin import resolve_address, simpan_checkin
+from apps.absensi.models import Absensi, AbsensiMagang, Rules
+from apps.absensi.snapshot import _cache_key, get_attendance_snapshot
+from apps.hrd.models import UploadLangsung
+from apps.hrd.tests import QueryBudgetTestMixin, StorageStandInTestMixin, buat_karyawan
+from apps.hrd.utils.cache import get_cache
+
+
+class CheckOvertimeEtagTest(TestCase):
+    def setUp(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.budi = buat_karyawan('budi@example.com', role='Magang')
+            self.ani = buat_karyawan('ani@example.com', role='Magang', nama='Ani Lestari')
+        self.client.login(email='budi@example.com', password='rahasia123')
+        self.url = reverse('check_overtime_status')
+        # ETag berganti setiap menit; bekukan slot waktu agar test tidak bergantung jam
+        patcher = mock.patch('apps.hrd.utils.etag.calendar.timegm', return_value=0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _get(self, etag=None):
+        headers = {'HTTP_IF_NONE_MATCH': etag} if etag else {}
+        return self.client.get(self.url, **headers)
+
+    def test_check_in_karyawan_lain_tetap_304(self):
+        etag = self._get()['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            AbsensiMagang.objects.create(id_karyawan=self.ani, tanggal=date.today(), jam_masuk=time(8), keterangan='WFO')
+        self.assertEqual(self._get(etag).status_code, 304)
+
+    def test_check_in_sendiri_mengganti_etag(self):
+        etag = self._get()['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            AbsensiMagang.objects.create(id_karyawan=self.budi, tanggal=date.today(), jam_masuk=time(8), keterangan='WFO')
+        response = self._get(etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()['has_checked_in'])
+
+
+class SimpanCheckinTest(TestCase):
+    def setUp(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.karyawan = buat_karyawan('budi@example.com', role='Magang')
+        self.tanggal = date(2025, 3, 10)
+
+    def _bump_absensi(self, callbacks):
+        return [f for f in callbacks if getattr(f, 'watermark_family', None) == 'absensi']
+
+    def test_insert_sekali_bump_setelah_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            absensi = simpan_checkin(self.karyawan, self.tanggal, jam_masuk=time(8), keterangan='WFO')
+        self.assertIsNotNone(absensi.pk)
+        self.assertEqual(len(self._bump_absensi(callbacks)), 1)
+
+    def test_placeholder_cron_diisi_sekali_bump(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            placeholder = AbsensiMagang.objects.create(id_karyawan=self.karyawan, tanggal=self.tanggal)
+        with self.captureOnCommitCallbacks() as callbacks:
+            absensi = simpan_checkin(self.karyawan, self.tanggal, placeholder, jam_masuk=time(8), keterangan='WFO')
+        self.assertEqual(absensi.pk, placeholder.pk)
+        self.assertEqual(len(self._bump_absensi(callbacks)), 1)
+
+    def test_submit_ganda_tidak_menimpa_jam_masuk(self):
+        simpan_checkin(self.karyawan, self.tanggal, jam_masuk=time(8), keterangan='WFO')
+        with self.captureOnCommitCallbacks() as callbacks:
+            hasil = simpan_checkin(self.karyawan, self.tanggal, jam_masuk=time(9), keterangan='WFO')
+        self.assertIsNone(hasil)
+        self.assertEqual(self._bump_absensi(callbacks), [])
+        self.assertEqual(AbsensiMagang.objects.get(id_karyawan=self.karyawan).jam_masuk, time(8))
+
+
+class GeocodeCacheTest(TestCase):
+    def test_alamat_di_cache_namespace_geo(self):
+        with mock.patch('apps.absensi.checkin.get_address_from_coordinates', return_value='Jl. Sudirman') as geocode:
+            self.assertEqual(resolve_address(-6.20881, 106.84559), 'Jl. Sudirman')
+            # Koordinat berjarak < 11 m memakai alamat yang sama tanpa memanggil Nominatim
+            self.assertEqual(resolve_address(-6.208812, 106.845591), 'Jl. Sudirman')
+        geocode.assert_called_once()
+        self.assertEqual(get_cache('geo').get('absensi:geocode:-6.2088:106.8456'), 'Jl. Sudirman')
+
+
+class SnapshotInvalidasiTest(TestCase):
+    def test_snapshot_dihapus_setelah_commit(self):
+        tanggal = date(2025, 3, 10)
+        with self.captureOnCommitCallbacks(execute=True):
+            karyawan = buat_karyawan('budi@example.com', role='Magang')
+        self.assertEqual(get_attendance_snapshot(tanggal)['sudah_absen_hari_ini'], 0)
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            AbsensiMagang.objects.create(id_karyawan=karyawan, tanggal=tanggal, jam_masuk=time(8), keterangan='WFO')
+            # Belum commit: snapshot lama tetap ada, pembaca lain tidak membangun ulang dari data pra-commit
+            self.assertIsNotNone(get_cache('reports').get(_cache_key(tanggal)))
+        for callback in callbacks:
+            callback()
+
+        self.assertIsNone(get_cache('reports').get(_cache_key(tanggal)))
+        self.assertEqual(get_attendance_snapshot(tanggal)['sudah_absen_hari_ini'], 1)
+
+
+class UploadAbsensiLangsungTest(StorageStandInTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.hrd = buat_karyawan('hrd@example.com', role='HRD').user
+        self.rule = Rules.objects.create(nama_rule='Standar', jam_masuk=time(8), jam_keluar=time(17))
+        self.client.login(email='hrd@example.com', password='rahasia123')
+
+    @mock.patch('apps.absensi.views.absensi_views.process_absensi')
+    def test_request_hanya_mengklaim_verifikasi_di_background(self, process_absensi):
+        isi = b'PK\x03\x04workbook'
+        key = self.upload_ke_standin(self.hrd, 'absensi', 'absensi.xlsx', isi)
+
+        with mock.patch('apps.hrd.utils.upload_langsung.verifikasi_upload') as verifikasi, \
+                mock.patch('apps.hrd.utils.upload_langsung._get_executor') as executor:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(reverse('upload_absensi'), {
+                    'bulan': '3', 'tahun': '2025', 'rules': self.rule.pk, 'file_key': key,
+                })
+        self.assertRedirects(response, reverse('upload_absensi'), fetch_redirect_response=False)
+        process_absensi.assert_called_once()
+        self.assertEqual(process_absensi.call_args.kwargs['file_stream'].read(), isi)
+        # Isi file tidak diverifikasi di request; diserahkan ke thread background
+        verifikasi.assert_not_called()
+        executor.return_value.submit.assert_called_once_with(mock.ANY, key)
+        self.assertEqual(UploadLangsung.objects.get(key=key).status, 'diklaim')
+
+
+class QueryBudgetAbsensiTest(QueryBudgetTestMixin, TestCase):
+    """Beberapa karyawan dengan beberapa hari absensi agar pola N+1 terlihat di jumlah query."""
+
+    def setUp(self):
+        today = date.today()
+        self.tanggal = [date(today.year, today.month, hari) for hari in range(1, 6)]
+        self.periode = {'bulan': today.month, 'tahun': today.year}
+        with self.captureOnCommitCallbacks(execute=True):
+            buat_karyawan('hrd@example.com', role='HRD', nama='Sari HRD')
+            rule = Rules.objects.create(nama_rule='Standar', jam_masuk=time(8), jam_keluar=time(17))
+            self.magang = [
+                buat_karyawan(f'magang{i}@example.com', role='Magang', nama=f'Magang {i}') for i in range(4)
+            ]
+            for karyawan in self.magang:
+                for tanggal in self.tanggal:
+                    AbsensiMagang.objects.create(
+                        id_karyawan=karyawan, tanggal=tanggal, jam_masuk=time(8), jam_pulang=time(17),
+                        keterangan='WFO', status='Tepat Waktu',
+                    )
+                    Absensi.objects.create(
+                        id_karyawan=karyawan, rules=rule, tanggal=tanggal, bulan=tanggal.month, tahun=tanggal.year,
+                        status_absensi='Tepat Waktu', jam_masuk=time(8), jam_keluar=time(17),
+                    )
+
+    def _login_hrd(self):
+        self.client.login(email='hrd@example.com', password='rahasia123')
+
+    def test_absen_fleksibel(self):
+        self.client.login(email='magang0@example.com', password='rahasia123')
+        self.assertDalamBudget('absen_fleksibel')
+
+    def test_export_absensi_excel(self):
+        self._login_hrd()
+        self.assertDalamBudget('export_absensi_excel', self.periode)
+
+    def test_riwayat_absensi_fleksibel_hr(self):
+        self._login_hrd()
+        self.assertDalamBudget('riwayat_absensi_fleksibel_hr', {'tanggal': self.tanggal[0].isoformat()})
+
+    def test_export_absensi_fleksibel_excel(self):
+        self._login_hrd()
+        self.assertDalamBudget('export_absensi_fleksibel_excel', self.periode)
+
+    def test_detail_absensi_hari(self):
+        self._login_hrd()
+        self.assertDalamBudget('get_detail_absensi_hari_ajax', {
+            'karyawan_id': self.magang[0].pk, 'tanggal': self.tanggal[0].isoformat(),
+        })
 
-# Create your tests here.
+    def test_detail_absensi_bulan(self):
+        self._login_hrd()
+        self.assertDalamBudget('get_detail_absensi_bulan_ajax', {'karyawan_id': self.magang[0].pk, **self.periode})
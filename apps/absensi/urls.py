@@ -8,6 +8,7 @@ from apps.absensi.views.hr_absensi_views import (
     export_rekap_hari_kerja_fleksibel_excel,
     save_hr_attendance_note,
     get_detail_absensi_hari_ajax,
+    get_detail_absensi_bulan_ajax,
 )
 from django.conf import settings
 from django.conf.urls.static import static
@@ -38,6 +39,7 @@ urlpatterns = [
     #  HR Actions
     path('hr/save-note/', save_hr_attendance_note, name='save_hr_attendance_note'),
     path('hr/get-detail-absensi-hari/', get_detail_absensi_hari_ajax, name='get_detail_absensi_hari_ajax'),
+    path('hr/get-detail-absensi-bulan/', get_detail_absensi_bulan_ajax, name='get_detail_absensi_bulan_ajax'),
 ]
 
 if settings.DEBUG:
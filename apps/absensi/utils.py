@@ -3,15 +3,15 @@ import re
 import logging
 import math
 from rapidfuzz import process
-from pytanggalmerah import TanggalMerah
 from django.utils.timezone import make_aware
 from datetime import datetime, date, time, timedelta
 from django.db.models import Q, Count
-from apps.hrd.models import Karyawan, Izin, Cuti
+from apps.hrd.models import Karyawan
+from apps.hrd.utils.interval_index import LeaveIntervalIndex
+from apps.hrd.utils.tanggal_merah import get_tanggal_merah
+from apps.utils.periode import month_range
 from .models import Absensi, Rules
 
-t = TanggalMerah(cache_path=None, cache_time=600)
-
 logger = logging.getLogger(__name__)
 
 
@@ -201,7 +201,7 @@ def is_wfa_day(check_date=None):
     return False, None
 
 
-def validate_user_location(user_lat, user_lon, check_date=None):
+def validate_user_location(user_lat, user_lon, check_date=None, konteks=None):
     """
     Memvalidasi apakah lokasi user berada dalam radius kantor yang aktif.
     Jika hari tersebut adalah WFA day, geofencing di-bypass tetapi koordinat tetap dicatat.
@@ -209,6 +209,8 @@ def validate_user_location(user_lat, user_lon, check_date=None):
     Args:
         user_lat, user_lon: Koordinat user
         check_date: Tanggal untuk cek WFA (default: hari ini)
+        konteks: Konteks hari dari apps.absensi.checkin.get_konteks_hari (opsional);
+            bila diisi, status WFA dan lokasi kantor diambil dari sana tanpa query
     Returns:
         Dict dengan hasil validasi:
         {
@@ -221,11 +223,14 @@ def validate_user_location(user_lat, user_lon, check_date=None):
             'wfa_keterangan': str atau None
         }
     """
-    # Cek apakah hari ini adalah WFA day
-    wfa_day, wfa_keterangan = is_wfa_day(check_date)
-    
-    # Tetap hitung jarak ke kantor untuk audit (jika ada lokasi kantor aktif)
-    office = get_active_office_location()
+    if konteks is not None:
+        wfa_day, wfa_keterangan = konteks['is_wfa'], konteks['wfa_keterangan']
+        office = konteks['kantor']
+    else:
+        # Cek apakah hari ini adalah WFA day
+        wfa_day, wfa_keterangan = is_wfa_day(check_date)
+        # Tetap hitung jarak ke kantor untuk audit (jika ada lokasi kantor aktif)
+        office = get_active_office_location()
     distance = None
     within_radius = False
 
@@ -301,9 +306,8 @@ def parse_time(value):
 # Deteksi Hari Libur dari `pytanggalmerah`
 def is_hari_libur(tahun, bulan, day):
     """Cek apakah tanggal adalah hari libur atau akhir pekan (Sabtu/Minggu)."""
-    t.set_date(str(tahun), f"{bulan:02d}", f"{day:02d}")  
     tanggal_obj = date(tahun, bulan, day)
-    return tanggal_obj.weekday() in [5, 6] or t.check()  
+    return tanggal_obj.weekday() in [5, 6] or bool(get_tanggal_merah(tanggal_obj))
 
 # Ekstraksi Nama dari File Excel
 def extract_id_name(data):
@@ -338,6 +342,15 @@ def process_absensi(file_path, bulan, tahun, selected_rule, file_name=None, file
     extracted_names = extract_id_name(data)
     user_id_rows = identify_time_rows(data)
 
+    # Cuti/Izin disetujui sebulan (plus H-1 untuk klaim lembur) dimuat sekali,
+    # bukan 3 query per karyawan per hari
+    awal_bulan, akhir_bulan = month_range(tahun, bulan)
+    indeks = LeaveIntervalIndex.load(
+        awal_bulan - timedelta(days=1), akhir_bulan,
+        karyawan_ids=[k.id for k in daftar_karyawan.values()],
+        izin_jenis=['wfa', 'wfh', 'telat', 'klaim_lembur'],
+    )
+
     for idx, user_row in enumerate(user_id_rows):
         user_name = extracted_names[idx].strip().upper()
         best_match = process.extractOne(user_name, daftar_karyawan.keys(), score_cutoff=80)
@@ -382,28 +395,17 @@ def process_absensi(file_path, bulan, tahun, selected_rule, file_name=None, file
                         jam_keluar = parsed_times[-1]
 
             # Cek apakah karyawan memiliki izin WFA atau Telat di tanggal tsb
-            izin_di_tanggal_ini = Izin.objects.filter(
-                id_karyawan=karyawan,
-                tanggal_izin=tanggal_absensi,
-                jenis_izin__in=['wfa', 'wfh', 'telat'],  # Support both WFA and legacy WFH
-                status='disetujui'
-            ).exists()
+            izin_di_tanggal_ini = bool(indeks.izin_pada(
+                karyawan.id, tanggal_absensi, ['wfa', 'wfh', 'telat'],  # Support both WFA and legacy WFH
+            ))
 
-            izin_klaim_masuk_siang_h_minus_1 = Izin.objects.filter(
-                id_karyawan=karyawan,
-                tanggal_izin=tanggal_absensi - timedelta(days=1),
-                jenis_izin='klaim_lembur',
-                kompensasi_lembur='masuk_siang',
-                status='disetujui'
-            ).exists()
+            izin_klaim_masuk_siang_h_minus_1 = any(
+                izin.kompensasi_lembur == 'masuk_siang'
+                for izin in indeks.izin_pada(karyawan.id, tanggal_absensi - timedelta(days=1), 'klaim_lembur')
+            )
             
             # Cek apakah karyawan memiliki cuti di tanggal tsb
-            cuti_di_tanggal_ini = Cuti.objects.filter(
-                id_karyawan=karyawan,
-                tanggal_mulai__lte=tanggal_absensi,
-                tanggal_selesai__gte=tanggal_absensi,
-                status='disetujui'
-            ).exists()
+            cuti_di_tanggal_ini = indeks.ada_cuti(karyawan.id, tanggal_absensi)
 
             if is_libur:
                 status_absensi = "Libur"
@@ -5,17 +5,19 @@ from apps.authentication.decorators import role_required
 from django.contrib import messages
 from apps.absensi.forms import UploadAbsensiForm
 from apps.absensi.models import Absensi
-from apps.hrd.models import Karyawan
 from apps.absensi.utils import process_absensi
+from apps.absensi.projections import absensi_rows
+from apps.absensi.rekap import rekap_absensi_bulanan, STATUS_ABSENSI_BUCKETS
 from datetime import datetime
 from django.core.files.base import ContentFile
 from django.core.files.storage import default_storage
 from io import BytesIO
-import openpyxl
-from django.db.models import Max, Count, Q
-from django.http import HttpResponse
+from django.db.models import Max
 from django.conf import settings
 import os
+from apps.utils.excel_export import export_response, DEFAULT_CHUNK_SIZE
+from apps.hrd.utils.instrumentation import query_budget
+from apps.hrd.utils.upload_langsung import UploadLangsungFile, jadwalkan_verifikasi
 
 # Tambahkan import
 from django.core.exceptions import ValidationError
@@ -36,7 +38,7 @@ def upload_absensi(request):
     absensi_list = Absensi.objects.filter(bulan=bulan, tahun=tahun)
     if query:
         absensi_list = absensi_list.filter(id_karyawan__nama__icontains=query)
-    absensi_list = absensi_list.order_by('tanggal', 'id_karyawan_id')
+    absensi_list = absensi_rows(absensi_list.order_by('tanggal', 'id_karyawan_id'))
 
     # Paginate
     paginator = Paginator(absensi_list, 10)
@@ -50,7 +52,7 @@ def upload_absensi(request):
 
     # Upload file
     if request.method == 'POST':
-        form = UploadAbsensiForm(request.POST, request.FILES)
+        form = UploadAbsensiForm(request.POST, request.FILES, upload_user=request.user)
         if form.is_valid():
             try:
                 bulan = int(form.cleaned_data['bulan'])
@@ -58,13 +60,22 @@ def upload_absensi(request):
                 file = form.cleaned_data['file']
                 selected_rule = form.cleaned_data['rules']
 
-                original_name = file.name
-                timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-                s3_key = f"absensi/{tahun}/{bulan}/{timestamp}_{original_name}"
-
-                # Baca konten file dari upload dan simpan ke S3
-                content_bytes = file.read()
-                saved_path = default_storage.save(s3_key, ContentFile(content_bytes))
+                if isinstance(file, UploadLangsungFile):
+                    # Sudah diupload langsung ke bucket: cukup baca, tidak perlu disimpan ulang.
+                    # Key sudah diklaim form; magic bytes diperiksa di background seperti
+                    # dokumen WFA (workbook rusak tetap gagal di process_absensi).
+                    jadwalkan_verifikasi(file.name)
+                    original_name = file.upload.nama_asli
+                    content_bytes = file.read()
+                    saved_path = file.name
+                else:
+                    original_name = file.name
+                    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+                    s3_key = f"absensi/{tahun}/{bulan}/{timestamp}_{original_name}"
+
+                    # Baca konten file dari upload dan simpan ke S3
+                    content_bytes = file.read()
+                    saved_path = default_storage.save(s3_key, ContentFile(content_bytes))
 
                 # URL presigned untuk unduh
                 file_url = default_storage.url(saved_path)
@@ -104,49 +115,11 @@ def upload_absensi(request):
         .order_by('-created_at')
     )
     
-    # Buat pivot tabel rekap absensi
+    # Buat pivot tabel rekap absensi (satu query GROUP BY karyawan)
     rekap_absensi = []
     
     if bulan and tahun:
-        # Ambil semua karyawan yang memiliki data absensi di bulan dan tahun yang dipilih
-        karyawan_dengan_absensi = Karyawan.objects.filter(
-            absensi__bulan=bulan, 
-            absensi__tahun=tahun
-        ).distinct()
-        
-        for karyawan in karyawan_dengan_absensi:
-            # Filter absensi untuk karyawan ini di bulan dan tahun yang dipilih
-            absensi_karyawan = Absensi.objects.filter(
-                id_karyawan=karyawan,
-                bulan=bulan,
-                tahun=tahun
-            )
-            
-            # Hitung jumlah untuk setiap status
-            tepat_waktu = absensi_karyawan.filter(status_absensi='Tepat Waktu').count()
-            terlambat = absensi_karyawan.filter(status_absensi='Terlambat').count()
-            
-            # Hitung jumlah cuti (status yang mengandung kata 'Cuti')
-            cuti = absensi_karyawan.filter(status_absensi__icontains='Cuti').count()
-            
-            # Hitung jumlah izin (status yang mengandung kata 'Izin')
-            izin = absensi_karyawan.filter(status_absensi__icontains='Izin').count()
-            
-            # Hitung jumlah tidak hadir
-            tidak_hadir = absensi_karyawan.filter(status_absensi='Tidak Hadir').count()
-            
-            # Hitung total hari kerja (tidak termasuk hari libur)
-            total = absensi_karyawan.exclude(status_absensi='Libur').count()
-            
-            rekap_absensi.append({
-                'nama': karyawan.nama,
-                'tepat_waktu': tepat_waktu,
-                'terlambat': terlambat,
-                'cuti': cuti,
-                'izin': izin,
-                'tidak_hadir': tidak_hadir,
-                'total': total
-            })
+        rekap_absensi = rekap_absensi_bulanan(bulan, tahun)
             
     # paginasi pivot tabel
     paginator = Paginator(rekap_absensi,5)
@@ -206,6 +179,7 @@ def hapus_absensi_bulanan(request):
 
     return redirect("upload_absensi")
 
+@query_budget(10, max_duplicates=2)
 @login_required
 @role_required(['HRD'])
 def export_absensi_excel(request):
@@ -217,26 +191,21 @@ def export_absensi_excel(request):
     if q:
         absensi = absensi.filter(id_karyawan__nama__icontains=q)
 
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "Rekap Absensi"
-
-    ws.append(["Nama", "Tanggal", "Jam Masuk", "Jam Keluar", "Status"])
-
-    for a in absensi.order_by("tanggal", "id_karyawan__nama"):
-        ws.append([
-            a.id_karyawan.nama,
-            a.tanggal.strftime("%Y-%m-%d"),
-            a.jam_masuk.strftime("%H:%M") if a.jam_masuk else "-",
-            a.jam_keluar.strftime("%H:%M") if a.jam_keluar else "-",
-            a.status_absensi,
-        ])
+    rows = (
+        [r.nama, r.tanggal_text, r.jam_masuk_text, r.jam_keluar_text, r.status_absensi]
+        for r in absensi_rows(
+            absensi.order_by("tanggal", "id_karyawan__nama")
+        ).iterator(chunk_size=DEFAULT_CHUNK_SIZE)
+    )
 
     filename = f"rekap_absensi_{bulan}_{tahun}.xlsx"
-    response = HttpResponse(content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
-    response["Content-Disposition"] = f'attachment; filename="{filename}"'
-    wb.save(response)
-    return response
+    return export_response(
+        filename,
+        "Rekap Absensi",
+        ["Nama", "Tanggal", "Jam Masuk", "Jam Keluar", "Status"],
+        rows,
+        styled=False,
+    )
 
 @login_required
 @role_required(['HRD'])
@@ -249,49 +218,24 @@ def export_rekap_absensi_excel(request):
         messages.error(request, "Bulan dan tahun harus dipilih.")
         return redirect("upload_absensi")
 
-    # Filter karyawan dengan absensi
-    karyawan_dengan_absensi = Karyawan.objects.filter(
-        absensi__bulan=bulan,
-        absensi__tahun=tahun,
-        nama__icontains=q
-    ).distinct()
-
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "Rekap Pivot Absensi"
-
-    # Header
-    ws.append(["Nama", "Tepat Waktu", "Terlambat", "Cuti", "Izin", "Tidak Hadir", "Total"])
-
-    # Data
-    for karyawan in karyawan_dengan_absensi:
-        absensi_karyawan = Absensi.objects.filter(
-            id_karyawan=karyawan,
-            bulan=bulan,
-            tahun=tahun
-        )
-        tepat_waktu = absensi_karyawan.filter(status_absensi='Tepat Waktu').count()
-        terlambat = absensi_karyawan.filter(status_absensi='Terlambat').count()
-        cuti = absensi_karyawan.filter(status_absensi__icontains='Cuti').count()
-        izin = absensi_karyawan.filter(status_absensi__icontains='Izin').count()
-        tidak_hadir = absensi_karyawan.filter(status_absensi='Tidak Hadir').count()
-        total = absensi_karyawan.exclude(status_absensi='Libur').count()
-
-        ws.append([
-            karyawan.nama,
-            tepat_waktu,
-            terlambat,
-            cuti,
-            izin,
-            tidak_hadir,
-            total
-        ])
+    rows = (
+        [
+            r['nama'],
+            r['tepat_waktu'],
+            r['terlambat'],
+            r['cuti'],
+            r['izin'],
+            r['tidak_hadir'],
+            r['total'],
+        ]
+        for r in rekap_absensi_bulanan(bulan, tahun, q)
+    )
 
-    # Buat respons download
-    response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
     filename = f"rekap_pivot_absensi_{bulan}_{tahun}.xlsx"
-    response['Content-Disposition'] = f'attachment; filename="{filename}"'
-    wb.save(response)
-    
-    
-    return response
+    return export_response(
+        filename,
+        "Rekap Pivot Absensi",
+        ["Nama"] + [label for _key, label, _condition in STATUS_ABSENSI_BUCKETS],
+        rows,
+        styled=False,
+    )
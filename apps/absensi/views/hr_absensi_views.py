@@ -1,4 +1,3 @@
-import pandas as pd
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
@@ -15,6 +14,13 @@ import calendar
 import openpyxl
 from apps.hrd.utils.jatah_cuti import is_holiday_or_weekend
 from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
+from apps.utils.excel_export import export_response, DEFAULT_CHUNK_SIZE
+from apps.absensi.projections import absensi_fleksibel_rows
+from apps.absensi.rekap import rekap_absensi_fleksibel, KETERANGAN_WAJIB
+from apps.absensi.snapshot import get_attendance_snapshot
+from apps.utils.periode import month_range
+from apps.hrd.utils.instrumentation import query_budget
+from apps.hrd.utils.interval_index import LeaveIntervalIndex
 
 
 def calculate_work_duration(jam_masuk, jam_pulang):
@@ -35,6 +41,108 @@ def calculate_work_duration(jam_masuk, jam_pulang):
     return round(duration, 1)
 
 
+def _detail_absensi_data(karyawan, tanggal, absensi, izin_telat, izin_pulang_awal):
+    """Payload modal detail absensi untuk satu hari (format sama dengan endpoint per hari)."""
+    durasi = None
+    if absensi and absensi.jam_masuk and absensi.jam_pulang:
+        durasi = calculate_work_duration(absensi.jam_masuk, absensi.jam_pulang)
+
+    # Telat bila izin telat diajukan (created_at) >= 10:00
+    is_telat = False
+    if izin_telat and izin_telat.created_at:
+        created_local = timezone.localtime(izin_telat.created_at)
+        if created_local.time() >= time(10, 0):
+            is_telat = True
+
+    return {
+        'nama_karyawan': karyawan.nama,
+        'tanggal': tanggal.strftime('%Y-%m-%d'),
+        'tanggal_display': tanggal.strftime('%d %b %Y'),
+        'jam_masuk': absensi.jam_masuk.strftime('%H:%M') if absensi and absensi.jam_masuk else '-',
+        'jam_pulang': absensi.jam_pulang.strftime('%H:%M') if absensi and absensi.jam_pulang else '-',
+        'durasi': f'{durasi} jam' if durasi else '-',
+        'keterangan': absensi.keterangan or '-' if absensi else '-',
+        'hr_keterangan': absensi.hr_keterangan or '-' if absensi else '-',
+        'is_telat': is_telat,
+        'izin_telat_alasan': izin_telat.alasan if izin_telat else None,
+        'izin_pulang_awal': bool(izin_pulang_awal),
+        'izin_pulang_awal_alasan': izin_pulang_awal.alasan if izin_pulang_awal else None,
+        'belum_pulang': bool(absensi and absensi.jam_masuk and not absensi.jam_pulang),
+        'co_auto_generated': getattr(absensi, 'co_auto_generated', False) if absensi else False,
+        'alasan_lupa_co': getattr(absensi, 'alasan_lupa_co', None) or '-' if absensi else '-',
+        'aktivitas_wfa': absensi.aktivitas_wfa or '-' if absensi else '-',
+    }
+
+
+def build_detail_absensi(karyawan, awal, akhir):
+    """
+    Detail absensi harian satu karyawan untuk rentang [awal, akhir).
+
+    Dua query berbasis himpunan (AbsensiMagang dan Izin telat/pulang awal disetujui)
+    untuk seluruh rentang, bukan query per hari.
+
+    Returns:
+        dict {'YYYY-MM-DD': payload} untuk setiap hari dalam rentang
+    """
+    absensi_map = {
+        a.tanggal: a
+        for a in AbsensiMagang.objects.for_period(awal, akhir).filter(id_karyawan=karyawan)
+    }
+
+    indeks = LeaveIntervalIndex.load(
+        awal, akhir, karyawan_ids=[karyawan.id], izin_jenis=['telat', 'pulang_awal'], muat_cuti=False,
+    )
+
+    detail = {}
+    current = awal
+    while current < akhir:
+        detail[current.strftime('%Y-%m-%d')] = _detail_absensi_data(
+            karyawan,
+            current,
+            absensi_map.get(current),
+            # Sama dengan .first(): izin pertama (pk terkecil) per tanggal
+            next(iter(indeks.izin_pada(karyawan.id, current, 'telat')), None),
+            next(iter(indeks.izin_pada(karyawan.id, current, 'pulang_awal')), None),
+        )
+        current += timedelta(days=1)
+    return detail
+
+
+def get_telat_label_map(absensi_keys):
+    """
+    Bangun map (karyawan_id, tanggal) -> label Telat.
+
+    Aturan:
+    - Label "Telat" hanya muncul bila ada Izin Telat disetujui DISERTAI
+      created_at >= 10:00 (waktu lokal) untuk karyawan & tanggal tersebut.
+    - Izin Telat yang diajukan sebelum 10:00 tidak men-trigger label.
+
+    Check-in TANPA Izin Telat tetap tidak diperbolehkan oleh logic di views_fleksibel.
+    """
+    absensi_keys = set(absensi_keys)
+    telat_label_map = {}
+    if not absensi_keys:
+        return telat_label_map
+
+    izin_telat_qs = Izin.objects.filter(
+        jenis_izin='telat',
+        status='disetujui',
+        id_karyawan_id__in={k for k, _ in absensi_keys},
+        tanggal_izin__in={t for _, t in absensi_keys},
+    ).values_list('id_karyawan_id', 'tanggal_izin', 'created_at')
+
+    cutoff_time = time(10, 0)
+    for karyawan_id, tanggal_izin, created_at in izin_telat_qs:
+        key = (karyawan_id, tanggal_izin)
+        # Jika ada SATU saja izin dengan created_at >= 10:00 (waktu lokal),
+        # maka label Telat perlu ditampilkan.
+        if created_at and timezone.localtime(created_at).time() >= cutoff_time:
+            telat_label_map[key] = True
+        else:
+            telat_label_map.setdefault(key, False)
+    return telat_label_map
+
+
 def _badge_class_cuti_rekap(jenis_cuti):
     if jenis_cuti == 'sakit':
         return 'badge-danger'
@@ -71,10 +179,8 @@ def compute_rekap_hari_kerja(bulan_int, tahun_int, nama='', role=''):
             })
         current += timedelta(days=1)
 
-    rekap_absensi_query = AbsensiMagang.objects.filter(
+    rekap_absensi_query = AbsensiMagang.objects.for_month(tahun_int, bulan_int).filter(
         Q(jam_masuk__isnull=False) | Q(hr_keterangan__isnull=False),
-        tanggal__month=bulan_int,
-        tanggal__year=tahun_int,
     ).select_related('id_karyawan', 'id_karyawan__user')
 
     if nama:
@@ -90,67 +196,23 @@ def compute_rekap_hari_kerja(bulan_int, tahun_int, nama='', role=''):
         key = (a.id_karyawan_id, a.tanggal)
         absensi_by_key[key] = a
 
-    izin_telat_map = {}
-    cuti_by_key = {}
-    izin_tanpa_absensi_by_key = {}
-    if karyawan_ids and hari_kerja_list:
-        tanggal_set = {h['tanggal'] for h in hari_kerja_list}
-        for izin in Izin.objects.filter(
-            jenis_izin='telat',
-            status='disetujui',
-            id_karyawan_id__in=karyawan_ids,
-            tanggal_izin__in=tanggal_set,
-        ).only('id_karyawan_id', 'tanggal_izin', 'created_at'):
-            if izin.created_at:
-                created_local = timezone.localtime(izin.created_at)
-                if created_local.time() >= time(10, 0):
-                    izin_telat_map[(izin.id_karyawan_id, izin.tanggal_izin)] = True
-
-        for c in Cuti.objects.filter(
-            id_karyawan_id__in=karyawan_ids,
-            status='disetujui',
-            tanggal_mulai__lte=last_day,
-            tanggal_selesai__gte=first_day,
-        ).only('id', 'id_karyawan_id', 'tanggal_mulai', 'tanggal_selesai', 'jenis_cuti'):
-            d = max(c.tanggal_mulai, first_day)
-            end = min(c.tanggal_selesai, last_day)
-            while d <= end:
-                if d in tanggal_set:
-                    ck = (c.id_karyawan_id, d)
-                    if ck not in cuti_by_key:
-                        cuti_by_key[ck] = c
-                d += timedelta(days=1)
-
-        for izin in Izin.objects.filter(
-            id_karyawan_id__in=karyawan_ids,
-            status='disetujui',
-            tanggal_izin__in=tanggal_set,
-        ).order_by('id').only('id', 'id_karyawan_id', 'tanggal_izin', 'jenis_izin'):
-            ik = (izin.id_karyawan_id, izin.tanggal_izin)
-            if ik not in izin_tanpa_absensi_by_key:
-                izin_tanpa_absensi_by_key[ik] = izin
-
-    izin_pulang_awal_map = set()
-    for izin in Izin.objects.filter(
-        jenis_izin='pulang_awal',
-        status='disetujui',
-        id_karyawan_id__in=karyawan_ids,
-        tanggal_izin__month=bulan_int,
-        tanggal_izin__year=tahun_int,
-    ).values_list('id_karyawan_id', 'tanggal_izin'):
-        izin_pulang_awal_map.add((izin[0], izin[1]))
+    # Cuti/Izin disetujui untuk seluruh bulan dimuat sekali ke indeks interval
+    indeks = LeaveIntervalIndex.load(*month_range(tahun_int, bulan_int), karyawan_ids=karyawan_ids) if karyawan_ids else LeaveIntervalIndex()
+    tanggal_kerja = [h['tanggal'] for h in hari_kerja_list]
+    karyawan_rekap = list(karyawan_rekap)
+    matriks_cuti = indeks.leave_matrix([k.id for k in karyawan_rekap], tanggal_kerja)
 
-    for karyawan in karyawan_rekap:
+    for baris, karyawan in enumerate(karyawan_rekap):
         total_hadir = 0
         cells = []
-        for hari in hari_kerja_list:
+        for kolom, hari in enumerate(hari_kerja_list):
             tgl = hari['tanggal']
             key = (karyawan.id, tgl)
             absensi = absensi_by_key.get(key)
 
             if not absensi:
-                if key in cuti_by_key:
-                    c = cuti_by_key[key]
+                if matriks_cuti[baris, kolom]:
+                    c = indeks.cuti_pada(karyawan.id, tgl)
                     cells.append({
                         'label': c.get_jenis_cuti_display(),
                         'punya_detail': False,
@@ -159,8 +221,9 @@ def compute_rekap_hari_kerja(bulan_int, tahun_int, nama='', role=''):
                         'tipe': 'cuti',
                     })
                     continue
-                if key in izin_tanpa_absensi_by_key:
-                    iz = izin_tanpa_absensi_by_key[key]
+                izin_hari_ini = indeks.izin_pada(karyawan.id, tgl)
+                if izin_hari_ini:
+                    iz = izin_hari_ini[0]
                     cells.append({
                         'label': iz.get_jenis_izin_display(),
                         'punya_detail': False,
@@ -196,12 +259,15 @@ def compute_rekap_hari_kerja(bulan_int, tahun_int, nama='', role=''):
                 labels.append('Belum Pulang')
                 badge_class = 'badge-warning'
 
-            if izin_telat_map.get(key):
+            if any(
+                iz.created_at and timezone.localtime(iz.created_at).time() >= time(10, 0)
+                for iz in indeks.izin_pada(karyawan.id, tgl, 'telat')
+            ):
                 labels.append('Telat')
                 if 'badge-warning' not in badge_class:
                     badge_class = 'badge-warning'
 
-            if key in izin_pulang_awal_map:
+            if indeks.izin_pada(karyawan.id, tgl, 'pulang_awal'):
                 labels.append('Pulang Awal')
                 badge_class = 'badge-warning'
 
@@ -230,6 +296,7 @@ def compute_rekap_hari_kerja(bulan_int, tahun_int, nama='', role=''):
     return hari_kerja_list, rekap_hari_kerja_rows, rekap_hari_kerja_headers
 
 
+@query_budget(25, max_duplicates=3)
 @login_required
 @role_required(['HRD'])
 def riwayat_absensi_fleksibel_hr(request):
@@ -252,85 +319,21 @@ def riwayat_absensi_fleksibel_hr(request):
     # DASHBOARD STATISTICS
     # ============================================
     
-    # Total karyawan aktif (always current, not filtered by date)
-    total_karyawan_aktif = Karyawan.objects.filter(status_keaktifan='Aktif').count()
-    
-    # Absensi untuk tanggal yang dipilih (semua record)
-    absensi_hari_ini = AbsensiMagang.objects.filter(tanggal=selected_date).select_related('id_karyawan', 'id_karyawan__user')
-    
-    # Hanya yang benar-benar check-in (jam_masuk terisi). Abaikan placeholder dari cron reminder.
-    absensi_checkin = absensi_hari_ini.filter(jam_masuk__isnull=False)
-    
-    sudah_absen_hari_ini = absensi_checkin.count()
-    wfo_hari_ini = absensi_checkin.filter(keterangan='WFO').count()
-    wfa_hari_ini = absensi_checkin.filter(keterangan='WFA').count()
-    
-    # Karyawan yang belum absen pulang (sudah masuk tapi belum pulang)
-    belum_pulang = absensi_checkin.filter(jam_pulang__isnull=True)
-    belum_pulang_count = belum_pulang.count()
-    belum_pulang_list = list(belum_pulang.values_list('id_karyawan__nama', flat=True)[:5])
-    
-    # Karyawan aktif yang belum absen masuk sama sekali hari ini 
-    # Exclude: yang sudah check-in ATAU yang sudah punya catatan HR (hr_keterangan)
-    karyawan_sudah_absen_ids = absensi_checkin.values_list('id_karyawan_id', flat=True)
-    karyawan_dengan_catatan_hr = AbsensiMagang.objects.filter(
-        tanggal=selected_date,
-        hr_keterangan__isnull=False
-    ).values_list('id_karyawan_id', flat=True)
-    
-    belum_masuk = Karyawan.objects.filter(
-        status_keaktifan='Aktif'
-    ).exclude(id__in=karyawan_sudah_absen_ids).exclude(id__in=karyawan_dengan_catatan_hr)
-    belum_masuk_count = belum_masuk.count()
-    belum_masuk_list = list(belum_masuk.values_list('nama', flat=True)[:5])
-    
+    # KPI, histogram durasi dan potensi lembur dari snapshot harian (satu query, di-cache)
+    snapshot = get_attendance_snapshot(selected_date)
+    total_karyawan_aktif = snapshot['total_karyawan_aktif']
+    sudah_absen_hari_ini = snapshot['sudah_absen_hari_ini']
+    wfo_hari_ini = snapshot['wfo_hari_ini']
+    wfa_hari_ini = snapshot['wfa_hari_ini']
+    belum_pulang_count = snapshot['belum_pulang_count']
+    belum_pulang_list = snapshot['belum_pulang_list']
+    belum_masuk_count = snapshot['belum_masuk_count']
+    belum_masuk_list = snapshot['belum_masuk_list']
     # Full list of employees without attendance (for Add Note feature)
-    belum_masuk_all = belum_masuk.select_related('user').order_by('nama')
-    
-    # ============================================
-    # WORK DURATION INSIGHTS
-    # ============================================
-    
-    # Query absensi yang sudah pulang hari ini (untuk hitung durasi)
-    absensi_selesai = absensi_hari_ini.filter(jam_masuk__isnull=False, jam_pulang__isnull=False)
-    
-    # Hitung rata-rata durasi kerja
-    total_durasi = 0
-    durasi_list = []
-    durasi_kurang_8_jam = []
-    potensi_lembur = []
-    
-    for absensi in absensi_selesai:
-        durasi = calculate_work_duration(absensi.jam_masuk, absensi.jam_pulang)
-        if durasi:
-            durasi_list.append(durasi)
-            total_durasi += durasi
-            
-            if durasi < 8.5:
-                durasi_kurang_8_jam.append({
-                    'nama': absensi.id_karyawan.nama,
-                    'durasi': durasi
-                })
-            elif durasi >= 10:
-                potensi_lembur.append({
-                    'nama': absensi.id_karyawan.nama,
-                    'durasi': durasi
-                })
-    
-    # Check for employees still working (belum pulang) with 10+ hours
-    for absensi in belum_pulang:
-        if absensi.jam_masuk:
-            jam_masuk_dt = datetime.combine(selected_date, absensi.jam_masuk)
-            sekarang = datetime.now()
-            durasi = (sekarang - jam_masuk_dt).total_seconds() / 3600
-            if durasi >= 10:
-                potensi_lembur.append({
-                    'nama': absensi.id_karyawan.nama,
-                    'durasi': round(durasi, 1),
-                    'masih_kerja': True
-                })
-    
-    rata_rata_durasi = round(total_durasi / len(durasi_list), 1) if durasi_list else 0
+    belum_masuk_all = snapshot['belum_masuk_all']
+    rata_rata_durasi = snapshot['rata_rata_durasi']
+    durasi_kurang_8_jam = snapshot['durasi_kurang_8_jam']
+    potensi_lembur = snapshot['potensi_lembur']
     
     # ============================================
     # FILTERS
@@ -356,11 +359,10 @@ def riwayat_absensi_fleksibel_hr(request):
     if nama:
         absensi_query = absensi_query.filter(id_karyawan__nama__icontains=nama)
     
-    if bulan and bulan.isdigit():
-        absensi_query = absensi_query.filter(tanggal__month=int(bulan))
-    
-    if tahun and tahun.isdigit():
-        absensi_query = absensi_query.filter(tanggal__year=int(tahun))
+    absensi_query = absensi_query.for_month_or_year(
+        tahun=tahun if tahun and tahun.isdigit() else None,
+        bulan=bulan if bulan and bulan.isdigit() else None,
+    )
     
     if role:
         absensi_query = absensi_query.filter(id_karyawan__user__role=role)
@@ -404,64 +406,24 @@ def riwayat_absensi_fleksibel_hr(request):
         # Default: sort by tanggal with secondary sort
         absensi_query = absensi_query.order_by(sort_by, '-jam_masuk')
     
-    # ============================================
-    # LATE LABEL (IZIN TELAT) LOGIC
-    # ============================================
-    #
-    # Aturan:
-    # - Label "Telat" hanya muncul di rekap bila ada Izin Telat DISERTAI
-    #   created_at >= 10:00 untuk karyawan & tanggal tersebut.
-    # - Izin Telat yang diajukan sebelum 10:00 tidak men-trigger label.
-    #
-    # Catatan:
-    # - Check-in TANPA Izin Telat tetap tidak diperbolehkan oleh logic di views_fleksibel.
-    #
-    # Build a map of (karyawan_id, date) -> has_late_permission
-    absensi_list_for_keys = list(absensi_query.values('id_karyawan_id', 'tanggal', 'id_absensi'))
-    telat_label_map = {}
-    if absensi_list_for_keys:
-        karyawan_ids = list(set([item['id_karyawan_id'] for item in absensi_list_for_keys]))
-        tanggal_list = list(set([item['tanggal'] for item in absensi_list_for_keys]))
-        
-        izin_telat_qs = Izin.objects.filter(
-            jenis_izin='telat',
-            status='disetujui',
-            id_karyawan_id__in=karyawan_ids,
-            tanggal_izin__in=tanggal_list,
-        ).only('id_karyawan_id', 'tanggal_izin', 'created_at')
-        
-        cutoff_time = time(10, 0)
-        for izin in izin_telat_qs:
-            key = (izin.id_karyawan_id, izin.tanggal_izin)
-            # Jika ada SATU saja izin dengan created_at >= 10:00 (waktu lokal),
-            # maka label Telat perlu ditampilkan.
-            if izin.created_at:
-                # Konversi created_at ke timezone lokal (Asia/Jakarta)
-                created_at_local = timezone.localtime(izin.created_at)
-                created_time = created_at_local.time()
-                if created_time >= cutoff_time:
-                    telat_label_map[key] = True
-                else:
-                    telat_label_map.setdefault(key, False)
-            else:
-                telat_label_map.setdefault(key, False)
-    
-    # Calculate duration for each attendance record & attach late-label flag
-    absensi_with_duration = []
-    for absensi in absensi_query:
-        durasi = calculate_work_duration(absensi.jam_masuk, absensi.jam_pulang)
-        absensi.durasi_kerja = durasi
-        
-        key = (absensi.id_karyawan_id, absensi.tanggal)
-        absensi.is_telat_label = telat_label_map.get(key, False)
-        
-        absensi_with_duration.append(absensi)
-    
-    # Pagination
-    paginator = Paginator(absensi_with_duration, 15)  # 15 items per halaman
+    # Pagination di level query: hanya baris halaman aktif yang diambil,
+    # dalam bentuk proyeksi baris (tanpa relasi lazy)
+    paginator = Paginator(absensi_fleksibel_rows(absensi_query), 15)  # 15 items per halaman
     page = request.GET.get('page')
     absensi_list = paginator.get_page(page)
     
+    # Durasi kerja & label Telat (lihat get_telat_label_map) untuk baris halaman ini
+    page_rows = list(absensi_list.object_list)
+    telat_label_map = get_telat_label_map((r.id_karyawan_id, r.tanggal) for r in page_rows)
+    absensi_list.object_list = [
+        dict(
+            r._asdict(),
+            durasi_kerja=calculate_work_duration(r.jam_masuk, r.jam_pulang),
+            is_telat_label=telat_label_map.get((r.id_karyawan_id, r.tanggal), False),
+        )
+        for r in page_rows
+    ]
+    
     # ============================================
     # FILTER OPTIONS
     # ============================================
@@ -494,32 +456,11 @@ def riwayat_absensi_fleksibel_hr(request):
     pivot_rows = []
     
     if bulan and bulan.isdigit() and tahun and tahun.isdigit():
-        if absensi_query.exists():
-            pivot_data = list(absensi_query.values('id_karyawan__nama', 'keterangan'))
-            df = pd.DataFrame(pivot_data)
-            
-            if not df.empty and 'id_karyawan__nama' in df.columns and 'keterangan' in df.columns:
-                pivot_table = pd.pivot_table(
-                    df,
-                    index='id_karyawan__nama',
-                    columns='keterangan',
-                    aggfunc='size',
-                    fill_value=0
-                ).reset_index()
-                
-                all_keterangan = ['WFO', 'WFA']
-                for ket in all_keterangan:
-                    if ket not in pivot_table.columns:
-                        pivot_table[ket] = 0
-                
-                numeric_columns = [col for col in pivot_table.columns if col != 'id_karyawan__nama']
-                pivot_table['Total'] = pivot_table[numeric_columns].sum(axis=1)
-                
-                column_order = ['id_karyawan__nama'] + all_keterangan + ['Total']
-                pivot_table = pivot_table.reindex(columns=column_order, fill_value=0)
-                
-                pivot_headers = ['Nama Karyawan'] + all_keterangan + ['Total']
-                pivot_rows = [list(row) for _, row in pivot_table.iterrows()]
+        # Satu query GROUP BY karyawan; Total tetap menghitung semua keterangan
+        headers, rows = rekap_absensi_fleksibel(absensi_query, kolom_keterangan=KETERANGAN_WAJIB)
+        if rows:
+            pivot_headers = headers
+            pivot_rows = rows
     
     # ============================================
     # REKAP HARI KERJA (mirip Jatah Cuti, kolom per hari kerja)
@@ -547,12 +488,13 @@ def riwayat_absensi_fleksibel_hr(request):
         'wfa_hari_ini': wfa_hari_ini,
         'belum_masuk_count': belum_masuk_count,
         'belum_masuk_list': belum_masuk_list,
-        'belum_masuk_all': belum_masuk_all,  # Full queryset for Add Note feature
+        'belum_masuk_all': belum_masuk_all,  # Full list for Add Note feature
         'belum_pulang_count': belum_pulang_count,
         'belum_pulang_list': belum_pulang_list,
         'rata_rata_durasi': rata_rata_durasi,
         'durasi_kurang_8_jam': durasi_kurang_8_jam,
         'potensi_lembur': potensi_lembur,
+        'histogram_durasi': snapshot['histogram_durasi'],
         
         # Table data
         'absensi_list': absensi_list,
@@ -591,6 +533,7 @@ def riwayat_absensi_fleksibel_hr(request):
     return render(request, 'absensi/riwayat_absensi_fleksibel_hr.html', context)
 
 
+@query_budget(10, max_duplicates=2)
 @login_required
 @role_required(['HRD'])
 def export_absensi_fleksibel_excel(request):
@@ -610,11 +553,10 @@ def export_absensi_fleksibel_excel(request):
     if nama:
         absensi_query = absensi_query.filter(id_karyawan__nama__icontains=nama)
     
-    if bulan and bulan.isdigit():
-        absensi_query = absensi_query.filter(tanggal__month=int(bulan))
-    
-    if tahun and tahun.isdigit():
-        absensi_query = absensi_query.filter(tanggal__year=int(tahun))
+    absensi_query = absensi_query.for_month_or_year(
+        tahun=tahun if tahun and tahun.isdigit() else None,
+        bulan=bulan if bulan and bulan.isdigit() else None,
+    )
     
     if role:
         absensi_query = absensi_query.filter(id_karyawan__user__role=role)
@@ -639,44 +581,8 @@ def export_absensi_fleksibel_excel(request):
     absensi_query = absensi_query.order_by('-tanggal')
     
     # Label Telat (1/0): sama dengan logic di riwayat_absensi_fleksibel_hr
-    absensi_keys = list(absensi_query.values_list('id_karyawan_id', 'tanggal').distinct())
-    telat_label_map = {}
-    if absensi_keys:
-        karyawan_ids = [k for k, _ in absensi_keys]
-        tanggal_list = [t for _, t in absensi_keys]
-        izin_telat_qs = Izin.objects.filter(
-            jenis_izin='telat',
-            status='disetujui',
-            id_karyawan_id__in=karyawan_ids,
-            tanggal_izin__in=tanggal_list,
-        ).only('id_karyawan_id', 'tanggal_izin', 'created_at')
-        cutoff_time = time(10, 0)
-        for izin in izin_telat_qs:
-            key = (izin.id_karyawan_id, izin.tanggal_izin)
-            if izin.created_at:
-                created_at_local = timezone.localtime(izin.created_at)
-                created_time = created_at_local.time()
-                if created_time >= cutoff_time:
-                    telat_label_map[key] = True
-                else:
-                    telat_label_map.setdefault(key, False)
-            else:
-                telat_label_map.setdefault(key, False)
-    
-    # Buat workbook Excel
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "Riwayat Absensi"
-    
-    # Style untuk header
-    header_font = Font(bold=True, color="FFFFFF")
-    header_fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
-    header_alignment = Alignment(horizontal="center", vertical="center")
-    thin_border = Border(
-        left=Side(style='thin'),
-        right=Side(style='thin'),
-        top=Side(style='thin'),
-        bottom=Side(style='thin')
+    telat_label_map = get_telat_label_map(
+        absensi_query.order_by().values_list('id_karyawan_id', 'tanggal').distinct()
     )
     
     # Header
@@ -685,64 +591,38 @@ def export_absensi_fleksibel_excel(request):
         "Durasi (Jam)", "Keterangan", "Telat", "Lokasi Masuk", "Lokasi Pulang", "Catatan HR",
         "Aktivitas WFA", "Auto CO", "Alasan Lupa CO", "Jam Pulang Kira"
     ]
-    
-    for col, header in enumerate(headers, 1):
-        cell = ws.cell(row=1, column=col, value=header)
-        cell.font = header_font
-        cell.fill = header_fill
-        cell.alignment = header_alignment
-        cell.border = thin_border
-    
-    # Data
-    for row_num, absensi in enumerate(absensi_query, 2):
-        durasi = calculate_work_duration(absensi.jam_masuk, absensi.jam_pulang)
-        role_name = absensi.id_karyawan.user.role if absensi.id_karyawan.user else "-"
-        is_telat = telat_label_map.get((absensi.id_karyawan_id, absensi.tanggal), False)
-        
-        row_data = [
-            absensi.id_karyawan.nama,
-            role_name,
-            absensi.tanggal.strftime("%Y-%m-%d"),
-            absensi.jam_masuk.strftime("%H:%M:%S") if absensi.jam_masuk else "-",
-            absensi.jam_pulang.strftime("%H:%M:%S") if absensi.jam_pulang else "-",
-            durasi if durasi else "-",
-            absensi.keterangan or "-",
-            1 if is_telat else 0,
-            absensi.alamat_masuk or "-",
-            absensi.alamat_pulang or "-",
-            absensi.hr_keterangan or "-",
-            absensi.aktivitas_wfa or "-",
-            "Ya" if getattr(absensi, 'co_auto_generated', False) else "-",
-            getattr(absensi, 'alasan_lupa_co', None) or "-",
-            absensi.jam_pulang_kira.strftime("%H:%M") if getattr(absensi, 'jam_pulang_kira', None) else "-"
-        ]
-        
-        for col, value in enumerate(row_data, 1):
-            cell = ws.cell(row=row_num, column=col, value=value)
-            cell.border = thin_border
-            if col in [3, 4, 5, 6, 7, 8]:  # Center align date, time, duration, keterangan, telat
-                cell.alignment = Alignment(horizontal="center")
-    
-    # Auto-adjust column widths
-    for column in ws.columns:
-        max_length = 0
-        column_letter = column[0].column_letter
-        for cell in column:
-            try:
-                if len(str(cell.value)) > max_length:
-                    max_length = len(str(cell.value))
-            except:
-                pass
-        adjusted_width = min(max_length + 2, 50)
-        ws.column_dimensions[column_letter].width = adjusted_width
-    
-    # Buat respons download
-    response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+
+    # Data: proyeksi baris, tanggal & jam sudah diformat di SQL
+    def generate_rows():
+        for r in absensi_fleksibel_rows(absensi_query).iterator(chunk_size=DEFAULT_CHUNK_SIZE):
+            durasi = calculate_work_duration(r.jam_masuk, r.jam_pulang)
+            is_telat = telat_label_map.get((r.id_karyawan_id, r.tanggal), False)
+            yield [
+                r.nama,
+                r.role or "-",
+                r.tanggal_text,
+                r.jam_masuk_text,
+                r.jam_pulang_text,
+                durasi if durasi else "-",
+                r.keterangan or "-",
+                1 if is_telat else 0,
+                r.alamat_masuk or "-",
+                r.alamat_pulang or "-",
+                r.hr_keterangan or "-",
+                r.aktivitas_wfa or "-",
+                "Ya" if r.co_auto_generated else "-",
+                r.alasan_lupa_co or "-",
+                r.jam_pulang_kira_text,
+            ]
+
     filename = f"riwayat_absensi_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-    response['Content-Disposition'] = f'attachment; filename="{filename}"'
-    wb.save(response)
-    
-    return response
+    return export_response(
+        filename,
+        "Riwayat Absensi",
+        headers,
+        generate_rows(),
+        center_columns=[3, 4, 5, 6, 7, 8],  # tanggal, jam, durasi, keterangan, telat
+    )
 
 
 @login_required
@@ -759,10 +639,7 @@ def export_rekap_absensi_fleksibel_excel(request):
         return redirect("riwayat_absensi_fleksibel_hr")
     
     # Buat query dasar
-    absensi_query = AbsensiMagang.objects.filter(
-        tanggal__month=int(bulan),
-        tanggal__year=int(tahun)
-    ).select_related('id_karyawan', 'id_karyawan__user')
+    absensi_query = AbsensiMagang.objects.for_month_or_year(tahun=tahun, bulan=bulan).select_related('id_karyawan', 'id_karyawan__user')
     
     if nama:
         absensi_query = absensi_query.filter(id_karyawan__nama__icontains=nama)
@@ -770,85 +647,16 @@ def export_rekap_absensi_fleksibel_excel(request):
     if role:
         absensi_query = absensi_query.filter(id_karyawan__user__role=role)
     
-    # Buat workbook Excel
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "Rekap Absensi"
-    
-    # Style
-    header_font = Font(bold=True, color="FFFFFF")
-    header_fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
-    
-    if absensi_query.exists():
-        pivot_data = list(absensi_query.values('id_karyawan__nama', 'id_karyawan__user__role', 'keterangan'))
-        df = pd.DataFrame(pivot_data)
-        
-        if not df.empty:
-            pivot_table = pd.pivot_table(
-                df,
-                index=['id_karyawan__nama', 'id_karyawan__user__role'],
-                columns='keterangan',
-                aggfunc='size',
-                fill_value=0
-            ).reset_index()
-            
-            # Ensure WFO and WFA columns exist
-            for ket in ['WFO', 'WFA']:
-                if ket not in pivot_table.columns:
-                    pivot_table[ket] = 0
-            
-            numeric_columns = [col for col in pivot_table.columns if col not in ['id_karyawan__nama', 'id_karyawan__user__role']]
-            pivot_table['Total'] = pivot_table[numeric_columns].sum(axis=1)
-            
-            # Rename columns for clarity
-            pivot_table = pivot_table.rename(columns={
-                'id_karyawan__nama': 'Nama Karyawan',
-                'id_karyawan__user__role': 'Role'
-            })
-            
-            # Header
-            headers = list(pivot_table.columns)
-            for col, header in enumerate(headers, 1):
-                cell = ws.cell(row=1, column=col, value=header)
-                cell.font = header_font
-                cell.fill = header_fill
-            
-            # Data
-            for row_num, (_, row) in enumerate(pivot_table.iterrows(), 2):
-                for col, value in enumerate(row, 1):
-                    ws.cell(row=row_num, column=col, value=value)
-    else:
-        headers = ['Nama Karyawan', 'Role', 'WFO', 'WFA', 'Total']
-        for col, header in enumerate(headers, 1):
-            cell = ws.cell(row=1, column=col, value=header)
-            cell.font = header_font
-            cell.fill = header_fill
-    
-    # Auto-adjust column widths
-    for column in ws.columns:
-        max_length = 0
-        column_letter = column[0].column_letter
-        for cell in column:
-            try:
-                if len(str(cell.value)) > max_length:
-                    max_length = len(str(cell.value))
-            except:
-                pass
-        adjusted_width = min(max_length + 2, 50)
-        ws.column_dimensions[column_letter].width = adjusted_width
+    # Kolom WFO dan WFA selalu ada meskipun data kosong
+    headers, rows = rekap_absensi_fleksibel(absensi_query, dengan_role=True)
     
-    # Buat respons download
-    response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
     bulan_nama = dict([
         (1, 'Januari'), (2, 'Februari'), (3, 'Maret'), (4, 'April'),
         (5, 'Mei'), (6, 'Juni'), (7, 'Juli'), (8, 'Agustus'),
         (9, 'September'), (10, 'Oktober'), (11, 'November'), (12, 'Desember')
     ]).get(int(bulan), str(bulan))
     filename = f"rekap_absensi_{bulan_nama}_{str(tahun)}.xlsx"
-    response['Content-Disposition'] = f'attachment; filename="{filename}"'
-    wb.save(response)
-    
-    return response
+    return export_response(filename, "Rekap Absensi", headers, rows)
 
 
 @login_required
@@ -929,6 +737,7 @@ def export_rekap_hari_kerja_fleksibel_excel(request):
     return response
 
 
+@query_budget(8, max_duplicates=2)
 @login_required
 @role_required(['HRD'])
 def get_detail_absensi_hari_ajax(request):
@@ -951,56 +760,48 @@ def get_detail_absensi_hari_ajax(request):
     if not karyawan:
         return JsonResponse({'status': 'error', 'message': 'Karyawan tidak ditemukan'}, status=404)
 
-    absensi = AbsensiMagang.objects.filter(
-        id_karyawan=karyawan,
-        tanggal=tanggal
-    ).first()
+    detail = build_detail_absensi(karyawan, tanggal, tanggal + timedelta(days=1))
+    return JsonResponse({'status': 'success', 'data': detail[tanggal.strftime('%Y-%m-%d')]})
 
-    durasi = None
-    if absensi and absensi.jam_masuk and absensi.jam_pulang:
-        durasi = calculate_work_duration(absensi.jam_masuk, absensi.jam_pulang)
 
-    # Cek izin telat (created_at >= 10:00)
-    is_telat = False
-    izin_telat = Izin.objects.filter(
-        jenis_izin='telat',
-        status='disetujui',
-        id_karyawan=karyawan,
-        tanggal_izin=tanggal
-    ).first()
-    if izin_telat and izin_telat.created_at:
-        created_local = timezone.localtime(izin_telat.created_at)
-        if created_local.time() >= time(10, 0):
-            is_telat = True
+@query_budget(8, max_duplicates=2)
+@login_required
+@role_required(['HRD'])
+def get_detail_absensi_bulan_ajax(request):
+    """
+    Detail absensi satu karyawan untuk SEMUA hari dalam satu bulan (modal Rekap Hari Kerja).
+    Frontend menyimpan hasilnya per (karyawan, bulan) sehingga klik sel berikutnya
+    tidak perlu request lagi.
+    """
+    if request.method != 'GET':
+        return JsonResponse({'status': 'error', 'message': 'Method not allowed'}, status=405)
 
-    # Cek izin pulang awal
-    izin_pulang_awal = Izin.objects.filter(
-        jenis_izin='pulang_awal',
-        status='disetujui',
-        id_karyawan=karyawan,
-        tanggal_izin=tanggal
-    ).first()
+    karyawan_id = request.GET.get('karyawan_id')
+    bulan = request.GET.get('bulan')
+    tahun = request.GET.get('tahun')
 
-    data = {
-        'nama_karyawan': karyawan.nama,
-        'tanggal': tanggal_str,
-        'tanggal_display': tanggal.strftime('%d %b %Y'),
-        'jam_masuk': absensi.jam_masuk.strftime('%H:%M') if absensi and absensi.jam_masuk else '-',
-        'jam_pulang': absensi.jam_pulang.strftime('%H:%M') if absensi and absensi.jam_pulang else '-',
-        'durasi': f'{durasi} jam' if durasi else '-',
-        'keterangan': absensi.keterangan or '-' if absensi else '-',
-        'hr_keterangan': absensi.hr_keterangan or '-' if absensi else '-',
-        'is_telat': is_telat,
-        'izin_telat_alasan': izin_telat.alasan if izin_telat else None,
-        'izin_pulang_awal': bool(izin_pulang_awal),
-        'izin_pulang_awal_alasan': izin_pulang_awal.alasan if izin_pulang_awal else None,
-        'belum_pulang': bool(absensi and absensi.jam_masuk and not absensi.jam_pulang),
-        'co_auto_generated': getattr(absensi, 'co_auto_generated', False) if absensi else False,
-        'alasan_lupa_co': getattr(absensi, 'alasan_lupa_co', None) or '-' if absensi else '-',
-        'aktivitas_wfa': absensi.aktivitas_wfa or '-' if absensi else '-',
-    }
+    if not karyawan_id or not bulan or not tahun:
+        return JsonResponse({'status': 'error', 'message': 'Data tidak lengkap'}, status=400)
+
+    try:
+        awal, akhir = month_range(tahun, bulan)
+    except ValueError:
+        return JsonResponse({'status': 'error', 'message': 'Bulan atau tahun tidak valid'}, status=400)
 
-    return JsonResponse({'status': 'success', 'data': data})
+    karyawan = Karyawan.objects.filter(id=karyawan_id).first()
+    if not karyawan:
+        return JsonResponse({'status': 'error', 'message': 'Karyawan tidak ditemukan'}, status=404)
+
+    return JsonResponse({
+        'status': 'success',
+        'data': {
+            'karyawan_id': karyawan.id,
+            'nama_karyawan': karyawan.nama,
+            'bulan': awal.month,
+            'tahun': awal.year,
+            'hari': build_detail_absensi(karyawan, awal, akhir),
+        },
+    })
 
 
 @login_required
@@ -7,54 +7,35 @@ from django.contrib.auth.decorators import login_required
 from django.http import JsonResponse, HttpResponse
 from django.conf import settings
 from django.contrib import messages
+from django.core.exceptions import ValidationError
 from django.views.decorators.csrf import csrf_exempt
-from geopy.geocoders import Nominatim
-from geopy.exc import GeocoderTimedOut, GeocoderServiceError
 from apps.authentication.decorators import role_required
 from apps.hrd.models import Karyawan, Izin
+from apps.hrd.utils.instrumentation import query_budget
+from apps.hrd.utils.etag import watermark_etag
+from apps.hrd.utils.ringkasan_karyawan import kunci_ringkasan
+from apps.hrd.utils.upload_langsung import klaim_upload
 from ..models import AbsensiMagang
 from ..forms import AbsensiMagangForm, AbsensiPulangForm
-from ..utils import validate_user_location, get_rule_for_date, get_effective_rule_config
+from ..utils import validate_user_location
+from ..checkin import (
+    OVERTIME_THRESHOLD,
+    alamat_tanpa_menunggu,
+    get_konteks_hari,
+    get_request_karyawan,
+    jadwalkan_isi_alamat,
+    muat_status_absensi,
+    punya_izin_telat,
+    simpan_checkin,
+)
 
-# Fallback time restrictions (8.5 hour work system) - dipakai jika tidak ada rule
-MIN_CHECKIN_TIME = time(6, 0)   # 06:00 - earliest check-in allowed
-REMINDER_CHECKIN_TIME = time(10, 0)  # 10:00 - setelah ini wajib Izin Telat
-MAX_CHECKIN_TIME = time(11, 0)  # 11:00 - batas maksimal
-OVERTIME_THRESHOLD = time(18, 30)  # 6:30 PM - overtime alert threshold
 MAX_CHECKOUT_TIME = time(22, 0)  # 10:00 PM - system checkout limit
-MIN_WORK_DURATION_HOURS = 8.5  # 8.5 hours minimum work duration
 INTERN_EXPECTED_CO_TIME = time(17, 30)  # Expected CO for Magang (intern) - no 8.5h rule
 
 
 def _get_today_rule_config():
     """Ambil konfigurasi rule untuk hari ini (untuk Absensi Fleksibel). Fallback ke konstanta jika tidak ada rule."""
-    today = datetime.now().date()
-    rule = get_rule_for_date(today)
-    config = get_effective_rule_config(rule, today) if rule else None
-    if config:
-        return config
-    return {
-        'min_jam_masuk': MIN_CHECKIN_TIME,
-        'batas_checkin_reminder': REMINDER_CHECKIN_TIME,
-        'batas_deadline_checkin': MAX_CHECKIN_TIME,
-        'durasi_kerja_jam': MIN_WORK_DURATION_HOURS,
-        'batas_overtime': OVERTIME_THRESHOLD,
-    }
-
-# Fungsi untuk mendapatkan alamat dari koordinat
-def get_address_from_coordinates(latitude, longitude):
-    geolocator = Nominatim(user_agent="cesgs_web_hr_app", timeout=10)
-    try:
-        location = geolocator.reverse(f"{latitude}, {longitude}", exactly_one=True, language='id')
-        if location:
-            return location.address
-    except (GeocoderTimedOut, GeocoderServiceError) as e:
-        print(f"DEBUG: Geocoding error for {latitude}, {longitude}: {e}")
-        return None
-    except Exception as e:
-        print(f"DEBUG: An unexpected error occurred during geocoding for {latitude}, {longitude}: {e}")
-        return None
-    return None
+    return get_konteks_hari()['config']
 
 
 
@@ -170,37 +151,35 @@ def lupa_co_form_view(request):
     return render(request, 'absensi/lupa_co_form.html', context)
 
 
+# POST check-in: sesi + user + karyawan + status absensi (+ izin telat) + upsert + watermark.
+# GET juga merender dropdown notifikasi di base template (maks. 5 actor).
+@query_budget(12, max_duplicates=5)
 @login_required
 def absen_view(request):
     """View untuk halaman absensi lokasi (8.5 jam fleksibel)"""
     dashboard_url = get_dashboard_url(request.user)
     
-    try:
-        karyawan = Karyawan.objects.get(user=request.user)
-    except Karyawan.DoesNotExist:
+    karyawan = get_request_karyawan(request)
+    if karyawan is None:
         messages.error(request, 'Data karyawan tidak ditemukan')
         return redirect(dashboard_url)
 
+    # Cek apakah sudah absen hari ini (satu query: absensi hari ini + lupa CO pending)
+    today = datetime.now().date()
+    absensi_hari_ini, ada_lupa_co = muat_status_absensi(karyawan, today)
+
     # Sebelum CI: wajib isi alasan lupa CO jika ada yang pending
-    if _get_pending_lupa_co(karyawan).exists():
+    if ada_lupa_co:
         messages.warning(request, 'Anda lupa check-out pada hari kerja sebelumnya. Mohon lengkapi alasan dan perkiraan jam pulang terlebih dahulu.')
         return redirect('lupa_co_form')
-    
-    # Cek apakah sudah absen hari ini
-    today = datetime.now().date()
-    from apps.absensi.utils import is_wfa_day
-    is_wfa, wfa_keterangan = is_wfa_day(today)
 
-    # Konfigurasi rule untuk hari ini (Ramadhan dll)
-    cfg = _get_today_rule_config()
+    # Rule (Ramadhan dll), hari WFA dan lokasi kantor untuk hari ini (di-cache)
+    konteks = get_konteks_hari(today)
+    is_wfa, wfa_keterangan = konteks['is_wfa'], konteks['wfa_keterangan']
+    cfg = konteks['config']
     min_ci = cfg['min_jam_masuk']
     reminder_ci = cfg['batas_checkin_reminder']
     max_ci = cfg['batas_deadline_checkin']
-
-    absensi_hari_ini = AbsensiMagang.objects.filter(
-        id_karyawan=karyawan,
-        tanggal=today
-    ).first()
     
     # "Sudah check-in" = record ada DAN jam_masuk terisi. Placeholder (dari cron reminder)
     # punya record tapi jam_masuk NULL → belum check-in.
@@ -216,14 +195,7 @@ def absen_view(request):
     checkin_blocked = current_time >= reminder_ci and not sudah_checkin
     
     # Setelah pukul 10:00, hanya boleh check-in jika punya Izin Telat yang DISSETUJUI
-    has_approved_late_permission = False
-    if checkin_blocked:
-        has_approved_late_permission = Izin.objects.filter(
-            id_karyawan=karyawan,
-            tanggal_izin=today,
-            jenis_izin='telat',
-            status='disetujui'
-        ).exists()
+    has_approved_late_permission = checkin_blocked and punya_izin_telat(karyawan, today)
     checkin_blocked_no_permission = checkin_blocked and not has_approved_late_permission
     
     # Penyesuaian flag untuk tampilan:
@@ -236,101 +208,80 @@ def absen_view(request):
     
     if request.method == 'POST':
         # Block check-in sebelum jam minimum
-        if current_time < min_ci and not sudah_checkin:
+        if checkin_too_early:
             messages.error(request, f'Check-in hanya dapat dilakukan mulai pukul {min_ci.strftime("%H:%M")} WIB.')
             return redirect(dashboard_url)
         
         # Setelah batas reminder, WAJIB punya Izin Telat yang disetujui untuk bisa check-in.
-        if current_time >= reminder_ci and not sudah_checkin:
-            has_approved_late_permission_post = Izin.objects.filter(
-                id_karyawan=karyawan,
-                tanggal_izin=today,
-                jenis_izin='telat',
-                status='disetujui'
-            ).exists()
-            
-            if not has_approved_late_permission_post:
-                messages.error(
-                    request,
-                    f'Setelah pukul {reminder_ci.strftime("%H:%M")} WIB, check-in hanya dapat dilakukan jika Anda memiliki '
-                    'Izin Telat yang sudah disetujui HR.'
-                )
-                return redirect(dashboard_url)
-            # else:
-            #     messages.warning(request, 'Check-in dengan izin telat yang disetujui HR.')
-        
-        form = AbsensiMagangForm(request.POST, user=request.user)
-        if form.is_valid():
-            if sudah_checkin:
-                messages.info(request, 'Anda sudah melakukan absensi hari ini')
-                return redirect('magang_dashboard')
-            
-            # Update placeholder (dari cron reminder) atau buat baru
-            if absensi_hari_ini and absensi_hari_ini.jam_masuk is None:
-                absensi = absensi_hari_ini
-            else:
-                absensi = form.save(commit=False)
-                absensi.id_karyawan = karyawan
-                absensi.tanggal = today
-            
-            absensi.jam_masuk = current_time
-            
-            # Set status based on check-in time
-            if current_time < reminder_ci:
-                absensi.status = 'Tepat Waktu'  # Normal check-in
-            else:
-                absensi.status = 'Terlambat'  # Setelah batas reminder = terlambat
-            
-            # Ambil koordinat dari form
-            latitude = request.POST.get('latitude')
-            longitude = request.POST.get('longitude')
-            
-            # CRITICAL: Prevent Check-in without location
-            if not latitude or not longitude:
-                messages.error(request, 'Gagal Check-in: Lokasi tidak terdeteksi. Pastikan GPS aktif dan beri izin akses lokasi.')
-                return redirect(dashboard_url)
+        if checkin_blocked_no_permission:
+            messages.error(
+                request,
+                f'Setelah pukul {reminder_ci.strftime("%H:%M")} WIB, check-in hanya dapat dilakukan jika Anda memiliki '
+                'Izin Telat yang sudah disetujui HR.'
+            )
+            return redirect(dashboard_url)
 
-            # Auto-set keterangan based on geofence: WFO jika di ASEEC, WFA jika di luar
-            if latitude and longitude:
-                # Check geofence to determine WFO or WFA
-                location_result = validate_user_location(float(latitude), float(longitude))
-                if location_result['valid']:
-                    if location_result.get('is_wfa_day'):
-                        absensi.keterangan = 'WFA'  # WFA day = WFA
-                    else:
-                        absensi.keterangan = 'WFO'  # Within geofence = WFO
-                else:
-                    absensi.keterangan = 'WFA'  # Outside geofence = WFA
-                
-                absensi.lokasi_masuk = f"{latitude}, {longitude}"
-                address = get_address_from_coordinates(latitude, longitude)
-                if address:
-                    absensi.alamat_masuk = address
-                else:
-                    absensi.alamat_masuk = "Alamat tidak ditemukan"
-            
-            absensi.save()
+        if sudah_checkin:
+            messages.info(request, 'Anda sudah melakukan absensi hari ini')
+            return redirect('magang_dashboard')
 
-            # Warning untuk late check-in (valid & saved)
-            if current_time >= reminder_ci:
-                 messages.warning(request, 'Check-in dengan izin telat yang disetujui HR.')
+        # Ambil koordinat dari form
+        latitude = request.POST.get('latitude')
+        longitude = request.POST.get('longitude')
+        
+        # CRITICAL: Prevent Check-in without location
+        if not latitude or not longitude:
+            messages.error(request, 'Gagal Check-in: Lokasi tidak terdeteksi. Pastikan GPS aktif dan beri izin akses lokasi.')
+            return redirect(dashboard_url)
+        try:
+            lat, lon = float(latitude), float(longitude)
+        except ValueError:
+            messages.error(request, 'Gagal Check-in: Format koordinat lokasi tidak valid.')
+            return redirect(dashboard_url)
 
-            messages.success(request, f'Absensi berhasil disimpan pada {current_time.strftime("%H:%M:%S")}')
-            
-            # Redirect berdasarkan role
-            if request.user.role == 'HRD':
-                return redirect('hrd_dashboard')
-            elif request.user.role == 'Karyawan Tetap':
-                return redirect('karyawan_dashboard')
-            else:
-                return redirect('magang_dashboard')
+        # Auto-set keterangan based on geofence: WFO jika di ASEEC, WFA jika di luar
+        location_result = validate_user_location(lat, lon, konteks=konteks)
+        if location_result['valid'] and not location_result.get('is_wfa_day'):
+            keterangan = 'WFO'  # Within geofence = WFO
         else:
-            # Form validation failed - show errors
-            for field, errors in form.errors.items():
-                for error in errors:
-                    messages.error(request, f'{field}: {error}')
-    else:
-        form = AbsensiMagangForm(user=request.user)
+            keterangan = 'WFA'  # WFA day / outside geofence = WFA
+
+        # Alamat dari cache koordinat; bila belum ada diisi di background (tidak menunggu Nominatim)
+        alamat = alamat_tanpa_menunggu(latitude, longitude)
+
+        absensi = simpan_checkin(
+            karyawan,
+            today,
+            absensi_hari_ini,
+            jam_masuk=current_time,
+            # Setelah batas reminder = terlambat
+            status='Tepat Waktu' if current_time < reminder_ci else 'Terlambat',
+            keterangan=keterangan,
+            lokasi_masuk=f"{latitude}, {longitude}",
+            alamat_masuk=alamat,
+        )
+        if absensi is None:
+            # Submit ganda: check-in pertama sudah tersimpan
+            messages.info(request, 'Anda sudah melakukan absensi hari ini')
+            return redirect('magang_dashboard')
+        if alamat is None:
+            jadwalkan_isi_alamat(absensi, 'alamat_masuk', latitude, longitude)
+
+        # Warning untuk late check-in (valid & saved)
+        if current_time >= reminder_ci:
+            messages.warning(request, 'Check-in dengan izin telat yang disetujui HR.')
+
+        messages.success(request, f'Absensi berhasil disimpan pada {current_time.strftime("%H:%M:%S")}')
+        
+        # Redirect berdasarkan role
+        if request.user.role == 'HRD':
+            return redirect('hrd_dashboard')
+        elif request.user.role == 'Karyawan Tetap':
+            return redirect('karyawan_dashboard')
+        else:
+            return redirect('magang_dashboard')
+
+    form = AbsensiMagangForm(karyawan=karyawan)
     
     context = {
         'form': form,
@@ -356,26 +307,24 @@ def absen_pulang_view(request):
     """View untuk halaman absensi pulang"""
     dashboard_url = get_dashboard_url(request.user)
     
-    try:
-        karyawan = Karyawan.objects.get(user=request.user)
-    except Karyawan.DoesNotExist:
+    karyawan = get_request_karyawan(request)
+    if karyawan is None:
         messages.error(request, 'Data karyawan tidak ditemukan')
         return redirect(dashboard_url)
     
     # Cek apakah sudah absen masuk hari ini
     today = datetime.now().date()
     current_time = datetime.now().time()
-    from apps.absensi.utils import is_wfa_day
-    is_wfa, wfa_keterangan = is_wfa_day(today)
-
-    # Konfigurasi rule untuk hari ini (Ramadhan dll)
-    cfg = _get_today_rule_config()
+    # Rule (Ramadhan dll), hari WFA dan lokasi kantor untuk hari ini (di-cache)
+    konteks = get_konteks_hari(today)
+    is_wfa, wfa_keterangan = konteks['is_wfa'], konteks['wfa_keterangan']
+    cfg = konteks['config']
     max_ci = cfg['batas_deadline_checkin']
     overtime_threshold = cfg['batas_overtime']
     min_work_hours = cfg['durasi_kerja_jam']
 
     # Rule periode (Ramadhan dll) = jangan tampilkan label "Minimum: X jam", pakai jam pulang untuk konfirmasi early CO
-    today_rule = get_rule_for_date(today)
+    today_rule = konteks['rule']
     is_period_rule = today_rule and today_rule.tanggal_mulai and today_rule.tanggal_selesai
     show_min_duration_label = not is_period_rule
     jam_pulang_waktu = today_rule.jam_keluar.strftime('%H:%M') if (today_rule and today_rule.jam_keluar) else overtime_threshold.strftime('%H:%M')
@@ -384,6 +333,8 @@ def absen_pulang_view(request):
         id_karyawan=karyawan,
         tanggal=today
     ).first()
+    if absensi_hari_ini is not None:
+        absensi_hari_ini.id_karyawan = karyawan
     
     # Sudah check-in = record ada DAN jam_masuk terisi. Placeholder (cron) = belum check-in.
     sudah_checkin = absensi_hari_ini is not None and absensi_hari_ini.jam_masuk is not None
@@ -391,13 +342,7 @@ def absen_pulang_view(request):
     # Jika belum check-in (no record atau placeholder): redirect
     if not sudah_checkin:
         if current_time > max_ci:
-            has_approved_late_permission = Izin.objects.filter(
-                id_karyawan=karyawan,
-                tanggal_izin=today,
-                jenis_izin='telat',
-                status='disetujui'
-            ).exists()
-            if not has_approved_late_permission:
+            if not punya_izin_telat(karyawan, today):
                 messages.error(request, 
                     'Anda belum check-in hari ini dan sudah melewati batas waktu. '
                     'Silakan ajukan izin telat terlebih dahulu.')
@@ -435,7 +380,7 @@ def absen_pulang_view(request):
         if absensi_hari_ini.lokasi_masuk:
             try:
                 lat_masuk_str, lon_masuk_str = absensi_hari_ini.lokasi_masuk.split(', ')
-                ci_location_result = validate_user_location(float(lat_masuk_str), float(lon_masuk_str))
+                ci_location_result = validate_user_location(float(lat_masuk_str), float(lon_masuk_str), konteks=konteks)
                 ci_di_kantor = ci_location_result.get('valid', False) and not ci_location_result.get('is_wfa_day', False)
             except Exception:
                 ci_di_kantor = False
@@ -473,7 +418,7 @@ def absen_pulang_view(request):
             messages.warning(request, f'Anda belum mencapai {min_work_hours} jam kerja. Silakan konfirmasi untuk melanjutkan.')
             return redirect('absen_pulang_fleksibel')
         
-        form = AbsensiPulangForm(request.POST, request.FILES, user=request.user)
+        form = AbsensiPulangForm(request.POST, request.FILES, karyawan=karyawan)
         if form.is_valid():
             # PROSES ABSENSI PULANG
             absensi_hari_ini.jam_pulang = current_time
@@ -489,14 +434,11 @@ def absen_pulang_view(request):
             
             if latitude and longitude:
                 absensi_hari_ini.lokasi_pulang = f"{latitude}, {longitude}"
-                address = get_address_from_coordinates(latitude, longitude)
-                if address:
-                    absensi_hari_ini.alamat_pulang = address
-                else:
-                    absensi_hari_ini.alamat_pulang = "Alamat tidak ditemukan"
+                # Alamat dari cache koordinat; bila belum ada diisi di background setelah disimpan
+                absensi_hari_ini.alamat_pulang = alamat_tanpa_menunggu(latitude, longitude)
                 
                 # CRITICAL: Determine WFO/WFA based on kombinasi CHECK-IN & CHECK-OUT location
-                co_location_result = validate_user_location(float(latitude), float(longitude))
+                co_location_result = validate_user_location(float(latitude), float(longitude), konteks=konteks)
                 
                 co_di_kantor = co_location_result.get('valid', False) and not co_location_result.get('is_wfa_day', False)
                 
@@ -505,7 +447,7 @@ def absen_pulang_view(request):
                 if absensi_hari_ini.lokasi_masuk:
                     try:
                         lat_masuk_str, lon_masuk_str = absensi_hari_ini.lokasi_masuk.split(', ')
-                        ci_location_result = validate_user_location(float(lat_masuk_str), float(lon_masuk_str))
+                        ci_location_result = validate_user_location(float(lat_masuk_str), float(lon_masuk_str), konteks=konteks)
                         ci_di_kantor = ci_location_result.get('valid', False) and not ci_location_result.get('is_wfa_day', False)
                     except Exception:
                         ci_di_kantor = False
@@ -561,6 +503,14 @@ def absen_pulang_view(request):
                     # If WFA, validate mandatory documentation
                     aktivitas = request.POST.get('aktivitas_wfa', '').strip()
                     dokumen = request.FILES.get('dokumen_persetujuan')
+                    dokumen_key = request.POST.get('dokumen_persetujuan_key')
+                    if not dokumen and dokumen_key:
+                        # Dokumen sudah diupload langsung ke bucket
+                        try:
+                            dokumen = klaim_upload(dokumen_key, 'wfa', request.user).name
+                        except ValidationError as e:
+                            messages.error(request, f'WFA: {e.messages[0]}')
+                            return redirect('absen_pulang_fleksibel')
                     
                     if not aktivitas:
                         messages.error(request, 
@@ -582,6 +532,8 @@ def absen_pulang_view(request):
             #     pass
             
             absensi_hari_ini.save()
+            if absensi_hari_ini.alamat_pulang is None:
+                jadwalkan_isi_alamat(absensi_hari_ini, 'alamat_pulang', latitude, longitude)
             messages.success(request, f'Absen pulang berhasil pada {current_time.strftime("%H:%M:%S")} ({absensi_hari_ini.keterangan})')
             
             # Redirect berdasarkan role
@@ -594,7 +546,7 @@ def absen_pulang_view(request):
             
 
     else:
-        form = AbsensiMagangForm(user=request.user)
+        form = AbsensiMagangForm(karyawan=karyawan)
     
     # Untuk frontend: CI di kantor dan datetime check-in (WFA pure = CI luar & CO luar)
     checkin_datetime_iso = None
@@ -650,11 +602,10 @@ def riwayat_absensi(request):
     absensi_query = AbsensiMagang.objects.filter(id_karyawan=karyawan).order_by('-tanggal', '-jam_masuk')
     
     # Terapkan filter
-    if bulan and bulan.isdigit():
-        absensi_query = absensi_query.filter(tanggal__month=int(bulan))
-    
-    if tahun and tahun.isdigit():
-        absensi_query = absensi_query.filter(tanggal__year=int(tahun))
+    absensi_query = absensi_query.for_month_or_year(
+        tahun=tahun if tahun and tahun.isdigit() else None,
+        bulan=bulan if bulan and bulan.isdigit() else None,
+    )
     
     if keterangan:
         absensi_query = absensi_query.filter(keterangan=keterangan)
@@ -712,7 +663,7 @@ def check_location(request):
     
     try:
         # Validasi lokasi menggunakan geofencing (termasuk cek WFA day)
-        result = validate_user_location(float(latitude), float(longitude))
+        result = validate_user_location(float(latitude), float(longitude), konteks=get_konteks_hari())
         
         return JsonResponse({
             'status': 'success',
@@ -732,15 +683,23 @@ def check_location(request):
         }, status=500)
 
 
+def _token_absensi_saya(request):
+    """Token versi absensi milik user (diganti setiap check-in/check-out miliknya)."""
+    karyawan = get_request_karyawan(request)
+    return kunci_ringkasan(karyawan.pk) if karyawan else '-'
+
+
 @login_required
+# Status bergantung pada jam sekarang: ETag berganti setiap menit. Hanya absensi
+# milik user dan rule yang dibaca, jadi check-in karyawan lain tidak mengubah ETag.
+@watermark_etag('aturan_absensi', periode=60, token=_token_absensi_saya)
 def check_overtime_status(request):
     """
     API endpoint to check if user should receive overtime notification.
     Returns JSON with overtime status for browser notifications.
     """
-    try:
-        karyawan = Karyawan.objects.get(user=request.user)
-    except Karyawan.DoesNotExist:
+    karyawan = get_request_karyawan(request)
+    if karyawan is None:
         return JsonResponse({
             'status': 'error',
             'message': 'Data karyawan tidak ditemukan'
@@ -0,0 +1,59 @@
+"""
+Session engine berbasis cache dengan sliding expiry.
+
+Sebelumnya SESSION_SAVE_EVERY_REQUEST=True dengan engine db membuat setiap
+request (termasuk polling AJAX api_unread_count dan check_overtime_status)
+menjalankan UPDATE django_session. Di sini:
+
+- SessionStore: engine cached_db (baca dari alias cache 'sessions', tulis ke
+  cache dan database). Menulis ulang nilai yang sama (mis. selected_columns di
+  list_karyawan) tidak menandai session berubah, sehingga tidak disimpan.
+- SlidingSessionMiddleware: pengganti SessionMiddleware. Masa berlaku session
+  (dan cookie) hanya diperpanjang bila sisa umurnya di bawah
+  SESSION_REFRESH_THRESHOLD; request lain tidak menulis apa pun.
+
+Dengan SESSION_COOKIE_AGE 24 jam dan threshold 12 jam, user aktif menulis
+session paling banyak sekali per 12 jam (ditambah saat datanya berubah), dan
+tetap tidak logout selama aktif minimal sekali per 24 jam.
+"""
+import time
+
+from django.conf import settings
+from django.contrib.sessions.backends.cached_db import SessionStore as CachedDBStore
+from django.contrib.sessions.middleware import SessionMiddleware
+
+# Epoch terakhir kali masa berlaku session diperpanjang
+REFRESHED_AT_KEY = '_session_refreshed_at'
+
+_TIDAK_ADA = object()
+_IMMUTABLE = (str, bytes, int, float, bool, type(None))
+
+
+class SessionStore(CachedDBStore):
+    def __setitem__(self, key, value):
+        lama = self._session.get(key, _TIDAK_ADA)
+        # Objek mutable yang sama mungkin sudah diubah in-place, jadi tetap dianggap berubah
+        if lama == value and (lama is not value or isinstance(value, _IMMUTABLE)):
+            self.accessed = True
+            return
+        super().__setitem__(key, value)
+
+
+def _refresh_threshold():
+    return getattr(settings, 'SESSION_REFRESH_THRESHOLD', settings.SESSION_COOKIE_AGE // 2)
+
+
+class SlidingSessionMiddleware(SessionMiddleware):
+    def process_response(self, request, response):
+        session = getattr(request, 'session', None)
+        if session is not None and session.accessed and not session.is_empty():
+            sekarang = int(time.time())
+            if session.modified:
+                # Session tetap akan disimpan: sekalian perpanjang masa berlakunya
+                session[REFRESHED_AT_KEY] = sekarang
+            else:
+                refreshed_at = session.get(REFRESHED_AT_KEY, 0)
+                sisa = settings.SESSION_COOKIE_AGE - (sekarang - refreshed_at)
+                if sisa < _refresh_threshold():
+                    session[REFRESHED_AT_KEY] = sekarang
+        return super().process_response(request, response)
@@ -3,6 +3,82 @@
 Copyright (c) 2019 - present AppSeed.us
 """
 
+import time
+from unittest import mock
+
+from django.conf import settings
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from apps.authentication.sessions import REFRESHED_AT_KEY, SessionStore
+from apps.hrd.tests import buat_karyawan
+
+
+class SessionStoreTest(TestCase):
+    def test_nilai_sama_tidak_menandai_berubah(self):
+        session = SessionStore()
+        session['selected_columns'] = 'nama,divisi'
+        session.save()
+
+        session = SessionStore(session.session_key)
+        session['selected_columns'] = 'nama,divisi'
+        self.assertFalse(session.modified)
+        self.assertTrue(session.accessed)
+        session['selected_columns'] = 'nama'
+        self.assertTrue(session.modified)
+
+    def test_objek_mutable_yang_sama_tetap_berubah(self):
+        session = SessionStore()
+        kolom = ['nama']
+        session['kolom'] = kolom
+        session.save()
+        session = SessionStore(session.session_key)
+        kolom = session['kolom']
+        kolom.append('divisi')
+        # Diubah in-place lalu di-set ulang: tidak boleh dianggap sama
+        session['kolom'] = kolom
+        self.assertTrue(session.modified)
+
+
+class SlidingSessionTest(TestCase):
+    def setUp(self):
+        buat_karyawan('budi@example.com', role='Magang')
+        self.client.login(email='budi@example.com', password='rahasia123')
+        self.url = reverse('check_overtime_status')
+        # client.login() tidak lewat middleware: request pertama mencatat waktu refresh
+        self.assertNotIn(REFRESHED_AT_KEY, self.client.session)
+        self.client.get(self.url)
+        self.login_at = self.client.session[REFRESHED_AT_KEY]
+
+    def _get(self, detik_sejak_login):
+        with mock.patch('apps.authentication.sessions.time.time', return_value=self.login_at + detik_sejak_login), \
+                CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        tulis = [
+            q['sql'] for q in queries.captured_queries
+            if 'django_session' in q['sql'] and q['sql'].lstrip().upper().startswith(('UPDATE', 'INSERT'))
+        ]
+        return response, tulis
+
+    def test_request_pertama_menandai_waktu_refresh(self):
+        self.assertAlmostEqual(self.login_at, time.time(), delta=5)
+
+    def test_request_biasa_tidak_menulis_session(self):
+        response, tulis = self._get(3600)
+        self.assertEqual(tulis, [])
+        self.assertNotIn(settings.SESSION_COOKIE_NAME, response.cookies)
+        self.assertEqual(self.client.session[REFRESHED_AT_KEY], self.login_at)
+
+    def test_diperpanjang_saat_sisa_umur_di_bawah_threshold(self):
+        lewat = settings.SESSION_COOKIE_AGE - settings.SESSION_REFRESH_THRESHOLD + 60
+        response, tulis = self._get(lewat)
+        self.assertEqual(len(tulis), 1)
+        self.assertIn(settings.SESSION_COOKIE_NAME, response.cookies)
+        self.assertEqual(self.client.session[REFRESHED_AT_KEY], self.login_at + lewat)
 
-# Create your tests here.
+        # Setelah diperpanjang, request berikutnya kembali tanpa tulis
+        _response, tulis = self._get(lewat + 60)
+        self.assertEqual(tulis, [])
@@ -2,6 +2,10 @@ from django_cron import CronJobBase, Schedule
 from apps.hrd.models import Karyawan
 from django.utils.timezone import now
 from apps.hrd.utils.jatah_cuti import potong_jatah_cuti_h_minus_1
+from apps.hrd.utils.watermark import bump_watermark
+from apps.hrd.utils.export_jobs import process_pending_export_jobs
+from apps.hrd.utils.saldo_cuti import perbaiki_selisih_sisa_cuti
+from apps.hrd.utils.upload_langsung import proses_upload_tertunda
 from django.contrib.auth.models import User
 from notifications.signals import notify
 from datetime import datetime
@@ -22,6 +26,9 @@ class CekKontrakKaryawan(CronJobBase):
             status_keaktifan='Aktif'
         )
         count = karyawan_berakhir.update(status_keaktifan='Tidak Aktif')
+        if count:
+            # update() tidak memicu signal, naikkan watermark secara manual
+            bump_watermark('karyawan')
         print(f"{count} karyawan dinonaktifkan.")  # Debugging
 
 class PotongJatahCutiHMinus1(CronJobBase):
@@ -48,3 +55,40 @@ class PotongJatahCutiHMinus1(CronJobBase):
                 )
 
 
+class ProsesExportJob(CronJobBase):
+    """Cron cadangan untuk job ekspor yang belum diproses worker thread (mis. setelah restart)."""
+    RUN_EVERY_MINS = 1
+
+    schedule = Schedule(run_every_mins=RUN_EVERY_MINS)
+    code = 'hrd.proses_export_job'
+
+    def do(self):
+        processed = process_pending_export_jobs()
+        if processed:
+            logger.info(f"{processed} export job diproses oleh cron.")
+
+
+class VerifikasiSisaCuti(CronJobBase):
+    """Cron harian: deteksi dan perbaiki drift sisa_cuti terhadap slot DetailJatahCuti."""
+    RUN_EVERY_MINS = 1440
+
+    schedule = Schedule(run_every_mins=RUN_EVERY_MINS)
+    code = 'hrd.verifikasi_sisa_cuti'
+
+    def do(self):
+        selisih = perbaiki_selisih_sisa_cuti()
+        if selisih:
+            logger.warning(f"{len(selisih)} jatah cuti drift diperbaiki.")
+
+
+class VerifikasiUploadLangsung(CronJobBase):
+    """Cron cadangan: verifikasi upload langsung yang terlewat worker thread dan bersihkan upload terlantar."""
+    RUN_EVERY_MINS = 5
+
+    schedule = Schedule(run_every_mins=RUN_EVERY_MINS)
+    code = 'hrd.verifikasi_upload_langsung'
+
+    def do(self):
+        diverifikasi, dibersihkan = proses_upload_tertunda()
+        if diverifikasi or dibersihkan:
+            logger.info(f"Upload langsung: {diverifikasi} diverifikasi, {dibersihkan} terlantar dihapus.")
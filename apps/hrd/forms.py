@@ -115,32 +115,13 @@ class BookingRuangRapatForm(forms.ModelForm):
         cleaned_data = super().clean()
         waktu_mulai = cleaned_data.get('waktu_mulai')
         waktu_selesai = cleaned_data.get('waktu_selesai')
-        tanggal = cleaned_data.get('tanggal')
-        ruang_rapat = cleaned_data.get('ruang_rapat')
         
         if waktu_mulai and waktu_selesai:
             if waktu_selesai <= waktu_mulai:
                 raise forms.ValidationError('Waktu selesai harus setelah waktu mulai')
         
-        # Validasi overlap jika semua field terisi
-        if all([tanggal, waktu_mulai, waktu_selesai, ruang_rapat]):
-            overlapping_bookings = BookingRuangRapat.objects.filter(
-                ruang_rapat=ruang_rapat,
-                tanggal=tanggal,
-                waktu_mulai__lt=waktu_selesai,
-                waktu_selesai__gt=waktu_mulai
-            )
-            
-            # Exclude current instance jika sedang edit
-            if self.instance.pk:
-                overlapping_bookings = overlapping_bookings.exclude(pk=self.instance.pk)
-            
-            if overlapping_bookings.exists():
-                booking = overlapping_bookings.first()
-                raise forms.ValidationError(
-                    f'Waktu bertabrakan dengan booking "{booking.judul}" '
-                    f'({booking.waktu_mulai.strftime("%H:%M")} - {booking.waktu_selesai.strftime("%H:%M")})'
-                )
+        # Validasi overlap dilakukan BookingRuangRapat.clean() (dipanggil _post_clean)
+        # lewat apps.hrd.utils.booking_engine, sehingga tidak di-query dua kali di sini
         
         return cleaned_data
 
@@ -0,0 +1,350 @@
+import json
+import os
+import signal
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from urllib.parse import urljoin
+
+import requests
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+from django.urls import reverse
+from django.utils.crypto import get_random_string
+from django.utils.module_loading import import_module
+
+from apps.absensi.models import AbsensiMagang, LokasiKantor
+from apps.authentication.models import User
+from apps.hrd.management.commands.loadtest_checkin import CHECKIN_PATH, _email, _percentile
+from apps.hrd.models import UploadLangsung
+from apps.hrd.utils.upload_langsung import is_s3_storage, upload_langsung_aktif
+from apps.hrd.utils.watermark import bump_watermark
+
+GUNICORN_CONFIG = os.path.join(settings.BASE_DIR, 'gunicorn-cfg.py')
+
+# Endpoint yang dibandingkan; semua dibuka sebagai karyawan sintetis (role Magang).
+# upload = presign + POST file ke stand-in bucket (menulis ke media storage)
+ENDPOINTS = {
+    'dashboard': '/magang/',
+    'calendar': '/magang/calendar-events-magang/',
+    'checkin': CHECKIN_PATH,
+    'upload': reverse('upload_langsung_presign'),
+}
+
+
+def _ringkas(durations, jumlah_ok, wall_s):
+    durations = sorted(durations)
+    if not durations:
+        return {'requests': 0, 'ok': 0, 'rps': 0}
+    return {
+        'requests': len(durations),
+        'ok': jumlah_ok,
+        'rps': round(jumlah_ok / wall_s, 1) if wall_s else None,
+        'median_ms': round(statistics.median(durations), 1),
+        'p95_ms': round(_percentile(durations, 95), 1),
+        'max_ms': round(durations[-1], 1),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Bandingkan throughput (requests/detik) profil Gunicorn di gunicorn-cfg.py untuk '
+        'dashboard, feed kalender, POST check-in dan upload lampiran. Setiap profil dijalankan sebagai '
+        'proses gunicorn terpisah di port lokal memakai settings yang sama dengan command ini '
+        '(set STORAGE_STANDIN=True agar media memakai pengganti S3 lokal).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profiles', default='single,sync,gthread', help='Profil yang dibandingkan, pisahkan dengan koma')
+        parser.add_argument('--endpoints', default=','.join(ENDPOINTS), help=f"Endpoint yang diukur ({', '.join(ENDPOINTS)})")
+        parser.add_argument('--users', type=int, default=200, help='Jumlah karyawan sintetis yang dipakai (default: 200)')
+        parser.add_argument('--concurrency', type=int, default=16, help='Jumlah klien paralel (default: 16)')
+        parser.add_argument('--duration', type=float, default=20, help='Durasi pengukuran per endpoint GET dalam detik (default: 20)')
+        parser.add_argument('--port', type=int, default=5090, help='Port lokal untuk gunicorn benchmark (default: 5090)')
+        parser.add_argument('--timeout', type=float, default=30, help='Timeout per request dalam detik (default: 30)')
+        parser.add_argument('--upload-kb', type=int, default=256, help='Ukuran file endpoint upload dalam KB (default: 256)')
+        parser.add_argument('--output', default=None, help='Tulis hasil JSON ke file (default: stdout)')
+        parser.add_argument('--force', action='store_true', help='Izinkan menghapus absensi hari ini karyawan sintetis saat DEBUG=False')
+
+    def handle(self, *args, **options):
+        profiles = [p.strip() for p in options['profiles'].split(',') if p.strip()]
+        endpoints = [e.strip() for e in options['endpoints'].split(',') if e.strip()]
+        tidak_dikenal = [e for e in endpoints if e not in ENDPOINTS]
+        if tidak_dikenal:
+            raise CommandError(f"Endpoint tidak dikenal: {', '.join(tidak_dikenal)}")
+        if 'checkin' in endpoints and not settings.DEBUG and not options['force']:
+            raise CommandError(
+                'DEBUG=False: benchmark check-in menghapus absensi hari ini milik karyawan sintetis. '
+                'Jalankan di database staging atau tambahkan --force.'
+            )
+
+        users = list(
+            User.objects.filter(email__in=[_email(i) for i in range(options['users'])])
+            .select_related('karyawan')
+            .order_by('email')
+        )
+        if len(users) < options['users']:
+            raise CommandError(
+                f"Baru ada {len(users)} dari {options['users']} karyawan sintetis. "
+                f"Jalankan loadtest_checkin --setup --users {options['users']} dulu."
+            )
+
+        if 'upload' in endpoints and (is_s3_storage(default_storage) or not upload_langsung_aktif()):
+            raise CommandError(
+                'Endpoint upload butuh DIRECT_UPLOAD_ENABLED dan media di stand-in lokal '
+                '(STORAGE_STANDIN=True); dengan S3 file dikirim ke bucket, bukan ke gunicorn.'
+            )
+
+        kantor = LokasiKantor.objects.filter(is_active=True).order_by('id').first()
+        if 'checkin' in endpoints and kantor is None:
+            raise CommandError('Tidak ada lokasi kantor aktif untuk koordinat check-in.')
+
+        # Session dibuat langsung di database agar login tidak ikut terukur
+        cookies = [self._buat_session(user) for user in users]
+        base_url = f"http://127.0.0.1:{options['port']}/"
+
+        hasil = {}
+        try:
+            for profile in profiles:
+                self.stderr.write(f'Profil {profile}: menjalankan gunicorn di {base_url} ...')
+                proses, log_path = self._jalankan_gunicorn(profile, options['port'])
+                try:
+                    self._tunggu_siap(base_url, proses, log_path)
+                    hasil[profile] = {}
+                    for endpoint in endpoints:
+                        if endpoint == 'checkin':
+                            karyawan_ids = [u.karyawan.id for u in users]
+                            AbsensiMagang.objects.filter(id_karyawan_id__in=karyawan_ids, tanggal=date.today()).delete()
+                            bump_watermark('absensi')
+                            ringkasan = self._ukur_checkin(base_url, cookies, kantor, options)
+                            ringkasan['tersimpan'] = AbsensiMagang.objects.filter(
+                                id_karyawan_id__in=karyawan_ids, tanggal=date.today(), jam_masuk__isnull=False
+                            ).count()
+                        elif endpoint == 'upload':
+                            ringkasan = self._ukur_upload(base_url, cookies, options)
+                        else:
+                            ringkasan = self._ukur_get(base_url, ENDPOINTS[endpoint], cookies, options)
+                        hasil[profile][endpoint] = ringkasan
+                        self.stderr.write(f"  {endpoint}: {ringkasan.get('rps')} req/s ({ringkasan.get('ok')}/{ringkasan.get('requests')} OK)")
+                finally:
+                    self._hentikan(proses)
+        finally:
+            session_model = import_module(settings.SESSION_ENGINE).SessionStore.get_model_class()
+            session_model.objects.filter(session_key__in=[c['session_key'] for c in cookies]).delete()
+
+        result = {
+            'meta': {
+                'timestamp': datetime.now().isoformat(timespec='seconds'),
+                'cpu_count': os.cpu_count(),
+                'database': settings.DATABASES['default']['ENGINE'].rsplit('.', 1)[-1],
+                'media_storage': settings.DEFAULT_FILE_STORAGE,
+                'users': len(users),
+                'concurrency': options['concurrency'],
+                'duration_s': options['duration'],
+                'upload_kb': options['upload_kb'],
+                'storage_latency_ms': getattr(settings, 'STORAGE_STANDIN_LATENCY_MS', 0),
+            },
+            'results': hasil,
+        }
+        self.stderr.write(self._tabel_markdown(hasil, endpoints))
+
+        output = json.dumps(result, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output)
+            self.stderr.write(self.style.SUCCESS(f"Hasil ditulis ke {options['output']}"))
+        else:
+            self.stdout.write(output)
+
+    # ============================================
+    # PERSIAPAN
+    # ============================================
+
+    def _buat_session(self, user):
+        session = import_module(settings.SESSION_ENGINE).SessionStore()
+        session[SESSION_KEY] = str(user.pk)
+        session[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+        session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+        session.create()
+        # Token CSRF 64 karakter dipakai apa adanya sebagai cookie dan field form
+        return {'session_key': session.session_key, 'csrftoken': get_random_string(64)}
+
+    def _http_session(self, cookie):
+        session = requests.Session()
+        session.cookies.set(settings.SESSION_COOKIE_NAME, cookie['session_key'])
+        session.cookies.set(settings.CSRF_COOKIE_NAME, cookie['csrftoken'])
+        return session
+
+    def _jalankan_gunicorn(self, profile, port):
+        env = dict(os.environ, GUNICORN_PROFILE=profile, GUNICORN_BIND=f'127.0.0.1:{port}', GUNICORN_LOGLEVEL='warning')
+        log = tempfile.NamedTemporaryFile(prefix=f'gunicorn-{profile}-', suffix='.log', delete=False)
+        proses = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', '--config', GUNICORN_CONFIG, 'core.wsgi:application'],
+            cwd=settings.BASE_DIR, env=env, stdout=log, stderr=subprocess.STDOUT,
+            # Grup proses sendiri agar worker ikut dihentikan walau master harus di-kill
+            start_new_session=True,
+        )
+        log.close()
+        return proses, log.name
+
+    def _tunggu_siap(self, base_url, proses, log_path, batas_detik=60):
+        batas = time.monotonic() + batas_detik
+        while time.monotonic() < batas:
+            if proses.poll() is not None:
+                raise CommandError(f'Gunicorn berhenti saat startup, lihat {log_path}')
+            try:
+                requests.get(urljoin(base_url, 'auth/login/'), timeout=2)
+                return
+            except requests.RequestException:
+                time.sleep(0.5)
+        raise CommandError(f'Gunicorn tidak siap dalam {batas_detik} detik, lihat {log_path}')
+
+    def _hentikan(self, proses):
+        os.killpg(proses.pid, signal.SIGTERM)
+        try:
+            proses.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            os.killpg(proses.pid, signal.SIGKILL)
+            proses.wait()
+
+    # ============================================
+    # PENGUKURAN
+    # ============================================
+
+    def _ukur_get(self, base_url, path, cookies, options):
+        """Closed loop: setiap klien mengirim request berikutnya segera setelah respons diterima."""
+        url = urljoin(base_url, path.lstrip('/'))
+        timeout = options['timeout']
+        deadline = time.monotonic() + options['duration']
+        lock = threading.Lock()
+        durations, ok = [], [0]
+
+        def klien(idx):
+            session = self._http_session(cookies[idx % len(cookies)])
+            while time.monotonic() < deadline:
+                start = time.perf_counter()
+                try:
+                    status = session.get(url, allow_redirects=False, timeout=timeout).status_code
+                except requests.RequestException:
+                    status = None
+                elapsed = (time.perf_counter() - start) * 1000
+                with lock:
+                    durations.append(elapsed)
+                    ok[0] += status == 200
+
+        wall_start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+            list(pool.map(klien, range(options['concurrency'])))
+        return _ringkas(durations, ok[0], time.perf_counter() - wall_start)
+
+    def _ukur_upload(self, base_url, cookies, options):
+        """
+        Closed loop seperti _ukur_get; satu operasi = presign lalu POST multipart file
+        ke stand-in bucket, yang menahan worker selama round-trip storage
+        (STORAGE_STANDIN_LATENCY_MS per operasi storage). Upload dihapus setelah diukur.
+        """
+        presign_url = urljoin(base_url, ENDPOINTS['upload'].lstrip('/'))
+        timeout = options['timeout']
+        deadline = time.monotonic() + options['duration']
+        isi = b'%PDF-1.4\n' + b'0' * (options['upload_kb'] * 1024)
+        lock = threading.Lock()
+        durations, ok, keys = [], [0], []
+
+        def klien(idx):
+            cookie = cookies[idx % len(cookies)]
+            session = self._http_session(cookie)
+            while time.monotonic() < deadline:
+                start = time.perf_counter()
+                berhasil = False
+                try:
+                    response = session.post(
+                        presign_url,
+                        data={
+                            'csrfmiddlewaretoken': cookie['csrftoken'],
+                            'jenis': 'wfa',
+                            'nama_file': 'persetujuan.pdf',
+                            'ukuran': len(isi),
+                        },
+                        timeout=timeout,
+                    )
+                    if response.status_code == 200:
+                        target = response.json()
+                        with lock:
+                            keys.append(target['key'])
+                        # Field kebijakan dulu, file terakhir (seperti presigned POST S3)
+                        berhasil = session.post(
+                            urljoin(base_url, target['url'].lstrip('/')),
+                            data=target['fields'],
+                            files={'file': ('persetujuan.pdf', isi, 'application/pdf')},
+                            timeout=timeout,
+                        ).status_code in (200, 201, 204)
+                except (requests.RequestException, ValueError, KeyError):
+                    pass
+                elapsed = (time.perf_counter() - start) * 1000
+                with lock:
+                    durations.append(elapsed)
+                    ok[0] += berhasil
+
+        wall_start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+            list(pool.map(klien, range(options['concurrency'])))
+        ringkasan = _ringkas(durations, ok[0], time.perf_counter() - wall_start)
+
+        # Bersihkan tanpa latensi buatan: yang diukur hanya request di atas
+        with override_settings(STORAGE_STANDIN_LATENCY_MS=0):
+            for key in keys:
+                default_storage.delete(key)
+        UploadLangsung.objects.filter(key__in=keys).delete()
+        return ringkasan
+
+    def _ukur_checkin(self, base_url, cookies, kantor, options):
+        """Setiap karyawan sintetis check-in sekali; throughput = jumlah POST / waktu total."""
+        url = urljoin(base_url, CHECKIN_PATH.lstrip('/'))
+        timeout = options['timeout']
+
+        def checkin(cookie):
+            session = self._http_session(cookie)
+            start = time.perf_counter()
+            try:
+                response = session.post(
+                    url,
+                    data={
+                        'csrfmiddlewaretoken': cookie['csrftoken'],
+                        'latitude': float(kantor.latitude),
+                        'longitude': float(kantor.longitude),
+                    },
+                    allow_redirects=False,
+                    timeout=timeout,
+                )
+                # Check-in berhasil dijawab redirect ke halaman absen
+                berhasil = response.status_code == 302
+            except requests.RequestException:
+                berhasil = False
+            return (time.perf_counter() - start) * 1000, berhasil
+
+        wall_start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+            results = list(pool.map(checkin, cookies))
+        wall_s = time.perf_counter() - wall_start
+        return _ringkas([ms for ms, _ in results], sum(1 for _, berhasil in results if berhasil), wall_s)
+
+    def _tabel_markdown(self, hasil, endpoints):
+        baris = [
+            '| Profil | ' + ' | '.join(f'{e} (req/s, p95 ms)' for e in endpoints) + ' |',
+            '|---|' + '---|' * len(endpoints),
+        ]
+        for profile, per_endpoint in hasil.items():
+            sel = []
+            for endpoint in endpoints:
+                r = per_endpoint.get(endpoint, {})
+                sel.append(f"{r.get('rps', '-')} / {r.get('p95_ms', '-')}")
+            baris.append(f'| {profile} | ' + ' | '.join(sel) + ' |')
+        return '\n'.join(baris)
@@ -0,0 +1,93 @@
+import json
+from datetime import datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from apps.hrd.utils.benchmark import (
+    BENCHMARKS,
+    BenchmarkContext,
+    benchmark_meta,
+    get_benchmark_users,
+    run_benchmark,
+    seed_dataset,
+)
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark hot path (rekap, jatah cuti, dashboard, kalender, ekspor, cron) '
+        'dengan dataset sintetis deterministik. Semua data di-rollback di akhir. Output JSON.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--karyawan', type=int, default=50, help='Jumlah karyawan sintetis (default: 50)')
+        parser.add_argument('--tahun', type=int, default=datetime.now().year, help='Tahun data (default: tahun sekarang)')
+        parser.add_argument('--bulan', type=int, default=None, help='Bulan untuk benchmark per bulan (default: bulan terakhir yang berisi data)')
+        parser.add_argument('--seed', type=int, default=42, help='Seed random dataset (default: 42)')
+        parser.add_argument('--repeat', type=int, default=3, help='Jumlah run per benchmark (default: 3)')
+        parser.add_argument(
+            '--only', action='append', default=[], choices=sorted(BENCHMARKS),
+            help='Jalankan benchmark tertentu saja (boleh diulang)',
+        )
+        parser.add_argument('--skip', action='append', default=[], choices=sorted(BENCHMARKS), help='Lewati benchmark tertentu')
+        parser.add_argument('--absensi-file', default=None, help='File Excel mesin absensi untuk benchmark process_absensi')
+        parser.add_argument('--output', default=None, help='Tulis hasil JSON ke file (default: stdout)')
+        parser.add_argument('--force', action='store_true', help='Izinkan jalan saat DEBUG=False (data tetap di-rollback)')
+
+    def handle(self, *args, **options):
+        if not settings.DEBUG and not options['force']:
+            raise CommandError(
+                'DEBUG=False: benchmark menulis data sintetis ke database (lalu rollback). '
+                'Jalankan di database lokal atau tambahkan --force.'
+            )
+
+        tahun = options['tahun']
+        now = datetime.now()
+        bulan = options['bulan'] or (now.month if tahun == now.year else 12)
+        names = options['only'] or list(BENCHMARKS)
+        names = [n for n in names if n not in options['skip']]
+
+        result = {}
+        try:
+            with transaction.atomic():
+                self.stderr.write(f"Seeding {options['karyawan']} karyawan untuk tahun {tahun}...")
+                counts = seed_dataset(options['karyawan'], tahun, seed=options['seed'])
+                self.stderr.write(f"Dataset: {counts}")
+
+                hr_user, karyawan_user, magang_user = get_benchmark_users()
+                ctx = BenchmarkContext(
+                    tahun=tahun,
+                    bulan=bulan,
+                    hr_user=hr_user,
+                    karyawan_user=karyawan_user or hr_user,
+                    magang_user=magang_user or hr_user,
+                    absensi_file=options['absensi_file'],
+                )
+
+                results = []
+                for name in names:
+                    self.stderr.write(f"- {name}")
+                    results.append(run_benchmark(name, ctx, repeat=options['repeat']))
+
+                result = {
+                    'meta': benchmark_meta(options['karyawan'], tahun, options['seed'], counts),
+                    'results': results,
+                }
+                # Dataset sintetis tidak boleh tertinggal di database
+                raise _Rollback
+        except _Rollback:
+            pass
+
+        output = json.dumps(result, indent=2, default=str)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output)
+            self.stderr.write(self.style.SUCCESS(f"Hasil ditulis ke {options['output']}"))
+        else:
+            self.stdout.write(output)
@@ -0,0 +1,122 @@
+import json
+import time
+from datetime import datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client, override_settings
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from apps.authentication.models import User
+from apps.hrd.utils.instrumentation import QueryCollector
+
+# Campuran request satu sesi kerja HR: polling AJAX mendominasi
+SKENARIO = [
+    ('/notifikasi/api/unread-count/', 6),
+    ('/absensi/fleksibel/api/check-overtime-status/', 3),
+    ('/hrd/manajemen-karyawan/', 1),
+]
+
+# Konfigurasi sebelum sliding session (engine db, simpan setiap request)
+KONFIGURASI_LAMA = {
+    'SESSION_ENGINE': 'django.contrib.sessions.backends.db',
+    'SESSION_SAVE_EVERY_REQUEST': True,
+    'MIDDLEWARE': [
+        'django.contrib.sessions.middleware.SessionMiddleware'
+        if m == 'apps.authentication.sessions.SlidingSessionMiddleware' else m
+        for m in settings.MIDDLEWARE
+    ],
+}
+
+
+class SessionWriteCounter(QueryCollector):
+    """Hitung query tulis ke tabel django_session."""
+
+    def __init__(self):
+        super().__init__()
+        self.writes = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        if 'django_session' in sql and sql.lstrip().split(' ', 1)[0].upper() in ('INSERT', 'UPDATE', 'DELETE'):
+            self.writes += 1
+        return super().__call__(execute, sql, params, many, context)
+
+
+class Command(BaseCommand):
+    help = (
+        'Ukur jumlah tulis ke django_session per request dan write QPS untuk konfigurasi '
+        'session lama (db + SESSION_SAVE_EVERY_REQUEST) dibanding konfigurasi saat ini '
+        '(cached_db + sliding expiry). Memakai test client dengan middleware lengkap.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--email', required=True, help='User HRD yang dipakai untuk request')
+        parser.add_argument('--rounds', type=int, default=20, help='Jumlah putaran skenario (default: 20)')
+        parser.add_argument('--output', default=None, help='Tulis hasil JSON ke file (default: stdout)')
+
+    def handle(self, *args, **options):
+        user = User.objects.filter(email=options['email']).first()
+        if user is None:
+            raise CommandError(f"User {options['email']} tidak ditemukan.")
+
+        setup_test_environment()
+        try:
+            with override_settings(**KONFIGURASI_LAMA):
+                lama = self._ukur(user, options['rounds'])
+            baru = self._ukur(user, options['rounds'])
+        finally:
+            teardown_test_environment()
+
+        result = {
+            'meta': {
+                'timestamp': datetime.now().isoformat(timespec='seconds'),
+                'user': user.email,
+                'rounds': options['rounds'],
+                'skenario': {path: n for path, n in SKENARIO},
+                'session_refresh_threshold': getattr(settings, 'SESSION_REFRESH_THRESHOLD', None),
+            },
+            'sebelum': lama,
+            'sesudah': baru,
+        }
+        self.stderr.write(
+            f"Tulis session/request: {lama['writes_per_request']} -> {baru['writes_per_request']}; "
+            f"write QPS: {lama['session_write_qps']} -> {baru['session_write_qps']}"
+        )
+
+        output = json.dumps(result, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output)
+            self.stderr.write(self.style.SUCCESS(f"Hasil ditulis ke {options['output']}"))
+        else:
+            self.stdout.write(output)
+
+    def _ukur(self, user, rounds):
+        client = Client(SERVER_NAME=settings.ALLOWED_HOSTS[0])
+        # Login tidak ikut diukur
+        client.force_login(user)
+
+        counter = SessionWriteCounter()
+        status = {}
+        jumlah = 0
+        start = time.perf_counter()
+        with connections['default'].execute_wrapper(counter):
+            for _ in range(rounds):
+                for path, n in SKENARIO:
+                    for _ in range(n):
+                        code = client.get(path).status_code
+                        status[str(code)] = status.get(str(code), 0) + 1
+                        jumlah += 1
+        elapsed = time.perf_counter() - start
+
+        return {
+            'engine': settings.SESSION_ENGINE,
+            'requests': jumlah,
+            'status': status,
+            'session_writes': counter.writes,
+            'writes_per_request': round(counter.writes / jumlah, 3),
+            'requests_per_s': round(jumlah / elapsed, 1),
+            'session_write_qps': round(counter.writes / elapsed, 1),
+            'queries_per_request': round(counter.count / jumlah, 2),
+        }
@@ -0,0 +1,67 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.hrd.utils.cache import clear_namespace, get_cache, info_namespace
+
+
+def _isi_direktori(path):
+    """Jumlah file dan total byte cache berbasis file."""
+    jumlah, ukuran = 0, 0
+    if os.path.isdir(path):
+        for entry in os.scandir(path):
+            if entry.is_file() and entry.name.endswith('.djcache'):
+                jumlah += 1
+                ukuran += entry.stat().st_size
+    return jumlah, ukuran
+
+
+class Command(BaseCommand):
+    help = (
+        'Tampilkan namespace cache (alias di settings.CACHES) beserta backend, versi dan '
+        'generasinya, atau kosongkan namespace tertentu.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clear', nargs='+', metavar='NAMESPACE', help="Kosongkan namespace (naikkan generasi); 'all' untuk semua")
+        parser.add_argument('--purge', action='store_true', help='Bersama --clear: hapus juga seluruh isi backend alias tersebut')
+
+    def handle(self, *args, **options):
+        namespaces = list(settings.CACHES)
+
+        if options['purge'] and not options['clear']:
+            raise CommandError('--purge hanya dipakai bersama --clear.')
+
+        if options['clear']:
+            target = namespaces if 'all' in options['clear'] else options['clear']
+            tidak_dikenal = [ns for ns in target if ns not in namespaces]
+            if tidak_dikenal:
+                raise CommandError(f"Namespace tidak dikenal: {', '.join(tidak_dikenal)} (pilihan: {', '.join(namespaces)})")
+            for namespace in target:
+                if options['purge']:
+                    cache = get_cache(namespace)
+                    if hasattr(cache, 'delete_pattern'):
+                        # django-redis: hapus key ber-prefix namespace saja, bukan seluruh database Redis
+                        cache.delete_pattern('*')
+                    else:
+                        cache.clear()
+                generasi = clear_namespace(namespace)
+                self.stdout.write(self.style.SUCCESS(
+                    f"Namespace {namespace} dikosongkan (generasi {generasi}{', isi dihapus' if options['purge'] else ''})."
+                ))
+            return
+
+        self.stdout.write(f"{'Namespace':<10} {'Backend':<16} {'Prefix':<12} {'Versi':>5} {'Generasi':>8} {'Timeout':>8}  Isi")
+        for namespace in namespaces:
+            info = info_namespace(namespace)
+            isi = '-'
+            if info['backend'] == 'FileBasedCache':
+                jumlah, ukuran = _isi_direktori(info['location'])
+                isi = f'{jumlah} file, {ukuran / 1024:.1f} KB'
+            elif info['backend'] == 'LocMemCache':
+                isi = 'per proses'
+            self.stdout.write(
+                f"{namespace:<10} {info['backend']:<16} {info['key_prefix']:<12} {info['version']:>5} "
+                f"{info['generasi']:>8} {str(info['timeout']):>8}  {isi}"
+            )
@@ -1,13 +1,27 @@
 import csv
+import os
 import re
+import time
 import unicodedata
 import datetime
+from concurrent.futures import ProcessPoolExecutor
 from typing import List, Dict, Tuple
+from django.contrib.auth.hashers import get_hasher
 from django.core.management.base import BaseCommand, CommandError
 from django.db import transaction
+from django.utils.module_loading import import_string
 from apps.authentication.models import User
 from apps.hrd.models import Karyawan
 from apps.hrd.utils.generate_password import generate_default_password
+from apps.hrd.utils.jatah_cuti import provisi_jatah_cuti_massal
+from apps.hrd.utils.ringkasan_karyawan import invalidate_semua_ringkasan
+from apps.hrd.utils.watermark import bump_watermark
+
+KARYAWAN_UPDATE_FIELDS = [
+    'nama', 'nama_catatan_kehadiran', 'jenis_kelamin', 'tanggal_lahir', 'mulai_kontrak', 'batas_kontrak',
+    'jabatan', 'divisi', 'alamat', 'no_telepon', 'status', 'status_keaktifan',
+    'provinsi', 'kabupaten_kota',
+]
 
 def parse_date(value):
     if not value:
@@ -82,6 +96,36 @@ def normalize_kabupaten_kota(value: str):
     digits = re.sub(r'\D', '', s)
     return digits if len(digits) == 4 else None
 
+def iter_csv_rows(path, encoding, delimiter):
+    """Baca CSV baris per baris (streaming), hasilkan (nomor_baris, row)."""
+    with open(path, mode='r', encoding=encoding, newline='') as f:
+        reader = csv.DictReader(f, delimiter=delimiter)
+        for i, row in enumerate(reader, start=2):
+            yield i, row
+
+def apply_row(karyawan, r):
+    """Isi field Karyawan dari baris bersih; nilai kosong tidak menimpa data lama."""
+    for field in KARYAWAN_UPDATE_FIELDS:
+        setattr(karyawan, field, r[field] or getattr(karyawan, field))
+
+def _hash_password(args):
+    # Dijalankan di worker process: cukup import kelas hasher, tanpa akses settings
+    hasher_path, password = args
+    hasher = import_string(hasher_path)()
+    return hasher.encode(password, hasher.salt())
+
+def hash_passwords(passwords, pool=None):
+    """Hash daftar password dengan hasher default, paralel bila pool tersedia."""
+    if not passwords:
+        return []
+    hasher = get_hasher('default')
+    hasher_path = f'{hasher.__class__.__module__}.{hasher.__class__.__qualname__}'
+    args = [(hasher_path, p) for p in passwords]
+    if pool is None:
+        return [_hash_password(a) for a in args]
+    chunksize = max(1, len(args) // (pool._max_workers * 4))
+    return list(pool.map(_hash_password, args, chunksize=chunksize))
+
 class Command(BaseCommand):
     help = 'Impor CSV karyawan secara batch dengan upsert'
 
@@ -95,6 +139,11 @@ class Command(BaseCommand):
         parser.add_argument('--no-update', action='store_true')
         parser.add_argument('--email-domain', default='cesgs.local')
         parser.add_argument('--set-default-passwords', action='store_true')
+        parser.add_argument('--fast', action='store_true',
+                            help='Mode throughput tinggi: hash password paralel, upsert satu kali per batch, '
+                                 'provisi jatah cuti massal')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Jumlah proses untuk hash password pada mode --fast (default: jumlah CPU)')
 
     def handle(self, *args, **opts):
         path = opts['csv_path']
@@ -106,6 +155,8 @@ class Command(BaseCommand):
         no_update = opts['no_update']
         email_domain = opts['email_domain']
         set_default_passwords = opts.get('set_default_passwords')
+        fast = opts['fast']
+        workers = opts['workers']
         created = 0
         updated = 0
         skipped = 0
@@ -180,20 +231,7 @@ class Command(BaseCommand):
                         karyawan = Karyawan(user=user, nama=nama)
 
                     if karyawan and not no_update:
-                        karyawan.nama = r['nama'] or karyawan.nama
-                        karyawan.nama_catatan_kehadiran = r['nama_catatan_kehadiran'] or karyawan.nama_catatan_kehadiran
-                        karyawan.jenis_kelamin = r['jenis_kelamin'] or karyawan.jenis_kelamin
-                        karyawan.tanggal_lahir = r['tanggal_lahir'] or karyawan.tanggal_lahir
-                        karyawan.mulai_kontrak = r['mulai_kontrak'] or karyawan.mulai_kontrak
-                        karyawan.batas_kontrak = r['batas_kontrak'] or karyawan.batas_kontrak
-                        karyawan.jabatan = r['jabatan'] or karyawan.jabatan
-                        karyawan.divisi = r['divisi'] or karyawan.divisi
-                        karyawan.alamat = r['alamat'] or karyawan.alamat
-                        karyawan.no_telepon = r['no_telepon'] or karyawan.no_telepon
-                        karyawan.status = r['status'] or karyawan.status
-                        karyawan.status_keaktifan = r['status_keaktifan'] or karyawan.status_keaktifan
-                        karyawan.provinsi = r['provinsi'] or karyawan.provinsi
-                        karyawan.kabupaten_kota = r['kabupaten_kota'] or karyawan.kabupaten_kota
+                        apply_row(karyawan, r)
 
                         if email in existing_karyawans:
                             to_update_karyawans.append(karyawan)
@@ -227,34 +265,158 @@ class Command(BaseCommand):
                     created += len(to_create_karyawans)
 
                 if to_update_karyawans:
-                    Karyawan.objects.bulk_update(
-                        to_update_karyawans,
-                        ['nama','nama_catatan_kehadiran','jenis_kelamin','tanggal_lahir','mulai_kontrak','batas_kontrak',
-                         'jabatan','divisi','alamat','no_telepon','status','status_keaktifan',
-                         'provinsi','kabupaten_kota']
-                    )
+                    Karyawan.objects.bulk_update(to_update_karyawans, KARYAWAN_UPDATE_FIELDS)
                     updated += len(to_update_karyawans)
                 if to_update_users:
                     User.objects.bulk_update(to_update_users, ['password'])
                     updated_passwords += len(to_update_users)
 
-        with open(path, mode='r', encoding=enc, newline='') as f:
-            reader = csv.DictReader(f, delimiter=delim)
+        def process_batch_fast(clean_rows: List[Dict[str,str]]):
+            """
+            Upsert satu kali per batch: satu query lookup email, bulk_create untuk
+            baris baru (PK langsung terisi di PostgreSQL), bulk_update untuk baris
+            lama, lalu provisi jatah cuti massal untuk karyawan baru.
+            """
+            nonlocal created, updated, skipped, updated_passwords, jatah_dibuat, hash_seconds
+            # Email ganda dalam satu batch: baris terakhir yang dipakai
+            rows_by_email = {}
+            for r in clean_rows:
+                rows_by_email[r['email']] = r
+            skipped += len(clean_rows) - len(rows_by_email)
+
+            existing_users = {
+                u.email.lower(): u
+                for u in User.objects.select_related('karyawan').filter(email__in=list(rows_by_email))
+            }
+
+            new_users: List[User] = []
+            new_karyawans: List[Tuple[User, Karyawan]] = []
+            to_update_karyawans: List[Karyawan] = []
+            password_targets: List[Tuple[User, str]] = []
+
+            for email, r in rows_by_email.items():
+                nama = r['nama']
+                tgl_lahir_r = r.get('tanggal_lahir')
+                user = existing_users.get(email)
+                if user is None:
+                    if no_create:
+                        skipped += 1
+                        continue
+                    user = User(email=email, first_name=nama.split()[0] if nama else '', role='Karyawan Tetap')
+                    if tgl_lahir_r:
+                        password_targets.append((user, generate_default_password(nama, tgl_lahir_r)))
+                    else:
+                        user.set_unusable_password()
+                    new_users.append(user)
+                elif set_default_passwords and not user.has_usable_password() and tgl_lahir_r:
+                    password_targets.append((user, generate_default_password(nama, tgl_lahir_r)))
+
+                karyawan = getattr(user, 'karyawan', None) if user.pk else None
+                if karyawan is None:
+                    if no_create:
+                        continue
+                    karyawan = Karyawan(nama=nama)
+                    apply_row(karyawan, r)
+                    new_karyawans.append((user, karyawan))
+                elif not no_update:
+                    apply_row(karyawan, r)
+                    to_update_karyawans.append(karyawan)
+
+            updated_password_users = [u for u, _ in password_targets if u.pk]
+            if dry:
+                created += len(new_users) + len(new_karyawans)
+                updated += len(to_update_karyawans)
+                updated_passwords += len(updated_password_users)
+                return
+
+            t_hash = time.perf_counter()
+            hashed = hash_passwords([p for _, p in password_targets], pool)
+            for (user, _), encoded in zip(password_targets, hashed):
+                user.password = encoded
+            hash_seconds += time.perf_counter() - t_hash
+
+            with transaction.atomic():
+                if new_users:
+                    User.objects.bulk_create(new_users, batch_size=batch_size)
+                    # PostgreSQL mengisi PK lewat RETURNING; backend lain perlu ambil ulang
+                    if any(u.pk is None for u in new_users):
+                        ids = dict(User.objects.filter(email__in=[u.email for u in new_users]).values_list('email', 'id'))
+                        for u in new_users:
+                            u.pk = ids[u.email]
+                    created += len(new_users)
+
+                karyawan_baru = []
+                for user, karyawan in new_karyawans:
+                    karyawan.user = user
+                    karyawan_baru.append(karyawan)
+                if karyawan_baru:
+                    Karyawan.objects.bulk_create(karyawan_baru, batch_size=batch_size)
+                    if any(k.pk is None for k in karyawan_baru):
+                        ids = dict(Karyawan.objects.filter(user_id__in=[k.user_id for k in karyawan_baru]).values_list('user_id', 'id'))
+                        for k in karyawan_baru:
+                            k.pk = ids[k.user_id]
+                    created += len(karyawan_baru)
+
+                if to_update_karyawans:
+                    Karyawan.objects.bulk_update(to_update_karyawans, KARYAWAN_UPDATE_FIELDS, batch_size=batch_size)
+                    updated += len(to_update_karyawans)
+                if updated_password_users:
+                    User.objects.bulk_update(updated_password_users, ['password'], batch_size=batch_size)
+                    updated_passwords += len(updated_password_users)
+
+                # Signal post_save tidak terpicu oleh bulk_create: provisi jatah cuti di sini
+                jatah_dibuat += provisi_jatah_cuti_massal(karyawan_baru, datetime.date.today().year, batch_size=batch_size)
+
+        jatah_dibuat = 0
+        hash_seconds = 0.0
+        total_rows = 0
+        started = time.perf_counter()
+        pool = ProcessPoolExecutor(max_workers=workers) if fast and workers > 1 and not dry else None
+
+        def flush(batch):
+            if fast:
+                process_batch_fast(batch)
+                elapsed = time.perf_counter() - started
+                self.stdout.write(
+                    f'{total_rows} baris diproses ({total_rows / elapsed if elapsed else 0:.0f} baris/detik)'
+                )
+            else:
+                process_batch(batch)
+
+        try:
             batch: List[Dict[str,str]] = []
-            for i, row in enumerate(reader, start=2):
+            for i, row in iter_csv_rows(path, enc, delim):
                 try:
                     clean = clean_row(row)
                     batch.append(clean)
+                    total_rows += 1
                     if len(batch) >= batch_size:
-                        process_batch(batch)
+                        flush(batch)
                         batch.clear()
                 except Exception as e:
                     errors.append(f'Baris {i}: {e}')
                     skipped += 1
             if batch:
-                process_batch(batch)
+                flush(batch)
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+        if fast and not dry and (created or updated or updated_passwords):
+            # bulk_create/bulk_update tidak memicu signal watermark
+            bump_watermark('karyawan')
+            if jatah_dibuat:
+                bump_watermark('cuti')
+            invalidate_semua_ringkasan()
 
         self.stdout.write(f'Created: {created}, Updated: {updated}, Skipped: {skipped}')
         self.stdout.write(f'Updated Passwords: {updated_passwords}')
+        if fast:
+            elapsed = time.perf_counter() - started
+            self.stdout.write(f'Jatah Cuti dibuat: {jatah_dibuat}')
+            self.stdout.write(
+                f'Waktu: {elapsed:.2f} detik ({total_rows / elapsed if elapsed else 0:.0f} baris/detik), '
+                f'hash password: {hash_seconds:.2f} detik ({workers if pool is not None else 1} worker)'
+            )
         if errors:
-            self.stderr.write('Errors:\n' + '\n'.join(errors))
\ No newline at end of file
+            self.stderr.write('Errors:\n' + '\n'.join(errors))
@@ -0,0 +1,244 @@
+import json
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from urllib.parse import urljoin
+
+import requests
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from apps.absensi.models import AbsensiMagang, LokasiKantor
+from apps.authentication.models import User
+from apps.hrd.models import Karyawan
+from apps.hrd.utils.watermark import bump_watermark
+
+LOADTEST_EMAIL_DOMAIN = 'loadtest.local'
+LOADTEST_PASSWORD = 'loadtest'
+
+LOGIN_PATH = '/auth/login/'
+CHECKIN_PATH = '/absensi/fleksibel/absen/'
+
+
+def _email(i):
+    return f'loadtest-{i:05d}@{LOADTEST_EMAIL_DOMAIN}'
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    idx = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[idx]
+
+
+class Command(BaseCommand):
+    help = (
+        'Load test check-in pagi: N karyawan sintetis login lalu POST check-in serentak '
+        'ke server yang sedang berjalan (mis. gunicorn). Output JSON berisi latensi dan '
+        'verifikasi baris absensi di database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:5005', help='Base URL server (default: bind gunicorn-cfg.py)')
+        parser.add_argument('--users', type=int, default=500, help='Jumlah karyawan yang check-in serentak (default: 500)')
+        parser.add_argument('--setup', action='store_true', help='Buat karyawan sintetis yang belum ada lalu keluar')
+        parser.add_argument('--cleanup', action='store_true', help='Hapus karyawan sintetis beserta absensinya lalu keluar')
+        parser.add_argument('--reset', action='store_true', help='Hapus absensi hari ini milik karyawan sintetis sebelum test')
+        parser.add_argument('--login-concurrency', type=int, default=20, help='Jumlah login paralel saat persiapan (default: 20)')
+        parser.add_argument('--lat', type=float, default=None, help='Latitude check-in (default: lokasi kantor aktif)')
+        parser.add_argument('--lon', type=float, default=None, help='Longitude check-in (default: lokasi kantor aktif)')
+        parser.add_argument('--timeout', type=float, default=60, help='Timeout per request dalam detik (default: 60)')
+        parser.add_argument('--output', default=None, help='Tulis hasil JSON ke file (default: stdout)')
+        parser.add_argument('--force', action='store_true', help='Izinkan --setup/--cleanup/--reset saat DEBUG=False')
+
+    def handle(self, *args, **options):
+        jumlah = options['users']
+        writes = options['setup'] or options['cleanup'] or options['reset']
+        if writes and not settings.DEBUG and not options['force']:
+            raise CommandError(
+                'DEBUG=False: --setup/--cleanup/--reset menulis ke database. '
+                'Jalankan di database staging atau tambahkan --force.'
+            )
+
+        if options['cleanup']:
+            deleted, _ = User.objects.filter(email__endswith=f'@{LOADTEST_EMAIL_DOMAIN}').delete()
+            bump_watermark('karyawan')
+            bump_watermark('absensi')
+            self.stderr.write(self.style.SUCCESS(f'{deleted} baris data load test dihapus.'))
+            return
+
+        if options['setup']:
+            dibuat = self._setup(jumlah)
+            self.stderr.write(self.style.SUCCESS(f'{dibuat} karyawan sintetis dibuat (password: {LOADTEST_PASSWORD}).'))
+            return
+
+        emails = [_email(i) for i in range(jumlah)]
+        karyawan_ids = list(Karyawan.objects.filter(user__email__in=emails).values_list('id', flat=True))
+        if len(karyawan_ids) < jumlah:
+            raise CommandError(f'Baru ada {len(karyawan_ids)} dari {jumlah} karyawan sintetis. Jalankan dengan --setup dulu.')
+
+        today = date.today()
+        if options['reset']:
+            AbsensiMagang.objects.filter(id_karyawan_id__in=karyawan_ids, tanggal=today).delete()
+
+        lat, lon = options['lat'], options['lon']
+        if lat is None or lon is None:
+            kantor = LokasiKantor.objects.filter(is_active=True).order_by('id').first()
+            if kantor is None:
+                raise CommandError('Tidak ada lokasi kantor aktif; isi --lat dan --lon.')
+            lat, lon = float(kantor.latitude), float(kantor.longitude)
+
+        base_url = options['url'].rstrip('/') + '/'
+        timeout = options['timeout']
+
+        # Persiapan (tidak diukur): login dan ambil token CSRF setiap user
+        self.stderr.write(f'Login {jumlah} user ke {base_url} ...')
+        with ThreadPoolExecutor(max_workers=options['login_concurrency']) as pool:
+            sessions = list(pool.map(lambda email: self._login(base_url, email, timeout), emails))
+        gagal_login = sum(1 for s in sessions if s is None)
+        sessions = [s for s in sessions if s is not None]
+        if not sessions:
+            raise CommandError('Tidak ada user yang berhasil login.')
+
+        # Semua thread menunggu di barrier agar POST check-in benar-benar serentak
+        barrier = threading.Barrier(len(sessions))
+
+        def checkin(session):
+            barrier.wait()
+            start = time.perf_counter()
+            try:
+                response = session.post(
+                    urljoin(base_url, CHECKIN_PATH.lstrip('/')),
+                    data={
+                        'csrfmiddlewaretoken': session.cookies.get('csrftoken', ''),
+                        'latitude': lat,
+                        'longitude': lon,
+                    },
+                    headers={'Referer': urljoin(base_url, CHECKIN_PATH.lstrip('/'))},
+                    allow_redirects=False,
+                    timeout=timeout,
+                )
+                return (time.perf_counter() - start) * 1000, response.status_code, response.headers.get('Location', '')
+            except requests.RequestException as e:
+                return (time.perf_counter() - start) * 1000, e.__class__.__name__, ''
+
+        self.stderr.write(f'POST check-in serentak oleh {len(sessions)} user ...')
+        wall_start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=len(sessions)) as pool:
+            results = list(pool.map(checkin, sessions))
+        wall_ms = (time.perf_counter() - wall_start) * 1000
+
+        durations = sorted(ms for ms, _status, _loc in results)
+        status_counts, redirect_counts = {}, {}
+        for _ms, status, location in results:
+            status_counts[str(status)] = status_counts.get(str(status), 0) + 1
+            if location:
+                redirect_counts[location] = redirect_counts.get(location, 0) + 1
+
+        # Verifikasi hasil di database: satu baris per karyawan, jam masuk terisi
+        tersimpan = AbsensiMagang.objects.filter(
+            id_karyawan_id__in=karyawan_ids, tanggal=today, jam_masuk__isnull=False
+        ).count()
+
+        result = {
+            'meta': {
+                'timestamp': datetime.now().isoformat(timespec='seconds'),
+                'url': base_url,
+                'users': jumlah,
+                'login_failed': gagal_login,
+                'coordinates': [lat, lon],
+            },
+            'checkin': {
+                'requests': len(results),
+                'wall_ms': round(wall_ms, 1),
+                'throughput_rps': round(len(results) / (wall_ms / 1000), 1) if wall_ms else None,
+                'min_ms': round(durations[0], 1),
+                'median_ms': round(statistics.median(durations), 1),
+                'p95_ms': round(_percentile(durations, 95), 1),
+                'p99_ms': round(_percentile(durations, 99), 1),
+                'max_ms': round(durations[-1], 1),
+                'status': status_counts,
+                'redirects': redirect_counts,
+            },
+            'database': {
+                'checked_in_today': tersimpan,
+                'missing': len(sessions) - tersimpan,
+            },
+        }
+        if tersimpan < len(sessions):
+            self.stderr.write(self.style.WARNING(
+                'Sebagian check-in tidak tersimpan. Pastikan jam server berada di jendela check-in '
+                '(antara min_jam_masuk dan batas reminder rule hari ini) dan pakai --reset untuk mengulang.'
+            ))
+
+        output = json.dumps(result, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output)
+            self.stderr.write(self.style.SUCCESS(f"Hasil ditulis ke {options['output']}"))
+        else:
+            self.stdout.write(output)
+
+    def _setup(self, jumlah):
+        emails = [_email(i) for i in range(jumlah)]
+        sudah_ada = set(User.objects.filter(email__in=emails).values_list('email', flat=True))
+        password = make_password(LOADTEST_PASSWORD)
+        baru = [i for i in range(jumlah) if _email(i) not in sudah_ada]
+        if not baru:
+            return 0
+
+        with transaction.atomic():
+            User.objects.bulk_create(
+                [User(email=_email(i), role='Magang', password=password) for i in baru],
+                batch_size=1000,
+            )
+            user_map = dict(User.objects.filter(email__in=[_email(i) for i in baru]).values_list('email', 'id'))
+            Karyawan.objects.bulk_create(
+                [
+                    Karyawan(
+                        user_id=user_map[_email(i)],
+                        nama=f'Load Test {i:05d}',
+                        jenis_kelamin='L' if i % 2 else 'P',
+                        jabatan='Staff',
+                        divisi='General',
+                        alamat='Jl. Load Test',
+                        status='Belum kawin',
+                        mulai_kontrak=date(date.today().year, 1, 1),
+                        batas_kontrak=date(date.today().year, 12, 31),
+                        tanggal_lahir=date(1995, 1 + i % 12, 1 + i % 28),
+                    )
+                    for i in baru
+                ],
+                batch_size=1000,
+            )
+            bump_watermark('karyawan')
+        return len(baru)
+
+    def _login(self, base_url, email, timeout):
+        session = requests.Session()
+        try:
+            session.get(urljoin(base_url, LOGIN_PATH.lstrip('/')), timeout=timeout)
+            response = session.post(
+                urljoin(base_url, LOGIN_PATH.lstrip('/')),
+                data={
+                    'csrfmiddlewaretoken': session.cookies.get('csrftoken', ''),
+                    'email': email,
+                    'password': LOADTEST_PASSWORD,
+                },
+                headers={'Referer': urljoin(base_url, LOGIN_PATH.lstrip('/'))},
+                allow_redirects=False,
+                timeout=timeout,
+            )
+            if response.status_code != 302 or 'sessionid' not in session.cookies:
+                self.stderr.write(self.style.WARNING(f'Login gagal untuk {email} (HTTP {response.status_code})'))
+                return None
+            # Halaman absen dibuka lebih dulu seperti alur di browser (token CSRF tetap sama)
+            session.get(urljoin(base_url, CHECKIN_PATH.lstrip('/')), timeout=timeout)
+            return session
+        except requests.RequestException as e:
+            self.stderr.write(self.style.WARNING(f'Login gagal untuk {email}: {e}'))
+            return None
@@ -2,6 +2,7 @@ from django.core.management.base import BaseCommand
 from apps.hrd.models import TidakAmbilCuti, JatahCuti
 from django.utils import timezone
 from django.db import transaction
+from apps.hrd.utils.saldo_cuti import terapkan_delta_sisa_cuti
 
 
 class Command(BaseCommand):
@@ -31,8 +32,7 @@ class Command(BaseCommand):
                 )
                 
                 # Tambahkan jatah cuti
-                jatah_cuti.sisa_cuti += jumlah_hari
-                jatah_cuti.save()
+                terapkan_delta_sisa_cuti(jatah_cuti, jumlah_hari)
                 
                 # Tandai sudah diproses
                 pengajuan.is_processed = True
@@ -4,6 +4,7 @@ from apps.hrd.models import TidakAmbilCuti, CutiBersama, JatahCuti, Karyawan
 from django.utils import timezone
 from datetime import datetime, timedelta
 from django.db import transaction
+from apps.hrd.utils.saldo_cuti import terapkan_delta_sisa_cuti
 import logging
 from django.utils.dateparse import parse_date
 
@@ -194,8 +195,7 @@ class Command(BaseCommand):
                     )
                     
                     if jatah_cuti.sisa_cuti > 0:
-                        jatah_cuti.sisa_cuti -= 1
-                        jatah_cuti.save()
+                        terapkan_delta_sisa_cuti(jatah_cuti, -1, allow_minus=False)
                         
                         self.stdout.write(
                             f'✂ Cut 1 day: {karyawan.nama} for {cuti.tanggal} (Remaining: {jatah_cuti.sisa_cuti})'
@@ -0,0 +1,54 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.utils.storages import HashedStaticStorage, StaticStorage
+
+# Nama ber-hash berubah setiap isinya berubah, jadi aman di-cache selamanya
+CACHE_CONTROL_IMMUTABLE = 'max-age=315360000, public, immutable'
+
+
+class Command(BaseCommand):
+    help = (
+        'Salin file static ber-hash hasil collectstatic (STATIC_BACKEND=whitenoise) ke bucket '
+        'StaticStorage. Hanya file yang belum ada di bucket yang diunggah; file lama tidak '
+        'dihapus karena halaman yang masih di-cache browser bisa merujuknya.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Hanya tampilkan file yang akan diunggah')
+        parser.add_argument('--workers', type=int, default=8, help='Jumlah upload paralel (default: 8)')
+
+    def handle(self, *args, **options):
+        if not isinstance(staticfiles_storage, HashedStaticStorage):
+            raise CommandError('STATIC_BACKEND harus whitenoise (jalankan collectstatic dengan STATIC_BACKEND=whitenoise).')
+
+        manifest = staticfiles_storage.load_manifest()
+        if not manifest:
+            raise CommandError(f'Manifest tidak ditemukan di {staticfiles_storage.location}; jalankan collectstatic dulu.')
+        hashed = sorted(set(manifest.values()))
+
+        bucket = StaticStorage(object_parameters={'CacheControl': CACHE_CONTROL_IMMUTABLE})
+        prefix = f'{bucket.location}/'
+        ada = {obj.key[len(prefix):] for obj in bucket.bucket.objects.filter(Prefix=prefix)}
+        baru = [name for name in hashed if name not in ada]
+        ukuran = sum(os.path.getsize(staticfiles_storage.path(name)) for name in baru)
+
+        self.stdout.write(
+            f'{len(hashed)} file ber-hash, {len(hashed) - len(baru)} sudah ada di bucket, '
+            f'{len(baru)} perlu diunggah ({ukuran / (1024 * 1024):.1f} MB).'
+        )
+        if options['dry_run']:
+            for name in baru:
+                self.stdout.write(f'  {name}')
+            return
+
+        def unggah(name):
+            with staticfiles_storage.open(name) as f:
+                bucket.save(name, f)
+
+        with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+            list(executor.map(unggah, baru))
+        self.stdout.write(self.style.SUCCESS(f'{len(baru)} file diunggah ke s3://{bucket.bucket_name}/{prefix}'))
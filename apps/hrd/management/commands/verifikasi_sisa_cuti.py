@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from apps.hrd.utils.saldo_cuti import cari_selisih_sisa_cuti, perbaiki_selisih_sisa_cuti
+
+
+class Command(BaseCommand):
+    help = "Periksa (dan perbaiki dengan --fix) sisa_cuti yang tidak sesuai jumlah slot DetailJatahCuti terpakai"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tahun', type=int, default=None, help='Batasi ke satu tahun jatah cuti')
+        parser.add_argument('--karyawan', type=int, action='append', default=None, help='Batasi ke id karyawan (boleh diulang)')
+        parser.add_argument('--fix', action='store_true', help='Perbaiki drift yang ditemukan')
+
+    def handle(self, *args, **options):
+        filters = {'tahun': options['tahun'], 'karyawan_ids': options['karyawan']}
+        if options['fix']:
+            selisih = perbaiki_selisih_sisa_cuti(**filters)
+        else:
+            selisih = list(cari_selisih_sisa_cuti(**filters))
+
+        for row in selisih:
+            self.stdout.write(
+                f"{row['karyawan__nama']} ({row['tahun']}): sisa_cuti={row['sisa_cuti']}, "
+                f"seharusnya={row['sisa_seharusnya']} (total {row['total_cuti']}, terpakai {row['jumlah_dipakai']})"
+            )
+
+        if not selisih:
+            self.stdout.write(self.style.SUCCESS("Semua sisa_cuti konsisten."))
+        elif options['fix']:
+            self.stdout.write(self.style.SUCCESS(f"{len(selisih)} jatah cuti diperbaiki."))
+        else:
+            self.stdout.write(self.style.WARNING(f"{len(selisih)} jatah cuti drift. Jalankan dengan --fix untuk memperbaiki."))
@@ -1,5 +1,21 @@
+import json
+import logging
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
 from django.shortcuts import redirect
 from apps.hrd.models import Karyawan
+from apps.hrd.utils.instrumentation import (
+    QueryBudgetExceeded,
+    QueryCollector,
+    check_query_budget,
+    get_query_budget,
+    record_request,
+)
+
+metrics_logger = logging.getLogger('apps.hrd.metrics')
 
 class CheckKaryawanStatusMiddleware:
     def __init__(self, get_response):
@@ -13,6 +29,74 @@ class CheckKaryawanStatusMiddleware:
                     from django.contrib.auth import logout
                     logout(request)
                     return redirect('login')  # Redirect ke login dengan pesan
+                # Dipakai ulang view (lihat apps.absensi.checkin.get_request_karyawan)
+                karyawan.user = request.user
+                request.karyawan = karyawan
             except Karyawan.DoesNotExist:
-                pass
+                request.karyawan = None
         return self.get_response(request)
+
+
+class RequestMetricsMiddleware:
+    """
+    Catat jumlah query, query duplikat, waktu DB, waktu total dan ukuran response
+    per nama URL (lihat apps.hrd.utils.instrumentation). Aktif bila
+    REQUEST_METRICS_ENABLED=True.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = getattr(settings, 'REQUEST_METRICS_ENABLED', True)
+        self.slow_ms = getattr(settings, 'REQUEST_METRICS_SLOW_MS', 1000)
+
+    def __call__(self, request):
+        if not self.enabled:
+            return self.get_response(request)
+
+        collector = QueryCollector()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for conn in connections.all():
+                stack.enter_context(conn.execute_wrapper(collector))
+            response = self.get_response(request)
+        total_ms = (time.perf_counter() - start) * 1000
+
+        match = getattr(request, 'resolver_match', None)
+        if match is None:
+            # 404 dan sejenisnya: tidak dicatat agar kunci agregat tidak meledak
+            return response
+        url_name = match.view_name or match._func_path
+
+        budget = get_query_budget(match.func)
+        duplicates = collector.duplicates
+        pelanggaran = check_query_budget(budget, collector.count, duplicates)
+        if response.streaming:
+            response_bytes = int(response.get('Content-Length') or 0)
+        else:
+            response_bytes = len(response.content)
+
+        record_request(
+            url_name, collector.count, duplicates, collector.db_time * 1000, total_ms,
+            response_bytes, budget=budget, over_budget=bool(pelanggaran),
+        )
+
+        log_data = {
+            'url_name': url_name,
+            'method': request.method,
+            'status': response.status_code,
+            'queries': collector.count,
+            'duplicates': duplicates,
+            'db_ms': round(collector.db_time * 1000, 1),
+            'total_ms': round(total_ms, 1),
+            'bytes': response_bytes,
+        }
+        if pelanggaran:
+            log_data['budget'] = pelanggaran
+            log_data['top_duplicates'] = collector.top_duplicates()
+            metrics_logger.warning(json.dumps(log_data))
+            if getattr(settings, 'QUERY_BUDGET_STRICT', False):
+                raise QueryBudgetExceeded(f"{url_name}: {'; '.join(pelanggaran)}")
+        elif total_ms >= self.slow_ms:
+            metrics_logger.warning(json.dumps(log_data))
+        else:
+            metrics_logger.debug(json.dumps(log_data))
+        return response
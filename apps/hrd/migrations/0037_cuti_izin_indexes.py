@@ -0,0 +1,41 @@
+# Generated by Django 3.2.6 on 2026-10-19 16:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hrd', '0036_datawatermark_exportjob'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cuti',
+            index=models.Index(fields=['id_karyawan', 'status', 'tanggal_mulai'], name='cuti_karyawan_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cuti',
+            index=models.Index(condition=models.Q(('status', 'disetujui')), fields=['tanggal_mulai', 'tanggal_selesai'], name='cuti_disetujui_periode_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cuti',
+            index=models.Index(condition=models.Q(('status', 'menunggu')), fields=['-created_at'], name='cuti_menunggu_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='detailjatahcuti',
+            index=models.Index(fields=['jatah_cuti', 'dipakai'], name='detail_jatah_dipakai_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='izin',
+            index=models.Index(fields=['id_karyawan', 'tanggal_izin', 'jenis_izin'], name='izin_karyawan_tgl_jenis_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='izin',
+            index=models.Index(condition=models.Q(('status', 'disetujui')), fields=['tanggal_izin', 'jenis_izin'], name='izin_disetujui_tgl_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='izin',
+            index=models.Index(condition=models.Q(('status', 'menunggu')), fields=['-tanggal_pengajuan'], name='izin_menunggu_idx'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 3.2.6 on 2026-10-19 17:26
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('hrd', '0037_cuti_izin_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UploadLangsung',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=255, unique=True)),
+                ('jenis', models.CharField(max_length=30)),
+                ('nama_asli', models.CharField(max_length=255)),
+                ('content_type', models.CharField(max_length=100)),
+                ('ukuran', models.PositiveIntegerField(blank=True, null=True)),
+                ('status', models.CharField(choices=[('menunggu', 'Menunggu Upload'), ('diklaim', 'Dipakai Form'), ('terverifikasi', 'Terverifikasi'), ('ditolak', 'Ditolak')], default='menunggu', max_length=20)),
+                ('alasan_ditolak', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('diklaim_at', models.DateTimeField(blank=True, null=True)),
+                ('diverifikasi_at', models.DateTimeField(blank=True, null=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='upload_langsung', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'upload_langsung',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='uploadlangsung',
+            index=models.Index(fields=['status', 'created_at'], name='upload_langsung_status_idx'),
+        ),
+    ]
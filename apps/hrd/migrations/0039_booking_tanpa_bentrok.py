@@ -0,0 +1,105 @@
+# Generated by Django 3.2.6 on 2026-10-19 17:42
+#
+# Booking ruang rapat tidak boleh bertabrakan (ruang sama, tanggal sama, rentang
+# waktu [mulai, selesai) beririsan). PostgreSQL: exclusion constraint gist
+# (butuh extension btree_gist untuk operator = pada integer/date). SQLite: trigger
+# BEFORE INSERT/UPDATE dengan aturan yang sama. Vendor lain hanya dijaga oleh
+# BookingRuangRapat.clean().
+#
+# Catatan SQLite: migrasi yang membangun ulang tabel booking_ruang_rapat
+# (AlterField/RemoveField) ikut menghapus trigger; pasang lagi dengan RunPython
+# yang sama setelah operasi tersebut.
+from django.db import migrations, models
+
+NAMA_CONSTRAINT = 'booking_ruang_rapat_tanpa_bentrok'
+
+PG_BENTROK_LAMA = """
+SELECT a.id, b.id FROM booking_ruang_rapat a
+JOIN booking_ruang_rapat b
+  ON a.ruang_rapat_id = b.ruang_rapat_id AND a.tanggal = b.tanggal AND a.id < b.id
+ AND a.waktu_mulai < b.waktu_selesai AND a.waktu_selesai > b.waktu_mulai
+"""
+
+PG_TAMBAH = [
+    "CREATE EXTENSION IF NOT EXISTS btree_gist",
+    f"""
+    ALTER TABLE booking_ruang_rapat ADD CONSTRAINT {NAMA_CONSTRAINT}
+    EXCLUDE USING gist (
+        ruang_rapat_id WITH =,
+        tanggal WITH =,
+        tsrange(tanggal + waktu_mulai, tanggal + waktu_selesai, '[)') WITH &&
+    )
+    """,
+]
+
+PG_HAPUS = [f"ALTER TABLE booking_ruang_rapat DROP CONSTRAINT IF EXISTS {NAMA_CONSTRAINT}"]
+
+SQLITE_KONDISI = """
+    SELECT 1 FROM booking_ruang_rapat b
+    WHERE b.ruang_rapat_id = NEW.ruang_rapat_id AND b.tanggal = NEW.tanggal
+      AND b.waktu_mulai < NEW.waktu_selesai AND b.waktu_selesai > NEW.waktu_mulai
+"""
+
+SQLITE_TAMBAH = [
+    f"""
+    CREATE TRIGGER {NAMA_CONSTRAINT}_insert BEFORE INSERT ON booking_ruang_rapat
+    FOR EACH ROW WHEN EXISTS ({SQLITE_KONDISI})
+    BEGIN SELECT RAISE(ABORT, '{NAMA_CONSTRAINT}'); END
+    """,
+    f"""
+    CREATE TRIGGER {NAMA_CONSTRAINT}_update
+    BEFORE UPDATE OF ruang_rapat_id, tanggal, waktu_mulai, waktu_selesai ON booking_ruang_rapat
+    FOR EACH ROW WHEN EXISTS ({SQLITE_KONDISI} AND b.id <> NEW.id)
+    BEGIN SELECT RAISE(ABORT, '{NAMA_CONSTRAINT}'); END
+    """,
+]
+
+SQLITE_HAPUS = [
+    f"DROP TRIGGER IF EXISTS {NAMA_CONSTRAINT}_insert",
+    f"DROP TRIGGER IF EXISTS {NAMA_CONSTRAINT}_update",
+]
+
+
+def tambah_constraint(apps, schema_editor):
+    """Pasang constraint/trigger anti-bentrok sesuai vendor database."""
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute(PG_BENTROK_LAMA)
+            bentrok = cursor.fetchall()
+        if bentrok:
+            daftar = ', '.join(f'{a}-{b}' for a, b in bentrok[:20])
+            raise RuntimeError(
+                f'{len(bentrok)} pasang booking ruang rapat saling bertabrakan (id: {daftar}). '
+                'Ubah atau hapus salah satunya lalu jalankan migrate lagi.'
+            )
+        statements = PG_TAMBAH
+    elif vendor == 'sqlite':
+        statements = SQLITE_TAMBAH
+    else:
+        return
+    for sql in statements:
+        schema_editor.execute(sql)
+
+
+def hapus_constraint(apps, schema_editor):
+    """Lepas constraint/trigger anti-bentrok (reverse migration)."""
+    vendor = schema_editor.connection.vendor
+    statements = {'postgresql': PG_HAPUS, 'sqlite': SQLITE_HAPUS}.get(vendor, [])
+    for sql in statements:
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hrd', '0038_upload_langsung'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='bookingruangrapat',
+            index=models.Index(fields=['ruang_rapat', 'tanggal', 'waktu_mulai'], name='booking_ruang_tanggal_idx'),
+        ),
+        migrations.RunPython(tambah_constraint, hapus_constraint),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 3.2.6 on 2026-10-19 18:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hrd', '0039_booking_tanpa_bentrok'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='cuti',
+            name='cuti_disetujui_periode_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='izin',
+            name='izin_disetujui_tgl_idx',
+        ),
+        migrations.AddIndex(
+            model_name='cuti',
+            index=models.Index(condition=models.Q(('status', 'disetujui')), fields=['tanggal_mulai', 'tanggal_selesai'], include=('id', 'id_karyawan', 'jenis_cuti'), name='cuti_disetujui_periode_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cuti',
+            index=models.Index(fields=['id_karyawan', 'tanggal_mulai', 'id'], include=('tanggal_selesai', 'jenis_cuti', 'status'), name='cuti_riwayat_karyawan_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='izin',
+            index=models.Index(condition=models.Q(('status', 'disetujui')), fields=['tanggal_izin', 'jenis_izin'], include=('id', 'id_karyawan'), name='izin_disetujui_tgl_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='izin',
+            index=models.Index(fields=['id_karyawan', 'tanggal_izin', 'id'], include=('jenis_izin', 'status'), name='izin_riwayat_karyawan_idx'),
+        ),
+    ]
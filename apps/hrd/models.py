@@ -3,6 +3,20 @@ from django.utils.timezone import now
 from apps.authentication.models import User
 import calendar
 from apps.utils.validators import validate_file_size, validate_file_extension
+from apps.utils.periode import PeriodQuerySet
+
+
+class CutiQuerySet(PeriodQuerySet):
+    period_field = 'tanggal_mulai'
+
+
+class IzinQuerySet(PeriodQuerySet):
+    period_field = 'tanggal_izin'
+
+
+class TidakAmbilCutiQuerySet(PeriodQuerySet):
+    period_field = 'tanggal_pengajuan'
+
 
 class Karyawan(models.Model):
     STATUS_CHOICES = [
@@ -160,8 +174,34 @@ class Cuti(models.Model):
     )
     feedback_hr = models.TextField(null=True, blank=True)
 
+    objects = CutiQuerySet.as_manager()
+
     class Meta:
         db_table = 'cuti'
+        indexes = [
+            # Cuti per karyawan per status (absen_view, process_absensi, riwayat karyawan)
+            models.Index(fields=['id_karyawan', 'status', 'tanggal_mulai'], name='cuti_karyawan_status_idx'),
+            # Overlap periode cuti disetujui (kalender, rekap hari kerja, ekspor).
+            # INCLUDE (PostgreSQL): proyeksi LeaveIntervalIndex dilayani index-only scan
+            models.Index(
+                fields=['tanggal_mulai', 'tanggal_selesai'],
+                name='cuti_disetujui_periode_idx',
+                condition=models.Q(status='disetujui'),
+                include=['id', 'id_karyawan', 'jenis_cuti'],
+            ),
+            # Riwayat cuti terbaru per karyawan (dashboard: ORDER BY -tanggal_mulai, -id LIMIT n)
+            models.Index(
+                fields=['id_karyawan', 'tanggal_mulai', 'id'],
+                name='cuti_riwayat_karyawan_idx',
+                include=['tanggal_selesai', 'jenis_cuti', 'status'],
+            ),
+            # Antrian approval HR (status='menunggu' ORDER BY -created_at)
+            models.Index(
+                fields=['-created_at'],
+                name='cuti_menunggu_idx',
+                condition=models.Q(status='menunggu'),
+            ),
+        ]
 
     def __str__(self):
         return f"{self.id_karyawan.nama} - {self.jenis_cuti} ({self.status})"
@@ -218,8 +258,34 @@ class Izin(models.Model):
     )
     feedback_hr = models.TextField(null=True, blank=True)
 
+    objects = IzinQuerySet.as_manager()
+
     class Meta:
         db_table = 'izin'
+        indexes = [
+            # Izin per karyawan per tanggal per jenis (absen_view, process_absensi, label telat)
+            models.Index(fields=['id_karyawan', 'tanggal_izin', 'jenis_izin'], name='izin_karyawan_tgl_jenis_idx'),
+            # Izin disetujui per periode (rekap hari kerja, kalender, ekspor).
+            # INCLUDE (PostgreSQL): proyeksi kalender (ringkas=True) dilayani index-only scan
+            models.Index(
+                fields=['tanggal_izin', 'jenis_izin'],
+                name='izin_disetujui_tgl_idx',
+                condition=models.Q(status='disetujui'),
+                include=['id', 'id_karyawan'],
+            ),
+            # Riwayat izin terbaru per karyawan (dashboard: ORDER BY -tanggal_izin, -id LIMIT n)
+            models.Index(
+                fields=['id_karyawan', 'tanggal_izin', 'id'],
+                name='izin_riwayat_karyawan_idx',
+                include=['jenis_izin', 'status'],
+            ),
+            # Antrian approval HR (status='menunggu' ORDER BY -tanggal_pengajuan)
+            models.Index(
+                fields=['-tanggal_pengajuan'],
+                name='izin_menunggu_idx',
+                condition=models.Q(status='menunggu'),
+            ),
+        ]
 
     def __str__(self):
         return f"{self.id_karyawan.nama} - {self.jenis_izin} ({self.status})"
@@ -255,6 +321,10 @@ class DetailJatahCuti(models.Model):
         unique_together = ('jatah_cuti', 'tahun', 'bulan')
         db_table = 'detail_jatah_cuti'
         ordering = ['tahun', 'bulan']
+        indexes = [
+            # Slot terpakai/kosong per jatah (hitung sisa cuti, pilih slot)
+            models.Index(fields=['jatah_cuti', 'dipakai'], name='detail_jatah_dipakai_idx'),
+        ]
 
     def __str__(self):
         tanggal_info = f" ({self.tanggal_terpakai.strftime('%d-%m-%Y')})" if self.tanggal_terpakai else ""
@@ -271,6 +341,8 @@ class CutiBersama(models.Model):
     jenis = models.CharField(max_length=20, choices=JENIS_CHOICES, default='Cuti Bersama')
     keterangan = models.CharField(max_length=100, blank=True, null=True)
 
+    objects = PeriodQuerySet.as_manager()
+
     class Meta:
         db_table = 'cuti_bersama'
         unique_together = ['tanggal']
@@ -321,6 +393,8 @@ class TidakAmbilCuti(models.Model):
     tanggal_pengajuan = models.DateField(auto_now_add=True)
     feedback_hr = models.TextField(null=True, blank=True)
 
+    objects = TidakAmbilCutiQuerySet.as_manager()
+
     class Meta:
         db_table = 'tidak_ambil_cuti'
 
@@ -362,43 +436,72 @@ class BookingRuangRapat(models.Model):
         verbose_name_plural = 'Booking Ruang Rapat'
         ordering = ['tanggal', 'waktu_mulai']
         
-        # Constraint untuk mencegah overlap
+        # Constraint untuk mencegah overlap; bentrok antar booking dijaga oleh
+        # constraint/trigger booking_ruang_rapat_tanpa_bentrok (migrasi 0039)
         constraints = [
             models.CheckConstraint(
                 check=models.Q(waktu_selesai__gt=models.F('waktu_mulai')),
                 name='waktu_selesai_after_waktu_mulai'
             )
         ]
+        indexes = [
+            models.Index(fields=['ruang_rapat', 'tanggal', 'waktu_mulai'], name='booking_ruang_tanggal_idx'),
+        ]
     
     def __str__(self):
         return f"{self.judul} - {self.ruang_rapat.nama} ({self.tanggal})"
     
-    def clean(self):
+    def _validasi_jam(self):
         from django.core.exceptions import ValidationError
         from datetime import time
         
-        # Validasi jam operasional 09:00-18:00
+        if self.waktu_mulai is None or self.waktu_selesai is None:
+            return
+        # Validasi jam operasional 07:00-18:00
         if self.waktu_mulai < time(7, 0):
             raise ValidationError('Waktu mulai tidak boleh sebelum 07:00')
         if self.waktu_selesai > time(18, 0):
             raise ValidationError('Waktu selesai tidak boleh setelah 18:00')
         if self.waktu_selesai <= self.waktu_mulai:
             raise ValidationError('Waktu selesai harus setelah waktu mulai')
+    
+    def clean(self):
+        from django.core.exceptions import ValidationError
+        from apps.hrd.utils.booking_engine import cari_bentrok, pesan_bentrok
         
-        # Validasi overlap
-        overlapping_bookings = BookingRuangRapat.objects.filter(
-            ruang_rapat=self.ruang_rapat,
-            tanggal=self.tanggal,
-            waktu_mulai__lt=self.waktu_selesai,
-            waktu_selesai__gt=self.waktu_mulai
-        ).exclude(pk=self.pk)
+        self._validasi_jam()
+        if None in (self.ruang_rapat_id, self.tanggal, self.waktu_mulai, self.waktu_selesai):
+            return
         
-        if overlapping_bookings.exists():
-            raise ValidationError('Terdapat booking yang bertabrakan pada waktu tersebut')
+        # Validasi overlap
+        bentrok = cari_bentrok(self.ruang_rapat_id, self.tanggal, self.waktu_mulai, self.waktu_selesai, exclude_id=self.pk)
+        if bentrok:
+            raise ValidationError(pesan_bentrok(bentrok))
     
     def save(self, *args, **kwargs):
-        self.clean()
-        super().save(*args, **kwargs)
+        """
+        Simpan booking. Di PostgreSQL/SQLite bentrok ditolak oleh database sehingga
+        query overlap tidak diulang (form sudah memanggil clean()); pelanggaran
+        constraint dikembalikan sebagai ValidationError.
+        """
+        from django.core.exceptions import ValidationError
+        from django.db import IntegrityError, router, transaction
+        from apps.hrd.utils.booking_engine import cari_bentrok, dijaga_database, pelanggaran_bentrok, pesan_bentrok
+        
+        using = kwargs.get('using') or router.db_for_write(type(self), instance=self)
+        if dijaga_database(using):
+            self._validasi_jam()
+        else:
+            self.clean()
+        
+        try:
+            with transaction.atomic(using=using):
+                super().save(*args, **kwargs)
+        except IntegrityError as e:
+            if not pelanggaran_bentrok(e):
+                raise
+            bentrok = cari_bentrok(self.ruang_rapat_id, self.tanggal, self.waktu_mulai, self.waktu_selesai, exclude_id=self.pk)
+            raise ValidationError(pesan_bentrok(bentrok))
     
     @property
     def durasi_jam(self):
@@ -408,3 +511,89 @@ class BookingRuangRapat(models.Model):
         end = datetime.combine(self.tanggal, self.waktu_selesai)
         duration = end - start
         return duration.total_seconds() / 3600
+
+
+class DataWatermark(models.Model):
+    """
+    Versi data per keluarga tabel (absensi, cuti, izin, karyawan).
+
+    Dinaikkan oleh signal setiap ada perubahan baris, dipakai sebagai
+    penanda "data berubah" untuk cache artefak ekspor.
+    """
+    family = models.CharField(max_length=50, unique=True)
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'data_watermark'
+
+    def __str__(self):
+        return f"{self.family} v{self.version}"
+
+
+class ExportJob(models.Model):
+    """Job ekspor Excel yang dibangun di background dan disimpan di MediaStorage."""
+    STATUS_CHOICES = [
+        ('menunggu', 'Menunggu'),
+        ('diproses', 'Diproses'),
+        ('selesai', 'Selesai'),
+        ('gagal', 'Gagal'),
+    ]
+
+    # Hash dari nama ekspor + filter + watermark data (content-addressed)
+    key = models.CharField(max_length=64, unique=True)
+    export_name = models.CharField(max_length=100)
+    params = models.JSONField(default=dict, blank=True)
+    requested_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='export_jobs')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='menunggu')
+    file = models.FileField(upload_to='exports/', null=True, blank=True)
+    filename = models.CharField(max_length=255, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'export_job'
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.export_name} ({self.status})"
+
+
+class UploadLangsung(models.Model):
+    """
+    Upload file langsung dari browser ke bucket (presigned POST).
+
+    Server menerbitkan key, browser mengunggah ke bucket, lalu form hanya
+    mengirim key. Isi file diverifikasi di background (lihat
+    apps.hrd.utils.upload_langsung).
+    """
+    STATUS_CHOICES = [
+        ('menunggu', 'Menunggu Upload'),
+        ('diklaim', 'Dipakai Form'),
+        ('terverifikasi', 'Terverifikasi'),
+        ('ditolak', 'Ditolak'),
+    ]
+
+    key = models.CharField(max_length=255, unique=True)
+    jenis = models.CharField(max_length=30)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='upload_langsung')
+    nama_asli = models.CharField(max_length=255)
+    content_type = models.CharField(max_length=100)
+    ukuran = models.PositiveIntegerField(null=True, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='menunggu')
+    alasan_ditolak = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    diklaim_at = models.DateTimeField(null=True, blank=True)
+    diverifikasi_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'upload_langsung'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='upload_langsung_status_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.key} ({self.status})"
@@ -3,6 +3,9 @@ from django.dispatch import receiver
 from .models import JatahCuti, DetailJatahCuti, Karyawan, CutiBersama
 from datetime import datetime
 from apps.hrd.utils.jatah_cuti import hitung_jatah_cuti
+from apps.hrd.utils.watermark import connect_watermark_signals
+from apps.hrd.utils.upload_langsung import connect_upload_langsung_signals
+from apps.hrd.utils.ringkasan_karyawan import connect_ringkasan_signals
 
 @receiver(post_save, sender=JatahCuti)
 def create_detail_jatah_cuti(sender, instance, created, **kwargs):
@@ -42,4 +45,10 @@ def handle_karyawan_jatah_cuti(sender, instance, created, **kwargs):
             else:
                 # Jika belum ada jatah cuti sama sekali, buat untuk tahun ini
                 tahun_ini = datetime.now().year
-                result = hitung_jatah_cuti(instance, tahun=tahun_ini, isi_detail_cuti_bersama=False)
\ No newline at end of file
+                result = hitung_jatah_cuti(instance, tahun=tahun_ini, isi_detail_cuti_bersama=False)
+
+
+# Watermark data (penanda perubahan untuk cache ekspor)
+connect_watermark_signals()
+connect_upload_langsung_signals()
+connect_ringkasan_signals()
@@ -0,0 +1,11 @@
+from django import template
+
+from apps.hrd.utils.media_links import media_redirect_url
+
+register = template.Library()
+
+
+@register.simple_tag
+def media_url(obj, field):
+    """Link lampiran lewat redirect; presigned URL baru dibuat saat link diklik."""
+    return media_redirect_url(obj, field)
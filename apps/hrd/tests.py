@@ -1,3 +1,846 @@
-from django.test import TestCase
+import os
+import shutil
+import tempfile
+from datetime import date, datetime, time, timedelta
+from io import StringIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import IntegrityError, connection, transaction
+from django.http import QueryDict
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+from django.utils import timezone
+
+from apps.authentication.models import User
+from apps.hrd.models import (
+    BookingRuangRapat, Cuti, DetailJatahCuti, Izin, JatahCuti, Karyawan, RuangRapat, UploadLangsung,
+)
+from apps.hrd.utils.approval_cuti import (
+    DIPROSES,
+    SUDAH_DIPROSES,
+    TIDAK_DITEMUKAN,
+    file_persetujuan_dipakai_bersama,
+    proses_approval_cuti_massal,
+)
+from apps.hrd.utils.booking_engine import IndeksRuangHarian, cari_slot_kosong, pelanggaran_bentrok
+from apps.hrd.utils.cache import cached_for_period, clear_namespace, get_cache, get_generasi
+from apps.hrd.utils.export_jobs import compute_export_key, normalize_params
+from apps.hrd.utils.generate_password import generate_default_password
+from apps.hrd.utils.instrumentation import get_query_budget
+from apps.hrd.utils.interval_index import LeaveIntervalIndex
+from apps.hrd.utils.jatah_cuti import hitung_jatah_cuti
+from apps.hrd.utils.ringkasan_karyawan import get_ringkasan_karyawan
+from apps.hrd.utils.saldo_cuti import (
+    cari_selisih_sisa_cuti,
+    perbaiki_selisih_sisa_cuti,
+    terapkan_delta_sisa_cuti,
+    ubah_status_slot,
+)
+from apps.hrd.utils.upload_langsung import buat_upload, klaim_upload, proses_upload_tertunda, verifikasi_upload
+from apps.hrd.utils.watermark import get_watermark
+from apps.karyawan.forms import IzinForm
+from apps.utils.storages import MediaStorage
+
+
+def buat_karyawan(email, role='Karyawan Tetap', nama='Budi Santoso', **fields):
+    """User + Karyawan minimal untuk test."""
+    user = User.objects.create_user(email=email, password='rahasia123', role=role)
+    fields.setdefault('jabatan', 'Staff')
+    fields.setdefault('divisi', 'Consulting')
+    fields.setdefault('alamat', 'Jakarta')
+    fields.setdefault('status', 'Belum kawin')
+    fields.setdefault('mulai_kontrak', date(2024, 1, 1))
+    fields.setdefault('batas_kontrak', date(2030, 12, 31))
+    return Karyawan.objects.create(user=user, nama=nama, **fields)
+
+
+class QueryBudgetTestMixin:
+    """GET lewat RequestMetricsMiddleware dengan QUERY_BUDGET_STRICT aktif."""
+
+    def assertDalamBudget(self, url_name, params=None):
+        url = reverse(url_name)
+        self.assertIsNotNone(get_query_budget(resolve(url).func), f'{url_name} tidak memakai @query_budget')
+        # Melewati budget -> QueryBudgetExceeded dilempar middleware dan test gagal
+        with override_settings(QUERY_BUDGET_STRICT=True):
+            response = self.client.get(url, params or {})
+        self.assertEqual(response.status_code, 200)
+        return response
+
+
+class WatermarkTest(TestCase):
+    def setUp(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.karyawan = buat_karyawan('budi@example.com')
+
+    def test_login_tidak_menaikkan_watermark_karyawan(self):
+        sebelum = get_watermark('karyawan')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertTrue(self.client.login(email='budi@example.com', password='rahasia123'))
+        self.karyawan.user.refresh_from_db()
+        self.assertIsNotNone(self.karyawan.user.last_login)
+        self.assertEqual(get_watermark('karyawan'), sebelum)
+
+    def test_perubahan_data_karyawan_menaikkan_watermark(self):
+        sebelum = get_watermark('karyawan')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.karyawan.jabatan = 'Manager'
+            self.karyawan.save()
+        self.assertNotEqual(get_watermark('karyawan'), sebelum)
+
+    def test_satu_transaksi_hanya_sekali_naik(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.karyawan.save()
+            self.karyawan.save()
+            self.karyawan.user.save()
+        keluarga = [getattr(func, 'watermark_family', None) for func in callbacks]
+        self.assertEqual(keluarga.count('karyawan'), 1)
+
+    def test_key_artefak_stabil_dan_berubah_saat_data_berubah(self):
+        params = normalize_params(QueryDict('bulan=3&tahun=2025&page=2&csrfmiddlewaretoken=x'))
+        self.assertEqual(params, {'bulan': ['3'], 'tahun': ['2025']})
+        params_urutan_lain = normalize_params(QueryDict('tahun=2025&bulan=3'))
+
+        key = compute_export_key('riwayat_cuti', params)
+        self.assertEqual(compute_export_key('riwayat_cuti', params_urutan_lain), key)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.login(email='budi@example.com', password='rahasia123')
+        self.assertEqual(compute_export_key('riwayat_cuti', params), key)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Cuti.objects.create(
+                id_karyawan=self.karyawan,
+                jenis_cuti='tahunan',
+                tanggal_mulai=date(2025, 3, 10),
+                tanggal_selesai=date(2025, 3, 11),
+            )
+        key_baru = compute_export_key('riwayat_cuti', params)
+        self.assertNotEqual(key_baru, key)
+        self.assertEqual(compute_export_key('riwayat_cuti', params), key_baru)
+
+
+class CachedForPeriodTest(TestCase):
+    def setUp(self):
+        get_cache('reports').clear()
+        self.dihitung = 0
+
+        @cached_for_period(300, namespace='reports', watermark=('cuti',))
+        def jumlah_cuti(tahun):
+            self.dihitung += 1
+            return Cuti.objects.filter(tanggal_mulai__year=tahun).count()
+
+        self.jumlah_cuti = jumlah_cuti
+        with self.captureOnCommitCallbacks(execute=True):
+            self.karyawan = buat_karyawan('budi@example.com')
+
+    def test_watermark_naik_menghitung_ulang(self):
+        self.assertEqual(self.jumlah_cuti(2025), 0)
+        self.assertEqual(self.jumlah_cuti(2025), 0)
+        self.assertEqual(self.dihitung, 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Cuti.objects.create(
+                id_karyawan=self.karyawan, jenis_cuti='tahunan',
+                tanggal_mulai=date(2025, 3, 10), tanggal_selesai=date(2025, 3, 11),
+            )
+        self.assertEqual(self.jumlah_cuti(2025), 1)
+        self.assertEqual(self.dihitung, 2)
+
+    def test_clear_namespace_menghitung_ulang(self):
+        self.jumlah_cuti(2025)
+        clear_namespace('rules')
+        self.jumlah_cuti(2025)
+        self.assertEqual(self.dihitung, 1)
+
+        clear_namespace('reports')
+        self.jumlah_cuti(2025)
+        self.assertEqual(self.dihitung, 2)
+
+    def test_generasi_naik_tanpa_kedaluwarsa(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            caches_file = {'reports': {
+                'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+                'LOCATION': cache_dir,
+                'TIMEOUT': 60,
+            }}
+            with override_settings(CACHES={**settings.CACHES, **caches_file}):
+                self.assertEqual(clear_namespace('reports'), 2)
+                self.assertEqual(clear_namespace('reports'), 3)
+                # incr() FileBasedCache menulis ulang dengan TIMEOUT default
+                nanti = datetime.now().timestamp() + 3600
+                with mock.patch('django.core.cache.backends.filebased.time.time', return_value=nanti):
+                    self.assertEqual(get_generasi('reports'), 3)
+
+
+class WatermarkEtagTest(TestCase):
+    def setUp(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.karyawan = buat_karyawan('budi@example.com')
+            buat_karyawan('ani@example.com', nama='Ani Lestari')
+            self.ruang = RuangRapat.objects.create(nama='Ruang Merapi')
+        self.url = reverse('booking_calendar_events') + '?start=2025-03-01&end=2025-03-31'
+
+    def _get(self, etag=None):
+        headers = {'HTTP_IF_NONE_MATCH': etag} if etag else {}
+        return self.client.get(self.url, **headers)
+
+    def test_login_user_lain_tetap_304(self):
+        self.client.login(email='budi@example.com', password='rahasia123')
+        etag = self._get()['ETag']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.login(email='ani@example.com', password='rahasia123')
+            self.client.login(email='budi@example.com', password='rahasia123')
+
+        response = self._get(etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertIn('no-cache', response['Cache-Control'])
+
+    def test_booking_baru_mengganti_etag(self):
+        self.client.login(email='budi@example.com', password='rahasia123')
+        etag = self._get()['ETag']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            BookingRuangRapat.objects.create(
+                user=self.karyawan.user, ruang_rapat=self.ruang, judul='Sprint review',
+                tanggal=date(2025, 3, 10), waktu_mulai=time(9), waktu_selesai=time(10),
+            )
+
+        response = self._get(etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([e['title'] for e in response.json()], ['Sprint review'])
+
+
+class StorageStandInTestMixin:
+    """Media di LocalS3StandIn (tanpa latensi) pada direktori sementara."""
+
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        override = override_settings(
+            DEFAULT_FILE_STORAGE='apps.utils.storages.LocalS3StandIn',
+            MEDIA_ROOT=media_root,
+            STORAGE_STANDIN_LATENCY_MS=0,
+        )
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def upload_ke_standin(self, user, jenis, nama_file, isi):
+        """Presign lalu POST ke endpoint stand-in seperti yang dilakukan browser."""
+        target = buat_upload(user, jenis, nama_file, len(isi))
+        data = dict(target['fields'], file=SimpleUploadedFile(nama_file, isi))
+        response = self.client.post(target['url'], data)
+        self.assertEqual(response.status_code, 204)
+        return target['key']
+
+
+class UploadLangsungTest(StorageStandInTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.karyawan = buat_karyawan('budi@example.com')
+        self.user = self.karyawan.user
+
+    def test_key_hanya_bisa_diklaim_sekali(self):
+        key = self.upload_ke_standin(self.user, 'cuti', 'surat.pdf', b'%PDF-1.4 isi')
+        file = klaim_upload(key, 'cuti', self.user)
+        self.assertEqual(file.name, key)
+        self.assertEqual(file.size, len(b'%PDF-1.4 isi'))
+        upload = UploadLangsung.objects.get(key=key)
+        self.assertEqual(upload.status, 'diklaim')
+
+        with self.assertRaises(ValidationError):
+            klaim_upload(key, 'cuti', self.user)
+
+    def test_klaim_ditolak_bila_status_berubah_sebelum_update(self):
+        key = self.upload_ke_standin(self.user, 'cuti', 'surat.pdf', b'%PDF-1.4 isi')
+        asli = default_storage.size
+
+        def size_lalu_diklaim_request_lain(name):
+            UploadLangsung.objects.filter(key=key).update(status='diklaim')
+            return asli(name)
+
+        with mock.patch.object(default_storage, 'size', side_effect=size_lalu_diklaim_request_lain):
+            with self.assertRaises(ValidationError):
+                klaim_upload(key, 'cuti', self.user)
+
+    def test_klaim_key_milik_user_lain_ditolak(self):
+        lain = buat_karyawan('ani@example.com', nama='Ani Lestari').user
+        key = self.upload_ke_standin(self.user, 'cuti', 'surat.pdf', b'%PDF-1.4 isi')
+        with self.assertRaises(ValidationError):
+            klaim_upload(key, 'cuti', lain)
+        self.assertEqual(UploadLangsung.objects.get(key=key).status, 'menunggu')
+
+    def test_verifikasi_magic_bytes(self):
+        key_valid = self.upload_ke_standin(self.user, 'cuti', 'surat.pdf', b'%PDF-1.4 isi')
+        key_palsu = self.upload_ke_standin(self.user, 'cuti', 'palsu.pdf', b'MZ bukan pdf')
+        klaim_upload(key_valid, 'cuti', self.user)
+        klaim_upload(key_palsu, 'cuti', self.user)
+
+        self.assertEqual(verifikasi_upload(key_valid).status, 'terverifikasi')
+        ditolak = verifikasi_upload(key_palsu)
+        self.assertEqual(ditolak.status, 'ditolak')
+        self.assertFalse(default_storage.exists(key_palsu))
+        self.assertTrue(default_storage.exists(key_valid))
+
+    def test_form_tidak_valid_tidak_mengklaim_key(self):
+        key = self.upload_ke_standin(self.user, 'izin', 'bukti.png', b'\x89PNG\r\n\x1a\nisi')
+        data = {'jenis_izin': 'telat', 'tanggal_izin': date.today(), 'file_pengajuan_key': key}
+
+        # alasan kosong: form ditolak, key tetap menunggu dan bisa dipakai submit ulang
+        form = IzinForm(data=data, karyawan=self.karyawan)
+        self.assertFalse(form.is_valid())
+        self.assertIn('alasan', form.errors)
+        self.assertEqual(UploadLangsung.objects.get(key=key).status, 'menunggu')
+
+        form = IzinForm(data={**data, 'alasan': 'Ban bocor'}, karyawan=self.karyawan)
+        self.assertTrue(form.is_valid(), form.errors)
+        self.assertEqual(form.instance.file_pengajuan.name, key)
+        self.assertEqual(UploadLangsung.objects.get(key=key).status, 'diklaim')
+
+    def test_cron_hapus_klaim_tanpa_pemakai(self):
+        isi = b'\x89PNG\r\n\x1a\nisi'
+        key_dipakai = self.upload_ke_standin(self.user, 'izin', 'dipakai.png', isi)
+        key_yatim = self.upload_ke_standin(self.user, 'izin', 'yatim.png', isi)
+        klaim_upload(key_dipakai, 'izin', self.user)
+        klaim_upload(key_yatim, 'izin', self.user)
+        Izin.objects.create(
+            id_karyawan=self.karyawan, jenis_izin='telat', tanggal_izin=date.today(),
+            alasan='Ban bocor', file_pengajuan=key_dipakai,
+        )
+        UploadLangsung.objects.update(diklaim_at=timezone.now() - timedelta(days=2))
+
+        proses_upload_tertunda()
+
+        self.assertFalse(UploadLangsung.objects.filter(key=key_yatim).exists())
+        self.assertFalse(default_storage.exists(key_yatim))
+        self.assertEqual(UploadLangsung.objects.get(key=key_dipakai).status, 'terverifikasi')
+        self.assertTrue(default_storage.exists(key_dipakai))
+
+
+@mock.patch('apps.hrd.utils.jatah_cuti.get_tanggal_merah', return_value=None)
+class ApprovalCutiMassalTest(StorageStandInTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.hrd = buat_karyawan('hrd@example.com', role='HRD', nama='Sari HRD').user
+            self.budi = buat_karyawan('budi@example.com')
+            self.ani = buat_karyawan('ani@example.com', nama='Ani Lestari')
+        # Tahun berjalan: slot tahun lalu bisa sudah hangus
+        self.tahun = date.today().year
+        with mock.patch('apps.hrd.utils.jatah_cuti.get_tanggal_merah', return_value=None):
+            for karyawan in (self.budi, self.ani):
+                hitung_jatah_cuti(karyawan, self.tahun, isi_detail_cuti_bersama=False)
+
+    def _senin(self, bulan, tambah=0):
+        awal = date(self.tahun, bulan, 1)
+        return awal + timedelta(days=(7 - awal.weekday()) % 7 + tambah)
+
+    def _cuti(self, karyawan, mulai, selesai):
+        return Cuti.objects.create(
+            id_karyawan=karyawan, jenis_cuti='tahunan', tanggal_mulai=mulai, tanggal_selesai=selesai,
+        )
+
+    def _slot_dipakai(self, karyawan):
+        return DetailJatahCuti.objects.filter(
+            jatah_cuti__karyawan=karyawan, dipakai=True, keterangan__startswith='Cuti Tahunan',
+        ).count()
+
+    def test_id_ganda_dan_ulangan_tidak_memotong_dua_kali(self, _tanggal_merah):
+        # Senin-Selasa: dua hari kerja
+        cuti = self._cuti(self.budi, self._senin(3), self._senin(3, 1))
+        with CaptureQueriesContext(connection) as queries:
+            hasil = proses_approval_cuti_massal([cuti.pk, str(cuti.pk), 'x', 999999], 'disetujui', self.hrd)
+        self.assertEqual([h['status'] for h in hasil], [DIPROSES, TIDAK_DITEMUKAN])
+        self.assertEqual(self._slot_dipakai(self.budi), 2)
+        sisa = JatahCuti.objects.get(karyawan=self.budi, tahun=self.tahun).sisa_cuti
+        if connection.features.has_select_for_update:
+            self.assertTrue(any('FOR UPDATE' in q['sql'] for q in queries.captured_queries))
+
+        # Submit terklik dua kali / HR lain: status dibaca ulang setelah baris terkunci
+        hasil = proses_approval_cuti_massal([cuti.pk], 'disetujui', self.hrd)
+        self.assertEqual(hasil[0]['status'], SUDAH_DIPROSES)
+        self.assertEqual(self._slot_dipakai(self.budi), 2)
+        hasil = proses_approval_cuti_massal([cuti.pk], 'ditolak', self.hrd)
+        self.assertEqual(hasil[0]['status'], SUDAH_DIPROSES)
+        self.assertEqual(JatahCuti.objects.get(karyawan=self.budi, tahun=self.tahun).sisa_cuti, sisa)
+        cuti.refresh_from_db()
+        self.assertEqual(cuti.status, 'disetujui')
+
+    def test_approve_massal_memakai_satu_file_persetujuan(self, _tanggal_merah):
+        daftar = [
+            self._cuti(self.budi, self._senin(3), self._senin(3)),
+            self._cuti(self.budi, self._senin(4), self._senin(4, 1)),
+            self._cuti(self.ani, self._senin(3, 2), self._senin(3, 2)),
+        ]
+        file = SimpleUploadedFile('persetujuan.pdf', b'%PDF-1.4 persetujuan direktur')
+        with self.captureOnCommitCallbacks(execute=True):
+            hasil = proses_approval_cuti_massal([c.pk for c in daftar], 'disetujui', self.hrd, file_persetujuan=file)
+        self.assertEqual([h['status'] for h in hasil], [DIPROSES] * 3)
+        self.assertEqual(self._slot_dipakai(self.budi), 3)
+        self.assertEqual(self._slot_dipakai(self.ani), 1)
+
+        nama = {c.file_persetujuan.name for c in Cuti.objects.filter(pk__in=[c.pk for c in daftar])}
+        self.assertEqual(len(nama), 1)
+        nama = nama.pop()
+        _dirs, files = default_storage.listdir('cuti/file_persetujuan/')
+        self.assertEqual(files, [nama.rsplit('/', 1)[1]])
+        with default_storage.open(nama) as f:
+            self.assertEqual(f.read(), b'%PDF-1.4 persetujuan direktur')
+
+        # Menghapus satu pengajuan tidak menghapus file yang masih dirujuk pengajuan lain
+        daftar[0].refresh_from_db()
+        self.assertTrue(file_persetujuan_dipakai_bersama(daftar[0]))
+        self.client.login(email='hrd@example.com', password='rahasia123')
+        self.client.post(reverse('hrd_hapus_cuti', args=[daftar[0].pk]))
+        self.assertFalse(Cuti.objects.filter(pk=daftar[0].pk).exists())
+        self.assertTrue(default_storage.exists(nama))
+
+
+class SaldoCutiTest(TestCase):
+    def setUp(self):
+        self.karyawan = buat_karyawan('budi@example.com')
+        # Signal JatahCuti membuat 12 slot bulanan
+        self.jatah = JatahCuti.objects.create(karyawan=self.karyawan, tahun=2025, total_cuti=12, sisa_cuti=12)
+        self.jatah.detail.update(dipakai=False, tersedia=True)
+        self.slot = list(self.jatah.detail.order_by('bulan'))
+
+    def _sisa(self):
+        return JatahCuti.objects.get(pk=self.jatah.pk).sisa_cuti
+
+    def test_delta_dari_objek_basi_tidak_saling_menimpa(self):
+        # Dua request memuat baris yang sama sebelum keduanya memotong saldo
+        a = JatahCuti.objects.get(pk=self.jatah.pk)
+        b = JatahCuti.objects.get(pk=self.jatah.pk)
+        terapkan_delta_sisa_cuti(a, -1)
+        terapkan_delta_sisa_cuti(b, -2)
+        self.assertEqual(self._sisa(), 9)
+        # Nilai di memori ikut diperbarui, save() berikutnya tidak mengembalikan delta
+        self.assertEqual(b.sisa_cuti, 9)
+        b.save()
+        self.assertEqual(self._sisa(), 9)
+
+        terapkan_delta_sisa_cuti(self.jatah.pk, -20, allow_minus=False)
+        self.assertEqual(self._sisa(), 0)
+        terapkan_delta_sisa_cuti(self.jatah.pk, -1)
+        self.assertEqual(self._sisa(), -1)
+
+    def test_ubah_status_slot_hanya_dihitung_sekali(self):
+        slot = self.slot[0]
+        self.assertEqual(ubah_status_slot(slot, True, keterangan='Cuti Tahunan'), -1)
+        # Edit kedua dari objek basi: status sudah dipakai, saldo tidak dipotong lagi
+        basi = DetailJatahCuti.objects.get(pk=slot.pk)
+        basi.dipakai = False
+        self.assertEqual(ubah_status_slot(basi, True, keterangan='Cuti Tahunan (edit)'), 0)
+        self.assertEqual(self._sisa(), 11)
+        self.assertEqual(DetailJatahCuti.objects.get(pk=slot.pk).keterangan, 'Cuti Tahunan (edit)')
+
+        self.assertEqual(ubah_status_slot(slot, False, keterangan=''), 1)
+        self.assertEqual(self._sisa(), 12)
+
+    def test_drift_terdeteksi_dan_diperbaiki(self):
+        DetailJatahCuti.objects.filter(pk__in=[self.slot[0].pk, self.slot[1].pk]).update(dipakai=True)
+        JatahCuti.objects.filter(pk=self.jatah.pk).update(sisa_cuti=12)
+
+        selisih = list(cari_selisih_sisa_cuti(tahun=2025))
+        self.assertEqual(len(selisih), 1)
+        self.assertEqual(selisih[0]['jumlah_dipakai'], 2)
+        self.assertEqual(selisih[0]['sisa_seharusnya'], 10)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            diperbaiki = perbaiki_selisih_sisa_cuti(tahun=2025)
+        self.assertEqual([row['id'] for row in diperbaiki], [self.jatah.pk])
+        self.assertEqual(self._sisa(), 10)
+        self.assertEqual(list(cari_selisih_sisa_cuti(tahun=2025)), [])
+
+    def test_saldo_dibatasi_nol_bukan_drift(self):
+        JatahCuti.objects.filter(pk=self.jatah.pk).update(total_cuti=1, sisa_cuti=0)
+        DetailJatahCuti.objects.filter(pk__in=[self.slot[0].pk, self.slot[1].pk]).update(dipakai=True)
+        self.assertEqual(list(cari_selisih_sisa_cuti(tahun=2025)), [])
+        JatahCuti.objects.filter(pk=self.jatah.pk).update(sisa_cuti=1)
+        self.assertEqual(len(cari_selisih_sisa_cuti(tahun=2025)), 1)
+
+
+@mock.patch('apps.hrd.utils.jatah_cuti.get_tanggal_merah', return_value=None)
+class ImportCsvKaryawanFastTest(TestCase):
+    HEADER = 'nama,email,jenis_kelamin,tanggal_lahir,mulai_kontrak,batas_kontrak,jabatan,divisi,alamat,status,status_keaktifan'
+
+    def setUp(self):
+        self.tahun = date.today().year
+        self.mulai = date(self.tahun, 4, 1).isoformat()
+        self.batas = date(self.tahun + 1, 12, 31).isoformat()
+        with mock.patch('apps.hrd.utils.jatah_cuti.get_tanggal_merah', return_value=None):
+            self.budi = buat_karyawan('budi@example.com')
+            # Jalur signal sebagai pembanding: kontrak sama dengan baris baru di CSV
+            self.pembanding = buat_karyawan(
+                'pembanding@example.com', nama='Pembanding',
+                mulai_kontrak=date(self.tahun, 4, 1), batas_kontrak=date(self.tahun + 1, 12, 31),
+            )
+        self.dewi = User.objects.create_user(email='dewi@example.com', password='rahasia123', role='Karyawan Tetap')
+
+    def _import(self, *baris):
+        fd, path = tempfile.mkstemp(suffix='.csv')
+        self.addCleanup(os.remove, path)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write('\n'.join((self.HEADER,) + baris) + '\n')
+        out = StringIO()
+        call_command('import_csv_karyawan', path, '--fast', '--workers', '1', stdout=out, stderr=StringIO())
+        return out.getvalue()
+
+    def _baris(self, nama, email, jabatan='Staff'):
+        return f'{nama},{email},L,1990-05-17,{self.mulai},{self.batas},{jabatan},Consulting,Jakarta,Belum kawin,Aktif'
+
+    def _jatah(self, karyawan):
+        jatah = JatahCuti.objects.get(karyawan=karyawan, tahun=self.tahun)
+        detail = list(
+            DetailJatahCuti.objects.filter(jatah_cuti=jatah).order_by('bulan')
+            .values_list('tahun', 'bulan', 'dipakai', 'jumlah_hari', 'keterangan', 'tersedia')
+        )
+        return jatah.total_cuti, jatah.sisa_cuti, detail
+
+    def test_upsert_dan_jatah_cuti(self, _tanggal_merah):
+        output = self._import(
+            self._baris('Andi Wijaya', 'andi@example.com'),
+            self._baris('Citra Dewi', 'citra@example.com', jabatan='Staff'),
+            self._baris('Budi Santoso', 'budi@example.com', jabatan='Manager'),
+            self._baris('Dewi Anggraini', 'dewi@example.com'),
+            self._baris('Citra Dewi', 'Citra@example.com', jabatan='Lead'),
+        )
+
+        # User baru: andi, citra; Karyawan baru: andi, citra, dewi; budi diupdate; satu baris ganda
+        self.assertIn('Created: 5, Updated: 1, Skipped: 1', output)
+        self.assertIn('Jatah Cuti dibuat: 3', output)
+
+        citra = Karyawan.objects.get(user__email='citra@example.com')
+        self.assertEqual(citra.jabatan, 'Lead')
+        self.assertEqual(User.objects.filter(email='citra@example.com').count(), 1)
+
+        self.budi.refresh_from_db()
+        self.assertEqual(self.budi.jabatan, 'Manager')
+
+        dewi = Karyawan.objects.get(user=self.dewi)
+        self.assertEqual(dewi.nama, 'Dewi Anggraini')
+        self.assertTrue(dewi.user.check_password('rahasia123'))
+
+        andi = Karyawan.objects.select_related('user').get(user__email='andi@example.com')
+        self.assertTrue(andi.user.check_password(generate_default_password('Andi Wijaya', date(1990, 5, 17))))
+
+        # Provisi massal sama dengan jalur signal (hitung_jatah_cuti)
+        harapan = self._jatah(self.pembanding)
+        self.assertEqual(harapan[0], 9)
+        for karyawan in (andi, citra, dewi):
+            with self.subTest(karyawan=karyawan.nama):
+                self.assertEqual(self._jatah(karyawan), harapan)
+
+
+class LeaveIntervalIndexTest(TestCase):
+    """Indeks dibandingkan dengan query per hari yang digantikannya."""
+
+    def setUp(self):
+        self.budi = buat_karyawan('budi@example.com')
+        self.ani = buat_karyawan('ani@example.com', nama='Ani Lestari')
+        self.awal, self.akhir = date(2025, 3, 1), date(2025, 4, 1)
+        self.cuti_a = self._cuti(self.budi, 3, 7)
+        self.cuti_b = self._cuti(self.budi, 5, 10)
+        # Mulai bersamaan: id terkecil (cuti_d) menang, cuti_e tertutup penuh
+        self.cuti_d = self._cuti(self.budi, 12, 14)
+        self.cuti_e = self._cuti(self.budi, 12, 13)
+        self._cuti(self.budi, 20, 21, status='ditolak')
+        # Melewati batas periode di kedua sisi
+        self.cuti_awal = Cuti.objects.create(
+            id_karyawan=self.ani, jenis_cuti='tahunan', status='disetujui',
+            tanggal_mulai=date(2025, 2, 27), tanggal_selesai=date(2025, 3, 2),
+        )
+        self.cuti_akhir = Cuti.objects.create(
+            id_karyawan=self.ani, jenis_cuti='tahunan', status='disetujui',
+            tanggal_mulai=date(2025, 3, 31), tanggal_selesai=date(2025, 4, 3),
+        )
+
+        self.telat = self._izin(self.budi, 17, 'telat')
+        self.lembur = self._izin(self.budi, 17, 'klaim_lembur', kompensasi_lembur='masuk_siang')
+        self.wfa = self._izin(self.budi, 17, 'wfa')
+        self._izin(self.budi, 17, 'sakit', status='menunggu')
+        self._izin(self.ani, 18, 'telat')
+
+        self.indeks = LeaveIntervalIndex.load(self.awal, self.akhir)
+
+    def _cuti(self, karyawan, mulai, selesai, status='disetujui'):
+        return Cuti.objects.create(
+            id_karyawan=karyawan, jenis_cuti='tahunan', status=status,
+            tanggal_mulai=date(2025, 3, mulai), tanggal_selesai=date(2025, 3, selesai),
+        )
+
+    def _izin(self, karyawan, hari, jenis, status='disetujui', **fields):
+        return Izin.objects.create(
+            id_karyawan=karyawan, jenis_izin=jenis, status=status,
+            tanggal_izin=date(2025, 3, hari), alasan='Test', **fields,
+        )
+
+    def test_cuti_tumpang_tindih_dipotong(self):
+        segmen = self.indeks.cuti_dalam_rentang(self.budi.id, self.awal, self.akhir)
+        self.assertEqual(segmen, [
+            (date(2025, 3, 3), date(2025, 3, 7), self.cuti_a),
+            (date(2025, 3, 8), date(2025, 3, 10), self.cuti_b),
+            (date(2025, 3, 12), date(2025, 3, 14), self.cuti_d),
+        ])
+        self.assertEqual(self.indeks.cuti_pada(self.budi.id, date(2025, 3, 5)), self.cuti_a)
+        self.assertEqual(self.indeks.cuti_pada(self.budi.id, date(2025, 3, 8)), self.cuti_b)
+        self.assertEqual(self.indeks.cuti_pada(self.budi.id, date(2025, 3, 13)), self.cuti_d)
+
+    def test_batas_cuti_pada(self):
+        cuti_pada = self.indeks.cuti_pada
+        self.assertIsNone(cuti_pada(self.budi.id, date(2025, 3, 2)))
+        self.assertEqual(cuti_pada(self.budi.id, date(2025, 3, 3)), self.cuti_a)
+        self.assertEqual(cuti_pada(self.budi.id, date(2025, 3, 10)), self.cuti_b)
+        self.assertIsNone(cuti_pada(self.budi.id, date(2025, 3, 11)))
+        self.assertIsNone(cuti_pada(self.budi.id, date(2025, 3, 20)))  # ditolak
+        self.assertIsNone(cuti_pada(self.budi.id + self.ani.id, date(2025, 3, 5)))
+        # Dipotong ke periode [awal, akhir)
+        self.assertIsNone(cuti_pada(self.ani.id, date(2025, 2, 28)))
+        self.assertEqual(cuti_pada(self.ani.id, date(2025, 3, 1)), self.cuti_awal)
+        self.assertEqual(cuti_pada(self.ani.id, date(2025, 3, 31)), self.cuti_akhir)
+        self.assertIsNone(cuti_pada(self.ani.id, date(2025, 4, 1)))
+
+    def test_batas_cuti_dalam_rentang(self):
+        rentang = self.indeks.cuti_dalam_rentang
+        # Setengah terbuka dan dipotong ke rentang
+        self.assertEqual(rentang(self.budi.id, date(2025, 3, 4), date(2025, 3, 9)), [
+            (date(2025, 3, 4), date(2025, 3, 7), self.cuti_a),
+            (date(2025, 3, 8), date(2025, 3, 8), self.cuti_b),
+        ])
+        self.assertEqual(rentang(self.budi.id, date(2025, 3, 10), date(2025, 3, 11)), [
+            (date(2025, 3, 10), date(2025, 3, 10), self.cuti_b),
+        ])
+        self.assertEqual(rentang(self.budi.id, date(2025, 3, 11), date(2025, 3, 12)), [])
+        self.assertEqual(rentang(self.budi.id, date(2025, 3, 1), date(2025, 3, 3)), [])
+        self.assertEqual(rentang(self.budi.id, date(2025, 3, 14), date(2025, 3, 20)), [
+            (date(2025, 3, 14), date(2025, 3, 14), self.cuti_d),
+        ])
+
+    def test_izin_pada_urut_id_dan_filter_jenis(self):
+        izin_pada = self.indeks.izin_pada
+        tanggal = date(2025, 3, 17)
+        self.assertEqual(izin_pada(self.budi.id, tanggal), [self.telat, self.lembur, self.wfa])
+        self.assertEqual(izin_pada(self.budi.id, tanggal, 'telat'), [self.telat])
+        self.assertEqual(izin_pada(self.budi.id, tanggal, ['wfa', 'wfh', 'telat']), [self.telat, self.wfa])
+        self.assertEqual(izin_pada(self.budi.id, tanggal, 'sakit'), [])  # menunggu tidak dimuat
+        self.assertEqual(izin_pada(self.budi.id, date(2025, 3, 18)), [])
+        self.assertEqual(izin_pada(self.ani.id, tanggal), [])
+
+    def test_leave_matrix_tanggal_berlubang(self):
+        tanggal_list = [date(2025, 3, h) for h in (1, 3, 7, 11, 12, 14, 17, 31)]
+        matrix = self.indeks.leave_matrix([self.budi.id, self.ani.id, 0], tanggal_list)
+        self.assertEqual(matrix.shape, (3, len(tanggal_list)))
+        self.assertEqual(matrix[0].tolist(), [False, True, True, False, True, True, False, False])
+        self.assertEqual(matrix[1].tolist(), [True, False, False, False, False, False, False, True])
+        self.assertFalse(matrix[2].any())
+
+    def test_sama_dengan_query_per_hari(self):
+        hari_list = [self.awal + timedelta(days=n) for n in range((self.akhir - self.awal).days)]
+        for karyawan in (self.budi, self.ani):
+            for hari in hari_list:
+                ada_cuti = Cuti.objects.filter(
+                    id_karyawan=karyawan, tanggal_mulai__lte=hari, tanggal_selesai__gte=hari, status='disetujui',
+                ).exists()
+                izin = Izin.objects.filter(
+                    id_karyawan=karyawan, tanggal_izin=hari, jenis_izin__in=['wfa', 'wfh', 'telat'], status='disetujui',
+                ).exists()
+                lembur = Izin.objects.filter(
+                    id_karyawan=karyawan, tanggal_izin=hari, jenis_izin='klaim_lembur',
+                    kompensasi_lembur='masuk_siang', status='disetujui',
+                ).exists()
+                with self.subTest(karyawan=karyawan.nama, hari=hari):
+                    self.assertEqual(self.indeks.ada_cuti(karyawan.id, hari), ada_cuti)
+                    self.assertEqual(bool(self.indeks.izin_pada(karyawan.id, hari, ['wfa', 'wfh', 'telat'])), izin)
+                    self.assertEqual(any(
+                        i.kompensasi_lembur == 'masuk_siang'
+                        for i in self.indeks.izin_pada(karyawan.id, hari, 'klaim_lembur')
+                    ), lembur)
+
+
+class BookingBentrokTest(TestCase):
+    def setUp(self):
+        self.user = buat_karyawan('budi@example.com').user
+        self.merapi = RuangRapat.objects.create(nama='Ruang Merapi')
+        self.bromo = RuangRapat.objects.create(nama='Ruang Bromo')
+        self.tanggal = date(2030, 3, 11)
+        self.rapat = self._booking(self.merapi, time(9), time(10))
+
+    def _booking(self, ruang, mulai, selesai, simpan=True, **fields):
+        booking = BookingRuangRapat(
+            user=self.user, ruang_rapat=ruang, judul=fields.pop('judul', 'Rapat'),
+            tanggal=fields.pop('tanggal', self.tanggal), waktu_mulai=mulai, waktu_selesai=selesai, **fields,
+        )
+        if simpan:
+            booking.save()
+        return booking
+
+    def test_database_menolak_bentrok_tanpa_clean(self):
+        # bulk_create/update() melewati save() dan clean(): hanya trigger/constraint yang menjaga
+        for mulai, selesai in ((time(9, 30), time(10, 30)), (time(8), time(11)), (time(9), time(10))):
+            with self.assertRaises(IntegrityError) as ctx, transaction.atomic():
+                BookingRuangRapat.objects.bulk_create([self._booking(self.merapi, mulai, selesai, simpan=False)])
+            self.assertTrue(pelanggaran_bentrok(ctx.exception))
+
+        lain = self._booking(self.merapi, time(13), time(14))
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            BookingRuangRapat.objects.filter(pk=lain.pk).update(waktu_mulai=time(9, 45))
+        # Update baris sendiri (tanpa menyentuh booking lain) tetap boleh
+        BookingRuangRapat.objects.filter(pk=self.rapat.pk).update(waktu_selesai=time(10, 30))
+
+    def test_batas_setengah_terbuka_dan_ruang_lain(self):
+        self._booking(self.merapi, time(10), time(11))
+        self._booking(self.merapi, time(8), time(9))
+        self._booking(self.bromo, time(9), time(10))
+        self.assertEqual(BookingRuangRapat.objects.filter(ruang_rapat=self.merapi).count(), 3)
+
+    def test_save_mengembalikan_validation_error(self):
+        with self.assertRaises(ValidationError):
+            self._booking(self.merapi, time(9, 30), time(10, 30))
+        self.assertEqual(BookingRuangRapat.objects.count(), 1)
+
+    def test_indeks_bentrok_setengah_terbuka(self):
+        indeks = IndeksRuangHarian.load(self.tanggal)
+        self.assertIsNone(indeks.bentrok(self.merapi.pk, self.tanggal, time(10), time(11)))
+        self.assertIsNone(indeks.bentrok(self.merapi.pk, self.tanggal, time(8), time(9)))
+        self.assertEqual(indeks.bentrok(self.merapi.pk, self.tanggal, time(9, 59), time(11)).pk, self.rapat.pk)
+        self.assertIsNone(indeks.bentrok(self.merapi.pk, self.tanggal, time(9, 30), time(10), exclude_id=self.rapat.pk))
+
+    def _slot(self, ruang, **kwargs):
+        kwargs.setdefault('sekarang', datetime(2030, 3, 1, 8))
+        return [
+            (s['tanggal'], s['mulai'], s['selesai'])
+            for s in cari_slot_kosong(self.tanggal, ruang_ids=[ruang.pk], **kwargs)
+        ]
+
+    def test_slot_kosong_booking_bersebelahan(self):
+        self._booking(self.merapi, time(10), time(11))
+        self.assertEqual(self._slot(self.merapi, durasi_menit=60), [
+            (self.tanggal, time(7), time(9)),
+            (self.tanggal, time(11), time(18)),
+        ])
+        # Ruang tanpa booking tetap muncul (LEFT JOIN)
+        self.assertEqual(self._slot(self.bromo, durasi_menit=60), [(self.tanggal, time(7), time(18))])
+
+    def test_slot_kosong_durasi_pas_dan_kurang(self):
+        self._booking(self.merapi, time(11), time(12))
+        # Celah 10:00-11:00 pas 60 menit, tidak cukup untuk 90 menit
+        self.assertIn((self.tanggal, time(10), time(11)), self._slot(self.merapi, durasi_menit=60))
+        self.assertNotIn((self.tanggal, time(10), time(11)), self._slot(self.merapi, durasi_menit=90))
+
+    def test_slot_kosong_hari_ini_dipotong_jam_sekarang(self):
+        # 13:07:30 dibulatkan naik ke kelipatan 15 menit berikutnya
+        slot = self._slot(self.merapi, durasi_menit=30, sekarang=datetime.combine(self.tanggal, time(13, 7, 30)))
+        self.assertEqual(slot, [(self.tanggal, time(13, 15), time(18))])
+        # Sisa 08:45-09:00 sebelum booking hanya cukup untuk rapat 15 menit
+        jam_845 = datetime.combine(self.tanggal, time(8, 45))
+        self.assertEqual(self._slot(self.merapi, durasi_menit=30, sekarang=jam_845), [(self.tanggal, time(10), time(18))])
+        self.assertEqual(self._slot(self.merapi, durasi_menit=15, sekarang=jam_845), [
+            (self.tanggal, time(8, 45), time(9)),
+            (self.tanggal, time(10), time(18)),
+        ])
+        # Lewat jam tutup atau tanggal sudah lewat: tidak ada slot
+        self.assertEqual(self._slot(self.merapi, durasi_menit=15, sekarang=datetime.combine(self.tanggal, time(17, 50))), [])
+        self.assertEqual(self._slot(self.merapi, durasi_menit=15, sekarang=datetime(2030, 3, 12, 8)), [])
+
+
+class PresignedUrlCacheTest(TestCase):
+    def setUp(self):
+        get_cache('media').clear()
+
+    def _storage(self):
+        return MediaStorage(
+            bucket_name='hr-bucket', region_name='ap-southeast-1', access_key='AKIATEST', secret_key='rahasia',
+        )
+
+    def test_default_media_memakai_presigned_url(self):
+        storage = self._storage()
+        self.assertIsNone(storage.custom_domain)
+        self.assertIn('Signature=', storage.url('cuti/surat.pdf'))
+
+    def test_url_berulang_tidak_ditandatangani_ulang(self):
+        storage = self._storage()
+        client = storage.connection.meta.client
+        with mock.patch.object(client, 'generate_presigned_url', wraps=client.generate_presigned_url) as sign:
+            url = storage.url('cuti/surat.pdf')
+            self.assertEqual(storage.url('cuti/surat.pdf'), url)
+            self.assertEqual(self._storage().url('cuti/surat.pdf'), url)
+            storage.url('izin/surat.pdf')
+        self.assertEqual(sign.call_count, 2)
+
+    @override_settings(AWS_MEDIA_CUSTOM_DOMAIN='media.example.com')
+    def test_custom_domain_tanpa_signer_tidak_di_cache(self):
+        storage = self._storage()
+        self.assertEqual(storage.url('cuti/surat.pdf'), 'https://media.example.com/hr_cesgs_dev/media/cuti/surat.pdf')
+
+
+@skipUnless(connection.vendor == 'postgresql', 'INCLUDE (covering index) hanya dibuat di PostgreSQL')
+class CoveringIndexPlanTest(TransactionTestCase):
+    """Proyeksi kalender dan riwayat dashboard harus tetap index-only scan."""
+
+    def setUp(self):
+        self.karyawan = [buat_karyawan(f'k{i}@example.com', nama=f'Karyawan {i}') for i in range(5)]
+        awal = date(2024, 1, 1)
+        Cuti.objects.bulk_create(
+            Cuti(
+                id_karyawan=self.karyawan[i % 5], jenis_cuti='tahunan',
+                status=('disetujui', 'menunggu', 'ditolak')[i % 3],
+                tanggal_mulai=awal + timedelta(days=i), tanggal_selesai=awal + timedelta(days=i + 1),
+            )
+            for i in range(600)
+        )
+        Izin.objects.bulk_create(
+            Izin(
+                id_karyawan=self.karyawan[i % 5], jenis_izin=('telat', 'sakit', 'wfh')[i % 3],
+                status=('disetujui', 'menunggu')[i % 2], alasan='x' * 200,
+                tanggal_izin=awal + timedelta(days=i),
+            )
+            for i in range(600)
+        )
+        with connection.cursor() as cursor:
+            # Visibility map terisi agar planner memilih index-only scan
+            cursor.execute('VACUUM ANALYZE cuti')
+            cursor.execute('VACUUM ANALYZE izin')
+
+    def _rencana(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute('SET enable_seqscan = off')
+            cursor.execute('SET enable_bitmapscan = off')
+            try:
+                cursor.execute(f'EXPLAIN {sql}')
+                return '\n'.join(row[0] for row in cursor.fetchall())
+            finally:
+                cursor.execute('RESET enable_seqscan')
+                cursor.execute('RESET enable_bitmapscan')
+
+    def _query(self, queries, tabel, *penanda):
+        for query in queries.captured_queries:
+            sql = query['sql']
+            if f'FROM "{tabel}"' in sql and all(p in sql for p in penanda):
+                return sql
+        self.fail(f'query {tabel} tidak ditemukan')
+
+    def test_kalender_index_only_scan(self):
+        with CaptureQueriesContext(connection) as queries:
+            LeaveIntervalIndex.load(with_nama=True, ringkas=True)
+        rencana_cuti = self._rencana(self._query(queries, 'cuti'))
+        self.assertIn('Index Only Scan', rencana_cuti)
+        self.assertIn('cuti_disetujui_periode_idx', rencana_cuti)
+        rencana_izin = self._rencana(self._query(queries, 'izin'))
+        self.assertIn('Index Only Scan', rencana_izin)
+        self.assertIn('izin_disetujui_tgl_idx', rencana_izin)
+
+    def test_riwayat_dashboard_index_only_scan(self):
+        with CaptureQueriesContext(connection) as queries:
+            get_ringkasan_karyawan(self.karyawan[0])
+        rencana_cuti = self._rencana(self._query(queries, 'cuti', 'LIMIT'))
+        self.assertIn('Index Only Scan', rencana_cuti)
+        self.assertIn('cuti_riwayat_karyawan_idx', rencana_cuti)
+        rencana_izin = self._rencana(self._query(queries, 'izin', 'LIMIT'))
+        self.assertIn('Index Only Scan', rencana_izin)
+        self.assertIn('izin_riwayat_karyawan_idx', rencana_izin)
@@ -23,6 +23,9 @@ from .views.laporan_jatah_cuti import (
     fix_jatah_cuti_slots
 )
 
+from .views.upload_langsung import presign_upload, standin_upload
+from .views.media_redirect import media_redirect
+
 from .views.booking_ruang_rapat import (
     booking_ruang_rapat_view,
     create_booking,
@@ -30,8 +33,11 @@ from .views.booking_ruang_rapat import (
     delete_booking,
     get_booking_detail,
     check_availability,
+    find_free_slots,
     booking_calendar_events
 )
+from .views.export_jobs import request_export_job, export_job_status
+from .views.instrumentation import request_metrics, reset_request_metrics
 from .views.kelola_notifikasi import (
     kelola_notifikasi_view,
     kelola_notifikasi_toggle_ajax,
@@ -69,6 +75,19 @@ urlpatterns = [
     path('ajax/update-jatah-cuti/', update_jatah_cuti_ajax, name='update_jatah_cuti_ajax'),
     path('ajax/get-detail-jatah-cuti/', get_detail_jatah_cuti_ajax, name='get_detail_jatah_cuti_ajax'),
     path('fix-jatah-cuti-slots/', fix_jatah_cuti_slots, name='fix_jatah_cuti_slots'),
+
+    # Export job (ekspor Excel di background)
+    path('export-jobs/', request_export_job, name='request_export_job'),
+    path('export-jobs/<int:job_id>/', export_job_status, name='export_job_status'),
+    path('metrics/requests/', request_metrics, name='request_metrics'),
+    path('metrics/requests/reset/', reset_request_metrics, name='reset_request_metrics'),
+
+    # Upload lampiran langsung ke bucket
+    path('upload-langsung/presign/', presign_upload, name='upload_langsung_presign'),
+    path('upload-langsung/standin/', standin_upload, name='upload_langsung_standin'),
+
+    # Link lampiran (presigned URL dibuat saat diklik)
+    path('media-redirect/<str:jenis>/<int:pk>/', media_redirect, name='media_redirect'),
     
     # Booking Ruang Rapat URLs
     path('booking-ruang-rapat/', booking_ruang_rapat_view, name='booking_ruang_rapat'),
@@ -77,6 +96,7 @@ urlpatterns = [
     path('booking-ruang-rapat/delete/<int:booking_id>/', delete_booking, name='delete_booking'),
     path('booking-ruang-rapat/detail/<int:booking_id>/', get_booking_detail, name='get_booking_detail'),
     path('booking-ruang-rapat/check-availability/', check_availability, name='check_availability'),
+    path('booking-ruang-rapat/slot-kosong/', find_free_slots, name='booking_slot_kosong'),
     
     # JSON feed FullCalendar
     path('booking-ruang-rapat/events/', booking_calendar_events, name='booking_calendar_events'),
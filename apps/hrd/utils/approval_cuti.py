@@ -0,0 +1,235 @@
+"""
+Layanan approval Cuti yang aman terhadap konkurensi.
+
+Dua HR yang menyetujui pengajuan yang sama bersamaan (atau submit yang
+terklik dua kali) sebelumnya bisa mengisi slot DetailJatahCuti dua kali karena
+status Cuti hanya dicek di memori. Di sini:
+
+- Semua Cuti yang diproses dikunci dengan SELECT ... FOR UPDATE (urut pk),
+  lalu seluruh JatahCuti milik karyawan terkait dikunci dalam satu query
+  (urut karyawan, tahun). Urutan kunci yang tetap mencegah deadlock antar
+  worker yang memproses kumpulan pengajuan beririsan.
+- Id Cuti adalah kunci idempotensi: status dibaca ulang setelah baris terkunci,
+  sehingga pengajuan yang bukan 'menunggu' lagi dilewati tanpa menyentuh slot.
+- Tiap pengajuan diproses di savepoint sendiri; kegagalan satu pengajuan tidak
+  membatalkan pengajuan lain dalam batch yang sama.
+- Notifikasi dikirim setelah commit dan disusun setelah slot terisi, sehingga
+  sisa cuti yang dilaporkan sesuai kondisi akhir.
+- File persetujuan batch disimpan ke storage sekali; setiap pengajuan
+  menyimpan nama objek yang sama (lihat file_persetujuan_dipakai_bersama).
+"""
+import logging
+from collections import defaultdict
+
+from django.db import transaction
+from notifications.signals import notify
+
+from apps.hrd.models import Cuti, DetailJatahCuti, JatahCuti
+from apps.hrd.utils.jatah_cuti import (
+    isi_cuti_tahunan,
+    isi_cuti_tahunan_dua_tahun,
+    validasi_cuti_dua_tahun,
+)
+
+logger = logging.getLogger(__name__)
+
+AKSI_APPROVAL = ('disetujui', 'ditolak')
+
+# Status hasil per pengajuan
+DIPROSES = 'diproses'
+SUDAH_DIPROSES = 'sudah_diproses'
+TIDAK_DITEMUKAN = 'tidak_ditemukan'
+GAGAL = 'gagal'
+
+
+class _GagalApproval(Exception):
+    pass
+
+
+def _hasil(cuti_id, status, pesan, info=None, cuti=None):
+    return {'cuti_id': cuti_id, 'status': status, 'pesan': pesan, 'info': info or [], 'cuti': cuti}
+
+
+def _deskripsi_notifikasi(cuti, aksi):
+    deskripsi = f"Pengajuan cuti Anda untuk tanggal {cuti.tanggal_mulai} sampai {cuti.tanggal_selesai} telah {aksi}"
+    if aksi != 'disetujui' or cuti.jenis_cuti != 'tahunan':
+        return deskripsi
+
+    tahun_sekarang = cuti.tanggal_mulai.year
+    jatah_cuti_list = JatahCuti.objects.filter(
+        karyawan_id=cuti.id_karyawan_id,
+        tahun__in=[tahun_sekarang - 1, tahun_sekarang],
+    ).order_by('tahun')
+
+    # Hitung jumlah cuti yang dipotong per tahun
+    cuti_dipotong = defaultdict(int)
+    for tahun in DetailJatahCuti.objects.filter(
+        jatah_cuti__karyawan_id=cuti.id_karyawan_id,
+        dipakai=True,
+        keterangan__icontains=f'Cuti Tahunan: {cuti.tanggal_mulai} - {cuti.tanggal_selesai}',
+    ).values_list('tahun', flat=True):
+        cuti_dipotong[tahun] += 1
+
+    deskripsi += "\n\n✔️ Pengajuan cuti disetujui!\n"
+    for jc in jatah_cuti_list:
+        deskripsi += f"- Sisa cuti tahun {jc.tahun}: {jc.sisa_cuti} hari\n"
+    if cuti_dipotong:
+        deskripsi += "- Cuti dipotong:\n"
+        for tahun, jumlah in sorted(cuti_dipotong.items()):
+            deskripsi += f"   • Tahun {tahun}: {jumlah} hari\n"
+    return deskripsi
+
+
+def _potong_jatah_cuti_tahunan(cuti):
+    """
+    Isi slot DetailJatahCuti untuk cuti tahunan yang disetujui. Saldo boleh minus.
+
+    Returns:
+        list[str]: Pesan informasi untuk HR
+
+    Raises:
+        _GagalApproval: Slot tidak bisa diisi (mis. jatah cuti tahun tersebut tidak ada)
+    """
+    karyawan = cuti.id_karyawan
+    tahun = cuti.tanggal_mulai.year
+    jumlah_hari = (cuti.tanggal_selesai - cuti.tanggal_mulai).days + 1
+    info = []
+
+    if karyawan.user.role in ['HRD', 'Karyawan Tetap']:
+        # Validasi cuti dengan sistem 2 tahun (sekarang + sebelumnya) hanya sebagai informasi
+        is_valid, error_message, _ = validasi_cuti_dua_tahun(karyawan, jumlah_hari, tahun)
+        if not is_valid:
+            info.append(f"Info: Saldo cuti {karyawan.nama} tidak mencukupi. {error_message} Namun pengajuan tetap diproses.")
+        if not isi_cuti_tahunan_dua_tahun(karyawan, cuti.tanggal_mulai, cuti.tanggal_selesai, allow_minus=True):
+            info.append(f"Info: Saldo cuti {karyawan.nama} tidak mencukupi, namun pengajuan tetap diproses.")
+        return info
+
+    jatah_cuti = JatahCuti.objects.filter(karyawan=karyawan, tahun=tahun).first()
+    if jatah_cuti and jatah_cuti.sisa_cuti < jumlah_hari:
+        info.append(
+            f"Info: Saldo cuti {karyawan.nama} tidak mencukupi. Sisa cuti: {jatah_cuti.sisa_cuti} hari, "
+            f"yang diajukan: {jumlah_hari} hari. Namun pengajuan tetap diproses."
+        )
+    if not isi_cuti_tahunan(karyawan, cuti.tanggal_mulai, cuti.tanggal_selesai, allow_minus=True):
+        raise _GagalApproval(f"Jatah cuti {karyawan.nama} tahun {tahun} tidak tersedia, pengajuan belum diproses.")
+    return info
+
+
+def file_persetujuan_dipakai_bersama(cuti):
+    """True bila file persetujuan cuti ini juga dipakai pengajuan lain (approval massal)."""
+    return bool(cuti.file_persetujuan) and Cuti.objects.filter(
+        file_persetujuan=cuti.file_persetujuan.name
+    ).exclude(pk=cuti.pk).exists()
+
+
+def proses_approval_cuti_massal(cuti_ids, aksi, approver, alasan_ditolak='', file_persetujuan=None):
+    """
+    Setujui/tolak satu atau banyak pengajuan Cuti dalam satu transaksi.
+
+    Aman dipanggil ulang dengan id yang sama: pengajuan yang statusnya bukan
+    'menunggu' lagi (sudah diproses request lain) dilaporkan sebagai
+    SUDAH_DIPROSES tanpa efek samping.
+
+    Args:
+        cuti_ids: Iterable id Cuti
+        aksi: 'disetujui' atau 'ditolak'
+        approver: User HR yang memproses
+        alasan_ditolak: Feedback untuk aksi 'ditolak'
+        file_persetujuan: File persetujuan opsional; disimpan sekali dan dirujuk
+            oleh setiap pengajuan yang diproses
+
+    Returns:
+        list[dict]: Satu hasil per id (urut input) dengan key cuti_id, status,
+        pesan, info dan cuti
+    """
+    if aksi not in AKSI_APPROVAL:
+        raise ValueError(f"Aksi approval tidak dikenal: {aksi}")
+
+    ids = []
+    for cuti_id in cuti_ids:
+        try:
+            cuti_id = int(cuti_id)
+        except (TypeError, ValueError):
+            continue
+        if cuti_id not in ids:
+            ids.append(cuti_id)
+    if not ids:
+        return []
+
+    hasil = {}
+    nama_file_persetujuan = None
+    with transaction.atomic():
+        daftar_cuti = list(
+            Cuti.objects.select_for_update(of=('self',))
+            .select_related('id_karyawan__user')
+            .filter(pk__in=ids)
+            .order_by('pk')
+        )
+        menunggu = [c for c in daftar_cuti if c.status == 'menunggu']
+
+        # Kunci saldo semua karyawan terkait sekaligus sebelum slot diisi
+        if aksi == 'disetujui':
+            karyawan_ids = sorted({c.id_karyawan_id for c in menunggu if c.jenis_cuti == 'tahunan'})
+            if karyawan_ids:
+                list(
+                    JatahCuti.objects.select_for_update()
+                    .filter(karyawan_id__in=karyawan_ids)
+                    .order_by('karyawan_id', 'tahun')
+                    .values_list('pk', flat=True)
+                )
+
+        for cuti in daftar_cuti:
+            if cuti.status != 'menunggu':
+                hasil[cuti.pk] = _hasil(
+                    cuti.pk, SUDAH_DIPROSES,
+                    f"Pengajuan cuti {cuti.id_karyawan.nama} sudah {cuti.status} sebelumnya.",
+                    cuti=cuti,
+                )
+                continue
+
+            try:
+                with transaction.atomic():
+                    info = []
+                    if aksi == 'disetujui' and cuti.jenis_cuti == 'tahunan':
+                        info = _potong_jatah_cuti_tahunan(cuti)
+
+                    cuti.status = aksi
+                    cuti.approval = approver
+                    if aksi == 'ditolak':
+                        cuti.feedback_hr = alasan_ditolak or "Tidak ada alasan diberikan."
+                    if nama_file_persetujuan:
+                        cuti.file_persetujuan = nama_file_persetujuan
+                    elif file_persetujuan:
+                        # Upload pertama ke storage; pengajuan berikutnya cukup merujuk namanya
+                        cuti.file_persetujuan.save(file_persetujuan.name, file_persetujuan, save=False)
+                        nama_file_persetujuan = cuti.file_persetujuan.name
+                    cuti.save()
+            except _GagalApproval as e:
+                cuti.status = 'menunggu'
+                hasil[cuti.pk] = _hasil(cuti.pk, GAGAL, str(e), cuti=cuti)
+                continue
+            except Exception:
+                logger.exception("Gagal memproses approval cuti %s", cuti.pk)
+                cuti.status = 'menunggu'
+                hasil[cuti.pk] = _hasil(
+                    cuti.pk, GAGAL, f"Pengajuan cuti {cuti.id_karyawan.nama} gagal diproses.", cuti=cuti
+                )
+                continue
+
+            deskripsi = _deskripsi_notifikasi(cuti, aksi)
+            transaction.on_commit(
+                lambda cuti=cuti, deskripsi=deskripsi: notify.send(
+                    sender=approver,
+                    recipient=cuti.id_karyawan.user,
+                    verb=f"cuti {aksi}",
+                    description=deskripsi,
+                    target=cuti,
+                    data={"url": "/karyawan/pengajuan-cuti/"},
+                )
+            )
+            hasil[cuti.pk] = _hasil(cuti.pk, DIPROSES, f"Pengajuan cuti berhasil {aksi}.", info=info, cuti=cuti)
+
+    return [
+        hasil.get(cuti_id) or _hasil(cuti_id, TIDAK_DITEMUKAN, f"Pengajuan cuti #{cuti_id} tidak ditemukan.")
+        for cuti_id in ids
+    ]
@@ -0,0 +1,424 @@
+"""
+Dataset sintetis dan daftar hot path untuk benchmark (manage.py benchmark_hr).
+
+- seed_dataset(): buat N karyawan dengan satu tahun AbsensiMagang, Izin, Cuti,
+  JatahCuti/DetailJatahCuti dan CutiBersama secara deterministik (random.Random(seed)).
+  Semua baris dibuat dengan bulk_create sehingga signal (watermark, snapshot)
+  tidak ikut terukur.
+- BENCHMARKS: nama -> fungsi yang menerima BenchmarkContext. Setiap run
+  dijalankan di dalam savepoint yang di-rollback supaya run berikutnya melihat
+  data yang sama (cron yang menulis ke DB tetap bisa diulang).
+
+Dipakai oleh manage.py benchmark_hr dan suite pytest-benchmark di benchmarks/.
+"""
+import random
+import statistics
+import time
+from dataclasses import dataclass
+from datetime import date, datetime, time as dt_time, timedelta
+from importlib import import_module
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.db import connection, transaction
+from django.test import RequestFactory
+
+from apps.absensi.models import AbsensiMagang, Rules
+from apps.authentication.models import User
+from apps.hrd.models import Cuti, CutiBersama, DetailJatahCuti, Izin, JatahCuti, Karyawan
+from apps.hrd.utils.instrumentation import QueryCollector
+
+BENCHMARK_EMAIL_DOMAIN = 'benchmark.local'
+
+# Komposisi role karyawan sintetis (diulang)
+ROLE_CYCLE = ['Karyawan Tetap', 'Karyawan Tetap', 'Magang', 'Karyawan Tetap', 'Part Time', 'Freelance', 'Project']
+DIVISI_CYCLE = ['General', 'DART', 'Annotation', 'Research and Innovation', 'CPEBR', 'Dataset', 'Consulting']
+JENIS_IZIN_BOBOT = [('telat', 5), ('pulang_awal', 2), ('sakit', 2), ('wfa', 1), ('klaim_lembur', 1)]
+
+
+@dataclass
+class BenchmarkContext:
+    tahun: int
+    bulan: int
+    hr_user: User
+    karyawan_user: User
+    magang_user: User
+    absensi_file: str = None
+
+
+# ============================================
+# DATASET SINTETIS
+# ============================================
+
+def _hari_kerja(awal, akhir):
+    current = awal
+    while current <= akhir:
+        if current.weekday() < 5:
+            yield current
+        current += timedelta(days=1)
+
+
+def _pilih_berbobot(rng, pilihan):
+    return rng.choices([p for p, _ in pilihan], weights=[b for _, b in pilihan])[0]
+
+
+def seed_dataset(jumlah_karyawan, tahun, seed=42, sampai=None, batch_size=2000):
+    """
+    Buat dataset sintetis. Dipanggil di dalam transaksi oleh command.
+
+    Args:
+        jumlah_karyawan: jumlah karyawan sintetis (karyawan pertama selalu HRD)
+        tahun: tahun data
+        seed: seed random agar dataset identik antar run
+        sampai: tanggal terakhir absensi (default: 31 Des atau hari ini bila tahun berjalan)
+
+    Returns:
+        dict jumlah baris per model
+    """
+    rng = random.Random(seed)
+    awal = date(tahun, 1, 1)
+    akhir = sampai or min(date(tahun, 12, 31), date.today())
+    password = make_password('benchmark')
+
+    users = []
+    for i in range(jumlah_karyawan):
+        role = 'HRD' if i == 0 else ROLE_CYCLE[i % len(ROLE_CYCLE)]
+        users.append(User(
+            email=f'bench-{i:05d}@{BENCHMARK_EMAIL_DOMAIN}',
+            role=role,
+            password=password,
+            is_staff=(i == 0),
+        ))
+    User.objects.bulk_create(users, batch_size=batch_size)
+    user_map = dict(
+        User.objects.filter(email__endswith=f'@{BENCHMARK_EMAIL_DOMAIN}').values_list('email', 'id')
+    )
+
+    karyawan_list = []
+    for i, user in enumerate(users):
+        karyawan_list.append(Karyawan(
+            user_id=user_map[user.email],
+            nama=f'Benchmark {i:05d}',
+            jenis_kelamin='L' if i % 2 else 'P',
+            jabatan='Staff',
+            divisi=DIVISI_CYCLE[i % len(DIVISI_CYCLE)],
+            alamat='Jl. Benchmark',
+            status='Belum kawin',
+            mulai_kontrak=date(tahun - 1, 1 + i % 12, 1),
+            batas_kontrak=date(tahun + 1, 12, 31),
+            tanggal_lahir=date(1990 + i % 10, 1 + i % 12, 1 + i % 28),
+        ))
+    Karyawan.objects.bulk_create(karyawan_list, batch_size=batch_size)
+    karyawan_rows = list(
+        Karyawan.objects.filter(user__email__endswith=f'@{BENCHMARK_EMAIL_DOMAIN}')
+        .order_by('nama')
+        .values_list('id', 'user__role')
+    )
+
+    hari_kerja = list(_hari_kerja(awal, akhir))
+    absensi, izin, cuti = [], [], []
+    jatah, detail_rows = [], []
+
+    for karyawan_id, role in karyawan_rows:
+        # Absensi harian: ~92% hadir, ~3% lupa check-out
+        for tanggal in hari_kerja:
+            if rng.random() > 0.92:
+                continue
+            menit_masuk = rng.randint(7 * 60 + 30, 9 * 60 + 30)
+            jam_masuk = dt_time(menit_masuk // 60, menit_masuk % 60)
+            jam_pulang = None
+            if rng.random() > 0.03:
+                menit_pulang = min(menit_masuk + rng.randint(7 * 60, 11 * 60), 23 * 60 + 59)
+                jam_pulang = dt_time(menit_pulang // 60, menit_pulang % 60)
+            absensi.append(AbsensiMagang(
+                id_karyawan_id=karyawan_id,
+                tanggal=tanggal,
+                jam_masuk=jam_masuk,
+                jam_pulang=jam_pulang,
+                keterangan='WFO' if rng.random() < 0.7 else 'WFA',
+                status='Terlambat' if menit_masuk > 9 * 60 else 'Tepat Waktu',
+            ))
+
+        # Izin: ~2 per bulan
+        for _ in range(2 * 12):
+            izin.append(Izin(
+                id_karyawan_id=karyawan_id,
+                tanggal_izin=rng.choice(hari_kerja),
+                jenis_izin=_pilih_berbobot(rng, JENIS_IZIN_BOBOT),
+                alasan='Benchmark',
+                status=rng.choice(['disetujui', 'disetujui', 'disetujui', 'ditolak', 'menunggu']),
+            ))
+
+        # Cuti: ~4 per tahun, 1-3 hari
+        bulan_cuti = set()
+        for _ in range(4):
+            mulai = rng.choice(hari_kerja)
+            status = rng.choice(['disetujui', 'disetujui', 'ditolak', 'menunggu'])
+            cuti.append(Cuti(
+                id_karyawan_id=karyawan_id,
+                tanggal_mulai=mulai,
+                tanggal_selesai=mulai + timedelta(days=rng.randint(0, 2)),
+                jenis_cuti='tahunan' if rng.random() < 0.8 else 'sakit',
+                status=status,
+            ))
+            if status == 'disetujui':
+                bulan_cuti.add(mulai.month)
+
+        if role in ('HRD', 'Karyawan Tetap'):
+            jatah.append((karyawan_id, bulan_cuti))
+
+    AbsensiMagang.objects.bulk_create(absensi, batch_size=batch_size)
+    Izin.objects.bulk_create(izin, batch_size=batch_size)
+    Cuti.objects.bulk_create(cuti, batch_size=batch_size)
+
+    JatahCuti.objects.bulk_create(
+        [JatahCuti(karyawan_id=k, tahun=tahun, total_cuti=12, sisa_cuti=12 - len(b)) for k, b in jatah],
+        batch_size=batch_size,
+    )
+    jatah_map = dict(
+        JatahCuti.objects.filter(tahun=tahun, karyawan_id__in=[k for k, _ in jatah]).values_list('karyawan_id', 'id')
+    )
+    for karyawan_id, bulan_cuti in jatah:
+        for bulan in range(1, 13):
+            detail_rows.append(DetailJatahCuti(
+                jatah_cuti_id=jatah_map[karyawan_id],
+                tahun=tahun,
+                bulan=bulan,
+                dipakai=bulan in bulan_cuti,
+                jumlah_hari=1 if bulan in bulan_cuti else 0,
+            ))
+    DetailJatahCuti.objects.bulk_create(detail_rows, batch_size=batch_size)
+
+    cuti_bersama = [
+        CutiBersama(tanggal=tanggal, jenis='Cuti Bersama', keterangan='Benchmark')
+        for tanggal in rng.sample(hari_kerja, min(5, len(hari_kerja)))
+    ]
+    CutiBersama.objects.bulk_create(cuti_bersama)
+
+    return {
+        'karyawan': len(karyawan_list),
+        'absensi_magang': len(absensi),
+        'izin': len(izin),
+        'cuti': len(cuti),
+        'jatah_cuti': len(jatah),
+        'detail_jatah_cuti': len(detail_rows),
+        'cuti_bersama': len(cuti_bersama),
+    }
+
+
+def get_benchmark_users():
+    """User sintetis untuk memanggil view: HRD, karyawan tetap, magang."""
+    users = User.objects.filter(email__endswith=f'@{BENCHMARK_EMAIL_DOMAIN}').order_by('email')
+    return (
+        users.filter(role='HRD').first(),
+        users.filter(role='Karyawan Tetap').first(),
+        users.filter(role='Magang').first(),
+    )
+
+
+# ============================================
+# HOT PATH
+# ============================================
+
+def _request(user, path='/', data=None):
+    request = RequestFactory().get(path, data or {})
+    request.user = user
+    request.session = import_module(settings.SESSION_ENGINE).SessionStore()
+    request._messages = CookieStorage(request)
+    return request
+
+
+def _consume(response):
+    """Paksa response dirender/dibaca penuh (FileResponse, TemplateResponse)."""
+    if hasattr(response, 'render') and not getattr(response, 'is_rendered', True):
+        response.render()
+    if response.streaming:
+        for _chunk in response.streaming_content:
+            pass
+        # Jangan response.close(): memicu request_finished yang menutup koneksi DB
+        file_to_stream = getattr(response, 'file_to_stream', None)
+        if file_to_stream is not None:
+            file_to_stream.close()
+    else:
+        response.content
+    return response.status_code
+
+
+def _view(dotted_path, user_attr, path='/', params=None):
+    def run(ctx):
+        from django.utils.module_loading import import_string
+        view = import_string(dotted_path)
+        data = params(ctx) if callable(params) else params
+        return _consume(view(_request(getattr(ctx, user_attr), path, data)))
+    return run
+
+
+def _periode(ctx):
+    return {'bulan': str(ctx.bulan), 'tahun': str(ctx.tahun)}
+
+
+def _compute_rekap_hari_kerja(ctx):
+    from apps.absensi.views.hr_absensi_views import compute_rekap_hari_kerja
+    return compute_rekap_hari_kerja(ctx.bulan, ctx.tahun)
+
+
+def _get_jatah_cuti_data(ctx):
+    from apps.hrd.utils.jatah_cuti import get_jatah_cuti_data
+    return get_jatah_cuti_data(ctx.tahun)
+
+
+def _attendance_snapshot(ctx):
+    from apps.absensi.snapshot import get_attendance_snapshot, invalidate_attendance_snapshot
+    tanggal = date(ctx.tahun, ctx.bulan, 15)
+    invalidate_attendance_snapshot(tanggal)
+    return get_attendance_snapshot(tanggal)
+
+
+def _process_absensi(ctx):
+    from apps.absensi.utils import process_absensi
+    if not ctx.absensi_file:
+        raise SkipBenchmark('butuh --absensi-file (file Excel mesin absensi)')
+    rule = Rules.objects.first()
+    if rule is None:
+        raise SkipBenchmark('belum ada Rules absensi')
+    return process_absensi(ctx.absensi_file, ctx.bulan, ctx.tahun, rule)
+
+
+def _tanpa_push():
+    """
+    Ganti pengiriman web push di cron notifikasi dengan mock.
+
+    Cron mengirim push ke semua karyawan aktif yang punya subscription; push
+    sudah keluar ke browser dan tidak ikut di-rollback savepoint benchmark.
+    """
+    return mock.patch('apps.notifikasi.cron.send_user_notification')
+
+
+def _checkin_reminder(ctx):
+    from apps.notifikasi.cron import execute_checkin_reminder
+    with _tanpa_push():
+        return execute_checkin_reminder()
+
+
+def _overtime_alert(ctx):
+    from apps.notifikasi.cron import execute_overtime_alert
+    with _tanpa_push():
+        return execute_overtime_alert()
+
+
+def _auto_checkout(ctx):
+    from apps.absensi.cron import AutoCheckoutCron
+    return AutoCheckoutCron().do()
+
+
+class SkipBenchmark(Exception):
+    pass
+
+
+BENCHMARKS = {
+    'compute_rekap_hari_kerja': _compute_rekap_hari_kerja,
+    'get_jatah_cuti_data': _get_jatah_cuti_data,
+    'attendance_snapshot': _attendance_snapshot,
+    'process_absensi': _process_absensi,
+    'hrd_dashboard': _view('apps.hrd.views.dashboard.hrd_dashboard', 'hr_user'),
+    'riwayat_absensi_fleksibel_hr': _view(
+        'apps.absensi.views.hr_absensi_views.riwayat_absensi_fleksibel_hr', 'hr_user', params=_periode,
+    ),
+    'calendar_events_hrd': _view('apps.hrd.views.dashboard.calendar_events', 'hr_user'),
+    'calendar_events_karyawan': _view('apps.karyawan.views.dashboard_karyawan.calendar_events', 'karyawan_user'),
+    'export_absensi_fleksibel_excel': _view(
+        'apps.absensi.views.hr_absensi_views.export_absensi_fleksibel_excel', 'hr_user', params=_periode,
+    ),
+    'export_rekap_absensi_fleksibel_excel': _view(
+        'apps.absensi.views.hr_absensi_views.export_rekap_absensi_fleksibel_excel', 'hr_user', params=_periode,
+    ),
+    'export_rekap_hari_kerja_fleksibel_excel': _view(
+        'apps.absensi.views.hr_absensi_views.export_rekap_hari_kerja_fleksibel_excel', 'hr_user', params=_periode,
+    ),
+    'export_laporan_jatah_cuti_excel': _view(
+        'apps.hrd.views.laporan_jatah_cuti.export_laporan_jatah_cuti_excel', 'hr_user',
+        params=lambda ctx: {'tahun': str(ctx.tahun)},
+    ),
+    'export_riwayat_cuti_excel': _view(
+        'apps.hrd.views.hrd_cuti.export_riwayat_cuti_excel', 'hr_user',
+        params=lambda ctx: {'tahun': str(ctx.tahun)},
+    ),
+    'cron_checkin_reminder': _checkin_reminder,
+    'cron_overtime_alert': _overtime_alert,
+    'cron_auto_checkout': _auto_checkout,
+}
+
+
+class _Rollback(Exception):
+    pass
+
+
+def jalankan_sekali(name, ctx):
+    """
+    Satu run hot path di savepoint yang di-rollback (dipakai juga suite pytest-benchmark).
+
+    Returns:
+        (durasi ms, QueryCollector)
+
+    Raises:
+        SkipBenchmark: prasyarat benchmark tidak tersedia
+    """
+    func = BENCHMARKS[name]
+    collector = QueryCollector()
+    durasi = None
+    try:
+        with transaction.atomic():
+            with connection.execute_wrapper(collector):
+                start = time.perf_counter()
+                func(ctx)
+                durasi = (time.perf_counter() - start) * 1000
+            raise _Rollback
+    except _Rollback:
+        pass
+    return durasi, collector
+
+
+def run_benchmark(name, ctx, repeat=3):
+    """
+    Jalankan satu hot path `repeat` kali, masing-masing di savepoint yang di-rollback.
+
+    Returns:
+        dict berisi waktu (ms) min/median/mean/max dan jumlah query run terakhir
+    """
+    durations = []
+    collector = None
+    for _ in range(repeat):
+        try:
+            durasi, collector = jalankan_sekali(name, ctx)
+        except SkipBenchmark as e:
+            return {'name': name, 'skipped': str(e)}
+        except Exception as e:
+            return {'name': name, 'error': f'{e.__class__.__name__}: {e}'}
+        durations.append(durasi)
+
+    return {
+        'name': name,
+        'runs': len(durations),
+        'min_ms': round(min(durations), 2),
+        'median_ms': round(statistics.median(durations), 2),
+        'mean_ms': round(statistics.mean(durations), 2),
+        'max_ms': round(max(durations), 2),
+        'queries': collector.count,
+        'duplicate_queries': collector.duplicates,
+        'db_ms': round(collector.db_time * 1000, 2),
+    }
+
+
+def benchmark_meta(jumlah_karyawan, tahun, seed, counts):
+    import django
+    return {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'django': django.get_version(),
+        'db_vendor': connection.vendor,
+        'karyawan': jumlah_karyawan,
+        'tahun': tahun,
+        'seed': seed,
+        'rows': counts,
+    }
@@ -0,0 +1,259 @@
+"""
+Mesin booking ruang rapat: deteksi bentrok dan pencarian slot kosong.
+
+Bentrok dijaga di dua lapis:
+
+- Database. Migrasi 0039 memasang constraint `booking_ruang_rapat_tanpa_bentrok`:
+  di PostgreSQL berupa EXCLUDE USING gist (btree_gist) atas ruang_rapat_id,
+  tanggal dan tsrange(tanggal + waktu_mulai, tanggal + waktu_selesai); di SQLite
+  berupa trigger BEFORE INSERT/UPDATE dengan aturan yang sama. Dua request yang
+  lolos validasi bersamaan tetap hanya satu yang tersimpan.
+- Aplikasi. BookingRuangRapat.clean() memanggil cari_bentrok() (satu query
+  ber-index) agar form bisa menampilkan booking yang bertabrakan.
+
+Interval memakai rentang setengah terbuka [mulai, selesai): booking 09:00-10:00
+tidak bentrok dengan 10:00-11:00.
+
+IndeksRuangHarian memuat booking satu rentang tanggal sekali lalu menyimpan
+interval per (ruang, tanggal) terurut waktu mulai, sehingga cek bentrok dan
+pencarian celah tidak perlu query lagi:
+
+    indeks = IndeksRuangHarian.load(tanggal)
+    indeks.bentrok(ruang_id, tanggal, time(9), time(10))   # booking atau None
+    indeks.celah(ruang_id, tanggal)                        # [(mulai, selesai), ...]
+
+    cari_slot_kosong(tanggal, durasi_menit=60)   # semua ruang aktif, satu query
+"""
+from bisect import bisect_right
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models import FilteredRelation, Q
+
+from apps.hrd.models import BookingRuangRapat, RuangRapat
+
+NAMA_CONSTRAINT = 'booking_ruang_rapat_tanpa_bentrok'
+
+# Jam operasional ruang rapat (sama dengan validasi BookingRuangRapat.clean)
+JAM_BUKA = time(7, 0)
+JAM_TUTUP = time(18, 0)
+
+# Slot kosong untuk hari ini dimulai dari kelipatan langkah ini setelah jam sekarang
+LANGKAH_MENIT = 15
+
+# Batas rentang pencarian slot kosong
+MAKS_HARI_PENCARIAN = 31
+
+VENDOR_DIJAGA = ('postgresql', 'sqlite')
+
+
+def dijaga_database(using=DEFAULT_DB_ALIAS):
+    """True bila database memasang constraint/trigger anti-bentrok (migrasi 0039)."""
+    return connections[using].vendor in VENDOR_DIJAGA
+
+
+def pelanggaran_bentrok(error):
+    """True bila IntegrityError berasal dari constraint/trigger anti-bentrok."""
+    return NAMA_CONSTRAINT in str(error)
+
+
+def cari_bentrok(ruang_id, tanggal, mulai, selesai, exclude_id=None):
+    """
+    Booking pertama (urut waktu mulai) yang bertabrakan dengan [mulai, selesai)
+    di ruang dan tanggal tersebut, atau None.
+    """
+    qs = BookingRuangRapat.objects.filter(
+        ruang_rapat_id=ruang_id,
+        tanggal=tanggal,
+        waktu_mulai__lt=selesai,
+        waktu_selesai__gt=mulai,
+    )
+    if exclude_id:
+        qs = qs.exclude(pk=exclude_id)
+    return qs.only('id', 'judul', 'waktu_mulai', 'waktu_selesai').order_by('waktu_mulai', 'id').first()
+
+
+def pesan_bentrok(booking):
+    """Pesan validasi untuk booking yang bertabrakan."""
+    if booking is None:
+        return 'Terdapat booking yang bertabrakan pada waktu tersebut'
+    return (
+        f'Waktu bertabrakan dengan booking "{booking.judul}" '
+        f'({booking.waktu_mulai.strftime("%H:%M")} - {booking.waktu_selesai.strftime("%H:%M")})'
+    )
+
+
+def _ke_menit(t, bulatkan_naik=False):
+    naik = bulatkan_naik and (t.second or t.microsecond)
+    return t.hour * 60 + t.minute + (1 if naik else 0)
+
+
+def _dari_menit(menit):
+    return time(menit // 60, menit % 60)
+
+
+class IndeksRuangHarian:
+    """
+    Interval booking per (ruang_id, tanggal), terurut berdasarkan waktu mulai.
+
+    Constraint database menjamin interval satu ruang per hari tidak tumpang tindih,
+    tetapi data lama (sebelum constraint) mungkin masih bertumpuk. Karena itu
+    disimpan juga prefiks maksimum waktu selesai: bisect pada prefiks tersebut
+    menemukan booking pertama yang mungkin beririsan dalam O(log n) tanpa
+    mengasumsikan interval saling lepas.
+    """
+
+    def __init__(self, bookings=()):
+        # (ruang_id, tanggal) -> (starts, ends, maks_akhir, items)
+        self._slot = {}
+        per_kunci = defaultdict(list)
+        for b in bookings:
+            per_kunci[(b.ruang_rapat_id, b.tanggal)].append(b)
+        for kunci, items in per_kunci.items():
+            items.sort(key=lambda b: (b.waktu_mulai, b.pk))
+            starts = [b.waktu_mulai for b in items]
+            ends = [b.waktu_selesai for b in items]
+            maks_akhir = []
+            for akhir in ends:
+                maks_akhir.append(max(akhir, maks_akhir[-1]) if maks_akhir else akhir)
+            self._slot[kunci] = (starts, ends, maks_akhir, items)
+
+    @classmethod
+    def load(cls, awal, akhir=None, ruang_ids=None):
+        """
+        Muat booking pada tanggal awal..akhir (inklusif) dalam satu query.
+
+        Args:
+            awal, akhir: Rentang tanggal; akhir None berarti hanya tanggal awal
+            ruang_ids: Batasi ke ruang tertentu (None = semua)
+        """
+        qs = BookingRuangRapat.objects.filter(tanggal__range=(awal, akhir or awal)).only(
+            'id', 'judul', 'ruang_rapat_id', 'tanggal', 'waktu_mulai', 'waktu_selesai'
+        )
+        if ruang_ids is not None:
+            qs = qs.filter(ruang_rapat_id__in=ruang_ids)
+        return cls(qs)
+
+    def interval(self, ruang_id, tanggal):
+        """Daftar booking ruang pada tanggal tersebut, urut waktu mulai."""
+        slot = self._slot.get((ruang_id, tanggal))
+        return list(slot[3]) if slot else []
+
+    def bentrok(self, ruang_id, tanggal, mulai, selesai, exclude_id=None):
+        """Booking pertama yang beririsan dengan [mulai, selesai), atau None."""
+        slot = self._slot.get((ruang_id, tanggal))
+        if not slot:
+            return None
+        starts, ends, maks_akhir, items = slot
+        # Booking sebelum indeks ini semuanya selesai <= mulai
+        i = bisect_right(maks_akhir, mulai)
+        while i < len(items) and starts[i] < selesai:
+            if ends[i] > mulai and items[i].pk != exclude_id:
+                return items[i]
+            i += 1
+        return None
+
+    def celah(self, ruang_id, tanggal, jam_buka=JAM_BUKA, jam_tutup=JAM_TUTUP, durasi_menit=0, exclude_id=None):
+        """
+        Rentang kosong [(mulai, selesai), ...] di antara booking dalam jam operasional,
+        hanya yang panjangnya minimal durasi_menit. Booking exclude_id dianggap kosong
+        (mode edit).
+        """
+        buka, tutup = _ke_menit(jam_buka), _ke_menit(jam_tutup)
+        hasil = []
+        kursor = buka
+        slot = self._slot.get((ruang_id, tanggal))
+        if slot:
+            starts, ends, _maks, items = slot
+            for mulai, selesai, booking in zip(starts, ends, items):
+                if exclude_id is not None and booking.pk == exclude_id:
+                    continue
+                m, s = _ke_menit(mulai), _ke_menit(selesai, bulatkan_naik=True)
+                if m > kursor and min(m, tutup) - kursor >= max(durasi_menit, 1):
+                    hasil.append((_dari_menit(kursor), _dari_menit(min(m, tutup))))
+                kursor = max(kursor, s)
+                if kursor >= tutup:
+                    break
+        if tutup - kursor >= max(durasi_menit, 1):
+            hasil.append((_dari_menit(kursor), _dari_menit(tutup)))
+        return hasil
+
+
+class _BookingBaris:
+    """Baris booking ringan hasil join RuangRapat -> bookings (tanpa instance model)."""
+    __slots__ = ('pk', 'ruang_rapat_id', 'tanggal', 'waktu_mulai', 'waktu_selesai')
+
+    def __init__(self, pk, ruang_rapat_id, tanggal, waktu_mulai, waktu_selesai):
+        self.pk = pk
+        self.ruang_rapat_id = ruang_rapat_id
+        self.tanggal = tanggal
+        self.waktu_mulai = waktu_mulai
+        self.waktu_selesai = waktu_selesai
+
+
+def cari_slot_kosong(awal, durasi_menit, akhir=None, ruang_ids=None, min_kapasitas=None, sekarang=None):
+    """
+    Semua rentang kosong yang cukup untuk rapat selama durasi_menit di setiap ruang
+    aktif pada tanggal awal..akhir (inklusif).
+
+    Ruang dan booking-nya dimuat dalam satu query (LEFT JOIN lewat FilteredRelation),
+    sehingga ruang tanpa booking tetap muncul. Untuk hari ini, slot dimulai dari
+    kelipatan LANGKAH_MENIT berikutnya setelah jam sekarang.
+
+    Returns:
+        list dict {ruang_id, ruang, kapasitas, warna, tanggal, mulai, selesai},
+        urut tanggal, jam mulai lalu nama ruang.
+    """
+    akhir = akhir or awal
+    sekarang = sekarang or datetime.now()
+
+    ruang_qs = RuangRapat.objects.filter(aktif=True)
+    if ruang_ids is not None:
+        ruang_qs = ruang_qs.filter(pk__in=ruang_ids)
+    if min_kapasitas:
+        ruang_qs = ruang_qs.filter(kapasitas__gte=min_kapasitas)
+    rows = (
+        ruang_qs
+        .annotate(b=FilteredRelation('bookings', condition=Q(bookings__tanggal__range=(awal, akhir))))
+        .order_by('nama', 'id', 'b__tanggal', 'b__waktu_mulai')
+        .values_list('id', 'nama', 'kapasitas', 'warna_kalender',
+                     'b__id', 'b__tanggal', 'b__waktu_mulai', 'b__waktu_selesai')
+    )
+
+    ruang = {}
+    bookings = []
+    for ruang_id, nama, kapasitas, warna, b_id, b_tanggal, b_mulai, b_selesai in rows:
+        ruang.setdefault(ruang_id, (nama, kapasitas, warna))
+        if b_id is not None:
+            bookings.append(_BookingBaris(b_id, ruang_id, b_tanggal, b_mulai, b_selesai))
+    indeks = IndeksRuangHarian(bookings)
+
+    hasil = []
+    tanggal = awal
+    while tanggal <= akhir:
+        jam_buka = JAM_BUKA
+        if tanggal < sekarang.date():
+            tanggal += timedelta(days=1)
+            continue
+        if tanggal == sekarang.date():
+            menit = -(-_ke_menit(sekarang.time(), bulatkan_naik=True) // LANGKAH_MENIT) * LANGKAH_MENIT
+            if menit >= _ke_menit(JAM_TUTUP):
+                tanggal += timedelta(days=1)
+                continue
+            jam_buka = max(JAM_BUKA, _dari_menit(menit))
+        for ruang_id, (nama, kapasitas, warna) in ruang.items():
+            for mulai, selesai in indeks.celah(ruang_id, tanggal, jam_buka=jam_buka, durasi_menit=durasi_menit):
+                hasil.append({
+                    'ruang_id': ruang_id,
+                    'ruang': nama,
+                    'kapasitas': kapasitas,
+                    'warna': warna,
+                    'tanggal': tanggal,
+                    'mulai': mulai,
+                    'selesai': selesai,
+                })
+        tanggal += timedelta(days=1)
+
+    hasil.sort(key=lambda s: (s['tanggal'], s['mulai'], s['ruang']))
+    return hasil
@@ -0,0 +1,140 @@
+"""
+Cache per subsistem (namespace).
+
+Setiap namespace adalah alias di settings.CACHES dengan KEY_PREFIX sendiri
+(lihat CACHE_NAMESPACES di core/settings.py):
+
+- calendar: tanggal merah / libur nasional (data eksternal, jarang berubah)
+- rules: konteks hari absensi (rule, hari WFA, lokasi kantor)
+- reports: KPI dashboard dan snapshot kehadiran
+- sessions: dipakai session engine
+- geo: alamat hasil reverse geocoding per koordinat (check-in/check-out)
+- default: sisanya
+
+Backend dipilih lewat CACHE_BACKEND (file / redis / locmem) sehingga data
+bisa dipakai bersama antar worker Gunicorn; LocMem hanya untuk test.
+
+Key selalu berversi: VERSION alias (CACHE_VERSION, dinaikkan bila format data
+yang di-cache berubah antar rilis) ditambah nomor generasi namespace.
+clear_namespace() cukup menaikkan generasi: semua key lama otomatis tidak
+terbaca tanpa menghapus key satu per satu (aman untuk Redis yang dipakai
+bersama aplikasi lain).
+"""
+import functools
+import hashlib
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import caches
+
+from apps.hrd.utils.watermark import get_watermark
+
+logger = logging.getLogger(__name__)
+
+GENERASI_KEY = '__generasi__'
+_MISS = object()
+
+
+def get_cache(namespace):
+    """Cache untuk satu namespace; jatuh ke alias default bila namespace tidak dikonfigurasi."""
+    return caches[namespace if namespace in settings.CACHES else 'default']
+
+
+def get_generasi(namespace):
+    return get_cache(namespace).get(GENERASI_KEY, 1)
+
+
+def naikkan_penghitung(cache, key, awal):
+    """
+    Naikkan penghitung versi/generasi tanpa kedaluwarsa.
+
+    add() hanya menulis bila key belum ada dan incr() atomik di Redis/LocMem,
+    sehingga dua worker yang menaikkan bersamaan tidak saling menimpa
+    (get lalu set bisa kehilangan satu kenaikan).
+
+    Returns:
+        int: Nilai baru
+    """
+    cache.add(key, awal, None)
+    try:
+        nilai = cache.incr(key)
+    except ValueError:
+        # Key ter-evict di antara add() dan incr()
+        cache.add(key, awal + 1, None)
+        return cache.get(key, awal + 1)
+    # incr() bawaan (FileBasedCache) menulis ulang dengan TIMEOUT default;
+    # penghitung yang kedaluwarsa kembali ke awal dan menghidupkan key lama
+    cache.touch(key, None)
+    return nilai
+
+
+def clear_namespace(namespace):
+    """
+    Kosongkan satu namespace secara logis dengan menaikkan generasinya.
+
+    Returns:
+        int: Generasi baru
+    """
+    return naikkan_penghitung(get_cache(namespace), GENERASI_KEY, 1)
+
+
+def _key_fungsi(func, args, kwargs):
+    argumen = repr((args, sorted(kwargs.items())))
+    digest = hashlib.md5(argumen.encode('utf-8')).hexdigest()
+    return f'{func.__module__}.{func.__qualname__}:{digest}'
+
+
+def cached_for_period(timeout, namespace='default', watermark=()):
+    """
+    Cache hasil fungsi selama periode tertentu di satu namespace.
+
+    Key dibentuk dari nama fungsi, argumen, dan (bila diisi) watermark keluarga
+    tabel, sehingga hasil yang bergantung pada data HR otomatis dihitung ulang
+    begitu data berubah tanpa menunggu timeout. Argumen harus punya repr() yang
+    stabil (tanggal, angka, string).
+
+    Args:
+        timeout: Detik atau timedelta; None = tanpa kedaluwarsa
+        namespace: Alias cache (calendar, rules, reports, ...)
+        watermark: Keluarga tabel yang memengaruhi hasil, mis. ('cuti', 'izin')
+
+    Fungsi hasil punya atribut .uncached (fungsi asli, tanpa cache).
+    """
+    if isinstance(timeout, timedelta):
+        timeout = int(timeout.total_seconds())
+    watermark = tuple(watermark)
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            cache = get_cache(namespace)
+            key = _key_fungsi(func, args, kwargs)
+            if watermark:
+                key = f'{key}:{get_watermark(*watermark)}'
+            key = f'{key}:g{cache.get(GENERASI_KEY, 1)}'
+
+            hasil = cache.get(key, _MISS)
+            if hasil is _MISS:
+                hasil = func(*args, **kwargs)
+                cache.set(key, hasil, timeout)
+            return hasil
+
+        wrapper.uncached = func
+        return wrapper
+
+    return decorator
+
+
+def info_namespace(namespace):
+    """Ringkasan konfigurasi satu namespace untuk command cache_namespaces."""
+    config = settings.CACHES.get(namespace, {})
+    return {
+        'namespace': namespace,
+        'backend': config.get('BACKEND', '-').rsplit('.', 1)[-1],
+        'location': config.get('LOCATION', ''),
+        'key_prefix': config.get('KEY_PREFIX', ''),
+        'version': config.get('VERSION', 1),
+        'timeout': config.get('TIMEOUT', 300),
+        'generasi': get_generasi(namespace),
+    }
@@ -0,0 +1,75 @@
+"""
+Conditional GET untuk feed JSON (kalender, badge notifikasi, status lembur).
+
+Feed ini di-poll berulang kali dan hampir selalu mengembalikan isi yang sama.
+@watermark_etag(...) menghitung ETag dari versi keluarga tabel di
+data_watermark (satu query, lihat apps.hrd.utils.watermark) ditambah view,
+argumen URL, query string (jendela tanggal/filter), user dan slot waktu.
+Bila If-None-Match dari browser cocok, view tidak dijalankan sama sekali dan
+response 304 dikirim tanpa body.
+
+Response diberi Cache-Control: private, no-cache sehingga browser selalu
+revalidasi (mengirim If-None-Match) alih-alih memakai salinan lama.
+"""
+import calendar
+import hashlib
+from datetime import datetime
+from functools import wraps
+
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+from apps.hrd.utils.watermark import get_watermark
+
+HARI = 24 * 3600
+
+
+def watermark_etag(*families, per_user=True, periode=None, token=None):
+    """
+    Decorator view GET: jawab 304 bila data di balik feed belum berubah.
+
+    Args:
+        families: Keluarga tabel yang dibaca view (WATERMARK_FAMILIES), mis. 'cuti', 'izin'
+        per_user: True bila isi response bergantung pada user yang login
+        periode: Detik; isi yang bergantung pada waktu (mis. "hari ini", durasi kerja)
+            dianggap berubah setiap pergantian slot. Slot dihitung dari waktu lokal,
+            sehingga periode=HARI berganti tepat tengah malam WIB.
+        token: Callable(request) -> str untuk versi yang lebih sempit dari keluarga
+            tabel, mis. token ringkasan per karyawan (apps.hrd.utils.ringkasan_karyawan)
+
+    Pilih keluarga sesempit mungkin: keluarga yang sering berubah (mis. 'absensi'
+    naik di setiap check-in) membuat ETag hampir selalu berbeda.
+
+    Pasang di bawah @login_required/@role_required agar akses tetap dicek lebih dulu.
+    """
+    def etag_func(view, request, *args, **kwargs):
+        bagian = [
+            f'{view.__module__}.{view.__qualname__}',
+            get_watermark(*families),
+            repr((args, sorted(kwargs.items()))),
+            '&'.join(sorted(request.GET.urlencode().split('&'))),
+        ]
+        if per_user:
+            bagian.append(f'u{request.user.pk}')
+        if token:
+            bagian.append(token(request))
+        if periode:
+            detik_lokal = calendar.timegm(datetime.now().timetuple())
+            bagian.append(f'p{detik_lokal // periode}')
+        return hashlib.md5('|'.join(bagian).encode('utf-8')).hexdigest()
+
+    def decorator(view):
+        conditional_view = condition(
+            etag_func=lambda request, *args, **kwargs: etag_func(view, request, *args, **kwargs)
+        )(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response = conditional_view(request, *args, **kwargs)
+            if request.method in ('GET', 'HEAD'):
+                patch_cache_control(response, private=True, no_cache=True)
+            return response
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,334 @@
+"""
+Subsistem job ekspor Excel.
+
+Alur:
+1. Klien meminta ekspor (nama ekspor + filter) dan menerima job id.
+2. Worker (thread di proses yang sama, dengan cron ProsesExportJob sebagai
+   cadangan) menjalankan view ekspor yang sudah ada dan menyimpan hasilnya ke
+   default storage (MediaStorage) di bawah key content-addressed:
+   sha256(nama ekspor + filter + watermark data [+ user]).
+3. Setelah selesai, klien mendapat presigned URL.
+
+Permintaan dengan filter yang sama memakai ulang artefak yang sama selama
+watermark data (lihat apps.hrd.utils.watermark) belum berubah dan umur artefak
+belum melewati EXPORT_JOB_MAX_AGE_HOURS.
+"""
+import hashlib
+import json
+import logging
+import re
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.core.files import File
+from django.db import connections, transaction
+from django.http import HttpRequest, QueryDict
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from apps.hrd.models import ExportJob
+from apps.hrd.utils.watermark import get_watermark
+
+logger = logging.getLogger(__name__)
+
+# Artefak dipakai ulang maksimal selama ini (jaga-jaga perubahan lewat update() massal)
+EXPORT_JOB_MAX_AGE = timedelta(hours=getattr(settings, 'EXPORT_JOB_MAX_AGE_HOURS', 6))
+# Job 'diproses' lebih lama dari ini dianggap macet dan boleh diulang
+EXPORT_JOB_STALE_AFTER = timedelta(minutes=30)
+# Masa berlaku presigned URL (detik)
+EXPORT_URL_EXPIRE = getattr(settings, 'EXPORT_URL_EXPIRE', 3600)
+
+# ============================================
+# REGISTRY EKSPOR
+# ============================================
+# nama ekspor -> view, keluarga watermark, role yang boleh, per_user
+# per_user=True: hasil bergantung pada user peminta (mis. riwayat cuti pribadi)
+
+EXPORT_REGISTRY = {
+    'absensi': {
+        'view': 'apps.absensi.views.absensi_views.export_absensi_excel',
+        'families': ['absensi', 'karyawan'],
+        'roles': ['HRD'],
+    },
+    'rekap_absensi': {
+        'view': 'apps.absensi.views.absensi_views.export_rekap_absensi_excel',
+        'families': ['absensi', 'karyawan'],
+        'roles': ['HRD'],
+    },
+    'absensi_fleksibel': {
+        'view': 'apps.absensi.views.hr_absensi_views.export_absensi_fleksibel_excel',
+        'families': ['absensi', 'izin', 'karyawan'],
+        'roles': ['HRD'],
+    },
+    'rekap_absensi_fleksibel': {
+        'view': 'apps.absensi.views.hr_absensi_views.export_rekap_absensi_fleksibel_excel',
+        'families': ['absensi', 'karyawan'],
+        'roles': ['HRD'],
+    },
+    'rekap_hari_kerja_fleksibel': {
+        'view': 'apps.absensi.views.hr_absensi_views.export_rekap_hari_kerja_fleksibel_excel',
+        'families': ['absensi', 'izin', 'cuti', 'karyawan'],
+        'roles': ['HRD'],
+    },
+    'riwayat_cuti': {
+        'view': 'apps.hrd.views.hrd_cuti.export_riwayat_cuti_excel',
+        'families': ['cuti', 'karyawan'],
+        'roles': ['HRD'],
+    },
+    'riwayat_izin': {
+        'view': 'apps.hrd.views.hrd_izin.export_riwayat_izin_excel',
+        'families': ['izin', 'karyawan'],
+        'roles': ['HRD'],
+    },
+    'data_karyawan': {
+        'view': 'apps.hrd.views.manajemen_karyawan.download_karyawan_excel',
+        'families': ['karyawan'],
+        'roles': ['HRD'],
+    },
+    'laporan_jatah_cuti': {
+        'view': 'apps.hrd.views.laporan_jatah_cuti.export_laporan_jatah_cuti_excel',
+        'families': ['cuti', 'karyawan'],
+        'roles': ['HRD'],
+    },
+    'riwayat_cuti_karyawan': {
+        'view': 'apps.karyawan.views.riwayat_cuti_detail.export_riwayat_cuti_excel',
+        'families': ['cuti', 'karyawan'],
+        'roles': None,
+        'per_user': True,
+    },
+}
+
+
+class ExportJobError(Exception):
+    pass
+
+
+def can_request_export(user, export_name):
+    """Cek apakah user boleh meminta ekspor ini."""
+    entry = EXPORT_REGISTRY.get(export_name)
+    if not entry or not user.is_authenticated:
+        return False
+    return entry['roles'] is None or user.role in entry['roles']
+
+
+def normalize_params(querydict, exclude=('csrfmiddlewaretoken', 'export', 'page')):
+    """QueryDict -> dict terurut {key: [nilai...]} tanpa nilai kosong."""
+    params = {}
+    for key in sorted(querydict.keys()):
+        if key in exclude:
+            continue
+        values = [v for v in querydict.getlist(key) if v != '']
+        if values:
+            params[key] = values
+    return params
+
+
+def compute_export_key(export_name, params, user=None):
+    """Key content-addressed: hash dari nama ekspor, filter, watermark data (dan user)."""
+    entry = EXPORT_REGISTRY[export_name]
+    payload = {
+        'export': export_name,
+        'params': params,
+        'watermark': get_watermark(*entry['families']),
+    }
+    if entry.get('per_user'):
+        payload['user'] = user.pk if user else None
+    raw = json.dumps(payload, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def _artifact_available(job):
+    if job.status != 'selesai' or not job.file:
+        return False
+    if job.finished_at and timezone.now() - job.finished_at > EXPORT_JOB_MAX_AGE:
+        return False
+    try:
+        return job.file.storage.exists(job.file.name)
+    except Exception:
+        return False
+
+
+def request_export(export_name, params, user):
+    """
+    Minta ekspor. Mengembalikan ExportJob yang sudah ada (artefak cache atau
+    job yang sedang berjalan) atau job baru yang langsung diantrikan.
+    """
+    if export_name not in EXPORT_REGISTRY:
+        raise ExportJobError(f"Ekspor '{export_name}' tidak dikenal")
+
+    key = compute_export_key(export_name, params, user)
+    job, created = ExportJob.objects.get_or_create(
+        key=key,
+        defaults={'export_name': export_name, 'params': params, 'requested_by': user},
+    )
+    if not created:
+        if _artifact_available(job):
+            return job
+        if job.status == 'menunggu':
+            return job
+        if job.status == 'diproses' and job.started_at and timezone.now() - job.started_at < EXPORT_JOB_STALE_AFTER:
+            return job
+
+        # Gagal, macet, kedaluwarsa, atau file hilang: bangun ulang
+        if job.file:
+            job.file.delete(save=False)
+        job.status = 'menunggu'
+        job.params = params
+        job.requested_by = user
+        job.error = ''
+        job.started_at = None
+        job.finished_at = None
+        job.save()
+
+    enqueue_export_job(job)
+    return job
+
+
+# ============================================
+# WORKER
+# ============================================
+
+_executor = None
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, 'EXPORT_JOB_WORKERS', 1),
+            thread_name_prefix='export-job',
+        )
+    return _executor
+
+
+def enqueue_export_job(job):
+    """Jalankan job di background setelah transaksi commit. Bila EXPORT_JOB_ASYNC=False, job menunggu cron."""
+    if not getattr(settings, 'EXPORT_JOB_ASYNC', True):
+        return
+    job_id = job.pk
+    transaction.on_commit(lambda: _get_executor().submit(_run_in_thread, job_id))
+
+
+def _run_in_thread(job_id):
+    try:
+        process_export_job(job_id)
+    finally:
+        # Thread worker memakai koneksi DB sendiri, tutup agar tidak bocor
+        connections.close_all()
+
+
+def _build_request(job):
+    """HttpRequest GET sintetis untuk memanggil view ekspor sebagai user peminta."""
+    request = HttpRequest()
+    request.method = 'GET'
+    request.path = f'/export-jobs/{job.pk}/'
+    request.META['SERVER_NAME'] = 'localhost'
+    request.META['SERVER_PORT'] = '80'
+    query = QueryDict(mutable=True)
+    for key, values in (job.params or {}).items():
+        query.setlist(key, values if isinstance(values, list) else [values])
+    request.GET = query
+    request.user = job.requested_by
+    # View ekspor memakai messages.error() untuk parameter tidak valid
+    request._messages = CookieStorage(request)
+    return request
+
+
+def _filename_from_response(response, default):
+    match = re.search(r'filename="?([^";]+)"?', response.get('Content-Disposition', ''))
+    return match.group(1) if match else default
+
+
+def process_export_job(job_id):
+    """Bangun artefak untuk satu job. Aman dipanggil berulang (klaim atomik)."""
+    claimed = ExportJob.objects.filter(pk=job_id, status='menunggu').update(
+        status='diproses', started_at=timezone.now()
+    )
+    if not claimed:
+        return None
+
+    job = ExportJob.objects.select_related('requested_by').get(pk=job_id)
+    entry = EXPORT_REGISTRY.get(job.export_name)
+    try:
+        if not entry:
+            raise ExportJobError(f"Ekspor '{job.export_name}' tidak dikenal")
+        if job.requested_by is None:
+            raise ExportJobError("User peminta sudah tidak ada")
+
+        view = import_string(entry['view'])
+        request = _build_request(job)
+        response = view(request)
+
+        if response.status_code != 200 or not response.get('Content-Disposition'):
+            pesan = '; '.join(str(m) for m in request._messages)
+            raise ExportJobError(pesan or f"View ekspor mengembalikan status {response.status_code}")
+
+        with tempfile.TemporaryFile() as tmp:
+            chunks = response.streaming_content if response.streaming else [response.content]
+            for chunk in chunks:
+                tmp.write(chunk)
+            response.close()
+            tmp.seek(0)
+            job.filename = _filename_from_response(response, f'{job.export_name}.xlsx')
+            job.file.save(f'{job.export_name}/{job.key}.xlsx', File(tmp), save=False)
+
+        job.status = 'selesai'
+        job.finished_at = timezone.now()
+        job.save(update_fields=['status', 'file', 'filename', 'finished_at'])
+        logger.info(f"Export job {job.pk} ({job.export_name}) selesai: {job.file.name}")
+    except Exception as e:
+        if isinstance(e, ExportJobError):
+            logger.warning(f"Export job {job.pk} ({job.export_name}) gagal: {e}")
+        else:
+            logger.exception(f"Export job {job.pk} ({job.export_name}) gagal")
+        job.status = 'gagal'
+        job.error = str(e) or e.__class__.__name__
+        job.finished_at = timezone.now()
+        job.save(update_fields=['status', 'error', 'finished_at'])
+    return job
+
+
+def process_pending_export_jobs(limit=20):
+    """Dipanggil cron: proses job yang masih menunggu dan ulang job yang macet."""
+    stale_before = timezone.now() - EXPORT_JOB_STALE_AFTER
+    ExportJob.objects.filter(status='diproses', started_at__lt=stale_before).update(status='menunggu')
+
+    processed = 0
+    for job_id in ExportJob.objects.filter(status='menunggu').order_by('created_at').values_list('pk', flat=True)[:limit]:
+        if process_export_job(job_id):
+            processed += 1
+    return processed
+
+
+def export_job_url(job):
+    """Presigned URL artefak (S3) dengan nama file unduhan yang rapi."""
+    if job.status != 'selesai' or not job.file:
+        return None
+    storage = job.file.storage
+    try:
+        from storages.backends.s3boto3 import S3Boto3Storage
+    except ImportError:
+        S3Boto3Storage = None
+    if S3Boto3Storage and isinstance(storage, S3Boto3Storage):
+        return storage.url(
+            job.file.name,
+            parameters={'ResponseContentDisposition': f'attachment; filename="{job.filename}"'},
+            expire=EXPORT_URL_EXPIRE,
+        )
+    return job.file.url
+
+
+def serialize_export_job(job):
+    return {
+        'job_id': job.pk,
+        'export': job.export_name,
+        'status': job.status,
+        'filename': job.filename,
+        'url': export_job_url(job),
+        'error': job.error or None,
+        'created_at': job.created_at.isoformat() if job.created_at else None,
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+    }
@@ -0,0 +1,164 @@
+"""
+Instrumentasi request: jumlah query, query duplikat, waktu DB, waktu total dan
+ukuran response per nama URL.
+
+- QueryCollector dipasang lewat connection.execute_wrapper() oleh
+  RequestMetricsMiddleware (apps.hrd.middleware) untuk setiap request.
+- Agregat disimpan di memori proses (per worker) dan bisa dibaca lewat
+  endpoint JSON khusus staff (apps.hrd.views.instrumentation).
+- @query_budget(...) menetapkan batas query per view. Pelanggaran dicatat
+  sebagai warning; bila QUERY_BUDGET_STRICT=True (mis. saat test) middleware
+  melempar QueryBudgetExceeded sehingga test gagal.
+"""
+import threading
+import time
+from collections import Counter
+from functools import wraps
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+# ============================================
+# PENGUMPUL QUERY
+# ============================================
+
+class QueryCollector:
+    """Callable untuk connection.execute_wrapper(): hitung query dan waktunya."""
+
+    def __init__(self):
+        self.count = 0
+        self.db_time = 0.0
+        self._seen = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.count += 1
+            try:
+                self._seen[(sql, repr(params))] += 1
+            except Exception:
+                self._seen[(sql, None)] += 1
+
+    @property
+    def duplicates(self):
+        """Jumlah eksekusi ulang query yang sama persis (SQL + parameter)."""
+        return sum(n - 1 for n in self._seen.values() if n > 1)
+
+    def top_duplicates(self, limit=3):
+        return [
+            {'sql': sql[:200], 'count': n}
+            for (sql, _params), n in self._seen.most_common(limit)
+            if n > 1
+        ]
+
+
+# ============================================
+# BUDGET PER VIEW
+# ============================================
+
+def query_budget(max_queries, max_duplicates=None):
+    """
+    Tetapkan batas jumlah query (dan query duplikat) untuk satu view.
+
+    Pasang sebagai decorator paling luar:
+
+        @query_budget(20, max_duplicates=0)
+        @login_required
+        @role_required(['HRD'])
+        def export_absensi_excel(request): ...
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def _wrapped_view(request, *args, **kwargs):
+            return view_func(request, *args, **kwargs)
+        _wrapped_view.query_budget = {'max_queries': max_queries, 'max_duplicates': max_duplicates}
+        return _wrapped_view
+    return decorator
+
+
+def get_query_budget(view_func):
+    return getattr(view_func, 'query_budget', None)
+
+
+def check_query_budget(budget, queries, duplicates):
+    """Daftar pelanggaran budget (kosong bila aman)."""
+    if not budget:
+        return []
+    pelanggaran = []
+    if budget['max_queries'] is not None and queries > budget['max_queries']:
+        pelanggaran.append(f"{queries} query > budget {budget['max_queries']}")
+    if budget['max_duplicates'] is not None and duplicates > budget['max_duplicates']:
+        pelanggaran.append(f"{duplicates} query duplikat > budget {budget['max_duplicates']}")
+    return pelanggaran
+
+
+# ============================================
+# AGREGAT PER NAMA URL (per proses)
+# ============================================
+
+_lock = threading.Lock()
+_stats = {}
+
+
+def record_request(url_name, queries, duplicates, db_ms, total_ms, response_bytes, budget=None, over_budget=False):
+    with _lock:
+        s = _stats.get(url_name)
+        if s is None:
+            s = _stats[url_name] = {
+                'requests': 0,
+                'queries_total': 0,
+                'queries_max': 0,
+                'duplicates_total': 0,
+                'db_ms_total': 0.0,
+                'total_ms_total': 0.0,
+                'total_ms_max': 0.0,
+                'bytes_total': 0,
+                'over_budget': 0,
+                'budget': None,
+            }
+        s['requests'] += 1
+        s['queries_total'] += queries
+        s['queries_max'] = max(s['queries_max'], queries)
+        s['duplicates_total'] += duplicates
+        s['db_ms_total'] += db_ms
+        s['total_ms_total'] += total_ms
+        s['total_ms_max'] = max(s['total_ms_max'], total_ms)
+        s['bytes_total'] += response_bytes or 0
+        s['over_budget'] += int(over_budget)
+        s['budget'] = budget
+
+
+def get_request_stats():
+    """Ringkasan per nama URL, diurutkan dari total waktu DB terbesar."""
+    with _lock:
+        snapshot = {name: dict(s) for name, s in _stats.items()}
+
+    rows = []
+    for name, s in snapshot.items():
+        n = s['requests'] or 1
+        rows.append({
+            'url_name': name,
+            'requests': s['requests'],
+            'queries_avg': round(s['queries_total'] / n, 1),
+            'queries_max': s['queries_max'],
+            'duplicates_avg': round(s['duplicates_total'] / n, 1),
+            'db_ms_avg': round(s['db_ms_total'] / n, 1),
+            'db_ms_total': round(s['db_ms_total'], 1),
+            'total_ms_avg': round(s['total_ms_total'] / n, 1),
+            'total_ms_max': round(s['total_ms_max'], 1),
+            'bytes_avg': int(s['bytes_total'] / n),
+            'budget': s['budget'],
+            'over_budget': s['over_budget'],
+        })
+    rows.sort(key=lambda r: r['db_ms_total'], reverse=True)
+    return rows
+
+
+def reset_request_stats():
+    with _lock:
+        _stats.clear()
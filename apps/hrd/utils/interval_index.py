@@ -0,0 +1,217 @@
+"""
+Indeks interval Cuti/Izin yang disetujui untuk satu periode.
+
+Klasifikasi kehadiran (rekap hari kerja, proses absensi mesin, kalender)
+perlu menjawab "apakah karyawan X sedang cuti/izin pada tanggal D" berkali-kali.
+Daripada query per tanggal atau memekarkan rentang cuti hari per hari, indeks
+ini memuat Cuti dan Izin sekali (2 query) lalu menyimpan per karyawan:
+
+- Cuti sebagai segmen tanggal yang tidak saling tumpang tindih, terurut
+  berdasarkan tanggal awal. Bila dua cuti bertumpuk, cuti yang mulai lebih dulu
+  (lalu id terkecil) yang menempati hari tersebut.
+- Izin sebagai array tanggal terurut (satu entri per izin, urut id).
+
+Query titik dan rentang memakai bisect sehingga O(log n) per karyawan:
+
+    indeks = LeaveIntervalIndex.load(awal, akhir, karyawan_ids=[...])
+    indeks.cuti_pada(karyawan_id, tanggal)       # Cuti atau None
+    indeks.izin_pada(karyawan_id, tanggal)       # list Izin (urut id)
+    indeks.leave_matrix(karyawan_ids, tanggal_list)  # numpy bool [karyawan x tanggal]
+
+Periode memakai rentang setengah terbuka [awal, akhir) seperti apps.utils.periode.
+"""
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from datetime import timedelta
+
+import numpy as np
+
+from apps.hrd.models import Cuti, Izin
+
+
+class LeaveIntervalIndex:
+    def __init__(self, cuti_list=(), izin_list=(), awal=None, akhir=None):
+        self.awal = awal
+        self.akhir = akhir
+        # karyawan_id -> (starts, ends, cuti) ; segmen tidak tumpang tindih
+        self._cuti = {}
+        # karyawan_id -> (tanggal, izin) ; terurut per tanggal lalu id
+        self._izin = {}
+
+        batas_akhir = akhir - timedelta(days=1) if akhir is not None else None
+
+        per_karyawan = defaultdict(list)
+        for c in cuti_list:
+            mulai = max(c.tanggal_mulai, awal) if awal is not None else c.tanggal_mulai
+            selesai = min(c.tanggal_selesai, batas_akhir) if batas_akhir is not None else c.tanggal_selesai
+            if mulai <= selesai:
+                per_karyawan[c.id_karyawan_id].append((mulai, c.pk, selesai, c))
+
+        for karyawan_id, intervals in per_karyawan.items():
+            intervals.sort(key=lambda x: (x[0], x[1]))
+            starts, ends, items = [], [], []
+            for mulai, _pk, selesai, c in intervals:
+                # Diurutkan per tanggal mulai: bagian yang sudah tertutup segmen
+                # sebelumnya selalu berupa prefiks [mulai, ends[-1]]
+                if ends and mulai <= ends[-1]:
+                    mulai = ends[-1] + timedelta(days=1)
+                if mulai > selesai:
+                    continue
+                starts.append(mulai)
+                ends.append(selesai)
+                items.append(c)
+            self._cuti[karyawan_id] = (starts, ends, items)
+
+        izin_per_karyawan = defaultdict(list)
+        for i in izin_list:
+            izin_per_karyawan[i.id_karyawan_id].append(i)
+        for karyawan_id, items in izin_per_karyawan.items():
+            items.sort(key=lambda i: (i.tanggal_izin, i.pk))
+            self._izin[karyawan_id] = ([i.tanggal_izin for i in items], items)
+
+    @classmethod
+    def load(cls, awal=None, akhir=None, karyawan_ids=None, izin_jenis=None, with_nama=False, muat_cuti=True,
+             ringkas=False):
+        """
+        Muat Cuti dan Izin berstatus disetujui yang beririsan dengan [awal, akhir).
+
+        Args:
+            awal, akhir: Batas periode setengah terbuka; None berarti tanpa batas
+            karyawan_ids: Batasi ke karyawan tertentu (None = semua)
+            izin_jenis: Batasi jenis izin yang dimuat (None = semua)
+            with_nama: Ikut muat nama karyawan (untuk label kalender)
+            muat_cuti: False bila pemanggil hanya butuh Izin (hemat satu query)
+            ringkas: Izin hanya dimuat dengan tanggal dan jenis (cukup untuk kalender),
+                sehingga kedua query tercakup index covering *_disetujui_* di PostgreSQL
+        """
+        cuti_qs = Cuti.objects.filter(status='disetujui')
+        izin_qs = Izin.objects.filter(status='disetujui')
+        if awal is not None:
+            cuti_qs = cuti_qs.filter(tanggal_selesai__gte=awal)
+        if akhir is not None:
+            cuti_qs = cuti_qs.filter(tanggal_mulai__lt=akhir)
+        izin_qs = izin_qs.for_period(awal, akhir)
+        if karyawan_ids is not None:
+            karyawan_ids = list(karyawan_ids)
+            cuti_qs = cuti_qs.filter(id_karyawan_id__in=karyawan_ids)
+            izin_qs = izin_qs.filter(id_karyawan_id__in=karyawan_ids)
+        if izin_jenis is not None:
+            izin_qs = izin_qs.filter(jenis_izin__in=list(izin_jenis))
+
+        cuti_fields = ['id', 'id_karyawan_id', 'tanggal_mulai', 'tanggal_selesai', 'jenis_cuti']
+        izin_fields = ['id', 'id_karyawan_id', 'tanggal_izin', 'jenis_izin']
+        if not ringkas:
+            izin_fields += ['kompensasi_lembur', 'alasan', 'created_at']
+        if with_nama:
+            cuti_qs = cuti_qs.select_related('id_karyawan')
+            izin_qs = izin_qs.select_related('id_karyawan')
+            cuti_fields.append('id_karyawan__nama')
+            izin_fields.append('id_karyawan__nama')
+
+        cuti_list = cuti_qs.only(*cuti_fields) if muat_cuti else ()
+        return cls(cuti_list, izin_qs.only(*izin_fields), awal=awal, akhir=akhir)
+
+    # ============================================
+    # QUERY CUTI
+    # ============================================
+
+    def cuti_pada(self, karyawan_id, tanggal):
+        """Cuti yang menempati tanggal tersebut, atau None."""
+        data = self._cuti.get(karyawan_id)
+        if not data:
+            return None
+        starts, ends, items = data
+        idx = bisect_right(starts, tanggal) - 1
+        if idx >= 0 and tanggal <= ends[idx]:
+            return items[idx]
+        return None
+
+    def ada_cuti(self, karyawan_id, tanggal):
+        return self.cuti_pada(karyawan_id, tanggal) is not None
+
+    def cuti_dalam_rentang(self, karyawan_id, awal, akhir):
+        """
+        Segmen cuti yang beririsan dengan [awal, akhir), dipotong ke rentang.
+
+        Returns:
+            list of (mulai, selesai, cuti) dengan selesai inklusif
+        """
+        data = self._cuti.get(karyawan_id)
+        if not data:
+            return []
+        starts, ends, items = data
+        batas_akhir = akhir - timedelta(days=1)
+        hasil = []
+        # Segmen sebelum idx berakhir sebelum segmen berikutnya mulai, jadi cukup
+        # mundur satu segmen dari posisi awal
+        idx = max(bisect_right(starts, awal) - 1, 0)
+        while idx < len(starts) and starts[idx] <= batas_akhir:
+            if ends[idx] >= awal:
+                hasil.append((max(starts[idx], awal), min(ends[idx], batas_akhir), items[idx]))
+            idx += 1
+        return hasil
+
+    def hari_cuti_per_tanggal(self):
+        """
+        tanggal -> list Cuti (satu per karyawan) untuk seluruh periode terindeks.
+        Dipakai kalender yang memang menampilkan event per hari.
+        """
+        hasil = defaultdict(list)
+        for starts, ends, items in self._cuti.values():
+            for mulai, selesai, c in zip(starts, ends, items):
+                for n in range((selesai - mulai).days + 1):
+                    hasil[mulai + timedelta(days=n)].append(c)
+        return hasil
+
+    # ============================================
+    # QUERY IZIN
+    # ============================================
+
+    def izin_pada(self, karyawan_id, tanggal, jenis=None):
+        """Daftar Izin karyawan pada tanggal tersebut (urut id), opsional per jenis."""
+        data = self._izin.get(karyawan_id)
+        if not data:
+            return []
+        dates, items = data
+        lo = bisect_left(dates, tanggal)
+        hi = bisect_right(dates, tanggal, lo)
+        if jenis is None:
+            return items[lo:hi]
+        if isinstance(jenis, str):
+            jenis = (jenis,)
+        return [i for i in items[lo:hi] if i.jenis_izin in jenis]
+
+    def izin_dalam_rentang(self, karyawan_id, awal, akhir):
+        """Daftar Izin karyawan dengan awal <= tanggal_izin < akhir."""
+        data = self._izin.get(karyawan_id)
+        if not data:
+            return []
+        dates, items = data
+        return items[bisect_left(dates, awal):bisect_left(dates, akhir)]
+
+    def semua_izin(self):
+        for _dates, items in self._izin.values():
+            yield from items
+
+    # ============================================
+    # MATRIKS
+    # ============================================
+
+    def leave_matrix(self, karyawan_ids, tanggal_list):
+        """
+        Matriks boolean [len(karyawan_ids) x len(tanggal_list)]: True bila karyawan
+        sedang cuti pada tanggal tersebut. tanggal_list harus terurut naik tetapi
+        boleh berlubang (mis. hanya hari kerja).
+        """
+        ordinals = np.fromiter((t.toordinal() for t in tanggal_list), dtype=np.int64, count=len(tanggal_list))
+        matrix = np.zeros((len(karyawan_ids), len(ordinals)), dtype=bool)
+        for row, karyawan_id in enumerate(karyawan_ids):
+            data = self._cuti.get(karyawan_id)
+            if not data:
+                continue
+            starts, ends, _items = data
+            lo = np.searchsorted(ordinals, [s.toordinal() for s in starts], side='left')
+            hi = np.searchsorted(ordinals, [e.toordinal() for e in ends], side='right')
+            for a, b in zip(lo, hi):
+                matrix[row, a:b] = True
+        return matrix
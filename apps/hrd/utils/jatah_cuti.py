@@ -4,7 +4,8 @@ from apps.hrd.models import JatahCuti, DetailJatahCuti, CutiBersama, Karyawan
 import logging
 from django.contrib.auth.models import User
 from ..models import Cuti
-from pytanggalmerah import TanggalMerah
+from apps.hrd.utils.saldo_cuti import hitung_ulang_sisa_cuti, terapkan_delta_sisa_cuti, ubah_status_slot
+from apps.hrd.utils.tanggal_merah import get_tanggal_merah
 
 def is_holiday_or_weekend(check_date):
     # Pengecualian khusus untuk 26 Desember 2025 (WFA)
@@ -24,10 +25,9 @@ def is_holiday_or_weekend(check_date):
 
     # Cek apakah tanggal merah nasional menggunakan pytanggalmerah
     try:
-        t = TanggalMerah()
-        t.set_date(str(check_date.year), f"{check_date.month:02d}", f"{check_date.day:02d}")
+        libur = get_tanggal_merah(check_date)
         # Filter keluar hari Minggu karena sudah ditangani di atas
-        if t.check() and "Minggu" not in t.get_event():
+        if libur and "Minggu" not in libur:
             return True
     except Exception:
         # Abaikan error jika pytanggalmerah gagal (misal tahun terlalu jauh)
@@ -165,7 +165,7 @@ def hitung_jatah_cuti(karyawan, tahun, isi_detail_cuti_bersama=True):
     cuti_bersama_yang_perlu_diisi = []
     if isi_detail_cuti_bersama:
         # Hanya cuti bersama yang bertipe 'Cuti Bersama' yang memotong jatah cuti
-        cuti_bersama_tahun_ini = CutiBersama.objects.filter(tanggal__year=tahun, jenis='Cuti Bersama')
+        cuti_bersama_tahun_ini = CutiBersama.objects.for_year(tahun).filter(jenis='Cuti Bersama')
         for cb in cuti_bersama_tahun_ini:
             # Cek apakah cuti bersama ini sudah diisi dalam detail
             detail_cb = DetailJatahCuti.objects.filter(
@@ -269,6 +269,73 @@ def hitung_jatah_cuti(karyawan, tahun, isi_detail_cuti_bersama=True):
     
     return jatah_cuti
 
+def provisi_jatah_cuti_massal(karyawan_list, tahun, batch_size=1000):
+    """
+    Versi massal dari hitung_jatah_cuti(..., isi_detail_cuti_bersama=False) untuk
+    karyawan yang baru dibuat lewat bulk_create (signal post_save tidak terpicu).
+
+    Hasil akhirnya sama dengan jalur signal: satu JatahCuti per karyawan dengan
+    total/sisa = jumlah bulan tersedia menurut kontrak, dan DetailJatahCuti kosong
+    hanya untuk bulan yang tersedia. Karyawan yang sudah punya JatahCuti untuk
+    tahun tersebut dilewati.
+
+    Args:
+        karyawan_list: Iterable objek Karyawan (dengan user ter-load)
+        tahun: Tahun jatah cuti
+
+    Returns:
+        int: Jumlah JatahCuti yang dibuat
+    """
+    kandidat = [k for k in karyawan_list if k.pk and k.user.role in ['Karyawan Tetap', 'HRD']]
+    if not kandidat:
+        return 0
+
+    sudah_ada = set(
+        JatahCuti.objects.filter(tahun=tahun, karyawan_id__in=[k.pk for k in kandidat])
+        .values_list('karyawan_id', flat=True)
+    )
+
+    bulan_per_karyawan = {}
+    for karyawan in kandidat:
+        if karyawan.pk in sudah_ada:
+            continue
+        bulan_tersedia = [b for b, tersedia in tentukan_bulan_tersedia_berdasarkan_kontrak(karyawan, tahun).items() if tersedia]
+        if bulan_tersedia:
+            bulan_per_karyawan[karyawan.pk] = bulan_tersedia
+
+    if not bulan_per_karyawan:
+        return 0
+
+    JatahCuti.objects.bulk_create(
+        [
+            JatahCuti(karyawan_id=karyawan_id, tahun=tahun, total_cuti=len(bulan), sisa_cuti=len(bulan))
+            for karyawan_id, bulan in bulan_per_karyawan.items()
+        ],
+        batch_size=batch_size,
+    )
+    # bulk_create tidak selalu mengembalikan PK (mis. SQLite), ambil ulang id-nya
+    jatah_ids = dict(
+        JatahCuti.objects.filter(tahun=tahun, karyawan_id__in=list(bulan_per_karyawan))
+        .values_list('karyawan_id', 'id')
+    )
+    DetailJatahCuti.objects.bulk_create(
+        [
+            DetailJatahCuti(
+                jatah_cuti_id=jatah_ids[karyawan_id],
+                tahun=tahun,
+                bulan=bulan,
+                dipakai=False,
+                jumlah_hari=0,
+                keterangan='',
+                tersedia=True,
+            )
+            for karyawan_id, daftar_bulan in bulan_per_karyawan.items()
+            for bulan in daftar_bulan
+        ],
+        batch_size=batch_size,
+    )
+    return len(bulan_per_karyawan)
+
 def get_kosong_slot_tahun_sama(karyawan, jumlah_hari, tahun):
     """Mencari slot kosong DetailJatahCuti untuk karyawan hanya di tahun yang sama.
     
@@ -420,9 +487,6 @@ def isi_slot_dan_update_sisa_cuti(karyawan, bulan_kosong, keterangan_list, tahun
     logger.info(f"===== MULAI PENGISIAN SLOT CUTI =====")
     logger.info(f"Karyawan: {karyawan.nama}, Jumlah slot yang akan diisi: {len(bulan_kosong)}, Tahun referensi: {tahun}")
     
-    # Kelompokkan slot kosong berdasarkan tahun untuk memperbarui sisa_cuti per tahun
-    slot_per_tahun = {}
-    
     # Buat daftar tanggal cuti jika ini adalah cuti tahunan (bukan cuti bersama)
     tanggal_cuti = []
     if not is_cuti_bersama and tanggal_mulai and tanggal_selesai:
@@ -435,60 +499,25 @@ def isi_slot_dan_update_sisa_cuti(karyawan, bulan_kosong, keterangan_list, tahun
             else:
                 keterangan = keterangan_list[i]
     
-    # Isi slot kosong
+    # Isi slot kosong; selisih saldo diterapkan per slot dengan F()
     for i, detail in enumerate(bulan_kosong):
         if i < len(keterangan_list):
-            # Log status slot sebelum diubah
-            
-            detail.dipakai = True
-            detail.jumlah_hari = 1
+            fields = {'jumlah_hari': 1}
             
             # Set tanggal_terpakai jika ini adalah cuti tahunan dan ada daftar tanggal
             if not is_cuti_bersama and i < len(tanggal_cuti):
-                detail.tanggal_terpakai = tanggal_cuti[i]
+                fields['tanggal_terpakai'] = tanggal_cuti[i]
             # Set tanggal_terpakai untuk cuti bersama (dari objek CutiBersama)
             elif is_cuti_bersama and hasattr(keterangan_list[i], 'tanggal'):
-                detail.tanggal_terpakai = keterangan_list[i].tanggal
+                fields['tanggal_terpakai'] = keterangan_list[i].tanggal
             
             # Set keterangan berdasarkan jenis item
             if is_cuti_bersama:
-                detail.keterangan = f'Cuti Bersama: {keterangan_list[i].keterangan or keterangan_list[i].tanggal}'
+                fields['keterangan'] = f'Cuti Bersama: {keterangan_list[i].keterangan or keterangan_list[i].tanggal}'
             else:
-                detail.keterangan = keterangan_list[i]
+                fields['keterangan'] = keterangan_list[i]
                 
-            detail.save()
-            
-            # Kelompokkan berdasarkan tahun untuk memperbarui sisa_cuti
-            tahun_slot = detail.jatah_cuti.tahun
-            if tahun_slot not in slot_per_tahun:
-                slot_per_tahun[tahun_slot] = 0
-            slot_per_tahun[tahun_slot] += 1
-            
-    
-    # Hitung ulang sisa cuti untuk setiap tahun yang terdampak
-    tahun_terdampak = set(slot_per_tahun.keys())
-    tahun_terdampak.add(tahun)  # Pastikan tahun referensi juga dihitung ulang
-    
-    
-    for tahun_slot in tahun_terdampak:
-        jatah_cuti_tahun = JatahCuti.objects.filter(karyawan=karyawan, tahun=tahun_slot).first()
-        if jatah_cuti_tahun:
-            # Simpan nilai sisa cuti sebelumnya untuk log
-            sisa_cuti_sebelumnya = jatah_cuti_tahun.sisa_cuti
-            
-            # Hitung total detail yang dipakai untuk tahun ini
-            total_dipakai = DetailJatahCuti.objects.filter(
-                jatah_cuti=jatah_cuti_tahun,
-                dipakai=True
-            ).count()
-            
-            # Perbarui sisa cuti, pastikan tidak menjadi negatif jika tidak allow_minus
-            if not allow_minus:
-                jatah_cuti_tahun.sisa_cuti = max(0, jatah_cuti_tahun.total_cuti - total_dipakai)
-            else:
-                jatah_cuti_tahun.sisa_cuti = jatah_cuti_tahun.total_cuti - total_dipakai
-            
-            jatah_cuti_tahun.save()
+            ubah_status_slot(detail, True, allow_minus=allow_minus, **fields)
             
     return True
 
@@ -498,22 +527,10 @@ def _label_cuti_tahunan(tanggal_mulai, tanggal_selesai):
 
 
 def _recompute_sisa_cuti_for_years(karyawan, tahun_list, *, allow_minus=True):
-    for th in tahun_list:
-        jatah_cuti_tahun = JatahCuti.objects.filter(karyawan=karyawan, tahun=th).first()
-        if not jatah_cuti_tahun:
-            continue
-
-        total_dipakai = DetailJatahCuti.objects.filter(
-            jatah_cuti=jatah_cuti_tahun,
-            dipakai=True,
-        ).count()
-
-        if allow_minus:
-            jatah_cuti_tahun.sisa_cuti = jatah_cuti_tahun.total_cuti - total_dipakai
-        else:
-            jatah_cuti_tahun.sisa_cuti = max(0, jatah_cuti_tahun.total_cuti - total_dipakai)
-
-        jatah_cuti_tahun.save()
+    hitung_ulang_sisa_cuti(
+        JatahCuti.objects.filter(karyawan=karyawan, tahun__in=list(tahun_list)),
+        allow_minus=allow_minus,
+    )
 
 
 def reconcile_cuti_tahunan_for_dates(
@@ -902,10 +919,7 @@ def proses_cuti_hangus(karyawan, tahun_sekarang):
     
     # Tandai sebagai hangus dan hitung jumlah yang hangus per tahun
     for detail in detail_expired:
-        detail.dipakai = True
-        detail.jumlah_hari = 1
-        detail.keterangan = 'Hangus (Expired)'
-        detail.save()
+        ubah_status_slot(detail, True, allow_minus=False, jumlah_hari=1, keterangan='Hangus (Expired)')
         
         # Log detail cuti hangus
         print(f"Cuti hangus: Karyawan {karyawan.nama}, Tahun {detail.tahun}, Bulan {detail.bulan}")
@@ -918,10 +932,7 @@ def proses_cuti_hangus(karyawan, tahun_sekarang):
         hangus_per_tahun[tahun] += 1
     
     for detail in detail_expired_bulan:
-        detail.dipakai = True
-        detail.jumlah_hari = 1
-        detail.keterangan = 'Hangus (Expired)'
-        detail.save()
+        ubah_status_slot(detail, True, allow_minus=False, jumlah_hari=1, keterangan='Hangus (Expired)')
         
         # Log detail cuti hangus
         print(f"Cuti hangus (bulan): Karyawan {karyawan.nama}, Tahun {detail.tahun}, Bulan {detail.bulan}")
@@ -933,20 +944,13 @@ def proses_cuti_hangus(karyawan, tahun_sekarang):
             hangus_per_tahun[tahun] = 0
         hangus_per_tahun[tahun] += 1
     
-    # Perbarui saldo cuti untuk setiap tahun yang memiliki cuti hangus
+    # Sisa cuti sudah dipotong per slot oleh ubah_status_slot
     for tahun, jumlah_hangus in hangus_per_tahun.items():
         jatah_cuti = JatahCuti.objects.filter(karyawan=karyawan, tahun=tahun).first()
         if jatah_cuti:
-            # Simpan nilai sisa cuti sebelumnya untuk log
-            sisa_cuti_sebelumnya = jatah_cuti.sisa_cuti
-            
-            # Kurangi sisa cuti dengan jumlah yang hangus
-            jatah_cuti.sisa_cuti = max(0, jatah_cuti.sisa_cuti - jumlah_hangus)
-            jatah_cuti.save()
-            
             # Log perubahan sisa cuti
-            print(f"Pembaruan jatah cuti hangus: Karyawan {karyawan.nama}, Tahun {tahun}, Jumlah hangus: {jumlah_hangus}, Sisa cuti sebelumnya: {sisa_cuti_sebelumnya}, Sisa cuti sekarang: {jatah_cuti.sisa_cuti}")
-            logger.info(f"Pembaruan jatah cuti hangus: Karyawan {karyawan.nama}, Tahun {tahun}, Jumlah hangus: {jumlah_hangus}, Sisa cuti sebelumnya: {sisa_cuti_sebelumnya}, Sisa cuti sekarang: {jatah_cuti.sisa_cuti}")
+            print(f"Pembaruan jatah cuti hangus: Karyawan {karyawan.nama}, Tahun {tahun}, Jumlah hangus: {jumlah_hangus}, Sisa cuti sekarang: {jatah_cuti.sisa_cuti}")
+            logger.info(f"Pembaruan jatah cuti hangus: Karyawan {karyawan.nama}, Tahun {tahun}, Jumlah hangus: {jumlah_hangus}, Sisa cuti sekarang: {jatah_cuti.sisa_cuti}")
             
             # Panggil fungsi untuk menggeser data cuti ke kiri
             # Ini hanya menggeser data, tidak mengubah sisa_cuti lagi
@@ -1027,22 +1031,13 @@ def kembalikan_jatah_tidak_ambil_cuti(karyawan, cuti_bersama_list):
             if not jatah_cuti:
                 jatah_cuti = detail_cuti_bersama.jatah_cuti
                 
-            # Kosongkan kembali slot bulan terakhir yang terisi
-            detail_cuti_bersama.dipakai = False
-            detail_cuti_bersama.jumlah_hari = 0
-            detail_cuti_bersama.keterangan = ''
-            detail_cuti_bersama.save()
-            
-            # Tambah sisa cuti
+            # Kosongkan kembali slot bulan terakhir yang terisi (sisa cuti +1)
+            ubah_status_slot(detail_cuti_bersama, False, jumlah_hari=0, keterangan='')
             jatah_cuti = detail_cuti_bersama.jatah_cuti
-            jatah_cuti.sisa_cuti += 1
-            jatah_cuti.save()
     
     # Jika ada detail yang diubah, panggil fungsi untuk menggeser data ke kiri
     if tahun and jatah_cuti:
         geser_data_cuti_ke_kiri(jatah_cuti, tahun)
-        
-        # Hitung ulang sisa cuti untuk memastikan saldo cuti diperbarui dengan benar
         rapikan_cuti_tahunan(karyawan, tahun)
 
 def geser_data_cuti_ke_kiri(jatah_cuti, tahun):
@@ -1153,33 +1148,27 @@ def geser_data_cuti_ke_kiri(jatah_cuti, tahun):
                 src.save()
 
 def rapikan_cuti_tahunan(karyawan, tahun):
-    """Merapikan data cuti tahunan setelah pengembalian jatah cuti."""
+    """
+    Merapikan data cuti tahunan setelah pengembalian jatah cuti.
+
+    Sisa cuti tidak dihitung ulang di sini: setiap perubahan slot sudah
+    menerapkan selisihnya (lihat apps.hrd.utils.saldo_cuti) dan penggeseran
+    tidak mengubah jumlah slot terpakai.
+    """
     # Pastikan ada jatah cuti untuk tahun ini
     jatah_cuti = JatahCuti.objects.filter(karyawan=karyawan, tahun=tahun).first()
     
     if not jatah_cuti:
         return
     
-    # Ambil semua detail jatah cuti untuk tahun ini
-    detail_jatah_cuti = DetailJatahCuti.objects.filter(
-        jatah_cuti=jatah_cuti,
-        tahun=tahun
-    ).order_by('bulan')
-    
-    # Hitung ulang sisa cuti berdasarkan detail yang dipakai
-    total_dipakai = detail_jatah_cuti.filter(dipakai=True).count()
-    jatah_cuti.sisa_cuti = jatah_cuti.total_cuti - total_dipakai
-    jatah_cuti.save()
-    
     # Geser data cuti ke kiri
     geser_data_cuti_ke_kiri(jatah_cuti, tahun)
 
 
 def recompute_jatah_sisa_dari_detail(jatah_cuti):
-    """Hitung ulang sisa_cuti dari jumlah DetailJatahCuti dipakai=True."""
-    total_dipakai = DetailJatahCuti.objects.filter(jatah_cuti=jatah_cuti, dipakai=True).count()
-    jatah_cuti.sisa_cuti = jatah_cuti.total_cuti - total_dipakai
-    jatah_cuti.save()
+    """Hitung ulang sisa_cuti dari jumlah DetailJatahCuti dipakai=True (satu UPDATE)."""
+    hitung_ulang_sisa_cuti(JatahCuti.objects.filter(pk=jatah_cuti.pk))
+    jatah_cuti.refresh_from_db(fields=['sisa_cuti'])
 
 
 def _eligible_target_slot_qs(base_qs, tahun_field="tahun", bulan_field="bulan"):
@@ -1252,20 +1241,13 @@ def pindahkan_cuti_tahunan_ke_tahun_sebelumnya(karyawan, tahun_lalu, tahun_ini):
             }
         )
 
-        kosong.dipakai = True
-        kosong.jumlah_hari = src.jumlah_hari
-        kosong.keterangan = src.keterangan
-        kosong.tanggal_terpakai = src.tanggal_terpakai
-        kosong.save()
-
-        src.dipakai = False
-        src.jumlah_hari = 0
-        src.keterangan = ""
-        src.tanggal_terpakai = None
-        src.save()
+        # Slot pindah jatah: tahun lalu -1, tahun ini +1
+        ubah_status_slot(
+            kosong, True,
+            jumlah_hari=src.jumlah_hari, keterangan=src.keterangan, tanggal_terpakai=src.tanggal_terpakai,
+        )
+        ubah_status_slot(src, False, jumlah_hari=0, keterangan="", tanggal_terpakai=None)
 
-    recompute_jatah_sisa_dari_detail(jc_lalu)
-    recompute_jatah_sisa_dari_detail(jc_ini)
     return moves_log
 
 
@@ -1584,28 +1566,19 @@ def update_manual_jatah_cuti(karyawan_id, tahun, bulan, dipakai, keterangan='',
                         related_cuti.delete()
                         logger.info(f"Deleted related Cuti: {related_cuti.id}")
             
-            # Update detail
-            detail.dipakai = dipakai
-            detail.jumlah_hari = 1 if dipakai else 0
-            detail.keterangan = keterangan if dipakai else ''
-            detail.tanggal_terpakai = tanggal_obj if dipakai and tanggal else None
-            detail.save()
-            
-            # Update sisa cuti berdasarkan perubahan
-            if old_dipakai != dipakai:
-                if dipakai and not old_dipakai:
-                    # Dari kosong ke terpakai: kurangi 1 hari
-                    jatah_cuti.sisa_cuti = max(0, jatah_cuti.sisa_cuti - 1)
-                elif not dipakai and old_dipakai:
-                    # Dari terpakai ke kosong: tambah 1 hari
-                    jatah_cuti.sisa_cuti += 1
-            
-            jatah_cuti.save()
+            # Update detail; sisa cuti berubah hanya bila status dipakai berubah
+            # (kosong -> terpakai: -1, terpakai -> kosong: +1)
+            ubah_status_slot(
+                detail, dipakai, allow_minus=False,
+                jumlah_hari=1 if dipakai else 0,
+                keterangan=keterangan if dipakai else '',
+                tanggal_terpakai=tanggal_obj if dipakai and tanggal else None,
+            )
+            jatah_cuti.refresh_from_db(fields=['sisa_cuti'])
         else:
             # New record: kurangi sisa cuti jika dipakai
             if dipakai:
-                jatah_cuti.sisa_cuti = max(0, jatah_cuti.sisa_cuti - 1)
-                jatah_cuti.save()
+                terapkan_delta_sisa_cuti(jatah_cuti, -1, allow_minus=False)
         
         # Buat entri Cuti jika diperlukan
         if dipakai and tanggal and jenis_cuti and user:
@@ -1942,8 +1915,7 @@ def backfill_potong_cuti_bersama(
 
     # Ambil semua cuti bersama yang sudah terjadi sampai batas tanggal (hanya jenis 'Cuti Bersama')
     cuti_bersama_qs = (
-        CutiBersama.objects.filter(
-            tanggal__year=tahun,
+        CutiBersama.objects.for_year(tahun).filter(
             jenis="Cuti Bersama",
             tanggal__lte=sampai_tanggal,
         )
@@ -2292,7 +2264,7 @@ def isi_cuti_bersama_h_minus_1(tahun):
     logger.info(f"===== MULAI PROSES CUTI BERSAMA H-1 UNTUK TAHUN {tahun} =====")
     
     # Ambil semua cuti bersama untuk tahun ini (hanya jenis 'Cuti Bersama')
-    cuti_bersama = CutiBersama.objects.filter(tanggal__year=tahun, jenis='Cuti Bersama').order_by('tanggal')
+    cuti_bersama = CutiBersama.objects.for_year(tahun).filter(jenis='Cuti Bersama').order_by('tanggal')
     
     if not cuti_bersama.exists():
         logger.info(f"Tidak ada cuti bersama untuk tahun {tahun}")
@@ -2382,20 +2354,17 @@ def isi_dari_bulan_kanan_cuti_bersama(jatah_cuti, cuti_bersama_list, tahun):
     for i, cb in enumerate(cuti_bersama_list):
         if i < detail_kosong.count():
             detail = detail_kosong[i]
-            detail.dipakai = True
-            detail.jumlah_hari = 1
-            detail.keterangan = f"Cuti Bersama: {cb.keterangan or cb.tanggal.strftime('%d %B %Y')}"
-            detail.tanggal_terpakai = cb.tanggal
-            detail.save()
+            ubah_status_slot(
+                detail, True, allow_minus=False,
+                jumlah_hari=1,
+                keterangan=f"Cuti Bersama: {cb.keterangan or cb.tanggal.strftime('%d %B %Y')}",
+                tanggal_terpakai=cb.tanggal,
+            )
             
             logger.info(f"Mengisi slot {detail.tahun}-{detail.bulan:02d} dengan cuti bersama {cb.tanggal}")
     
-    # Update sisa cuti
-    sisa_cuti_baru = max(0, jatah_cuti.sisa_cuti - len(cuti_bersama_list))
-    jatah_cuti.sisa_cuti = sisa_cuti_baru
-    jatah_cuti.save()
-    
-    logger.info(f"Sisa cuti {jatah_cuti.karyawan.nama} diupdate menjadi {sisa_cuti_baru}")
+    jatah_cuti.refresh_from_db(fields=['sisa_cuti'])
+    logger.info(f"Sisa cuti {jatah_cuti.karyawan.nama} diupdate menjadi {jatah_cuti.sisa_cuti}")
     return True
 
 def isi_cuti_tahunan_dari_kiri(karyawan, jumlah_hari, keterangan, tahun, tanggal_mulai=None, tanggal_selesai=None):
@@ -2427,24 +2396,17 @@ def isi_cuti_tahunan_dari_kiri(karyawan, jumlah_hari, keterangan, tahun, tanggal
     for i in range(jumlah_hari):
         if i < len(bulan_kosong):
             detail = bulan_kosong[i]
-            detail.dipakai = True
-            detail.jumlah_hari = 1
-            detail.keterangan = keterangan
+            fields = {'jumlah_hari': 1, 'keterangan': keterangan}
             
             # Set tanggal terpakai jika ada
             if i < len(tanggal_cuti):
-                detail.tanggal_terpakai = tanggal_cuti[i]
+                fields['tanggal_terpakai'] = tanggal_cuti[i]
             
-            detail.save()
+            ubah_status_slot(detail, True, allow_minus=False, **fields)
             logger.info(f"Mengisi slot {detail.tahun}-{detail.bulan:02d} dengan cuti tahunan")
     
-    # Update sisa cuti
     jatah_cuti = JatahCuti.objects.filter(karyawan=karyawan, tahun=tahun).first()
     if jatah_cuti:
-        sisa_cuti_baru = max(0, jatah_cuti.sisa_cuti - jumlah_hari)
-        jatah_cuti.sisa_cuti = sisa_cuti_baru
-        jatah_cuti.save()
-        
-        logger.info(f"Sisa cuti {karyawan.nama} diupdate menjadi {sisa_cuti_baru}")
+        logger.info(f"Sisa cuti {karyawan.nama} diupdate menjadi {jatah_cuti.sisa_cuti}")
     
     return True
\ No newline at end of file
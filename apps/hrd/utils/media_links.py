@@ -0,0 +1,60 @@
+"""
+Link lampiran yang ditandatangani saat diklik, bukan saat halaman dirender.
+
+Halaman daftar memakai {% media_url obj 'nama_field' %} (templatetags/media_links.py)
+yang hanya menghasilkan URL /hrd/media-redirect/<jenis>/<pk>/ tanpa menyentuh
+storage. View media_redirect memeriksa hak akses lalu mengarahkan ke
+presigned URL (di-cache oleh MediaStorage).
+"""
+from django.apps import apps
+from django.urls import reverse
+
+# jenis (segmen URL) -> (model, field file)
+MEDIA_LINKS = {
+    'cuti-pengajuan': ('hrd.Cuti', 'file_pengajuan'),
+    'cuti-formal': ('hrd.Cuti', 'file_dokumen_formal'),
+    'cuti-persetujuan': ('hrd.Cuti', 'file_persetujuan'),
+    'izin-pengajuan': ('hrd.Izin', 'file_pengajuan'),
+    'izin-persetujuan': ('hrd.Izin', 'file_persetujuan'),
+    'tidak-ambil-cuti-pengajuan': ('hrd.TidakAmbilCuti', 'file_pengajuan'),
+    'tidak-ambil-cuti-persetujuan': ('hrd.TidakAmbilCuti', 'file_persetujuan'),
+    'wfa': ('absensi.AbsensiMagang', 'dokumen_persetujuan'),
+    'screenshot-masuk': ('absensi.AbsensiMagang', 'screenshot_masuk'),
+    'screenshot-pulang': ('absensi.AbsensiMagang', 'screenshot_pulang'),
+}
+
+_JENIS_PER_FIELD = {value: jenis for jenis, value in MEDIA_LINKS.items()}
+
+
+def media_redirect_url(obj, field):
+    """
+    URL redirect untuk file di obj.<field>; string kosong bila tidak ada file.
+    Field yang tidak terdaftar memakai .url biasa.
+    """
+    file = getattr(obj, field, None)
+    if not file:
+        return ''
+    jenis = _JENIS_PER_FIELD.get((obj._meta.label, field))
+    if jenis is None:
+        return file.url
+    return reverse('media_redirect', args=[jenis, obj.pk])
+
+
+def get_media_file(jenis, pk, user):
+    """
+    File untuk satu link redirect bila user berhak: HRD untuk semua file,
+    selain itu hanya file milik karyawannya sendiri.
+
+    Returns:
+        FieldFile atau None (jenis tidak dikenal, data tidak ada, tidak berhak, atau file kosong)
+    """
+    if jenis not in MEDIA_LINKS:
+        return None
+    label, field = MEDIA_LINKS[jenis]
+    queryset = apps.get_model(label).objects.only(field)
+    if user.role != 'HRD':
+        queryset = queryset.filter(id_karyawan__user=user)
+    obj = queryset.filter(pk=pk).first()
+    if obj is None:
+        return None
+    return getattr(obj, field) or None
@@ -0,0 +1,306 @@
+"""
+Ringkasan dashboard per karyawan (dashboard karyawan & magang, API data-dashboard).
+
+Sisa cuti, jumlah pengajuan cuti/izin (bulan berjalan, disetujui, menunggu) dan
+statistik absensi dihitung dalam SATU query (subquery skalar per angka pada baris
+Karyawan), ditambah tiga query pendek untuk riwayat cuti, izin dan absensi terbaru.
+
+Hasil di-cache per karyawan di namespace 'reports' dengan token versi per
+karyawan. Token diganti (setelah commit) setiap kali Cuti, Izin, AbsensiMagang,
+JatahCuti atau Karyawan miliknya disimpan/dihapus (lihat connect_ringkasan_signals).
+Jalur update() massal yang melewati signal memanggil invalidate_ringkasan()
+sendiri; operasi yang menyentuh banyak karyawan sekaligus cukup memanggil
+invalidate_semua_ringkasan().
+
+Data yang sama untuk semua karyawan (periode absensi terakhir, libur nasional
+terdekat, ulang tahun hari ini) di-cache terpisah lewat cached_for_period.
+
+Catatan: invalidasi hanya efektif lintas worker bila backend cache dipakai
+bersama (CACHE_BACKEND file/redis, bukan locmem per proses).
+"""
+import calendar
+import hashlib
+import logging
+import uuid
+from datetime import datetime, timedelta
+
+from django.apps import apps
+from django.db import transaction
+from django.db.models import Count, IntegerField, Max, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.db.models.signals import post_delete, post_save
+
+from apps.absensi.models import Absensi, AbsensiMagang
+from apps.hrd.models import Cuti, Izin, JatahCuti, Karyawan
+from apps.hrd.utils.cache import GENERASI_KEY, cached_for_period, get_cache
+from apps.hrd.utils.media_links import media_redirect_url
+from apps.hrd.utils.tanggal_merah import get_tanggal_merah
+
+logger = logging.getLogger(__name__)
+
+RINGKASAN_CACHE_PREFIX = 'karyawan:ringkasan'
+# TTL cadangan; ringkasan juga diganti oleh signal
+RINGKASAN_TTL = 6 * 3600
+JUMLAH_RIWAYAT = 5
+
+# Model yang memengaruhi ringkasan -> field FK ke Karyawan
+_SUMBER = {
+    'hrd.Cuti': 'id_karyawan_id',
+    'hrd.Izin': 'id_karyawan_id',
+    'hrd.JatahCuti': 'karyawan_id',
+    'absensi.AbsensiMagang': 'id_karyawan_id',
+    'hrd.Karyawan': 'pk',
+}
+
+
+# ============================================
+# VERSI & INVALIDASI
+# ============================================
+
+def _versi_key(karyawan_id):
+    return f'{RINGKASAN_CACHE_PREFIX}:versi:{karyawan_id}'
+
+
+def _generasi_key():
+    return f'{RINGKASAN_CACHE_PREFIX}:{GENERASI_KEY}'
+
+
+def invalidate_ringkasan(*karyawan_ids):
+    """
+    Ganti token versi ringkasan karyawan tertentu.
+
+    Token acak (bukan +1) agar dua perubahan bersamaan tidak menulis versi yang
+    sama dan meninggalkan ringkasan lama yang dihitung di antaranya.
+    """
+    ids = {k for k in karyawan_ids if k is not None}
+    if ids:
+        get_cache('reports').set_many({_versi_key(k): uuid.uuid4().hex[:12] for k in ids}, None)
+
+
+def invalidate_semua_ringkasan():
+    """Buang ringkasan semua karyawan (operasi massal, mis. hitung ulang sisa cuti)."""
+    get_cache('reports').set(_generasi_key(), uuid.uuid4().hex[:12], None)
+
+
+def invalidate_ringkasan_on_commit(*karyawan_ids):
+    """Invalidasi setelah transaksi commit, agar ringkasan tidak dihitung ulang dari data lama."""
+    transaction.on_commit(lambda: invalidate_ringkasan(*karyawan_ids))
+
+
+def _make_receiver(field):
+    def receiver(sender, instance, **kwargs):
+        try:
+            invalidate_ringkasan_on_commit(getattr(instance, field))
+        except Exception as e:
+            # Ringkasan basi lebih baik daripada gagal menyimpan data
+            logger.warning(f"Gagal invalidasi ringkasan karyawan: {e}")
+    return receiver
+
+
+_receivers = []
+
+
+def connect_ringkasan_signals():
+    """Sambungkan signal invalidasi untuk semua model sumber (dipanggil sekali saat app ready)."""
+    if _receivers:
+        return
+    for label, field in _SUMBER.items():
+        receiver = _make_receiver(field)
+        # Simpan referensi agar receiver tidak di-garbage-collect (weak reference)
+        _receivers.append(receiver)
+        model = apps.get_model(label)
+        post_save.connect(receiver, sender=model, dispatch_uid=f'ringkasan_save_{label}')
+        post_delete.connect(receiver, sender=model, dispatch_uid=f'ringkasan_delete_{label}')
+
+
+# ============================================
+# DATA BERSAMA (SEMUA KARYAWAN)
+# ============================================
+
+@cached_for_period(3600, namespace='reports', watermark=('absensi',))
+def periode_absensi_terakhir():
+    """(bulan, tahun) terakhir pada data absensi mesin; bulan/tahun sekarang bila kosong."""
+    latest = Absensi.objects.aggregate(latest_bulan=Max('bulan'), latest_tahun=Max('tahun'))
+    sekarang = datetime.now()
+    return latest['latest_bulan'] or sekarang.month, latest['latest_tahun'] or sekarang.year
+
+
+@cached_for_period(24 * 3600, namespace='calendar')
+def libur_terdekat(tanggal, hari=30):
+    """Libur nasional dalam `hari` hari mulai tanggal (hari Minggu dilewati)."""
+    hasil = []
+    for i in range(hari):
+        hari_ini = tanggal + timedelta(days=i)
+        if hari_ini.weekday() == 6:
+            continue  # Lewati hari Minggu
+        try:
+            libur = get_tanggal_merah(hari_ini)
+        except Exception:
+            continue
+        for event in libur:
+            # Override khusus 26 Des 2025
+            summary = event
+            if hari_ini.year == 2025 and hari_ini.month == 12 and hari_ini.day == 26:
+                if "Tinju" in event or "Cuti Bersama" in event:
+                    summary = "WFA"
+            hasil.append({'summary': summary, 'date': hari_ini})
+    return hasil
+
+
+@cached_for_period(24 * 3600, namespace='reports', watermark=('karyawan',))
+def ulang_tahun_hari_ini(tanggal):
+    """Karyawan aktif yang berulang tahun pada tanggal tersebut: [{'id', 'nama'}]."""
+    return list(
+        Karyawan.objects.filter(
+            tanggal_lahir__month=tanggal.month,
+            tanggal_lahir__day=tanggal.day,
+            status_keaktifan='Aktif',
+        ).order_by('nama').values('id', 'nama')
+    )
+
+
+def hitung_hari_kerja(tahun, bulan):
+    """Jumlah hari Senin-Jumat dalam satu bulan."""
+    total_hari = calendar.monthrange(tahun, bulan)[1]
+    return sum(1 for day in range(1, total_hari + 1) if datetime(tahun, bulan, day).weekday() < 5)
+
+
+# ============================================
+# RINGKASAN PER KARYAWAN
+# ============================================
+
+def _hitung(qs, field='id_karyawan'):
+    """Subquery skalar COUNT(*) per karyawan (0 bila tidak ada baris)."""
+    return Coalesce(
+        Subquery(
+            qs.order_by().values(field).annotate(n=Count('pk')).values('n'),
+            output_field=IntegerField(),
+        ),
+        Value(0),
+    )
+
+
+def _build_ringkasan(karyawan, bulan, tahun):
+    ref = OuterRef('pk')
+    cuti = Cuti.objects.filter(id_karyawan=ref)
+    izin = Izin.objects.filter(id_karyawan=ref)
+    absensi = AbsensiMagang.objects.filter(id_karyawan=ref)
+
+    # Sisa cuti: jumlah sisa_cuti semua tahun sejak mulai kontrak
+    if karyawan.mulai_kontrak:
+        sisa_cuti = Coalesce(
+            Subquery(
+                JatahCuti.objects.filter(karyawan=ref, tahun__gte=karyawan.mulai_kontrak.year)
+                .order_by().values('karyawan').annotate(s=Sum('sisa_cuti')).values('s'),
+                output_field=IntegerField(),
+            ),
+            Value(0),
+        )
+    else:
+        sisa_cuti = Value(0, output_field=IntegerField())
+
+    stat = Karyawan.objects.filter(pk=karyawan.pk).annotate(
+        sisa=sisa_cuti,
+        cuti_bulan_ini=_hitung(cuti.for_month(tahun, bulan)),
+        cuti_disetujui=_hitung(cuti.filter(status__iexact='disetujui')),
+        cuti_menunggu=_hitung(cuti.filter(status__iexact='menunggu')),
+        izin_bulan_ini=_hitung(izin.for_month(tahun, bulan)),
+        izin_disetujui=_hitung(izin.filter(status__iexact='disetujui')),
+        izin_menunggu=_hitung(izin.filter(status__iexact='menunggu')),
+        absensi_total=_hitung(absensi),
+        absensi_bulan_ini=_hitung(absensi.for_month(tahun, bulan)),
+    ).values(
+        'sisa', 'cuti_bulan_ini', 'cuti_disetujui', 'cuti_menunggu',
+        'izin_bulan_ini', 'izin_disetujui', 'izin_menunggu', 'absensi_total', 'absensi_bulan_ini',
+    ).get()
+
+    riwayat_cuti = list(
+        Cuti.objects.filter(id_karyawan=karyawan)
+        .order_by('-tanggal_mulai', '-id')
+        .values('id', 'jenis_cuti', 'tanggal_mulai', 'tanggal_selesai', 'status')[:JUMLAH_RIWAYAT]
+    )
+    riwayat_izin = list(
+        Izin.objects.filter(id_karyawan=karyawan)
+        .order_by('-tanggal_izin', '-id')
+        .values('id', 'jenis_izin', 'tanggal_izin', 'status')[:JUMLAH_RIWAYAT]
+    )
+    absensi_terbaru = [
+        {
+            'id': a.pk,
+            'tanggal': a.tanggal,
+            'keterangan': a.keterangan,
+            'jam_masuk': a.jam_masuk,
+            'jam_pulang': a.jam_pulang,
+            'alamat_masuk': a.alamat_masuk,
+            'alamat_pulang': a.alamat_pulang,
+            # Link redirect stabil (presigned URL baru dibuat saat diklik), aman di-cache
+            'screenshot_masuk_url': media_redirect_url(a, 'screenshot_masuk'),
+            'screenshot_pulang_url': media_redirect_url(a, 'screenshot_pulang'),
+        }
+        for a in AbsensiMagang.objects.filter(id_karyawan=karyawan)
+        .only('pk', 'tanggal', 'keterangan', 'jam_masuk', 'jam_pulang', 'alamat_masuk',
+              'alamat_pulang', 'screenshot_masuk', 'screenshot_pulang')
+        .order_by('-tanggal', '-jam_masuk')[:JUMLAH_RIWAYAT]
+    ]
+
+    return {
+        'karyawan_id': karyawan.pk,
+        'nama': karyawan.nama,
+        'bulan': bulan,
+        'tahun': tahun,
+        'nama_bulan': calendar.month_name[bulan],
+        'hari_kerja': hitung_hari_kerja(tahun, bulan),
+        'sisa_cuti': max(0, stat['sisa']),
+        # Pengajuan pada bulan data absensi terakhir (sama dengan kartu dashboard)
+        'total_pengajuan_cuti': stat['cuti_bulan_ini'],
+        'total_pengajuan_izin': stat['izin_bulan_ini'],
+        'cuti_disetujui': stat['cuti_disetujui'],
+        'cuti_menunggu': stat['cuti_menunggu'],
+        'izin_disetujui': stat['izin_disetujui'],
+        'izin_menunggu': stat['izin_menunggu'],
+        'total_absensi': stat['absensi_total'],
+        'absensi_bulan_ini': stat['absensi_bulan_ini'],
+        'riwayat_cuti': riwayat_cuti,
+        'riwayat_izin': riwayat_izin,
+        'absensi_terbaru': absensi_terbaru,
+        'dibuat': datetime.now(),
+    }
+
+
+def kunci_ringkasan(karyawan_id, tanggal=None):
+    """
+    Key cache ringkasan saat ini: generasi global + token versi karyawan + tanggal
+    + periode absensi terakhir. Juga dipakai sebagai dasar ETag API.
+    """
+    tanggal = tanggal or datetime.now().date()
+    cache = get_cache('reports')
+    versi_key, generasi_key = _versi_key(karyawan_id), _generasi_key()
+    token = cache.get_many([versi_key, generasi_key])
+    bulan, tahun = periode_absensi_terakhir()
+    return (
+        f'{RINGKASAN_CACHE_PREFIX}:{token.get(generasi_key, 0)}:{karyawan_id}:'
+        f'{token.get(versi_key, 0)}:{tanggal.isoformat()}:{tahun}-{bulan}'
+    )
+
+
+def etag_ringkasan(karyawan_id):
+    return hashlib.md5(kunci_ringkasan(karyawan_id).encode('utf-8')).hexdigest()
+
+
+def get_ringkasan_karyawan(karyawan):
+    """
+    Ringkasan dashboard satu karyawan, dari cache bila versinya masih berlaku.
+
+    Returns:
+        dict: sisa_cuti, total_pengajuan_cuti/izin (bulan data absensi terakhir),
+        cuti/izin disetujui & menunggu, total_absensi, absensi_bulan_ini, hari_kerja,
+        riwayat_cuti, riwayat_izin, absensi_terbaru, bulan, tahun, nama_bulan
+    """
+    key = kunci_ringkasan(karyawan.pk)
+    cache = get_cache('reports')
+    ringkasan = cache.get(key)
+    if ringkasan is None:
+        bulan, tahun = periode_absensi_terakhir()
+        ringkasan = _build_ringkasan(karyawan, bulan, tahun)
+        cache.set(key, ringkasan, RINGKASAN_TTL)
+    return ringkasan
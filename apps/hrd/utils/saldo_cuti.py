@@ -0,0 +1,168 @@
+"""
+Pemeliharaan saldo JatahCuti.sisa_cuti secara inkremental.
+
+Invarian saldo: sisa_cuti = total_cuti - jumlah DetailJatahCuti dipakai=True
+(dengan batas bawah 0 pada jalur yang tidak mengizinkan minus).
+
+- Setiap perubahan status slot (kosong <-> dipakai) lewat ubah_status_slot()
+  menerapkan selisihnya (+1/-1) ke sisa_cuti dengan F() di transaksi yang sama,
+  tanpa membaca ulang semua detail.
+- UPDATE slot bersyarat (WHERE dipakai = status lama) memastikan dua edit HR
+  yang bersamaan pada slot yang sama hanya dihitung sekali, dan F() mencegah
+  lost update pada baris JatahCuti.
+- cari_selisih_sisa_cuti()/perbaiki_selisih_sisa_cuti() memeriksa invarian
+  secara massal (satu query) dan memperbaiki drift; dijalankan berkala lewat
+  cron VerifikasiSisaCuti atau command verifikasi_sisa_cuti.
+"""
+import logging
+
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from apps.hrd.models import DetailJatahCuti, JatahCuti
+from apps.hrd.utils.ringkasan_karyawan import invalidate_ringkasan_on_commit, invalidate_semua_ringkasan
+from apps.hrd.utils.watermark import bump_watermark_on_commit
+
+logger = logging.getLogger(__name__)
+
+
+def _sisa_expr(delta, allow_minus):
+    expr = F('sisa_cuti') + delta
+    return expr if allow_minus else Greatest(expr, Value(0))
+
+
+def terapkan_delta_sisa_cuti(jatah_cuti, delta, allow_minus=True):
+    """
+    Tambah/kurangi sisa_cuti satu JatahCuti secara atomik di level DB.
+
+    Args:
+        jatah_cuti: Objek JatahCuti atau id-nya. Bila objek, nilai sisa_cuti di
+            memori ikut diperbarui agar save() berikutnya tidak menimpa delta.
+        delta: Selisih sisa cuti (negatif = memotong)
+        allow_minus: False -> sisa_cuti tidak turun di bawah 0
+    """
+    if not delta:
+        return
+    jatah_id = getattr(jatah_cuti, 'pk', jatah_cuti)
+    JatahCuti.objects.filter(pk=jatah_id).update(sisa_cuti=_sisa_expr(delta, allow_minus))
+    bump_watermark_on_commit('cuti')
+    karyawan_id = getattr(jatah_cuti, 'karyawan_id', None)
+    if karyawan_id is None:
+        karyawan_id = JatahCuti.objects.filter(pk=jatah_id).values_list('karyawan_id', flat=True).first()
+    invalidate_ringkasan_on_commit(karyawan_id)
+    if isinstance(jatah_cuti, JatahCuti):
+        jatah_cuti.refresh_from_db(fields=['sisa_cuti'])
+
+
+def ubah_status_slot(detail, dipakai, allow_minus=True, **fields):
+    """
+    Ubah status dipakai satu DetailJatahCuti (plus field lain, mis. keterangan)
+    dan terapkan selisihnya ke sisa_cuti JatahCuti dalam satu transaksi.
+
+    Returns:
+        int: Delta sisa_cuti yang diterapkan (-1, 0 atau +1)
+    """
+    fields['dipakai'] = dipakai
+    with transaction.atomic():
+        berubah = DetailJatahCuti.objects.filter(pk=detail.pk, dipakai=not dipakai).update(**fields)
+        if not berubah:
+            # Status sudah sesuai (mis. diubah edit lain lebih dulu): simpan field lain saja
+            DetailJatahCuti.objects.filter(pk=detail.pk).update(**fields)
+        delta = (-1 if dipakai else 1) if berubah else 0
+        if delta:
+            JatahCuti.objects.filter(pk=detail.jatah_cuti_id).update(sisa_cuti=_sisa_expr(delta, allow_minus))
+            invalidate_ringkasan_on_commit(
+                JatahCuti.objects.filter(pk=detail.jatah_cuti_id).values_list('karyawan_id', flat=True).first()
+            )
+        # update() tidak memicu signal watermark
+        bump_watermark_on_commit('cuti')
+
+    for name, value in fields.items():
+        setattr(detail, name, value)
+    return delta
+
+
+# ============================================
+# HITUNG ULANG & VERIFIKASI MASSAL
+# ============================================
+
+def _jumlah_dipakai_subquery():
+    return Coalesce(
+        Subquery(
+            DetailJatahCuti.objects.filter(jatah_cuti=OuterRef('pk'), dipakai=True)
+            .order_by()
+            .values('jatah_cuti')
+            .annotate(n=Count('pk'))
+            .values('n'),
+            output_field=IntegerField(),
+        ),
+        Value(0),
+    )
+
+
+def hitung_ulang_sisa_cuti(jatah_qs, allow_minus=True):
+    """
+    Hitung ulang sisa_cuti untuk sekumpulan JatahCuti dalam satu UPDATE
+    (tanpa baca-ubah-simpan per baris). Untuk jalur yang memindahkan banyak slot
+    sekaligus; perubahan satu slot cukup lewat ubah_status_slot().
+
+    Returns:
+        int: Jumlah baris JatahCuti yang diperbarui
+    """
+    expr = F('total_cuti') - _jumlah_dipakai_subquery()
+    if not allow_minus:
+        expr = Greatest(expr, Value(0))
+    updated = jatah_qs.order_by().update(sisa_cuti=expr)
+    if updated:
+        bump_watermark_on_commit('cuti')
+        transaction.on_commit(invalidate_semua_ringkasan)
+    return updated
+
+
+def cari_selisih_sisa_cuti(tahun=None, karyawan_ids=None):
+    """
+    JatahCuti yang sisa_cuti-nya tidak sesuai invarian.
+
+    Baris dengan sisa_cuti=0 padahal seharusnya negatif dianggap konsisten
+    (hasil jalur yang membatasi saldo di 0).
+
+    Returns:
+        QuerySet values: id, karyawan_id, karyawan__nama, tahun, total_cuti,
+        sisa_cuti, jumlah_dipakai, sisa_seharusnya
+    """
+    qs = JatahCuti.objects.all()
+    if tahun is not None:
+        qs = qs.filter(tahun=tahun)
+    if karyawan_ids is not None:
+        qs = qs.filter(karyawan_id__in=karyawan_ids)
+    return (
+        qs.annotate(jumlah_dipakai=_jumlah_dipakai_subquery())
+        .annotate(sisa_seharusnya=F('total_cuti') - F('jumlah_dipakai'))
+        .exclude(sisa_cuti=F('sisa_seharusnya'))
+        .exclude(Q(sisa_cuti=0) & Q(sisa_seharusnya__lt=0))
+        .order_by('tahun', 'karyawan__nama')
+        .values(
+            'id', 'karyawan_id', 'karyawan__nama', 'tahun', 'total_cuti',
+            'sisa_cuti', 'jumlah_dipakai', 'sisa_seharusnya',
+        )
+    )
+
+
+def perbaiki_selisih_sisa_cuti(tahun=None, karyawan_ids=None):
+    """
+    Deteksi dan perbaiki drift sisa_cuti secara massal.
+
+    Returns:
+        list[dict]: Baris yang drift (nilai sebelum diperbaiki)
+    """
+    selisih = list(cari_selisih_sisa_cuti(tahun=tahun, karyawan_ids=karyawan_ids))
+    if selisih:
+        with transaction.atomic():
+            hitung_ulang_sisa_cuti(JatahCuti.objects.filter(pk__in=[row['id'] for row in selisih]))
+        for row in selisih:
+            logger.warning(
+                "Drift sisa_cuti diperbaiki: %s tahun %s, %s -> %s",
+                row['karyawan__nama'], row['tahun'], row['sisa_cuti'], row['sisa_seharusnya'],
+            )
+    return selisih
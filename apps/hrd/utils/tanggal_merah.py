@@ -0,0 +1,27 @@
+"""
+Tanggal merah (libur nasional) dari pytanggalmerah dengan cache bersama.
+
+Setiap TanggalMerah().check() mengambil data dari internet; kalender HR saja
+memeriksa ratusan tanggal per request. Hasil per tanggal di-cache di namespace
+'calendar' selama sehari sehingga hanya request pertama (di worker mana pun)
+yang menunggu jaringan. Kegagalan jaringan tidak di-cache: exception diteruskan
+ke pemanggil seperti sebelumnya.
+"""
+from pytanggalmerah import TanggalMerah
+
+from apps.hrd.utils.cache import cached_for_period
+
+
+@cached_for_period(24 * 3600, namespace='calendar')
+def get_tanggal_merah(tanggal):
+    """
+    Daftar event tanggal merah untuk satu tanggal.
+
+    Returns:
+        list[str]: Nama event (termasuk 'sunday' untuk hari Minggu), kosong bila bukan tanggal merah
+    """
+    t = TanggalMerah()
+    t.set_date(str(tanggal.year), f"{tanggal.month:02d}", f"{tanggal.day:02d}")
+    if not t.check():
+        return []
+    return list(t.get_event())
@@ -0,0 +1,546 @@
+"""
+Upload lampiran langsung dari browser ke bucket (presigned POST).
+
+Sebelumnya file pengajuan cuti/izin, dokumen WFA dan workbook absensi
+di-stream lewat Django lalu di-PUT ke S3 di dalam request, sehingga satu file
+5 MB menahan worker selama upload klien + PUT ke S3. Alurnya sekarang:
+
+1. Browser meminta key (buat_upload): server memilih key di bawah upload_to
+   field tujuan dan menerbitkan presigned POST dengan kebijakan Content-Type
+   dan content-length-range. Tanpa S3 (STORAGE_STANDIN / FileSystemStorage)
+   target POST adalah endpoint stand-in lokal dengan token bertanda tangan.
+2. Browser mengunggah langsung ke bucket, lalu submit form hanya dengan key
+   (field <nama>_key, lihat UploadLangsungFormMixin).
+3. Form hanya memeriksa pemilik key dan ukuran objek, lalu mengklaim key
+   setelah seluruh form valid; isi file tidak dibaca di dalam request.
+4. Setelah baris yang memakai file ter-commit, isi file diverifikasi di
+   background (magic bytes sesuai ekstensi, ukuran maksimal). File yang gagal
+   dihapus dari bucket dan field yang memakainya dikosongkan. Cron
+   VerifikasiUploadLangsung menjadi cadangan dan membersihkan upload yang
+   tidak pernah dipakai atau tidak lagi dirujuk baris mana pun.
+
+Upload multipart biasa tetap diterima (browser tanpa JavaScript).
+"""
+import logging
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from django import forms
+from django.apps import apps
+from django.conf import settings
+from django.core import signing
+from django.core.exceptions import ValidationError
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+from django.db.models.signals import post_save
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.text import get_valid_filename
+from notifications.signals import notify
+
+from apps.hrd.models import UploadLangsung
+from apps.hrd.utils.watermark import WATERMARK_FAMILIES, bump_watermark
+
+logger = logging.getLogger(__name__)
+
+MAX_UKURAN = 5 * 1024 * 1024  # 5MB, sama dengan validate_file_size
+# Penanda key upload langsung; dipakai signal untuk memfilter tanpa query
+PENANDA_KEY = '/lgs/'
+STANDIN_SALT = 'apps.hrd.upload_langsung.standin'
+# Upload yang tidak pernah dipakai form dihapus setelah ini
+UMUR_UPLOAD_TERLANTAR = timedelta(days=1)
+# Klaim yang belum diverifikasi thread setelah ini diambil alih cron
+VERIFIKASI_TERTUNDA_SETELAH = timedelta(minutes=2)
+
+KEY_TIDAK_BERLAKU = 'File upload tidak ditemukan atau sudah tidak berlaku. Silakan upload ulang.'
+
+EKSTENSI_DOKUMEN = ['.pdf', '.doc', '.docx', '.jpg', '.jpeg', '.png']
+
+CONTENT_TYPES = {
+    '.pdf': 'application/pdf',
+    '.png': 'image/png',
+    '.jpg': 'image/jpeg',
+    '.jpeg': 'image/jpeg',
+    '.doc': 'application/msword',
+    '.docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+    '.xls': 'application/vnd.ms-excel',
+    '.xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+_OLE = b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1'
+_ZIP = b'PK\x03\x04'
+MAGIC_BYTES = {
+    '.pdf': b'%PDF',
+    '.png': b'\x89PNG\r\n\x1a\n',
+    '.jpg': b'\xff\xd8\xff',
+    '.jpeg': b'\xff\xd8\xff',
+    '.doc': _OLE,
+    '.docx': _ZIP,
+    '.xls': _OLE,
+    '.xlsx': _ZIP,
+}
+
+# jenis upload -> field tujuan (model, field) atau prefix key, ekstensi, role yang boleh
+JENIS_UPLOAD = {
+    'cuti': {'model': 'hrd.Cuti', 'field': 'file_pengajuan', 'ekstensi': EKSTENSI_DOKUMEN},
+    'cuti_formal': {'model': 'hrd.Cuti', 'field': 'file_dokumen_formal', 'ekstensi': ['.pdf', '.doc', '.docx']},
+    'izin': {'model': 'hrd.Izin', 'field': 'file_pengajuan', 'ekstensi': EKSTENSI_DOKUMEN},
+    'tidak_ambil_cuti': {'model': 'hrd.TidakAmbilCuti', 'field': 'file_pengajuan', 'ekstensi': EKSTENSI_DOKUMEN},
+    'wfa': {'model': 'absensi.AbsensiMagang', 'field': 'dokumen_persetujuan', 'ekstensi': ['.pdf', '.jpg', '.jpeg', '.png']},
+    'absensi': {'prefix': 'absensi/upload/', 'ekstensi': ['.xls', '.xlsx'], 'roles': ['HRD']},
+}
+
+
+def upload_langsung_aktif():
+    return getattr(settings, 'DIRECT_UPLOAD_ENABLED', True)
+
+
+def _model_field(entry):
+    if 'model' not in entry:
+        return None
+    return apps.get_model(entry['model'])._meta.get_field(entry['field'])
+
+
+def _ekstensi(nama):
+    return os.path.splitext(nama)[1].lower()
+
+
+def is_s3_storage(storage):
+    try:
+        from storages.backends.s3boto3 import S3Boto3Storage
+    except ImportError:
+        return False
+    return isinstance(storage, S3Boto3Storage)
+
+
+# ============================================
+# PRESIGN
+# ============================================
+
+def _buat_key(entry, nama_file):
+    field = _model_field(entry)
+    prefix = datetime.now().strftime(field.upload_to) if field else entry['prefix']
+    max_length = field.max_length if field else UploadLangsung._meta.get_field('key').max_length
+    prefix = f"{prefix.rstrip('/')}{PENANDA_KEY}{uuid.uuid4().hex}/"
+
+    nama = get_valid_filename(os.path.basename(nama_file)) or 'file'
+    stem, ext = os.path.splitext(nama)
+    sisa = max_length - len(prefix) - len(ext)
+    if sisa < 1:
+        raise ValidationError('Nama file terlalu panjang.')
+    return f'{prefix}{stem[:sisa]}{ext}'
+
+
+def buat_upload(user, jenis, nama_file, ukuran):
+    """
+    Catat upload baru dan terbitkan target POST untuk browser.
+
+    Returns:
+        dict: key, url, fields (field form yang wajib ikut di-POST sebelum file)
+
+    Raises:
+        ValidationError: jenis, ekstensi, ukuran atau role tidak diizinkan
+    """
+    entry = JENIS_UPLOAD.get(jenis)
+    if entry is None:
+        raise ValidationError('Jenis upload tidak dikenal.')
+    if entry.get('roles') and user.role not in entry['roles']:
+        raise ValidationError('Anda tidak memiliki akses untuk upload ini.')
+
+    ext = _ekstensi(nama_file or '')
+    if ext not in entry['ekstensi']:
+        raise ValidationError(f"Tipe file tidak diizinkan. Hanya diperbolehkan: {', '.join(entry['ekstensi'])}")
+    try:
+        ukuran = int(ukuran)
+    except (TypeError, ValueError):
+        raise ValidationError('Ukuran file tidak valid.')
+    if ukuran <= 0:
+        raise ValidationError('File kosong.')
+    if ukuran > MAX_UKURAN:
+        raise ValidationError(f'Ukuran file terlalu besar. Maksimal 5MB. File Anda: {ukuran / (1024 * 1024):.2f}MB')
+
+    upload = UploadLangsung.objects.create(
+        key=_buat_key(entry, nama_file),
+        jenis=jenis,
+        user=user,
+        nama_asli=os.path.basename(nama_file)[:255],
+        content_type=CONTENT_TYPES[ext],
+    )
+    target = _presigned_post(default_storage, upload)
+    return {'key': upload.key, **target}
+
+
+def _presigned_post(storage, upload):
+    expire = getattr(settings, 'DIRECT_UPLOAD_EXPIRE', 600)
+    if is_s3_storage(storage):
+        fields = {'Content-Type': upload.content_type}
+        # Ikuti parameter objek MediaStorage (mis. ContentDisposition) seperti upload lewat server
+        disposition = storage.get_object_parameters(upload.key).get('ContentDisposition')
+        if disposition:
+            fields['Content-Disposition'] = disposition
+        conditions = [{name: value} for name, value in fields.items()]
+        conditions.append(['content-length-range', 1, MAX_UKURAN])
+        post = storage.connection.meta.client.generate_presigned_post(
+            Bucket=storage.bucket_name,
+            Key=storage._normalize_name(upload.key),
+            Fields=fields,
+            Conditions=conditions,
+            ExpiresIn=expire,
+        )
+        return {'url': post['url'], 'fields': post['fields']}
+
+    # Stand-in lokal: POST multipart ke Django dengan token bertanda tangan
+    token = signing.dumps({'key': upload.key}, salt=STANDIN_SALT)
+    return {
+        'url': reverse('upload_langsung_standin'),
+        'fields': {'key': upload.key, 'token': token, 'Content-Type': upload.content_type},
+    }
+
+
+def simpan_standin(token, file):
+    """Simpan file untuk stand-in lokal; meniru pemeriksaan kebijakan presigned POST."""
+    expire = getattr(settings, 'DIRECT_UPLOAD_EXPIRE', 600)
+    try:
+        key = signing.loads(token, salt=STANDIN_SALT, max_age=expire)['key']
+    except (signing.BadSignature, KeyError, TypeError):
+        raise ValidationError('Token upload tidak valid atau kedaluwarsa.')
+    if file is None or not 0 < file.size <= MAX_UKURAN:
+        raise ValidationError('Ukuran file di luar batas.')
+    if default_storage.exists(key):
+        default_storage.delete(key)
+    return default_storage.save(key, file)
+
+
+# ============================================
+# KLAIM OLEH FORM
+# ============================================
+
+class UploadLangsungFile(File):
+    """File yang sudah ada di storage; dibaca dari storage hanya bila diperlukan."""
+
+    def __init__(self, upload, storage=None):
+        super().__init__(None, name=upload.key)
+        self.upload = upload
+        self.storage = storage or default_storage
+        # File.size adalah cached_property; isi dari ukuran objek di storage
+        self.size = upload.ukuran
+
+    def open(self, mode='rb'):
+        if self.file is None or self.file.closed:
+            self.file = self.storage.open(self.name, mode)
+        return self
+
+    def read(self, *args):
+        return self.open().file.read(*args)
+
+
+def periksa_upload(key, jenis, user):
+    """
+    Validasi key hasil upload langsung untuk dipakai form: milik user, jenisnya
+    sesuai, dan objeknya ada di storage dengan ukuran yang diizinkan. Status
+    upload belum diubah (lihat klaim_upload).
+
+    Returns:
+        UploadLangsungFile
+
+    Raises:
+        ValidationError
+    """
+    upload = UploadLangsung.objects.filter(key=key, jenis=jenis, user=user, status='menunggu').first()
+    if upload is None:
+        raise ValidationError(KEY_TIDAK_BERLAKU)
+    try:
+        ukuran = default_storage.size(key)
+    except Exception:
+        raise ValidationError('File belum selesai diupload. Silakan upload ulang.')
+    if not 0 < ukuran <= MAX_UKURAN:
+        raise ValidationError('Ukuran file terlalu besar. Maksimal 5MB.')
+    upload.ukuran = ukuran
+    return UploadLangsungFile(upload)
+
+
+def _klaim(file):
+    """
+    Pindahkan status menunggu -> diklaim dengan UPDATE bersyarat, sehingga dua
+    submit bersamaan (atau key yang sudah dipakai baris lain) tidak bisa memakai
+    objek yang sama.
+    """
+    upload = file.upload
+    sekarang = timezone.now()
+    diklaim = UploadLangsung.objects.filter(pk=upload.pk, status='menunggu').update(
+        status='diklaim', ukuran=upload.ukuran, diklaim_at=sekarang
+    )
+    if not diklaim:
+        # Diklaim request lain di antara SELECT dan UPDATE
+        raise ValidationError(KEY_TIDAK_BERLAKU)
+    upload.status = 'diklaim'
+    upload.diklaim_at = sekarang
+
+
+def klaim_upload(key, jenis, user):
+    """
+    Periksa lalu klaim key upload langsung (periksa_upload + UPDATE bersyarat).
+    Satu key hanya bisa diklaim sekali.
+
+    Returns:
+        UploadLangsungFile
+
+    Raises:
+        ValidationError
+    """
+    file = periksa_upload(key, jenis, user)
+    _klaim(file)
+    return file
+
+
+class UploadLangsungFormMixin:
+    """
+    Mixin form: field file di direct_upload_fields ({nama field: jenis}) juga
+    menerima key upload langsung lewat field <nama>_key. File multipart biasa
+    tetap diutamakan bila ada.
+
+    User pemilik upload diambil dari kwarg upload_user, atau self.karyawan.user.
+    Key baru diklaim setelah seluruh form valid; form yang ditolak membiarkan
+    key tetap menunggu sehingga bisa dipakai submit berikutnya.
+    """
+    direct_upload_fields = {}
+
+    def __init__(self, *args, **kwargs):
+        self.upload_user = kwargs.pop('upload_user', None)
+        super().__init__(*args, **kwargs)
+        self._upload_langsung = {}
+        if upload_langsung_aktif():
+            for name, jenis in self.direct_upload_fields.items():
+                self.fields[name].widget.attrs['data-direct-upload'] = jenis
+
+    def _get_upload_user(self):
+        if self.upload_user is not None:
+            return self.upload_user
+        karyawan = getattr(self, 'karyawan', None)
+        return karyawan.user if karyawan is not None else None
+
+    def full_clean(self):
+        galat = {}
+        if self.is_bound and upload_langsung_aktif():
+            for name, jenis in self.direct_upload_fields.items():
+                key = self.data.get(f'{self.add_prefix(name)}_key')
+                if not key or self.files.get(self.add_prefix(name)):
+                    continue
+                try:
+                    file = periksa_upload(key, jenis, self._get_upload_user())
+                except ValidationError as e:
+                    galat[name] = e
+                    continue
+                self.files = self.files.copy()
+                self.files[self.add_prefix(name)] = file
+                self._upload_langsung[name] = file
+        super().full_clean()
+        for name, error in galat.items():
+            # Ganti pesan "wajib diisi" dengan alasan key ditolak
+            self._errors.pop(name, None)
+            self.cleaned_data.pop(name, None)
+            self.add_error(name, error)
+        if self._errors:
+            return
+        for name, file in self._upload_langsung.items():
+            try:
+                _klaim(file)
+            except ValidationError as e:
+                self.add_error(name, e)
+
+    def _post_clean(self):
+        super()._post_clean()
+        instance = getattr(self, 'instance', None)
+        for name, file in self._upload_langsung.items():
+            if instance is not None and name in self.cleaned_data:
+                # Pakai key apa adanya: objek sudah di storage, jangan disimpan ulang
+                setattr(instance, name, file.name)
+
+
+# ============================================
+# VERIFIKASI BACKGROUND
+# ============================================
+
+_executor = None
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, 'DIRECT_UPLOAD_WORKERS', 1),
+            thread_name_prefix='upload-langsung',
+        )
+    return _executor
+
+
+def _verifikasi_in_thread(key):
+    try:
+        verifikasi_upload(key)
+    except Exception:
+        logger.exception("Gagal memverifikasi upload %s", key)
+    finally:
+        # Thread worker memakai koneksi DB sendiri, tutup agar tidak bocor
+        connections.close_all()
+
+
+def jadwalkan_verifikasi(key):
+    """Verifikasi di background setelah commit. Bila DIRECT_UPLOAD_VERIFY_ASYNC=False, menunggu cron."""
+    if not getattr(settings, 'DIRECT_UPLOAD_VERIFY_ASYNC', True):
+        return
+    transaction.on_commit(lambda: _get_executor().submit(_verifikasi_in_thread, key))
+
+
+def _tolak(upload, alasan):
+    upload.status = 'ditolak'
+    upload.alasan_ditolak = alasan
+    upload.diverifikasi_at = timezone.now()
+    upload.save(update_fields=['status', 'alasan_ditolak', 'diverifikasi_at'])
+
+    try:
+        default_storage.delete(upload.key)
+    except Exception:
+        logger.exception("Gagal menghapus upload ditolak %s", upload.key)
+
+    entry = JENIS_UPLOAD.get(upload.jenis, {})
+    if 'model' in entry:
+        model = apps.get_model(entry['model'])
+        dikosongkan = model.objects.filter(**{entry['field']: upload.key}).update(**{entry['field']: ''})
+        if dikosongkan:
+            # update() tidak memicu signal watermark
+            for family, labels in WATERMARK_FAMILIES.items():
+                if entry['model'] in labels:
+                    bump_watermark(family)
+
+    logger.warning(f"Upload {upload.key} ditolak: {alasan}")
+    notify.send(
+        sender=upload.user,
+        recipient=upload.user,
+        verb="upload ditolak",
+        description=f"File {upload.nama_asli} ditolak: {alasan} Silakan upload ulang.",
+    )
+
+
+def verifikasi_upload(key):
+    """
+    Periksa isi objek yang sudah diklaim: ukuran dan magic bytes sesuai ekstensi.
+
+    Returns:
+        UploadLangsung (status terverifikasi/ditolak), atau None bila tidak ada
+        yang perlu diverifikasi atau storage belum bisa dibaca (dicoba lagi cron)
+    """
+    upload = UploadLangsung.objects.select_related('user').filter(key=key, status='diklaim').first()
+    if upload is None:
+        return None
+
+    try:
+        ukuran = default_storage.size(key)
+        with default_storage.open(key, 'rb') as f:
+            awal = f.read(16)
+    except FileNotFoundError:
+        _tolak(upload, 'File tidak ditemukan di storage.')
+        return upload
+    except Exception:
+        logger.exception("Storage tidak bisa dibaca saat verifikasi %s", key)
+        return None
+
+    magic = MAGIC_BYTES.get(_ekstensi(key))
+    if ukuran > MAX_UKURAN:
+        _tolak(upload, 'Ukuran file melebihi 5MB.')
+    elif magic is None or not awal.startswith(magic):
+        _tolak(upload, f'Isi file tidak sesuai format {_ekstensi(key)}.')
+    else:
+        upload.status = 'terverifikasi'
+        upload.ukuran = ukuran
+        upload.diverifikasi_at = timezone.now()
+        upload.save(update_fields=['status', 'ukuran', 'diverifikasi_at'])
+    return upload
+
+
+def _hapus_upload(upload):
+    try:
+        if default_storage.exists(upload.key):
+            default_storage.delete(upload.key)
+    except Exception:
+        logger.exception("Gagal menghapus upload terlantar %s", upload.key)
+        return False
+    upload.delete()
+    return True
+
+
+def _dipakai(upload):
+    entry = JENIS_UPLOAD.get(upload.jenis, {})
+    if 'model' not in entry:
+        # Tanpa field tujuan (mis. workbook absensi): pemakaiannya tidak bisa dicek
+        return True
+    return apps.get_model(entry['model']).objects.filter(**{entry['field']: upload.key}).exists()
+
+
+def proses_upload_tertunda(limit=50):
+    """
+    Dipanggil cron: verifikasi klaim yang terlewat thread (mis. setelah restart)
+    dan hapus upload yang tidak pernah dipakai: key yang tidak pernah diklaim,
+    serta key yang sudah diklaim tetapi tidak dirujuk baris mana pun (form
+    valid yang tidak jadi disimpan, atau baris pemakainya sudah dihapus).
+
+    Returns:
+        Tuple (jumlah diverifikasi, jumlah dibersihkan)
+    """
+    sekarang = timezone.now()
+    batas_terlantar = sekarang - UMUR_UPLOAD_TERLANTAR
+    diverifikasi = 0
+    tertunda = UploadLangsung.objects.filter(
+        status='diklaim', diklaim_at__lt=sekarang - VERIFIKASI_TERTUNDA_SETELAH
+    ).order_by('diklaim_at').values_list('key', flat=True)[:limit]
+    for key in tertunda:
+        if verifikasi_upload(key):
+            diverifikasi += 1
+
+    dibersihkan = 0
+    for upload in UploadLangsung.objects.filter(status='menunggu', created_at__lt=batas_terlantar)[:limit]:
+        if _hapus_upload(upload):
+            dibersihkan += 1
+
+    diklaim = UploadLangsung.objects.filter(
+        status__in=['diklaim', 'terverifikasi'],
+        jenis__in=[jenis for jenis, entry in JENIS_UPLOAD.items() if 'model' in entry],
+        diklaim_at__lt=batas_terlantar,
+    ).order_by('diklaim_at')[:limit]
+    for upload in diklaim:
+        if not _dipakai(upload) and _hapus_upload(upload):
+            dibersihkan += 1
+    return diverifikasi, dibersihkan
+
+
+# ============================================
+# SIGNAL
+# ============================================
+
+def _make_receiver(fields):
+    def _jadwalkan(sender, instance, **kwargs):
+        for field in fields:
+            name = getattr(instance, field).name
+            if name and PENANDA_KEY in name and UploadLangsung.objects.filter(key=name, status='diklaim').exists():
+                jadwalkan_verifikasi(name)
+    return _jadwalkan
+
+
+_receivers = []
+
+
+def connect_upload_langsung_signals():
+    """Jadwalkan verifikasi setiap kali baris yang memakai key upload langsung disimpan."""
+    if _receivers:
+        return
+    per_model = {}
+    for entry in JENIS_UPLOAD.values():
+        if 'model' in entry:
+            per_model.setdefault(entry['model'], []).append(entry['field'])
+    for label, fields in per_model.items():
+        receiver = _make_receiver(fields)
+        # Simpan referensi agar receiver tidak di-garbage-collect (weak reference)
+        _receivers.append(receiver)
+        post_save.connect(receiver, sender=apps.get_model(label), dispatch_uid=f'upload_langsung_{label}')
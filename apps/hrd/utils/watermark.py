@@ -0,0 +1,138 @@
+"""
+Watermark data per keluarga tabel.
+
+Setiap keluarga (absensi, cuti, izin, karyawan, booking, notifikasi) punya
+nomor versi di tabel data_watermark yang dinaikkan oleh signal
+post_save/post_delete. Versi ini dipakai sebagai bagian dari key cache (mis.
+artefak ekspor) dan ETag feed JSON (apps.hrd.utils.etag) sehingga keduanya
+otomatis tidak terpakai lagi begitu baris di bawahnya berubah.
+
+Kenaikan versi dari signal ditunda sampai transaksi commit dan paling banyak
+sekali per keluarga per transaksi (bump_watermark_on_commit), sehingga baris
+data_watermark tidak terkunci selama transaksi penulis berjalan dan kegagalannya
+tidak membatalkan transaksi utama.
+
+Catatan: QuerySet.update()/bulk_create() tidak memicu signal; pemanggil yang
+memakai operasi massal perlu memanggil bump_watermark_on_commit() (atau
+bump_watermark() di luar transaksi) secara manual.
+"""
+import logging
+
+from django.apps import apps
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.db.models.signals import m2m_changed, post_delete, post_save
+
+logger = logging.getLogger(__name__)
+
+# Keluarga tabel -> model yang termasuk di dalamnya
+WATERMARK_FAMILIES = {
+    'absensi': ['absensi.Absensi', 'absensi.AbsensiMagang', 'absensi.Rules', 'absensi.LokasiKantor'],
+    'cuti': ['hrd.Cuti', 'hrd.TidakAmbilCuti', 'hrd.JatahCuti', 'hrd.DetailJatahCuti', 'hrd.CutiBersama'],
+    'izin': ['hrd.Izin'],
+    'karyawan': ['hrd.Karyawan', 'authentication.User'],
+    'booking': ['hrd.BookingRuangRapat', 'hrd.RuangRapat'],
+    'notifikasi': ['notifications.Notification'],
+    # Keluarga sempit untuk feed yang hanya membaca sebagian tabel di atas
+    'cuti_bersama': ['hrd.CutiBersama'],
+    'aturan_absensi': ['absensi.Rules', 'absensi.LokasiKantor'],
+}
+
+# Save yang hanya menyentuh field ini tidak mengubah data yang dibaca ekspor/feed,
+# mis. update_last_login() -> user.save(update_fields=['last_login']) di setiap login
+FIELD_TANPA_WATERMARK = {
+    'authentication.User': {'last_login'},
+}
+
+
+def bump_watermark(family):
+    """Naikkan versi satu keluarga tabel (atomik di level DB)."""
+    from apps.hrd.models import DataWatermark
+
+    updated = DataWatermark.objects.filter(family=family).update(version=F('version') + 1)
+    if updated:
+        return
+    try:
+        with transaction.atomic():
+            DataWatermark.objects.create(family=family, version=1)
+    except IntegrityError:
+        # Baris dibuat oleh proses lain di antara update dan create
+        DataWatermark.objects.filter(family=family).update(version=F('version') + 1)
+
+
+def bump_watermark_on_commit(family, using=None):
+    """
+    Naikkan versi satu keluarga setelah transaksi aktif commit (langsung bila di
+    luar transaksi). Dalam satu transaksi, panggilan berikutnya untuk keluarga
+    yang sama diabaikan. Kegagalan hanya dicatat, data utama sudah tersimpan.
+    """
+    connection = transaction.get_connection(using)
+    if connection.in_atomic_block and any(
+        getattr(func, 'watermark_family', None) == family and not func.sudah_jalan
+        for _sids, func in connection.run_on_commit
+    ):
+        return
+
+    def _jalankan():
+        _jalankan.sudah_jalan = True
+        try:
+            bump_watermark(family)
+        except Exception as e:
+            logger.warning(f"Gagal menaikkan watermark {family}: {e}")
+
+    _jalankan.watermark_family = family
+    _jalankan.sudah_jalan = False
+    transaction.on_commit(_jalankan, using=using)
+
+
+def get_watermark(*families):
+    """
+    Ambil versi gabungan beberapa keluarga dalam satu query.
+
+    Returns:
+        String stabil, mis. 'absensi:12|karyawan:3'
+    """
+    from apps.hrd.models import DataWatermark
+
+    families = sorted(set(families))
+    versions = dict(
+        DataWatermark.objects.filter(family__in=families).values_list('family', 'version')
+    )
+    return '|'.join(f"{family}:{versions.get(family, 0)}" for family in families)
+
+
+def _make_receiver(family):
+    def _bump(sender, **kwargs):
+        # m2m_changed juga dikirim untuk pre_*; cukup tangkap post_*
+        action = kwargs.get('action')
+        if action and not action.startswith('post_'):
+            return
+        update_fields = kwargs.get('update_fields')
+        if update_fields and set(update_fields) <= FIELD_TANPA_WATERMARK.get(sender._meta.label, set()):
+            return
+        bump_watermark_on_commit(family, using=kwargs.get('using'))
+    return _bump
+
+
+_receivers = []
+
+
+def connect_watermark_signals():
+    """Sambungkan signal untuk semua model di WATERMARK_FAMILIES (dipanggil sekali saat app ready)."""
+    if _receivers:
+        return
+    for family, model_labels in WATERMARK_FAMILIES.items():
+        receiver = _make_receiver(family)
+        # Simpan referensi agar receiver tidak di-garbage-collect (weak reference)
+        _receivers.append(receiver)
+        for label in model_labels:
+            model = apps.get_model(label)
+            # Satu model boleh masuk beberapa keluarga: dispatch_uid memuat nama keluarga
+            post_save.connect(receiver, sender=model, dispatch_uid=f'watermark_save_{family}_{label}')
+            post_delete.connect(receiver, sender=model, dispatch_uid=f'watermark_delete_{family}_{label}')
+            for m2m_field in model._meta.many_to_many:
+                m2m_changed.connect(
+                    receiver,
+                    sender=m2m_field.remote_field.through,
+                    dispatch_uid=f'watermark_m2m_{family}_{label}_{m2m_field.name}',
+                )
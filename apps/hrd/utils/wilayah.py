@@ -0,0 +1,51 @@
+"""
+Registry wilayah (provinsi -> kabupaten/kota).
+
+File kab-{provinsi}.json dibaca malas (lazy) sekali per provinsi per proses
+lalu dimemo, sehingga list dan ekspor karyawan tidak membuka file JSON untuk
+setiap baris.
+"""
+import json
+import logging
+import os
+from functools import lru_cache
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+KABUPATEN_DIR = os.path.join(settings.BASE_DIR, 'apps', 'static', 'assets', 'data_wilayah_indo', 'kabupaten_kota')
+
+
+@lru_cache(maxsize=None)
+def get_provinsi_map():
+    """Kode provinsi -> nama provinsi (dari Karyawan.PROVINSI_CHOICES)."""
+    from apps.hrd.models import Karyawan
+    return dict(Karyawan.PROVINSI_CHOICES)
+
+
+@lru_cache(maxsize=64)
+def get_kabupaten_map(provinsi):
+    """Kode kabupaten/kota -> nama untuk satu provinsi. Dict kosong bila file tidak ada/rusak."""
+    kab_file_path = os.path.join(KABUPATEN_DIR, f'kab-{provinsi}.json')
+    try:
+        with open(kab_file_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except Exception as e:
+        logger.warning(f"Error loading kabupaten data {kab_file_path}: {e}")
+        return {}
+
+
+def get_provinsi_nama(provinsi, default='-'):
+    if not provinsi:
+        return default
+    return get_provinsi_map().get(provinsi, default)
+
+
+def get_kabupaten_nama(provinsi, kabupaten_kota, default='-'):
+    """Nama kabupaten/kota; jatuh ke kode aslinya bila tidak ditemukan."""
+    if not provinsi or not kabupaten_kota:
+        return default
+    return get_kabupaten_map(provinsi).get(kabupaten_kota, kabupaten_kota)
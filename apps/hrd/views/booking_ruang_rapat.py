@@ -3,13 +3,22 @@ from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.http import JsonResponse
 from django.views.decorators.http import require_POST
-from django.core.exceptions import PermissionDenied
-from django.db.models import Q
+from django.core.exceptions import PermissionDenied, ValidationError
+from django.db.models import Count, Q
 from datetime import datetime, date, timedelta
-import json
 
 from apps.hrd.models import BookingRuangRapat, RuangRapat, Karyawan
 from apps.hrd.forms import BookingRuangRapatForm
+from apps.hrd.utils.booking_engine import (
+    LANGKAH_MENIT,
+    MAKS_HARI_PENCARIAN,
+    JAM_BUKA,
+    JAM_TUTUP,
+    IndeksRuangHarian,
+    cari_slot_kosong,
+    pesan_bentrok,
+)
+from apps.hrd.utils.etag import HARI, watermark_etag
 
 def role_required(allowed_roles):
     """Decorator untuk membatasi akses berdasarkan role"""
@@ -40,57 +49,34 @@ def booking_ruang_rapat_view(request):
     # Get all active rooms
     ruang_rapat_list = RuangRapat.objects.filter(aktif=True)
     
-    # Get bookings for the week
-    start_of_week = selected_date_obj - timedelta(days=selected_date_obj.weekday())
-    end_of_week = start_of_week + timedelta(days=6)
-    
-    bookings_query = BookingRuangRapat.objects.filter(
-        tanggal__range=[start_of_week, end_of_week]
-    ).select_related('user', 'ruang_rapat', 'user__karyawan')
-    
-    if selected_room:
-        bookings_query = bookings_query.filter(ruang_rapat_id=selected_room)
-    
-    bookings = bookings_query.order_by('tanggal', 'waktu_mulai')
-    
-    # Format bookings for calendar
-    calendar_events = []
-    for booking in bookings:
-        # Get user name from Karyawan model if exists, otherwise fallback to User
-        try:
-            user_name = booking.user.karyawan.nama
-        except Karyawan.DoesNotExist:
-            user_name = booking.user.get_full_name() or booking.user.username
-            
-        calendar_events.append({
-            'id': booking.id,
-            'title': booking.judul,
-            'start': f"{booking.tanggal}T{booking.waktu_mulai}+07:00",
-            'end': f"{booking.tanggal}T{booking.waktu_selesai}+07:00",
-            'backgroundColor': booking.ruang_rapat.warna_kalender,
-            'borderColor': booking.ruang_rapat.warna_kalender,
-            'extendedProps': {
-                'room': booking.ruang_rapat.nama,
-                'description': booking.deskripsi or '',
-                'user': user_name,
-                'canEdit': booking.user == request.user
-            }
-        })
+    # Event kalender dimuat lewat booking_calendar_events; di sini cukup statistik
+    # (satu query agregat) dan 10 booking terakhir milik user
+    today = date.today()
+    stats = BookingRuangRapat.objects.filter(Q(tanggal=today) | Q(user=request.user)).aggregate(
+        hari_ini=Count('id', filter=Q(tanggal=today)),
+        milik_saya=Count('id', filter=Q(user=request.user)),
+    )
+    user_bookings = (
+        BookingRuangRapat.objects.filter(user=request.user)
+        .select_related('ruang_rapat')
+        .order_by('-tanggal', '-waktu_mulai')[:10]
+    )
     
     context = {
         'ruang_rapat_list': ruang_rapat_list,
         'selected_date': selected_date,
         'selected_room': selected_room,
-        'calendar_events': json.dumps(calendar_events),
-        'user_bookings': BookingRuangRapat.objects.filter(user=request.user).order_by('-tanggal', '-waktu_mulai')[:10],
-        # Tambahan agar template tidak error
-        'today_bookings': BookingRuangRapat.objects.filter(tanggal=date.today()),
-        'today': date.today(),
+        'user_bookings': user_bookings,
+        'jumlah_booking_hari_ini': stats['hari_ini'],
+        'jumlah_booking_saya': stats['milik_saya'],
+        'today': today,
     }
     return render(request, 'hrd/booking_ruang_rapat.html', context)
 
 @login_required
 @role_required(['HRD', 'Karyawan Tetap'])
+# 'karyawan': nama pemesan diambil dari Karyawan
+@watermark_etag('booking', 'karyawan', periode=HARI)
 def booking_calendar_events(request):
     """JSON feed untuk FullCalendar: muat events pada rentang tanggal."""
     start = request.GET.get('start')
@@ -143,11 +129,15 @@ def create_booking(request):
         if form.is_valid():
             booking = form.save(commit=False)
             booking.user = request.user
-            booking.save()
-            messages.success(request, f'Booking "{booking.judul}" berhasil dibuat!')
-            return redirect('booking_ruang_rapat')
-        else:
-            messages.error(request, 'Terjadi kesalahan dalam form. Silakan periksa kembali.')
+            try:
+                booking.save()
+            except ValidationError as e:
+                # Bentrok yang lolos validasi (booking bersamaan) ditolak database
+                form.add_error(None, e)
+            else:
+                messages.success(request, f'Booking "{booking.judul}" berhasil dibuat!')
+                return redirect('booking_ruang_rapat')
+        messages.error(request, 'Terjadi kesalahan dalam form. Silakan periksa kembali.')
     else:
         form = BookingRuangRapatForm()
         
@@ -179,11 +169,14 @@ def edit_booking(request, booking_id):
     if request.method == 'POST':
         form = BookingRuangRapatForm(request.POST, instance=booking)
         if form.is_valid():
-            form.save()
-            messages.success(request, f'Booking "{booking.judul}" berhasil diupdate!')
-            return redirect('booking_ruang_rapat')
-        else:
-            messages.error(request, 'Terjadi kesalahan dalam form. Silakan periksa kembali.')
+            try:
+                form.save()
+            except ValidationError as e:
+                form.add_error(None, e)
+            else:
+                messages.success(request, f'Booking "{booking.judul}" berhasil diupdate!')
+                return redirect('booking_ruang_rapat')
+        messages.error(request, 'Terjadi kesalahan dalam form. Silakan periksa kembali.')
     else:
         form = BookingRuangRapatForm(instance=booking)
     
@@ -263,22 +256,80 @@ def check_availability(request):
     except ValueError:
         return JsonResponse({'available': False, 'message': 'Format tanggal/waktu tidak valid'})
     
-    # Check for overlapping bookings
-    overlapping_bookings = BookingRuangRapat.objects.filter(
-        ruang_rapat_id=room_id,
-        tanggal=tanggal_obj,
-        waktu_mulai__lt=waktu_selesai_obj,
-        waktu_selesai__gt=waktu_mulai_obj
-    )
+    if waktu_selesai_obj <= waktu_mulai_obj:
+        return JsonResponse({'available': False, 'message': 'Waktu selesai harus setelah waktu mulai'})
     
-    if exclude_id:
-        overlapping_bookings = overlapping_bookings.exclude(id=exclude_id)
+    try:
+        room_id = int(room_id)
+        exclude_id = int(exclude_id) if exclude_id else None
+    except ValueError:
+        return JsonResponse({'available': False, 'message': 'Parameter tidak valid'})
     
-    if overlapping_bookings.exists():
-        booking = overlapping_bookings.first()
+    # Satu query untuk semua booking ruang ini pada tanggal tersebut: dipakai untuk
+    # cek bentrok sekaligus saran rentang kosong bila bentrok
+    indeks = IndeksRuangHarian.load(tanggal_obj, ruang_ids=[room_id])
+    bentrok = indeks.bentrok(room_id, tanggal_obj, waktu_mulai_obj, waktu_selesai_obj, exclude_id=exclude_id)
+    if bentrok:
+        durasi_menit = (
+            datetime.combine(tanggal_obj, waktu_selesai_obj) - datetime.combine(tanggal_obj, waktu_mulai_obj)
+        ).seconds // 60
+        saran = [
+            {'mulai': mulai.strftime('%H:%M'), 'selesai': selesai.strftime('%H:%M')}
+            for mulai, selesai in indeks.celah(room_id, tanggal_obj, durasi_menit=durasi_menit, exclude_id=exclude_id)
+        ]
         return JsonResponse({
             'available': False,
-            'message': f'Bertabrakan dengan "{booking.judul}" ({booking.waktu_mulai.strftime("%H:%M")} - {booking.waktu_selesai.strftime("%H:%M")})'
+            'message': pesan_bentrok(bentrok),
+            'saran': saran,
         })
     
-    return JsonResponse({'available': True, 'message': 'Waktu tersedia'})
\ No newline at end of file
+    return JsonResponse({'available': True, 'message': 'Waktu tersedia'})
+
+
+@login_required
+@role_required(['HRD', 'Karyawan Tetap'])
+@watermark_etag('booking', per_user=False, periode=LANGKAH_MENIT * 60)
+def find_free_slots(request):
+    """
+    Cari rentang kosong di semua ruang aktif yang cukup untuk rapat selama `durasi` menit.
+
+    Query string:
+        durasi: Lama rapat dalam menit (wajib)
+        tanggal: YYYY-MM-DD (default hari ini)
+        sampai: YYYY-MM-DD, cari sampai tanggal ini (opsional, maks 31 hari)
+        kapasitas: Minimal kapasitas ruang (opsional)
+    """
+    try:
+        durasi = int(request.GET.get('durasi', ''))
+        tanggal = datetime.strptime(request.GET.get('tanggal') or date.today().isoformat(), '%Y-%m-%d').date()
+        sampai_raw = request.GET.get('sampai')
+        sampai = datetime.strptime(sampai_raw, '%Y-%m-%d').date() if sampai_raw else tanggal
+        kapasitas = int(request.GET['kapasitas']) if request.GET.get('kapasitas') else None
+    except ValueError:
+        return JsonResponse({'status': 'error', 'message': 'Parameter durasi/tanggal/kapasitas tidak valid'}, status=400)
+    
+    jam_operasional = (
+        datetime.combine(tanggal, JAM_TUTUP) - datetime.combine(tanggal, JAM_BUKA)
+    ).seconds // 60
+    if not 1 <= durasi <= jam_operasional:
+        return JsonResponse({'status': 'error', 'message': f'Durasi harus 1-{jam_operasional} menit'}, status=400)
+    if sampai < tanggal or (sampai - tanggal).days >= MAKS_HARI_PENCARIAN:
+        return JsonResponse({'status': 'error', 'message': f'Rentang tanggal maksimal {MAKS_HARI_PENCARIAN} hari'}, status=400)
+    
+    slot = cari_slot_kosong(tanggal, durasi, akhir=sampai, min_kapasitas=kapasitas)
+    return JsonResponse({
+        'status': 'success',
+        'durasi': durasi,
+        'slot': [
+            {
+                'ruang_id': s['ruang_id'],
+                'ruang': s['ruang'],
+                'kapasitas': s['kapasitas'],
+                'warna': s['warna'],
+                'tanggal': s['tanggal'].isoformat(),
+                'mulai': s['mulai'].strftime('%H:%M'),
+                'selesai': s['selesai'].strftime('%H:%M'),
+            }
+            for s in slot
+        ],
+    })
@@ -18,6 +18,7 @@ from apps.hrd.utils.jatah_cuti import (
     rapikan_cuti_tahunan,
     pindahkan_cuti_tahunan_ke_tahun_sebelumnya,
 )
+from apps.hrd.utils.saldo_cuti import ubah_status_slot
 from datetime import datetime, timedelta
 from django.http import JsonResponse, HttpResponseForbidden
 from django.utils.dateparse import parse_date
@@ -60,14 +61,12 @@ def input_cuti_bersama_view(request):
                         
                         if detail_list.exists():
                             for detail in detail_list:
-                                detail.dipakai = False
-                                detail.jumlah_hari = 0
-                                detail.keterangan = f'Dikembalikan: {keterangan_dihapus or tanggal_dihapus} (dihapus)'
-                                detail.save()
-                                
-                                jatah_cuti = detail.jatah_cuti
-                                jatah_cuti.sisa_cuti += 1
-                                jatah_cuti.save()
+                                # Slot dikosongkan, sisa cuti +1
+                                ubah_status_slot(
+                                    detail, False,
+                                    jumlah_hari=0,
+                                    keterangan=f'Dikembalikan: {keterangan_dihapus or tanggal_dihapus} (dihapus)',
+                                )
                         else:
                             hitung_jatah_cuti(karyawan, tahun, isi_detail_cuti_bersama=False)
 
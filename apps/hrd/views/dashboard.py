@@ -7,12 +7,14 @@ from apps.absensi.models import Absensi, AbsensiMagang
 from apps.hrd.models import Karyawan, Cuti, Izin, TidakAmbilCuti, CutiBersama
 from datetime import datetime, timedelta
 from django.http import JsonResponse
-from pytanggalmerah import TanggalMerah
+from apps.hrd.utils.tanggal_merah import get_tanggal_merah
 from collections import defaultdict
 from django.core.paginator import Paginator
 import json
 from django.core.serializers.json import DjangoJSONEncoder
 from apps.absensi.utils import validate_user_location
+from apps.hrd.utils.interval_index import LeaveIntervalIndex
+from apps.hrd.utils.etag import HARI, watermark_etag
 
 @login_required
 @role_required(['HRD'])
@@ -68,10 +70,8 @@ def hrd_dashboard(request):
             'berkabung_sedarah', 'berkabung_serumah', 'khitan_anak', 
             'baptis_anak', 'istri_melahirkan'
         ],
-        tanggal_pengajuan__month=bulan_ini,
-        tanggal_pengajuan__year=tahun_ini,
         status='disetujui'
-    ).count()
+    ).for_month(tahun_ini, bulan_ini, field='tanggal_pengajuan').count()
     
     # Hitung total izin WFA (sesuaikan dengan model dan field yang Anda gunakan)
     total_izin_wfa = Izin.objects.filter(jenis_izin__in=['wfa', 'wfh']).count()  # Support both for backward compatibility
@@ -80,10 +80,8 @@ def hrd_dashboard(request):
     total_izin_telat = Izin.objects.filter(jenis_izin__icontains='telat').count()
 
     # Hitung total izin telat bulan ini yang disetujui
-    telat_bulan_ini = Izin.objects.filter(
+    telat_bulan_ini = Izin.objects.for_month(tahun_ini, bulan_ini).filter(
         jenis_izin__icontains='telat',
-        tanggal_izin__month=bulan_ini,
-        tanggal_izin__year=tahun_ini,
         status='disetujui'
     ).count()
 
@@ -102,7 +100,7 @@ def hrd_dashboard(request):
 
     # --------- Top 5 Jenis Cuti ---------
     top_jenis_cuti = (
-        Cuti.objects.filter(tanggal_mulai__year=tahun)
+        Cuti.objects.for_year(tahun)
         .values('jenis_cuti')
         .annotate(total=Count('id'))
         .order_by('-total')[:5]
@@ -111,24 +109,16 @@ def hrd_dashboard(request):
     top_cuti_labels = [item['jenis_cuti'] for item in top_jenis_cuti]
     top_cuti_values = [item['total'] for item in top_jenis_cuti]
 
-    cuti_bulan_ini = Cuti.objects.filter(
-        tanggal_mulai__month=bulan,
-        tanggal_mulai__year=tahun,
-        status='disetujui'
-    ).count()
+    cuti_bulan_ini = Cuti.objects.for_month_or_year(tahun, bulan).filter(status='disetujui').count()
 
-    izin_bulan_ini = Izin.objects.filter(
-        tanggal_izin__month=bulan,
-        tanggal_izin__year=tahun,
-        status='disetujui'
-    ).count()
+    izin_bulan_ini = Izin.objects.for_month_or_year(tahun, bulan).filter(status='disetujui').count()
 
     jumlah_cuti_menunggu = Cuti.objects.filter(status='menunggu').count()
     jumlah_izin_menunggu = Izin.objects.filter(status='menunggu').count()
     jumlah_tidak_ambil_cuti_menunggu = TidakAmbilCuti.objects.filter(status='menunggu').count()
 
     cuti_per_bulan = (
-        Cuti.objects.filter(status='disetujui', tanggal_mulai__year=tahun)
+        Cuti.objects.for_year(tahun).filter(status='disetujui')
         .annotate(bulan=ExtractMonth('tanggal_mulai'))
         .values('bulan')
         .annotate(total=Count('id'))
@@ -136,7 +126,7 @@ def hrd_dashboard(request):
     )
 
     izin_per_bulan = (
-        Izin.objects.filter(status='disetujui', tanggal_izin__year=tahun)
+        Izin.objects.for_year(tahun).filter(status='disetujui')
         .annotate(bulan=ExtractMonth('tanggal_izin'))
         .values('bulan')
         .annotate(total=Count('id'))
@@ -221,22 +211,19 @@ def hrd_dashboard(request):
             continue  # Lewati hari Minggu
 
         try:
-            t = TanggalMerah()
-            t.set_date(str(d.year), f"{d.month:02d}", f"{d.day:02d}")
-            if t.check():
-                events = t.get_event()
-                if events:
-                    for event in events:
-                        # Override khusus 26 Des 2025
-                        summary = event
-                        if d.year == 2025 and d.month == 12 and d.day == 26:
-                            if "Tinju" in event or "Cuti Bersama" in event:
-                                summary = "WFA"
-
-                        libur_terdekat.append({
-                            'summary': summary,
-                            'date': d
-                        })
+            events = get_tanggal_merah(d)
+            if events:
+                for event in events:
+                    # Override khusus 26 Des 2025
+                    summary = event
+                    if d.year == 2025 and d.month == 12 and d.day == 26:
+                        if "Tinju" in event or "Cuti Bersama" in event:
+                            summary = "WFA"
+
+                    libur_terdekat.append({
+                        'summary': summary,
+                        'date': d
+                    })
         except Exception:
             continue
 
@@ -288,6 +275,9 @@ def hrd_dashboard(request):
 
 @login_required
 @role_required(['HRD'])
+# Tidak per user: isi feed sama untuk semua HRD. Membaca cuti/izin disetujui, nama dan
+# ulang tahun Karyawan, CutiBersama, serta WFA dari check-in (AbsensiMagang)
+@watermark_etag('cuti', 'izin', 'karyawan', 'absensi', per_user=False, periode=HARI)
 def calendar_events(request):
     from datetime import date
     WFA_CUTOFF_DATE = date(2026, 1, 30)  # WFA labels only visible from this date onwards (Updated to 30 Jan)
@@ -295,12 +285,12 @@ def calendar_events(request):
     events = []
 
     # Gabungkan cuti berdasarkan tanggal (tampilkan di semua tanggal, selaras dengan karyawan)
-    grouped_cuti = defaultdict(list)
-    for c in Cuti.objects.filter(status='disetujui'):
-        current_date = c.tanggal_mulai
-        while current_date <= c.tanggal_selesai:
-            grouped_cuti[current_date].append(c.id_karyawan.nama)
-            current_date += timedelta(days=1)
+    # Cuti & izin disetujui dimuat sekali (dengan nama karyawan) lewat indeks interval
+    indeks = LeaveIntervalIndex.load(with_nama=True, ringkas=True)
+    grouped_cuti = {
+        tanggal: [c.id_karyawan.nama for c in daftar]
+        for tanggal, daftar in indeks.hari_cuti_per_tanggal().items()
+    }
 
     for date, names in grouped_cuti.items():
         events.append({
@@ -318,7 +308,7 @@ def calendar_events(request):
     grouped_izin_sakit = defaultdict(list)
     grouped_izin_business_trip = defaultdict(list)
 
-    for i in Izin.objects.filter(status='disetujui'):
+    for i in indeks.semua_izin():
         # 1. WFA Filter (with date cutoff)
         if i.jenis_izin.lower() in ['wfa', 'izin wfa']:
             # Only show WFA labels from cutoff date onwards
@@ -446,10 +436,9 @@ def calendar_events(request):
             continue
             
         try:
-            t = TanggalMerah()
-            t.set_date(str(current_date.year), f"{current_date.month:02d}", f"{current_date.day:02d}")
-            if t.check():
-                for event in t.get_event():
+            libur = get_tanggal_merah(current_date)
+            if libur:
+                for event in libur:
                     if event.lower() == 'sunday':
                         continue
 
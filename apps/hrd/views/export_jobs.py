@@ -0,0 +1,52 @@
+"""
+Export Job - minta ekspor Excel di background dan cek statusnya.
+Artefak disimpan di MediaStorage dan dipakai ulang selama data belum berubah.
+"""
+from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+from django.views.decorators.http import require_GET, require_POST
+from apps.hrd.models import ExportJob
+from apps.hrd.utils.export_jobs import (
+    EXPORT_REGISTRY,
+    can_request_export,
+    normalize_params,
+    request_export,
+    serialize_export_job,
+)
+
+
+@login_required
+@require_POST
+def request_export_job(request):
+    """
+    POST export=<nama ekspor> + filter yang sama dengan view ekspor sinkron.
+    Mengembalikan job id; bila artefak untuk filter & data yang sama sudah ada,
+    langsung mengembalikan URL-nya.
+    """
+    export_name = request.POST.get('export', '')
+    if export_name not in EXPORT_REGISTRY:
+        return JsonResponse({'status': 'error', 'message': 'Jenis ekspor tidak dikenal'}, status=400)
+    if not can_request_export(request.user, export_name):
+        return JsonResponse({'status': 'error', 'message': 'Forbidden'}, status=403)
+
+    job = request_export(export_name, normalize_params(request.POST), request.user)
+    return JsonResponse({'status': 'success', 'data': serialize_export_job(job)})
+
+
+@login_required
+@require_GET
+def export_job_status(request, job_id):
+    """Status job ekspor; field url berisi presigned URL bila sudah selesai."""
+    job = get_object_or_404(ExportJob, pk=job_id)
+    entry = EXPORT_REGISTRY.get(job.export_name, {})
+
+    # Ekspor per user hanya boleh dilihat pemiliknya; ekspor bersama cukup cek role
+    if entry.get('per_user'):
+        allowed = job.requested_by_id == request.user.pk
+    else:
+        allowed = can_request_export(request.user, job.export_name)
+    if not allowed:
+        return JsonResponse({'status': 'error', 'message': 'Forbidden'}, status=403)
+
+    return JsonResponse({'status': 'success', 'data': serialize_export_job(job)})
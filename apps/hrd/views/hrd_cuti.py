@@ -3,7 +3,7 @@ from django.contrib.auth.decorators import login_required
 from django.core.paginator import Paginator
 from django.contrib import messages
 from django.http import HttpResponse
-from apps.hrd.models import Cuti, TidakAmbilCuti, JatahCuti, DetailJatahCuti
+from apps.hrd.models import Cuti, TidakAmbilCuti, JatahCuti
 from apps.hrd.utils.jatah_cuti import (
     isi_cuti_tahunan,
     kembalikan_jatah_tidak_ambil_cuti,
@@ -11,10 +11,16 @@ from apps.hrd.utils.jatah_cuti import (
     validasi_cuti_dua_tahun,
     isi_cuti_tahunan_dua_tahun,
 )
+from apps.hrd.utils.approval_cuti import (
+    AKSI_APPROVAL,
+    DIPROSES,
+    SUDAH_DIPROSES,
+    file_persetujuan_dipakai_bersama,
+    proses_approval_cuti_massal,
+)
 from apps.hrd.forms import CutiHRForm
 from notifications.signals import notify
-import openpyxl
-from collections import defaultdict
+from apps.utils.excel_export import export_response, DEFAULT_CHUNK_SIZE
 
 @login_required
 def approval_cuti_view(request):
@@ -31,110 +37,35 @@ def approval_cuti_view(request):
         alasan_ditolak = request.POST.get('alasan_ditolak', '').strip()
 
         if jenis == 'cuti':
-            cuti_id = request.POST.get('cuti_id')
-            cuti = get_object_or_404(Cuti, id=cuti_id)
-
-            if aksi in ['disetujui', 'ditolak']:
-                cuti.status = aksi
-                cuti.approval = request.user
-
-                # Variabel untuk menyimpan informasi notifikasi
-                notification_description = f"Pengajuan cuti Anda untuk tanggal {cuti.tanggal_mulai} sampai {cuti.tanggal_selesai} telah {aksi}"
-                
-                if aksi == 'disetujui' and cuti.jenis_cuti == 'tahunan':
-                    # Tambahkan informasi detail tentang sisa cuti dan cuti yang dipotong
-                    tahun_sekarang = cuti.tanggal_mulai.year
-                    tahun_sebelumnya = tahun_sekarang - 1
-                    
-                    # Dapatkan informasi sisa cuti per tahun setelah cuti disetujui
-                    jatah_cuti_list = JatahCuti.objects.filter(
-                        karyawan=cuti.id_karyawan, 
-                        tahun__in=[tahun_sebelumnya, tahun_sekarang]
-                    ).order_by('tahun')
-                    
-                    # Hitung jumlah cuti yang dipotong per tahun
-                    cuti_dipotong = defaultdict(int)
-                    detail_cuti = DetailJatahCuti.objects.filter(
-                        jatah_cuti__karyawan=cuti.id_karyawan,
-                        dipakai=True,
-                        keterangan__icontains=f'Cuti Tahunan: {cuti.tanggal_mulai} - {cuti.tanggal_selesai}'
-                    )
-                    
-                    for detail in detail_cuti:
-                        cuti_dipotong[detail.tahun] += 1
-                    
-                    # Tambahkan informasi sisa cuti per tahun
-                    notification_description += "\n\n✔️ Pengajuan cuti disetujui!\n"
-                    
-                    # Tambahkan informasi sisa cuti per tahun
-                    for jc in jatah_cuti_list:
-                        notification_description += f"- Sisa cuti tahun {jc.tahun}: {jc.sisa_cuti} hari\n"
-                    
-                    # Tambahkan informasi cuti yang dipotong per tahun
-                    if cuti_dipotong:
-                        notification_description += "- Cuti dipotong:\n"
-                        for tahun, jumlah in cuti_dipotong.items():
-                            notification_description += f"   • Tahun {tahun}: {jumlah} hari\n"
-
-                # Kirim notifikasi ke karyawan
-                notify.send(
-                    sender=request.user,
-                    recipient=cuti.id_karyawan.user,
-                    verb=f"cuti {aksi}",
-                    description=notification_description,
-                    target=cuti,
-                    data={"url": "/karyawan/pengajuan-cuti/"}
+            # Bulk approve mengirim cuti_ids; form per baris mengirim cuti_id
+            cuti_ids = request.POST.getlist('cuti_ids') or [request.POST.get('cuti_id')]
+
+            if aksi in AKSI_APPROVAL:
+                hasil_list = proses_approval_cuti_massal(
+                    cuti_ids,
+                    aksi,
+                    request.user,
+                    alasan_ditolak=alasan_ditolak,
+                    file_persetujuan=request.FILES.get('file_persetujuan'),
                 )
-
-                if aksi == 'ditolak':
-                    cuti.feedback_hr = alasan_ditolak or "Tidak ada alasan diberikan."
-
-                file_persetujuan = request.FILES.get('file_persetujuan')
-                if file_persetujuan:
-                    cuti.file_persetujuan = file_persetujuan
-
-                if aksi == 'disetujui' and cuti.jenis_cuti == 'tahunan':
-                    tahun = cuti.tanggal_mulai.year
-                    jumlah_hari = (cuti.tanggal_selesai - cuti.tanggal_mulai).days + 1
-                    
-                    # Flag untuk mencegah pengisian slot ganda
-                    slot_sudah_diisi = False
-
-                    if cuti.id_karyawan.user.role in ['HRD', 'Karyawan Tetap']:
-                        # Validasi cuti dengan sistem 2 tahun (sekarang + sebelumnya)
-                        is_valid, error_message, detail_sisa = validasi_cuti_dua_tahun(
-                            cuti.id_karyawan, jumlah_hari, tahun
-                        )
-                        
-                        # Hapus validasi yang menolak cuti jika saldo tidak mencukupi
-                        # Hanya tampilkan pesan informasi tentang saldo cuti
-                        if not is_valid:
-                            messages.info(request, f"Info: Saldo cuti {cuti.id_karyawan.nama} tidak mencukupi. {error_message} Namun pengajuan tetap diproses.")
-                        
-                        # Isi cuti tahunan dengan sistem 2 tahun dan cek hasilnya
-                        # Tambahkan parameter allow_minus=True untuk memperbolehkan saldo minus
-                        if not isi_cuti_tahunan_dua_tahun(cuti.id_karyawan, cuti.tanggal_mulai, cuti.tanggal_selesai, allow_minus=True):
-                            messages.info(request, f"Info: Saldo cuti {cuti.id_karyawan.nama} tidak mencukupi, namun pengajuan tetap diproses.")
-                        
-                        # Set flag bahwa slot sudah diisi
-                        slot_sudah_diisi = True
-                        
-                    jatah_cuti = JatahCuti.objects.filter(karyawan=cuti.id_karyawan, tahun=tahun).first()
-                    
-                    # Hapus validasi yang menolak cuti jika saldo tidak mencukupi
-                    # Hanya tampilkan pesan informasi tentang saldo cuti
-                    if jatah_cuti and jatah_cuti.sisa_cuti < jumlah_hari:
-                        messages.info(request, f"Info: Saldo cuti {cuti.id_karyawan.nama} tidak mencukupi. Sisa cuti: {jatah_cuti.sisa_cuti} hari, yang diajukan: {jumlah_hari} hari. Namun pengajuan tetap diproses.")
-                    
-                    # Isi cuti tahunan hanya jika belum diisi sebelumnya
-                    if not slot_sudah_diisi:
-                        # Tambahkan parameter allow_minus=True untuk memperbolehkan saldo minus
-                        if not isi_cuti_tahunan(cuti.id_karyawan, cuti.tanggal_mulai, cuti.tanggal_selesai, allow_minus=True):
-                            messages.info(request, f"Info: Saldo cuti {cuti.id_karyawan.nama} tidak mencukupi, namun pengajuan tetap diproses.")
-                            return redirect('approval_cuti')
-
-                cuti.save()
-                messages.success(request, f"Pengajuan cuti berhasil {aksi}.")
+                if not hasil_list:
+                    messages.error(request, "Tidak ada pengajuan cuti yang dipilih.")
+
+                berhasil = 0
+                for hasil in hasil_list:
+                    for info in hasil['info']:
+                        messages.info(request, info)
+                    if hasil['status'] == DIPROSES:
+                        berhasil += 1
+                    elif hasil['status'] == SUDAH_DIPROSES:
+                        messages.warning(request, hasil['pesan'])
+                    else:
+                        messages.error(request, hasil['pesan'])
+
+                if berhasil == 1 and len(hasil_list) == 1:
+                    messages.success(request, f"Pengajuan cuti berhasil {aksi}.")
+                elif berhasil:
+                    messages.success(request, f"{berhasil} pengajuan cuti berhasil {aksi}.")
 
         elif jenis == 'tidak_ambil':
             tidak_ambil_id = request.POST.get('tidak_ambil_id')
@@ -186,7 +117,7 @@ def approval_cuti_view(request):
     if keyword:
         riwayat_cuti_list = riwayat_cuti_list.filter(id_karyawan__nama__icontains=keyword)
     if tahun:
-        riwayat_cuti_list = riwayat_cuti_list.filter(tanggal_mulai__year=tahun)
+        riwayat_cuti_list = riwayat_cuti_list.for_year(tahun)
     if status:
         riwayat_cuti_list = riwayat_cuti_list.filter(status=status)
     if tanggal_mulai:
@@ -202,7 +133,7 @@ def approval_cuti_view(request):
     if keyword:
         riwayat_tidak_ambil_list = riwayat_tidak_ambil_list.filter(id_karyawan__nama__icontains=keyword)
     if tahun:
-        riwayat_tidak_ambil_list = riwayat_tidak_ambil_list.filter(tanggal_pengajuan__year=tahun)
+        riwayat_tidak_ambil_list = riwayat_tidak_ambil_list.for_year(tahun)
     if status:
         riwayat_tidak_ambil_list = riwayat_tidak_ambil_list.filter(status=status)
     if tanggal_mulai:
@@ -329,19 +260,14 @@ def export_riwayat_cuti_excel(request):
     tanggal_mulai = request.GET.get('tanggal_mulai')
     tanggal_selesai = request.GET.get('tanggal_selesai')
 
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    
     if tab == 'tidak_ambil':
         # Export riwayat tidak ambil cuti
-        ws.title = "Riwayat Tidak Ambil Cuti"
-        
         riwayat = TidakAmbilCuti.objects.exclude(status='menunggu').order_by('-tanggal_pengajuan')
         
         if keyword:
             riwayat = riwayat.filter(id_karyawan__nama__icontains=keyword)
         if tahun:
-            riwayat = riwayat.filter(tanggal_pengajuan__year=tahun)
+            riwayat = riwayat.for_year(tahun)
         if status:
             riwayat = riwayat.filter(status=status)
         if tanggal_mulai:
@@ -349,31 +275,32 @@ def export_riwayat_cuti_excel(request):
         if tanggal_selesai:
             riwayat = riwayat.filter(tanggal_pengajuan__lte=tanggal_selesai)
 
-        ws.append(["Nama", "Tanggal Pengajuan", "Tanggal Cuti Bersama", "Alasan", "Scenario", "Status", "Disetujui Oleh"])
+        # Relasi diambil sekaligus agar tidak ada query per baris
+        riwayat = riwayat.select_related('id_karyawan', 'approval').prefetch_related('tanggal')
 
-        for r in riwayat:
-            tanggal_cuti_str = ", ".join([f"{t.tanggal.strftime('%Y-%m-%d')} ({t.keterangan})" for t in r.tanggal.all()])
-            ws.append([
+        headers = ["Nama", "Tanggal Pengajuan", "Tanggal Cuti Bersama", "Alasan", "Scenario", "Status", "Disetujui Oleh"]
+        rows = (
+            [
                 r.id_karyawan.nama,
                 r.tanggal_pengajuan.strftime('%Y-%m-%d'),
-                tanggal_cuti_str,
+                ", ".join([f"{t.tanggal.strftime('%Y-%m-%d')} ({t.keterangan})" for t in r.tanggal.all()]),
                 r.alasan,
                 r.get_scenario_display() if r.scenario else '-',
                 r.status,
                 r.approval.get_full_name() if r.approval else '-'
-            ])
-        
+            ]
+            for r in riwayat
+        )
+        title = "Riwayat Tidak Ambil Cuti"
         filename = 'riwayat_tidak_ambil_cuti.xlsx'
     else:
         # Export riwayat cuti (default)
-        ws.title = "Riwayat Cuti"
-        
         riwayat = Cuti.objects.exclude(status='menunggu').order_by('-created_at')
 
         if keyword:
             riwayat = riwayat.filter(id_karyawan__nama__icontains=keyword)
         if tahun:
-            riwayat = riwayat.filter(tanggal_mulai__year=tahun)
+            riwayat = riwayat.for_year(tahun)
         if status:
             riwayat = riwayat.filter(status=status)
         if tanggal_mulai:
@@ -381,24 +308,27 @@ def export_riwayat_cuti_excel(request):
         if tanggal_selesai:
             riwayat = riwayat.filter(tanggal_selesai__lte=tanggal_selesai)
 
-        ws.append(["Nama", "Jenis Cuti", "Tanggal Mulai", "Tanggal Selesai", "Status", "Disetujui Oleh"])
-
-        for r in riwayat:
-            ws.append([
-                r.id_karyawan.nama,
-                r.get_jenis_cuti_display(),
-                r.tanggal_mulai.strftime('%Y-%m-%d'),
-                r.tanggal_selesai.strftime('%Y-%m-%d'),
-                r.status,
-                r.approval.get_full_name() if r.approval else '-'
-            ])
-        
+        jenis_cuti_map = dict(Cuti.JENIS_CUTI_CHOICES)
+        headers = ["Nama", "Jenis Cuti", "Tanggal Mulai", "Tanggal Selesai", "Status", "Disetujui Oleh"]
+        rows = (
+            [
+                r['id_karyawan__nama'],
+                jenis_cuti_map.get(r['jenis_cuti'], r['jenis_cuti']),
+                r['tanggal_mulai'].strftime('%Y-%m-%d'),
+                r['tanggal_selesai'].strftime('%Y-%m-%d'),
+                r['status'],
+                # Sama dengan User.get_full_name()
+                f"{r['approval__first_name']} {r['approval__last_name']}".strip() if r['approval_id'] else '-'
+            ]
+            for r in riwayat.values(
+                'id_karyawan__nama', 'jenis_cuti', 'tanggal_mulai', 'tanggal_selesai', 'status',
+                'approval_id', 'approval__first_name', 'approval__last_name',
+            ).iterator(chunk_size=DEFAULT_CHUNK_SIZE)
+        )
+        title = "Riwayat Cuti"
         filename = 'riwayat_cuti.xlsx'
 
-    response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-    response['Content-Disposition'] = f'attachment; filename={filename}'
-    wb.save(response)
-    return response
+    return export_response(filename, title, headers, rows, styled=False)
 
 
 @login_required
@@ -415,7 +345,7 @@ def hapus_cuti(request, cuti_id):
     # Hapus file terkait jika ada
     if cuti.file_pengajuan:
         cuti.file_pengajuan.delete()
-    if cuti.file_persetujuan:
+    if cuti.file_persetujuan and not file_persetujuan_dipakai_bersama(cuti):
         cuti.file_persetujuan.delete()
     if cuti.file_dokumen_formal:
         cuti.file_dokumen_formal.delete()
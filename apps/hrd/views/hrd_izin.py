@@ -32,7 +32,7 @@ def approval_izin_view(request):
     if keyword:
         riwayat_izin = riwayat_izin.filter(id_karyawan__nama__icontains=keyword)
     if tahun:
-        riwayat_izin = riwayat_izin.filter(tanggal_izin__year=tahun)
+        riwayat_izin = riwayat_izin.for_year(tahun)
 
     riwayat_izin = riwayat_izin.order_by('-tanggal_pengajuan')
     
@@ -152,7 +152,7 @@ def export_riwayat_izin_excel(request):
     if keyword:
         riwayat = riwayat.filter(id_karyawan__nama__icontains=keyword)
     if tahun:
-        riwayat = riwayat.filter(tanggal_izin__year=tahun)
+        riwayat = riwayat.for_year(tahun)
 
     wb = openpyxl.Workbook()
     ws = wb.active
@@ -0,0 +1,26 @@
+"""
+Metrik request per nama URL (jumlah query, query duplikat, waktu DB/total,
+ukuran response). Hanya untuk staff. Angka bersifat per proses worker.
+"""
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import JsonResponse
+from django.views.decorators.http import require_GET, require_POST
+from apps.hrd.utils.instrumentation import get_request_stats, reset_request_stats
+
+
+@staff_member_required
+@require_GET
+def request_metrics(request):
+    """GET ?url_name=... untuk menyaring satu view."""
+    rows = get_request_stats()
+    url_name = request.GET.get('url_name')
+    if url_name:
+        rows = [r for r in rows if r['url_name'] == url_name]
+    return JsonResponse({'status': 'success', 'data': rows})
+
+
+@staff_member_required
+@require_POST
+def reset_request_metrics(request):
+    reset_request_stats()
+    return JsonResponse({'status': 'success', 'message': 'Metrik direset'})
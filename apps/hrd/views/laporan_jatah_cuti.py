@@ -14,8 +14,7 @@ from apps.hrd.utils.jatah_cuti import (
 )
 from django.db.models import Q
 import calendar
-import openpyxl
-from openpyxl.styles import Alignment, PatternFill, Border, Side, Font
+from apps.utils.excel_export import export_response, Styled, STYLE_CENTER, STYLE_EXPIRED, STYLE_USED
 from datetime import datetime, timedelta
 from django.core.paginator import Paginator
 import json
@@ -114,92 +113,44 @@ def export_laporan_jatah_cuti_excel(request):
     if nama and not karyawan_id:
         laporan_data = []
     
-    # Buat workbook Excel
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = f"Laporan Jatah Cuti {tahun}"
-    
-    # Styling
-    header_fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
-    header_font = Font(color="FFFFFF", bold=True)
-    expired_fill = PatternFill(start_color="FFC7CE", end_color="FFC7CE", fill_type="solid")
-    used_fill = PatternFill(start_color="C6EFCE", end_color="C6EFCE", fill_type="solid")
-    border = Border(
-        left=Side(style='thin'), 
-        right=Side(style='thin'), 
-        top=Side(style='thin'), 
-        bottom=Side(style='thin')
-    )
-    
     # Header
     headers = ["No", "Nama Lengkap", "Januari", "Februari", "Maret", "April", "Mei", "Juni", 
               "Juli", "Agustus", "September", "Oktober", "November", "Desember", "Saldo Cuti"]
     
-    for col_num, header in enumerate(headers, 1):
-        cell = ws.cell(row=1, column=col_num, value=header)
-        cell.fill = header_fill
-        cell.font = header_font
-        cell.border = border
-        cell.alignment = Alignment(horizontal='center')
-    
-    # Data
-    row_num = 2
-    
-    for idx, data in enumerate(laporan_data, 1):
-        karyawan = data['karyawan']
-        bulan_data = data['bulan_data']
-        sisa_cuti = data['sisa_cuti']
-        
-        # Tambahkan data ke Excel
-        row = [idx, karyawan.nama]
-        
-        # Tambahkan data bulan
-        for bulan_info in bulan_data:
-            if bulan_info['dipakai']:
-                # Ambil tanggal dari keterangan jika ada
-                tanggal = bulan_info['keterangan'].split(': ')[-1] if ': ' in bulan_info['keterangan'] else ''
-                row.append(tanggal)
-            else:
-                row.append('')
-        
-        # Tambahkan sisa cuti
-        row.append(sisa_cuti)
-        
-        # Tulis ke Excel
-        for col_num, value in enumerate(row, 1):
-            cell = ws.cell(row=row_num, column=col_num, value=value)
-            cell.border = border
+    def generate_rows():
+        for idx, data in enumerate(laporan_data, 1):
+            row = [idx, data['karyawan'].nama]
             
-            # Styling untuk bulan
-            if 2 < col_num < len(headers):
-                cell.alignment = Alignment(horizontal='center')
+            # Tambahkan data bulan
+            for bulan_info in data['bulan_data']:
+                tanggal = ''
+                if bulan_info['dipakai']:
+                    # Ambil tanggal dari keterangan jika ada
+                    tanggal = bulan_info['keterangan'].split(': ')[-1] if ': ' in bulan_info['keterangan'] else ''
                 
-                # Jika bulan dipakai, beri warna hijau
-                if bulan_data[col_num-3]['dipakai']:
-                    cell.fill = used_fill
-                
-                # Jika bulan expired, beri warna merah
-                if bulan_data[col_num-3]['expired']:
-                    cell.fill = expired_fill
-        
-        row_num += 1
-    
-    # Atur lebar kolom
-    for col_num in range(1, len(headers) + 1):
-        if col_num == 2:  # Kolom nama
-            ws.column_dimensions[openpyxl.utils.get_column_letter(col_num)].width = 30
-        else:
-            ws.column_dimensions[openpyxl.utils.get_column_letter(col_num)].width = 15
-    
-    # Freeze panes
-    ws.freeze_panes = 'C2'
-    
-    # Buat response
-    response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-    response['Content-Disposition'] = f'attachment; filename=laporan_jatah_cuti_{tahun}.xlsx'
-    wb.save(response)
-    
-    return response
+                # Merah jika bulan expired, hijau jika bulan dipakai
+                if bulan_info['expired']:
+                    row.append(Styled(tanggal, STYLE_EXPIRED))
+                elif bulan_info['dipakai']:
+                    row.append(Styled(tanggal, STYLE_USED))
+                else:
+                    row.append(Styled(tanggal, STYLE_CENTER))
+            
+            # Tambahkan sisa cuti
+            row.append(data['sisa_cuti'])
+            yield row
+    
+    # Lebar kolom tetap: nama 30, sisanya 15
+    widths = {col_num: 30 if col_num == 2 else 15 for col_num in range(1, len(headers) + 1)}
+    
+    return export_response(
+        f'laporan_jatah_cuti_{tahun}.xlsx',
+        f"Laporan Jatah Cuti {tahun}",
+        headers,
+        generate_rows(),
+        widths=widths,
+        freeze_panes='C2',
+    )
 
 
 @login_required
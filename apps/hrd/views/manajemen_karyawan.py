@@ -10,10 +10,8 @@ from ..forms import KaryawanForm
 from apps.authentication.models import User
 from apps.hrd.utils.jatah_cuti import hitung_jatah_cuti
 from apps.hrd.utils.generate_password import generate_default_password
-import pandas as pd
-import json
-import os
-from django.conf import settings
+from apps.hrd.utils.wilayah import get_provinsi_nama, get_kabupaten_nama
+from apps.utils.excel_export import export_response, DEFAULT_CHUNK_SIZE
 
 @login_required
 def list_karyawan(request):
@@ -92,28 +90,17 @@ def list_karyawan(request):
     if not selected_columns:
         selected_columns = [col[0] for col in available_columns]
 
-    request.session['selected_columns'] = selected_columns
-
-    # Tambahkan nama kabupaten/kota ke setiap karyawan
-    for karyawan in karyawan_list:
-        if karyawan.provinsi and karyawan.kabupaten_kota:
-            try:
-                # Path ke file JSON kabupaten/kota
-                kab_file_path = os.path.join(settings.BASE_DIR, 'apps', 'static', 'assets', 'data_wilayah_indo', 'kabupaten_kota', f'kab-{karyawan.provinsi}.json')
-                
-                # Baca file JSON
-                if os.path.exists(kab_file_path):
-                    with open(kab_file_path, 'r', encoding='utf-8') as f:
-                        kabupaten_data = json.load(f)
-                    
-                    # Tambahkan nama kabupaten/kota ke objek karyawan
-                    karyawan.kabupaten_kota_nama = kabupaten_data.get(karyawan.kabupaten_kota, karyawan.kabupaten_kota)
-            except Exception as e:
-                print(f"Error loading kabupaten data: {e}")
-    
+    if request.session.get('selected_columns') != selected_columns:
+        request.session['selected_columns'] = selected_columns
+
     paginator = Paginator(karyawan_list, 10)
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
+
+    # Nama provinsi & kabupaten/kota hanya untuk baris di halaman ini
+    for karyawan in page_obj:
+        karyawan.provinsi_nama = get_provinsi_nama(karyawan.provinsi, default='')
+        karyawan.kabupaten_kota_nama = get_kabupaten_nama(karyawan.provinsi, karyawan.kabupaten_kota, default='')
     
     # Update context
     context = {
@@ -260,67 +247,54 @@ def download_karyawan_excel(request):
 
         filters &= divisi_q
 
-    karyawan_queryset = Karyawan.objects.select_related('user').filter(filters)
-    
-    data_list = []
-    for k in karyawan_queryset:
-        # Map divisi to display value
-        if k.divisi in ['Consulting', None, '', '  ']:
-            divisi_display = 'Consulting'
-        elif k.divisi in ['Research and Innovation', 'Rinov']:
-            divisi_display = 'Research and Innovation'
-        elif k.divisi in ['CPEBR', 'Basic Research']:
-            divisi_display = 'CPEBR'
-        else:
-            divisi_display = k.divisi or 'Consulting'
-        
-        jenis_kelamin_map = dict(Karyawan.JENIS_KELAMIN_CHOICES)
-        jenis_kelamin_display = jenis_kelamin_map.get(k.jenis_kelamin, k.jenis_kelamin or '-')
-        
-        role_display = 'Full-Time' if k.user.role == 'Karyawan Tetap' else k.user.role
-        
-        provinsi_display = '-'
-        if k.provinsi:
-            for prov_code, prov_name in Karyawan.PROVINSI_CHOICES:
-                if prov_code == k.provinsi:
-                    provinsi_display = prov_name
-                    break
-        
-        kabupaten_display = '-'
-        if k.provinsi and k.kabupaten_kota:
-            try:
-                kab_file_path = os.path.join(settings.BASE_DIR, 'apps', 'static', 'assets', 'data_wilayah_indo', 'kabupaten_kota', f'kab-{k.provinsi}.json')
-                if os.path.exists(kab_file_path):
-                    with open(kab_file_path, 'r', encoding='utf-8') as f:
-                        kabupaten_data = json.load(f)
-                    kabupaten_display = kabupaten_data.get(k.kabupaten_kota, k.kabupaten_kota)
-            except Exception as e:
-                print(f"Error loading kabupaten data: {e}")
-                kabupaten_display = k.kabupaten_kota or '-'
-        
-        data_list.append({
-            'Nama': k.nama or '-',
-            'Nama Sesuai Catatan Kehadiran': k.nama_catatan_kehadiran or '-',
-            'Email': k.user.email or '-',
-            'Jenis Kelamin': jenis_kelamin_display,
-            'Jabatan': k.jabatan or '-',
-            'Divisi': divisi_display,
-            'Tanggal Lahir': k.tanggal_lahir.strftime('%d-%m-%Y') if k.tanggal_lahir else '-',
-            'Status Perkawinan': k.status or '-',
-            'Status Keaktifan': k.status_keaktifan or '-',
-            'Role': role_display,
-            'Provinsi': provinsi_display,
-            'Kabupaten/Kota': kabupaten_display,
-            'Alamat': k.alamat or '-',
-            'Mulai Kontrak': k.mulai_kontrak.strftime('%d-%m-%Y') if k.mulai_kontrak else '-',
-            'Batas Kontrak': k.batas_kontrak.strftime('%d-%m-%Y') if k.batas_kontrak else '-',
-            'No Telepon': k.no_telepon or '-',
-        })
-    
-    df = pd.DataFrame(data_list)
-
-    response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-    response['Content-Disposition'] = 'attachment; filename="data_karyawan.xlsx"'
-    with pd.ExcelWriter(response, engine='openpyxl') as writer:
-        df.to_excel(writer, index=False, sheet_name='Data Karyawan')
-    return response
\ No newline at end of file
+    karyawan_queryset = Karyawan.objects.filter(filters).order_by('nama')
+
+    jenis_kelamin_map = dict(Karyawan.JENIS_KELAMIN_CHOICES)
+    def format_tanggal(value):
+        return value.strftime('%d-%m-%Y') if value else '-'
+
+    def generate_rows():
+        for k in karyawan_queryset.values(
+            'nama', 'nama_catatan_kehadiran', 'user__email', 'user__role', 'jenis_kelamin',
+            'jabatan', 'divisi', 'tanggal_lahir', 'status', 'status_keaktifan', 'provinsi',
+            'kabupaten_kota', 'alamat', 'mulai_kontrak', 'batas_kontrak', 'no_telepon',
+        ).iterator(chunk_size=DEFAULT_CHUNK_SIZE):
+            # Map divisi to display value
+            divisi = k['divisi']
+            if divisi in ['Consulting', None, '', '  ']:
+                divisi_display = 'Consulting'
+            elif divisi in ['Research and Innovation', 'Rinov']:
+                divisi_display = 'Research and Innovation'
+            elif divisi in ['CPEBR', 'Basic Research']:
+                divisi_display = 'CPEBR'
+            else:
+                divisi_display = divisi or 'Consulting'
+
+            role = k['user__role']
+            role_display = 'Full-Time' if role == 'Karyawan Tetap' else role
+
+            yield [
+                k['nama'] or '-',
+                k['nama_catatan_kehadiran'] or '-',
+                k['user__email'] or '-',
+                jenis_kelamin_map.get(k['jenis_kelamin'], k['jenis_kelamin'] or '-'),
+                k['jabatan'] or '-',
+                divisi_display,
+                format_tanggal(k['tanggal_lahir']),
+                k['status'] or '-',
+                k['status_keaktifan'] or '-',
+                role_display,
+                get_provinsi_nama(k['provinsi']),
+                get_kabupaten_nama(k['provinsi'], k['kabupaten_kota']),
+                k['alamat'] or '-',
+                format_tanggal(k['mulai_kontrak']),
+                format_tanggal(k['batas_kontrak']),
+                k['no_telepon'] or '-',
+            ]
+
+    headers = [
+        'Nama', 'Nama Sesuai Catatan Kehadiran', 'Email', 'Jenis Kelamin', 'Jabatan', 'Divisi',
+        'Tanggal Lahir', 'Status Perkawinan', 'Status Keaktifan', 'Role', 'Provinsi',
+        'Kabupaten/Kota', 'Alamat', 'Mulai Kontrak', 'Batas Kontrak', 'No Telepon',
+    ]
+    return export_response('data_karyawan.xlsx', 'Data Karyawan', headers, generate_rows())
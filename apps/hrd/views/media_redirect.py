@@ -0,0 +1,19 @@
+"""
+Media Redirect - arahkan ke presigned URL lampiran hanya saat link diklik.
+"""
+from django.contrib.auth.decorators import login_required
+from django.http import Http404
+from django.shortcuts import redirect
+from django.views.decorators.cache import never_cache
+from django.views.decorators.http import require_GET
+from apps.hrd.utils.media_links import get_media_file
+
+
+@login_required
+@require_GET
+@never_cache
+def media_redirect(request, jenis, pk):
+    file = get_media_file(jenis, pk, request.user)
+    if file is None:
+        raise Http404
+    return redirect(file.url)
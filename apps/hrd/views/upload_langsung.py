@@ -0,0 +1,48 @@
+"""
+Upload Langsung - terbitkan presigned POST agar browser mengunggah lampiran
+langsung ke bucket, plus endpoint stand-in untuk storage non-S3 (lokal/dev).
+"""
+from django.contrib.auth.decorators import login_required
+from django.core.exceptions import ValidationError
+from django.core.files.storage import default_storage
+from django.http import Http404, HttpResponse, JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+from apps.hrd.utils.upload_langsung import is_s3_storage, buat_upload, simpan_standin, upload_langsung_aktif
+
+
+@login_required
+@require_POST
+def presign_upload(request):
+    """
+    POST jenis, nama_file, ukuran. Mengembalikan key serta url + fields untuk
+    POST multipart langsung ke bucket (file harus field terakhir).
+    """
+    if not upload_langsung_aktif():
+        return JsonResponse({'status': 'error', 'message': 'Upload langsung tidak aktif'}, status=404)
+    try:
+        data = buat_upload(
+            request.user,
+            request.POST.get('jenis', ''),
+            request.POST.get('nama_file', ''),
+            request.POST.get('ukuran'),
+        )
+    except ValidationError as e:
+        return JsonResponse({'status': 'error', 'message': e.messages[0]}, status=400)
+    return JsonResponse({'status': 'success', **data})
+
+
+@csrf_exempt
+@require_POST
+def standin_upload(request):
+    """
+    Pengganti endpoint bucket saat storage bukan S3. Diautentikasi lewat token
+    bertanda tangan dari presign (seperti policy presigned POST), bukan session.
+    """
+    if is_s3_storage(default_storage):
+        raise Http404
+    try:
+        simpan_standin(request.POST.get('token', ''), request.FILES.get('file'))
+    except ValidationError as e:
+        return JsonResponse({'status': 'error', 'message': e.messages[0]}, status=400)
+    return HttpResponse(status=204)
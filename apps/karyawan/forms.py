@@ -1,10 +1,13 @@
 from django import forms
 from apps.hrd.models import TidakAmbilCuti, CutiBersama, Cuti, Izin, JatahCuti
 from apps.utils.validators import validate_file_size, validate_file_extension
+from apps.hrd.utils.upload_langsung import UploadLangsungFormMixin
 from django.core.exceptions import ValidationError
 from datetime import datetime
 
-class TidakAmbilCutiForm(forms.ModelForm):
+class TidakAmbilCutiForm(UploadLangsungFormMixin, forms.ModelForm):
+    direct_upload_fields = {'file_pengajuan': 'tidak_ambil_cuti'}
+
     tanggal = forms.ModelMultipleChoiceField(
         queryset=CutiBersama.objects.none(),  # Diubah menjadi none() agar bisa diisi di __init__
         widget=forms.CheckboxSelectMultiple(attrs={
@@ -30,7 +33,7 @@ class TidakAmbilCutiForm(forms.ModelForm):
         # Set queryset untuk tanggal berdasarkan tahun saat ini (hanya jenis 'Cuti Bersama')
         from datetime import datetime
         tahun_sekarang = datetime.now().year
-        self.fields['tanggal'].queryset = CutiBersama.objects.filter(tanggal__year=tahun_sekarang, jenis='Cuti Bersama')
+        self.fields['tanggal'].queryset = CutiBersama.objects.for_year(tahun_sekarang).filter(jenis='Cuti Bersama')
         self.fields['file_pengajuan'].required = True
         self.fields['alasan'].label = 'Job Desc'
         self.fields['file_pengajuan'].label = 'Upload Bukti SS Ke Atasan Langsung'
@@ -43,7 +46,9 @@ class TidakAmbilCutiForm(forms.ModelForm):
             validate_file_extension(file)
         return file
 
-class CutiForm(forms.ModelForm):
+class CutiForm(UploadLangsungFormMixin, forms.ModelForm):
+    direct_upload_fields = {'file_pengajuan': 'cuti', 'file_dokumen_formal': 'cuti_formal'}
+
     class Meta:
         model = Cuti
         fields = ['jenis_cuti', 'tanggal_mulai', 'tanggal_selesai', 'file_pengajuan', 'file_dokumen_formal']
@@ -161,7 +166,9 @@ class CutiForm(forms.ModelForm):
         
         return cleaned_data
 
-class IzinForm(forms.ModelForm):
+class IzinForm(UploadLangsungFormMixin, forms.ModelForm):
+    direct_upload_fields = {'file_pengajuan': 'izin'}
+
     konfirmasi_isi_form_lembur = forms.BooleanField(
         required=False,
         label='Saya sudah mengisi form klaim lembur di link tersebut',
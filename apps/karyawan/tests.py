@@ -1,3 +1,106 @@
+from datetime import date
+
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from apps.hrd.models import Cuti, CutiBersama, Izin
+from apps.hrd.tests import QueryBudgetTestMixin, buat_karyawan
+
+
+def rencana_query(qs):
+    """Hasil EXPLAIN; di PostgreSQL seq scan dimatikan agar tabel test kecil tetap memakai index."""
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+    return qs.explain()
+
+
+class FilterPeriodeSargableTest(TestCase):
+    def setUp(self):
+        self.karyawan = buat_karyawan('budi@example.com')
+        for bulan in (1, 6, 12):
+            Cuti.objects.create(
+                id_karyawan=self.karyawan, jenis_cuti='tahunan', status='disetujui',
+                tanggal_mulai=date(2025, bulan, 2), tanggal_selesai=date(2025, bulan, 3),
+            )
+        Cuti.objects.create(
+            id_karyawan=self.karyawan, jenis_cuti='tahunan', status='disetujui',
+            tanggal_mulai=date(2026, 1, 1), tanggal_selesai=date(2026, 1, 1),
+        )
+        CutiBersama.objects.create(tanggal=date(2025, 12, 26))
+        CutiBersama.objects.create(tanggal=date(2026, 1, 2))
+
+    def test_for_year_rentang_setengah_terbuka(self):
+        qs = Cuti.objects.filter(id_karyawan=self.karyawan).for_year(2025)
+        self.assertEqual(qs.count(), 3)
+        self.assertEqual(CutiBersama.objects.for_year(2025).count(), 1)
+        sql = str(qs.query).lower()
+        self.assertNotIn('extract', sql)
+        self.assertIn('"tanggal_mulai" >=', sql)
+        self.assertIn('"tanggal_mulai" <', sql)
+
+    def test_explain_memakai_index_dengan_predikat_rentang(self):
+        plan = rencana_query(
+            Cuti.objects.filter(id_karyawan=self.karyawan, status='disetujui').for_year(2025)
+        )
+        if connection.vendor == 'postgresql':
+            self.assertIn('Index', plan)
+            self.assertIn('tanggal_mulai >=', plan)
+            self.assertIn('tanggal_mulai <', plan)
+        else:
+            self.assertIn('USING INDEX', plan)
+            self.assertIn('tanggal_mulai>?', plan)
+            self.assertIn('tanggal_mulai<?', plan)
+
+        plan = rencana_query(CutiBersama.objects.for_year(2025).filter(jenis='Cuti Bersama'))
+        if connection.vendor == 'postgresql':
+            self.assertIn('tanggal >=', plan)
+        else:
+            self.assertIn('tanggal>?', plan)
+
+    def test_export_riwayat_cuti_memakai_rentang_setengah_terbuka(self):
+        self.client.login(email='budi@example.com', password='rahasia123')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('export_riwayat_cuti_excel'), {'tahun': 2025})
+        self.assertEqual(response.status_code, 200)
+        sql_cuti = [q['sql'] for q in queries.captured_queries if 'FROM "cuti"' in q['sql'] and 'tanggal_mulai' in q['sql']]
+        self.assertTrue(sql_cuti)
+        for sql in sql_cuti:
+            self.assertNotIn('extract', sql.lower())
+            self.assertNotIn('BETWEEN', sql)
+            self.assertIn('"cuti"."tanggal_mulai" >=', sql)
+            self.assertIn('"cuti"."tanggal_mulai" <', sql)
+
+
+class QueryBudgetDashboardTest(QueryBudgetTestMixin, TestCase):
+    def setUp(self):
+        today = date.today()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.karyawan = buat_karyawan('budi@example.com')
+            self.magang = buat_karyawan('ani@example.com', role='Magang', nama='Ani Lestari')
+            for karyawan in (self.karyawan, self.magang):
+                for hari, status in ((2, 'disetujui'), (9, 'menunggu'), (16, 'ditolak')):
+                    Cuti.objects.create(
+                        id_karyawan=karyawan, jenis_cuti='tahunan', status=status,
+                        tanggal_mulai=date(today.year, today.month, hari),
+                        tanggal_selesai=date(today.year, today.month, hari + 1),
+                    )
+                    Izin.objects.create(
+                        id_karyawan=karyawan, jenis_izin='sakit', status=status, alasan='Demam',
+                        tanggal_izin=date(today.year, today.month, hari + 2),
+                    )
+            CutiBersama.objects.create(tanggal=date(today.year, 12, 26))
+
+    def test_karyawan_dashboard(self):
+        self.client.login(email='budi@example.com', password='rahasia123')
+        self.assertDalamBudget('karyawan_dashboard')
+
+    def test_data_dashboard_karyawan(self):
+        self.client.login(email='budi@example.com', password='rahasia123')
+        self.assertDalamBudget('data_dashboard_karyawan')
 
-# Create your tests here.
+    def test_magang_dashboard(self):
+        self.client.login(email='ani@example.com', password='rahasia123')
+        self.assertDalamBudget('magang_dashboard')
@@ -1,9 +1,11 @@
 from django.urls import path
 from .views import magang_views
+from .views.dashboard_karyawan import data_dashboard_karyawan
 
 urlpatterns = [
     # Dashboard
     path('', magang_views.magang_dashboard, name='magang_dashboard'),
+    path('data-dashboard/', data_dashboard_karyawan, name='data_dashboard_magang'),
     
     # Calendar
     path('calendar-events-magang/', magang_views.calendar_events_magang, name='calendar_events_magang'),
@@ -1,109 +1,47 @@
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
 from django.http import JsonResponse
-from django.db.models import Count, Sum, Value
-from django.db.models.functions import Coalesce
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
 from datetime import datetime, timedelta
 from collections import defaultdict
-from calendar import month_name
-from pytanggalmerah import TanggalMerah
-from django.db.models import Max
+from apps.hrd.utils.tanggal_merah import get_tanggal_merah
 
-from apps.absensi.models import Absensi, AbsensiMagang
-from apps.hrd.models import Cuti, Izin, JatahCuti, CutiBersama, Karyawan
+from apps.absensi.models import AbsensiMagang
+from apps.hrd.models import CutiBersama, Karyawan
 from apps.absensi.utils import validate_user_location
-
-
+from apps.hrd.utils.interval_index import LeaveIntervalIndex
+from apps.hrd.utils.etag import HARI, watermark_etag
+from apps.hrd.utils.instrumentation import query_budget
+from apps.hrd.utils.ringkasan_karyawan import (
+    etag_ringkasan,
+    get_ringkasan_karyawan,
+    libur_terdekat,
+    ulang_tahun_hari_ini,
+)
+
+
+@query_budget(20)
 @login_required
 def karyawan_dashboard(request):
-    user = request.user
-    karyawan = user.karyawan  
-    
-    # Check for birthday employees today
+    karyawan = request.user.karyawan
     today = datetime.now().date()
-    birthday_employees = Karyawan.objects.filter(
-        tanggal_lahir__month=today.month,
-        tanggal_lahir__day=today.day,
-        status_keaktifan='Aktif'
-    ).select_related('user')
-    
-    has_birthday_today = birthday_employees.exists()
-
-    # Mengambil bulan dan tahun terakhir dari data absensi
-    latest_data = Absensi.objects.aggregate(
-        latest_bulan=Max('bulan'),
-        latest_tahun=Max('tahun')
-    )
-    bulan = latest_data['latest_bulan'] or datetime.now().month
-    tahun = latest_data['latest_tahun'] or datetime.now().year
-    
-    # --- Perhitungan Sisa Cuti: Jumlahkan sisa_cuti dari semua tahun sejak join ---
-    tanggal_join = karyawan.mulai_kontrak
-    if tanggal_join:
-        # Ambil total sisa cuti dari semua tahun sejak join
-        sisa_cuti = JatahCuti.objects.filter(
-            karyawan=karyawan,
-            tahun__gte=tanggal_join.year
-        ).aggregate(
-            total_sisa=Coalesce(Sum('sisa_cuti'), Value(0))
-        )['total_sisa']
-        
-        # Pastikan tidak negatif
-        sisa_cuti = max(0, sisa_cuti)
-    else:
-        sisa_cuti = 0
-    
-    # --- Statistik Pribadi ---
-    total_pengajuan_cuti = Cuti.objects.filter(id_karyawan=karyawan, status__iexact='disetujui').count()
-    total_pengajuan_izin = Izin.objects.filter(id_karyawan=karyawan, status__iexact='disetujui').count()
-
-    # --- Hari Kerja Bulan Ini (Senin–Jumat) ---
-    total_hari = (datetime(tahun, bulan + 1, 1) - timedelta(days=1)).day if bulan != 12 else 31
-    hari_kerja = sum(
-        1 for day in range(1, total_hari + 1)
-        if datetime(tahun, bulan, day).weekday() < 5
-    )
-
-
-    # --- Libur Nasional Terdekat (30 hari ke depan) ---
-    today = datetime.today()
-    libur_terdekat = []
-    tanggal_mulai = today.date()
-    tanggal_sampai = tanggal_mulai + timedelta(days=30)
-
-    for hari in range((tanggal_sampai - tanggal_mulai).days):
-        tanggal = tanggal_mulai + timedelta(days=hari)
-        
-        if tanggal.weekday() == 6:
-            continue  # Lewati hari Minggu
-
-        try:
-            t = TanggalMerah()
-            t.set_date(str(tanggal.year), f"{tanggal.month:02d}", f"{tanggal.day:02d}")
-            if t.check():
-                for event in t.get_event():
-                    # Override khusus 26 Des 2025
-                    summary = event
-                    if tanggal.year == 2025 and tanggal.month == 12 and tanggal.day == 26:
-                        if "Tinju" in event or "Cuti Bersama" in event:
-                            summary = "WFA"
 
-                    libur_terdekat.append({
-                        "summary": summary,
-                        "date": tanggal
-                    })
-        except Exception:
-            continue
+    # Sisa cuti, pengajuan dan statistik dari ringkasan per karyawan (di-cache,
+    # diganti otomatis saat Cuti/Izin/Absensi/JatahCuti miliknya berubah)
+    ringkasan = get_ringkasan_karyawan(karyawan)
+    birthday_employees = ulang_tahun_hari_ini(today)
 
     context = {
-        "sisa_cuti": sisa_cuti,
-        "total_pengajuan_cuti": total_pengajuan_cuti,
-        "total_pengajuan_izin": total_pengajuan_izin,
-        "hari_kerja": hari_kerja,
-        "libur_terdekat": libur_terdekat,
-        "selected_bulan": str(bulan),
-        "selected_tahun": str(tahun),
-        "has_birthday_today": has_birthday_today,
+        "ringkasan": ringkasan,
+        "sisa_cuti": ringkasan["sisa_cuti"],
+        "total_pengajuan_cuti": ringkasan["total_pengajuan_cuti"],
+        "total_pengajuan_izin": ringkasan["total_pengajuan_izin"],
+        "hari_kerja": ringkasan["hari_kerja"],
+        "libur_terdekat": libur_terdekat(today),
+        "selected_bulan": str(ringkasan["bulan"]),
+        "selected_tahun": str(ringkasan["tahun"]),
+        "has_birthday_today": bool(birthday_employees),
         "birthday_employees": birthday_employees,
     }
 
@@ -111,6 +49,8 @@ def karyawan_dashboard(request):
 
 
 @login_required
+# Isi sama dengan kalender HR: cuti/izin, nama & ulang tahun Karyawan, WFA dari check-in
+@watermark_etag('cuti', 'izin', 'karyawan', 'absensi', per_user=False, periode=HARI)
 def calendar_events(request):
     from datetime import date
     WFA_CUTOFF_DATE = date(2026, 1, 30)  # WFA labels only visible from this date onwards (30 Jan)
@@ -118,12 +58,12 @@ def calendar_events(request):
     events = []
 
     # Gabungkan cuti berdasarkan tanggal
-    grouped_cuti = defaultdict(list)
-    for c in Cuti.objects.filter(status='disetujui'):
-        current_date = c.tanggal_mulai
-        while current_date <= c.tanggal_selesai:
-            grouped_cuti[current_date].append(c.id_karyawan.nama)
-            current_date += timedelta(days=1)
+    # Cuti & izin disetujui dimuat sekali (dengan nama karyawan) lewat indeks interval
+    indeks = LeaveIntervalIndex.load(with_nama=True, ringkas=True)
+    grouped_cuti = {
+        tanggal: [c.id_karyawan.nama for c in daftar]
+        for tanggal, daftar in indeks.hari_cuti_per_tanggal().items()
+    }
 
     for date, names in grouped_cuti.items():
         events.append({
@@ -139,7 +79,7 @@ def calendar_events(request):
     grouped_izin_sakit = defaultdict(list)
     grouped_izin_business_trip = defaultdict(list)
     
-    for i in Izin.objects.filter(status='disetujui'):
+    for i in indeks.semua_izin():
         # 1. WFA Filter (with date cutoff)
         if i.jenis_izin in ['wfa', 'izin wfa']:
             # Only show WFA labels from cutoff date onwards
@@ -248,10 +188,9 @@ def calendar_events(request):
             continue
             
         try:
-            t = TanggalMerah()
-            t.set_date(str(current_date.year), f"{current_date.month:02d}", f"{current_date.day:02d}")
-            if t.check():
-                for event in t.get_event():
+            libur = get_tanggal_merah(current_date)
+            if libur:
+                for event in libur:
                     if event.lower() == 'sunday':
                         continue
 
@@ -347,46 +286,32 @@ def calendar_events(request):
 
     return JsonResponse(events, safe=False)
 
-@login_required
-def data_dashboard_karyawan(request):
-    import calendar
-    
-    user = request.user
-    karyawan = user.karyawan
-
-    # Mengambil bulan dan tahun terakhir dari data absensi GLOBAL (bukan per karyawan)
-    latest_data = Absensi.objects.aggregate(
-        latest_bulan=Max('bulan'),
-        latest_tahun=Max('tahun')
-    )
-    bulan = latest_data['latest_bulan'] or datetime.now().month
-    tahun = latest_data['latest_tahun'] or datetime.now().year
-
-    # --- Perhitungan Sisa Cuti: Jumlahkan sisa_cuti dari semua tahun sejak join ---
-    tanggal_join = karyawan.mulai_kontrak
-    if tanggal_join:
-        # Ambil total sisa cuti dari semua tahun sejak join
-        sisa_cuti = JatahCuti.objects.filter(
-            karyawan=karyawan,
-            tahun__gte=tanggal_join.year
-        ).aggregate(
-            total_sisa=Coalesce(Sum('sisa_cuti'), Value(0))
-        )['total_sisa']
-        
-        # Pastikan tidak negatif
-        sisa_cuti = max(0, sisa_cuti)
-    else:
-        sisa_cuti = 0
-
-    # hitung semua data yang sama seperti view utama
-    total_pengajuan_cuti = Cuti.objects.filter(id_karyawan=karyawan, tanggal_mulai__year=tahun, tanggal_mulai__month=bulan).count()
-    total_pengajuan_izin = Izin.objects.filter(id_karyawan=karyawan, tanggal_izin__year=tahun, tanggal_izin__month=bulan).count()
+def _etag_ringkasan(request):
+    """ETag API dashboard dari versi ringkasan karyawan (tanpa query ke tabel cuti/izin/absensi)."""
+    try:
+        karyawan = request.user.karyawan
+    except Karyawan.DoesNotExist:
+        return None
+    return etag_ringkasan(karyawan.pk)
 
 
-    return JsonResponse({
-        "sisa_cuti": sisa_cuti,
-        "total_pengajuan_cuti": total_pengajuan_cuti,
-        "total_pengajuan_izin": total_pengajuan_izin,
-        "nama_bulan": calendar.month_name[bulan],
-        "tahun": tahun,
-    })
\ No newline at end of file
+@query_budget(15)
+@login_required
+@condition(etag_func=_etag_ringkasan)
+def data_dashboard_karyawan(request):
+    """
+    Ringkasan dashboard dalam JSON untuk hidrasi halaman karyawan/magang.
+
+    Browser menyimpan ETag-nya; selama data karyawan belum berubah server
+    menjawab 304 tanpa menghitung apa pun.
+    """
+    try:
+        karyawan = request.user.karyawan
+    except Karyawan.DoesNotExist:
+        return JsonResponse({'status': 'error', 'message': 'Data karyawan tidak ditemukan.'}, status=404)
+
+    data = dict(get_ringkasan_karyawan(karyawan))
+    data['libur_terdekat'] = libur_terdekat(datetime.now().date())
+    response = JsonResponse(data)
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
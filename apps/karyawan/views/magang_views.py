@@ -6,7 +6,10 @@ from apps.absensi.models import AbsensiMagang
 from django.contrib import messages
 from django.http import JsonResponse
 from datetime import datetime, timedelta, date
-from pytanggalmerah import TanggalMerah
+from apps.hrd.utils.tanggal_merah import get_tanggal_merah
+from apps.hrd.utils.etag import HARI, watermark_etag
+from apps.hrd.utils.instrumentation import query_budget
+from apps.hrd.utils.ringkasan_karyawan import get_ringkasan_karyawan, libur_terdekat
 from django.contrib.auth import update_session_auth_hash
 from django.contrib.auth.forms import PasswordChangeForm
 from apps.profil.forms import ProfilForm
@@ -15,6 +18,7 @@ from apps.authentication.models import User
 from notifications.signals import notify
 from django.core.paginator import Paginator
 
+@query_budget(15)
 @login_required
 @role_required(['Magang', 'Part Time', 'Freelance', 'Project'])
 def magang_dashboard(request):
@@ -25,38 +29,14 @@ def magang_dashboard(request):
         messages.error(request, "Data karyawan tidak ditemukan.")
         return redirect('home') # Atau halaman lain yang sesuai
 
-    # Ambil data absensi terbaru (misal 5 data terakhir)
-    daftar_absensi = AbsensiMagang.objects.filter(id_karyawan=karyawan).order_by('-tanggal', '-jam_masuk')[:5]
-
-    # Hitung statistik absensi (8 jam fleksibel - hanya total hadir)
-    total_absensi = AbsensiMagang.objects.filter(id_karyawan=karyawan).count()
-
-    # --- Libur Nasional Terdekat (30 hari ke depan) - Konsisten dengan Dashboard Karyawan ---
-    today = datetime.today()
-    libur_terdekat = []
-    tanggal_mulai = today.date()
-    tanggal_sampai = tanggal_mulai + timedelta(days=30)
-
-    for hari in range((tanggal_sampai - tanggal_mulai).days):
-        tanggal = tanggal_mulai + timedelta(days=hari)
-        
-        if tanggal.weekday() == 6:
-            continue  # Lewati hari Minggu
-
-        t = TanggalMerah()
-        t.set_date(str(tanggal.year), f"{tanggal.month:02d}", f"{tanggal.day:02d}")
-        if t.check():
-            for event in t.get_event():
-                libur_terdekat.append({
-                    "summary": event,
-                    "date": tanggal
-                })
+    # Absensi terbaru dan total kehadiran dari ringkasan per karyawan (di-cache)
+    ringkasan = get_ringkasan_karyawan(karyawan)
 
     context = {
         'karyawan': karyawan,
-        'daftar_absensi': daftar_absensi,
-        'total_absensi': total_absensi,
-        'libur_terdekat': libur_terdekat,
+        'daftar_absensi': ringkasan['absensi_terbaru'],
+        'total_absensi': ringkasan['total_absensi'],
+        'libur_terdekat': libur_terdekat(datetime.now().date()),
         'user': user,
     }
     return render(request, 'magang/index.html', context)
@@ -144,6 +124,8 @@ def ubah_password_magang(request):
 
 @login_required
 @role_required(['Magang', 'Part Time', 'Freelance', 'Project'])
+# Hanya tanggal merah dan CutiBersama yang dibaca
+@watermark_etag('cuti_bersama', periode=HARI)
 def calendar_events_magang(request):
     from datetime import date
     WFA_CUTOFF_DATE = date(2026, 1, 30)  # WFA labels only visible from this date onwards (30 Jan)
@@ -172,10 +154,9 @@ def calendar_events_magang(request):
             current_date += timedelta(days=1)
             continue
             
-        t = TanggalMerah()
-        t.set_date(str(current_date.year), f"{current_date.month:02d}", f"{current_date.day:02d}")
-        if t.check():
-            for event in t.get_event():
+        libur = get_tanggal_merah(current_date)
+        if libur:
+            for event in libur:
                 events.append({
                     "title": event,
                     "start": current_date.isoformat(),
@@ -56,9 +56,7 @@ def riwayat_cuti_detail_view(request):
             tersedia = bulan_tersedia_kontrak.get(bulan, False)
             
             # Cek apakah ada cuti bersama di bulan ini (hanya jenis 'Cuti Bersama')
-            cuti_bersama_bulan = CutiBersama.objects.filter(
-                tanggal__year=tahun_dipilih,
-                tanggal__month=bulan,
+            cuti_bersama_bulan = CutiBersama.objects.for_month(tahun_dipilih, bulan).filter(
                 jenis='Cuti Bersama'
             )
             
@@ -124,8 +122,7 @@ def riwayat_cuti_detail_view(request):
     riwayat_cuti = Cuti.objects.filter(
         id_karyawan=karyawan,
         status='disetujui',
-        tanggal_mulai__year=tahun_dipilih
-    ).order_by('tanggal_mulai')
+    ).for_year(tahun_dipilih).order_by('tanggal_mulai')
 
     # Hitung statistik
     total_jatah = jatah_cuti.total_cuti if jatah_cuti else 12
@@ -248,8 +245,7 @@ def export_riwayat_cuti_excel(request):
     # Data riwayat cuti
     riwayat_cuti = Cuti.objects.filter(
         id_karyawan=karyawan,
-        tanggal_mulai__year=tahun_dipilih
-    ).order_by('tanggal_mulai')
+    ).for_year(tahun_dipilih).order_by('tanggal_mulai')
 
     for cuti in riwayat_cuti:
         row_num += 1
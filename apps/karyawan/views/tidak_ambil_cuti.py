@@ -21,7 +21,7 @@ def tidak_ambil_cuti_view(request):
     today = timezone.now().date()
 
     # Ambil semua tanggal cuti bersama (hanya jenis 'Cuti Bersama') untuk tahun ini
-    semua_cuti_bersama = CutiBersama.objects.filter(tanggal__year=tahun_sekarang, jenis='Cuti Bersama')
+    semua_cuti_bersama = CutiBersama.objects.for_year(tahun_sekarang).filter(jenis='Cuti Bersama')
 
     # Ambil semua pengajuan yang sudah ada untuk karyawan ini
     pengajuan_existing = TidakAmbilCuti.objects.filter(
@@ -113,7 +113,7 @@ def tidak_ambil_cuti_view(request):
             available_dates.append(t)
     
     if request.method == 'POST':
-        form = TidakAmbilCutiForm(request.POST, request.FILES)
+        form = TidakAmbilCutiForm(request.POST, request.FILES, upload_user=request.user)
         # Set queryset untuk form dengan available dates
         form.fields['tanggal'].queryset = CutiBersama.objects.filter(
             id__in=[d.id for d in available_dates]
@@ -5,6 +5,8 @@ from django.contrib.auth.mixins import LoginRequiredMixin
 from django.http import JsonResponse
 from django.contrib import messages
 from notifications.models import Notification
+from apps.hrd.utils.etag import watermark_etag
+from apps.hrd.utils.watermark import bump_watermark
 from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
 
 @login_required
@@ -43,6 +45,8 @@ def mark_as_read(request, notification_id):
 @login_required
 def mark_all_as_read(request):
     request.user.notifications.mark_all_as_read()
+    # mark_all_as_read() memakai update(), tidak memicu signal watermark
+    bump_watermark('notifikasi')
     return redirect('all_notifications')
 
 @login_required
@@ -92,6 +96,7 @@ class AllNotificationsView(LoginRequiredMixin, ListView):
         return context
 
 @login_required
+@watermark_etag('notifikasi')
 def api_unread_count(request):
     count = request.user.notifications.unread().count()
     return JsonResponse({'count': count})
\ No newline at end of file
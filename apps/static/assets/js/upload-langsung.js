@@ -0,0 +1,98 @@
+/**
+ * Upload Langsung JavaScript
+ * Mengunggah file dari input[data-direct-upload] langsung ke bucket (presigned POST)
+ * sebelum form dikirim, lalu form hanya mengirim key-nya (<nama>_key).
+ * Bila presign/upload gagal, form dikirim seperti biasa (multipart ke server).
+ */
+
+const UploadLangsung = {
+  presignUrl: '/hrd/upload-langsung/presign/',
+
+  csrfToken: function(form) {
+    const input = form.querySelector('input[name="csrfmiddlewaretoken"]');
+    return input ? input.value : '';
+  },
+
+  /**
+   * Minta target upload lalu kirim file ke sana
+   * @returns {Promise<string>} key file di bucket
+   */
+  upload: async function(form, input) {
+    const file = input.files[0];
+    const body = new FormData();
+    body.append('jenis', input.dataset.directUpload);
+    body.append('nama_file', file.name);
+    body.append('ukuran', file.size);
+
+    const presign = await fetch(this.presignUrl, {
+      method: 'POST',
+      body: body,
+      headers: { 'X-CSRFToken': this.csrfToken(form) },
+      credentials: 'same-origin',
+    });
+    const data = await presign.json();
+    if (!presign.ok || data.status !== 'success') {
+      throw new Error(data.message || 'Presign gagal');
+    }
+
+    const target = new FormData();
+    Object.entries(data.fields).forEach(([name, value]) => target.append(name, value));
+    target.append('file', file);  // file wajib field terakhir
+    const response = await fetch(data.url, { method: 'POST', body: target });
+    if (!response.ok) {
+      throw new Error('Upload ke storage gagal (' + response.status + ')');
+    }
+    return data.key;
+  },
+
+  onSubmit: async function(e) {
+    const form = e.target;
+    if (e.defaultPrevented || form.dataset.directUploadDone) return;
+
+    const inputs = Array.from(form.querySelectorAll('input[type="file"][data-direct-upload]'))
+      .filter(input => input.files && input.files.length === 1);
+    if (!inputs.length) return;
+
+    e.preventDefault();
+    form.dataset.directUploadDone = '1';
+    if (typeof LoadingOverlay !== 'undefined') LoadingOverlay.show('Mengunggah file...');
+
+    try {
+      const keys = await Promise.all(inputs.map(input => this.upload(form, input)));
+      inputs.forEach((input, i) => {
+        const hidden = document.createElement('input');
+        hidden.type = 'hidden';
+        hidden.name = input.name + '_key';
+        hidden.value = keys[i];
+        form.appendChild(hidden);
+        // File tidak ikut dikirim lagi ke server
+        input.required = false;
+        input.disabled = true;
+      });
+    } catch (err) {
+      // Fallback: kirim multipart seperti biasa
+      console.warn('Upload langsung gagal, memakai upload biasa:', err);
+    }
+
+    // form.submit() tidak membawa nilai tombol submit
+    if (e.submitter && e.submitter.name) {
+      const hidden = document.createElement('input');
+      hidden.type = 'hidden';
+      hidden.name = e.submitter.name;
+      hidden.value = e.submitter.value;
+      form.appendChild(hidden);
+    }
+    if (typeof LoadingOverlay !== 'undefined') LoadingOverlay.show('Memproses data...');
+    form.submit();
+  },
+};
+
+document.addEventListener('DOMContentLoaded', function() {
+  document.querySelectorAll('form').forEach(form => {
+    if (form.querySelector('input[type="file"][data-direct-upload]')) {
+      form.addEventListener('submit', e => UploadLangsung.onSubmit(e));
+    }
+  });
+});
+
+window.UploadLangsung = UploadLangsung;
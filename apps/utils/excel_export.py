@@ -0,0 +1,179 @@
+"""
+Engine ekspor Excel bersama (openpyxl write-only).
+
+Semua ekspor laporan (absensi, absensi fleksibel, riwayat cuti, data karyawan,
+laporan jatah cuti) memakai modul ini agar:
+- baris ditulis langsung ke file sementara (write-only) sehingga memori tetap
+  datar meskipun data satu tahun penuh,
+- style sel didefinisikan sekali sebagai NamedStyle, bukan per sel,
+- lebar kolom diperkirakan dari sampel baris pertama, bukan scan ulang semua sel,
+- file hasil dikirim bertahap melalui StreamingHttpResponse (FileResponse).
+"""
+import tempfile
+from collections import namedtuple
+from itertools import chain, islice
+
+from django.http import FileResponse
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Border, Font, NamedStyle, PatternFill, Side
+from openpyxl.utils import get_column_letter
+
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+# Jumlah baris yang dipakai untuk memperkirakan lebar kolom
+WIDTH_SAMPLE_SIZE = 200
+MAX_COLUMN_WIDTH = 50
+
+# Ukuran chunk default untuk queryset.iterator()
+DEFAULT_CHUNK_SIZE = 2000
+
+# Nama style yang tersedia di setiap workbook ekspor
+STYLE_HEADER = 'hr_header'
+STYLE_BODY = 'hr_body'
+STYLE_CENTER = 'hr_center'
+STYLE_USED = 'hr_used'
+STYLE_EXPIRED = 'hr_expired'
+
+# Nilai sel dengan style khusus, mis. Styled('12-03', STYLE_USED)
+Styled = namedtuple('Styled', ['value', 'style'])
+
+
+def _thin_border():
+    thin = Side(style='thin')
+    return Border(left=thin, right=thin, top=thin, bottom=thin)
+
+
+def _build_named_styles():
+    header = NamedStyle(name=STYLE_HEADER)
+    header.font = Font(bold=True, color="FFFFFF")
+    header.fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
+    header.alignment = Alignment(horizontal="center", vertical="center")
+    header.border = _thin_border()
+
+    body = NamedStyle(name=STYLE_BODY)
+    body.border = _thin_border()
+
+    center = NamedStyle(name=STYLE_CENTER)
+    center.border = _thin_border()
+    center.alignment = Alignment(horizontal="center")
+
+    used = NamedStyle(name=STYLE_USED)
+    used.border = _thin_border()
+    used.alignment = Alignment(horizontal="center")
+    used.fill = PatternFill(start_color="C6EFCE", end_color="C6EFCE", fill_type="solid")
+
+    expired = NamedStyle(name=STYLE_EXPIRED)
+    expired.border = _thin_border()
+    expired.alignment = Alignment(horizontal="center")
+    expired.fill = PatternFill(start_color="FFC7CE", end_color="FFC7CE", fill_type="solid")
+
+    return [header, body, center, used, expired]
+
+
+def create_workbook():
+    """Membuat workbook write-only dengan named style yang sudah terdaftar."""
+    wb = Workbook(write_only=True)
+    for style in _build_named_styles():
+        wb.add_named_style(style)
+    return wb
+
+
+def _cell_text_length(value):
+    if isinstance(value, Styled):
+        value = value.value
+    if value is None:
+        return 0
+    return len(str(value))
+
+
+def estimate_column_widths(headers, sample_rows, max_width=MAX_COLUMN_WIDTH):
+    """Perkirakan lebar kolom dari header + sampel baris (bukan seluruh data)."""
+    widths = [len(str(h)) for h in headers]
+    for row in sample_rows:
+        for idx, value in enumerate(row):
+            if idx >= len(widths):
+                widths.append(0)
+            widths[idx] = max(widths[idx], _cell_text_length(value))
+    return [min(w + 2, max_width) for w in widths]
+
+
+def add_sheet(wb, title, headers, rows, center_columns=(), widths=None,
+              freeze_panes=None, styled=True, sample_size=WIDTH_SAMPLE_SIZE):
+    """
+    Tambahkan satu sheet ke workbook write-only.
+
+    Args:
+        wb: workbook dari create_workbook()
+        title: judul sheet (maks. 31 karakter)
+        headers: list judul kolom
+        rows: iterable berisi list/tuple nilai per baris (boleh generator)
+        center_columns: indeks kolom (mulai 1) yang rata tengah
+        widths: dict {indeks kolom: lebar} untuk override lebar hasil estimasi
+        freeze_panes: alamat sel freeze, mis. 'C2'
+        styled: False untuk ekspor polos tanpa border/header berwarna
+        sample_size: jumlah baris sampel untuk estimasi lebar kolom
+
+    Returns:
+        Jumlah baris data yang ditulis.
+    """
+    ws = wb.create_sheet(title=title[:31])
+
+    # Ambil sampel untuk estimasi lebar, lalu sambungkan lagi dengan sisa baris
+    rows = iter(rows)
+    sample = list(islice(rows, sample_size))
+    estimated = estimate_column_widths(headers, sample)
+    for idx, width in enumerate(estimated, 1):
+        if widths and idx in widths:
+            width = widths[idx]
+        ws.column_dimensions[get_column_letter(idx)].width = width
+
+    if freeze_panes:
+        ws.freeze_panes = freeze_panes
+
+    center_columns = set(center_columns)
+
+    def make_cell(value, style):
+        if isinstance(value, Styled):
+            value, style = value.value, value.style
+        if not styled and style in (STYLE_BODY, STYLE_CENTER):
+            return value
+        cell = WriteOnlyCell(ws, value=value)
+        cell.style = style
+        return cell
+
+    if styled:
+        ws.append([make_cell(h, STYLE_HEADER) for h in headers])
+    else:
+        ws.append(list(headers))
+
+    count = 0
+    for row in chain(sample, rows):
+        ws.append([
+            make_cell(value, STYLE_CENTER if col in center_columns else STYLE_BODY)
+            for col, value in enumerate(row, 1)
+        ])
+        count += 1
+    return count
+
+
+def workbook_response(wb, filename):
+    """
+    Simpan workbook ke file sementara lalu kirim bertahap ke klien.
+
+    FileResponse adalah turunan StreamingHttpResponse; file sementara
+    ditutup (dan dihapus) otomatis setelah respons selesai dikirim.
+    """
+    tmp = tempfile.TemporaryFile(suffix='.xlsx')
+    wb.save(tmp)
+    tmp.seek(0)
+    response = FileResponse(tmp, content_type=XLSX_CONTENT_TYPE)
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+def export_response(filename, title, headers, rows, **sheet_kwargs):
+    """Shortcut untuk ekspor satu sheet: buat workbook, isi, dan kirim."""
+    wb = create_workbook()
+    add_sheet(wb, title, headers, rows, **sheet_kwargs)
+    return workbook_response(wb, filename)
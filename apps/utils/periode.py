@@ -0,0 +1,73 @@
+"""
+Filter periode (bulan/tahun) yang sargable.
+
+tanggal__month=... / tanggal__year=... diterjemahkan menjadi EXTRACT(...) di SQL
+sehingga index pada kolom tanggal (mis. unique (id_karyawan, tanggal)) tidak
+terpakai. Helper di sini menerjemahkan periode menjadi rentang setengah terbuka
+[awal, akhir) pada kolom tanggal:
+
+    AbsensiMagang.objects.for_month(2025, 3)
+    -> WHERE tanggal >= '2025-03-01' AND tanggal < '2025-04-01'
+"""
+from datetime import date
+
+from django.db import models
+
+
+def month_range(tahun, bulan):
+    """(awal, akhir) setengah terbuka untuk satu bulan."""
+    tahun, bulan = int(tahun), int(bulan)
+    awal = date(tahun, bulan, 1)
+    akhir = date(tahun + 1, 1, 1) if bulan == 12 else date(tahun, bulan + 1, 1)
+    return awal, akhir
+
+
+def year_range(tahun):
+    """(awal, akhir) setengah terbuka untuk satu tahun."""
+    tahun = int(tahun)
+    return date(tahun, 1, 1), date(tahun + 1, 1, 1)
+
+
+class PeriodQuerySet(models.QuerySet):
+    """
+    QuerySet dengan filter periode berbasis rentang tanggal.
+
+    Subclass menentukan period_field (kolom tanggal utama model), atau
+    berikan field=... untuk memfilter kolom lain.
+    """
+    period_field = 'tanggal'
+
+    def for_period(self, awal=None, akhir=None, field=None):
+        """Filter awal <= field < akhir; batas yang None diabaikan."""
+        field = field or self.period_field
+        filters = {}
+        if awal is not None:
+            filters[f'{field}__gte'] = awal
+        if akhir is not None:
+            filters[f'{field}__lt'] = akhir
+        return self.filter(**filters)
+
+    def for_month(self, tahun, bulan, field=None):
+        return self.for_period(*month_range(tahun, bulan), field=field)
+
+    def for_year(self, tahun, field=None):
+        return self.for_period(*year_range(tahun), field=field)
+
+    def for_month_or_year(self, tahun=None, bulan=None, field=None):
+        """
+        Untuk filter GET opsional: bulan+tahun -> satu bulan, hanya tahun -> satu
+        tahun. Hanya bulan (tanpa tahun) tidak bisa dijadikan rentang, jadi
+        tetap memakai __month.
+        """
+        field = field or self.period_field
+        try:
+            if tahun and bulan:
+                return self.for_month(tahun, bulan, field=field)
+            if tahun:
+                return self.for_year(tahun, field=field)
+            if bulan:
+                return self.filter(**{f'{field}__month': int(bulan)})
+        except ValueError:
+            # Bulan/tahun di luar jangkauan: sama seperti __month=13, tidak ada hasil
+            return self.none()
+        return self
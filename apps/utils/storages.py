@@ -1,10 +1,78 @@
+import hashlib
+import logging
+import time
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
 from storages.backends.s3boto3 import S3Boto3Storage
+from whitenoise.storage import CompressedManifestStaticFilesStorage
+
+logger = logging.getLogger(__name__)
 
 class StaticStorage(S3Boto3Storage):
     location = 'hr_cesgs_dev/static'
     default_acl = None
 
-class MediaStorage(S3Boto3Storage):
+class CachedPresignedUrlMixin:
+    """
+    Cache presigned URL per (key storage, jendela waktu).
+
+    Membuat presigned URL adalah kerja tanda tangan SigV4 di CPU; halaman daftar
+    (approval cuti/izin, riwayat) bisa memanggilnya ratusan kali per render.
+    URL disimpan di namespace cache 'media' selama setengah masa berlaku
+    tanda tangan: key memuat nomor jendela waktu (lebar = expire // 2), sehingga
+    URL yang keluar dari cache selalu masih berlaku minimal expire // 2 detik.
+    Hanya URL GET tanpa parameter tambahan yang di-cache.
+
+    URL custom domain tanpa CloudFront signer tidak ditandatangani (dan tidak
+    di-cache); MediaStorage karena itu tidak memakai AWS_S3_CUSTOM_DOMAIN, lihat
+    AWS_MEDIA_CUSTOM_DOMAIN di settings.
+    """
+
+    def _url_ditandatangani(self):
+        return self.querystring_auth and (not self.custom_domain or self.cloudfront_signer)
+
+    def url(self, name, parameters=None, expire=None, http_method=None):
+        if parameters or http_method or not self._url_ditandatangani():
+            return super().url(name, parameters, expire, http_method)
+
+        from apps.hrd.utils.cache import get_cache
+
+        expire = expire or self.querystring_expire
+        jendela = max(expire // 2, 1)
+        sekarang = int(time.time())
+        digest = hashlib.md5(f'{self.bucket_name}/{self.location}/{name}:{expire}'.encode('utf-8')).hexdigest()
+        key = f'presigned:{digest}:{sekarang // jendela}'
+
+        cache = get_cache('media')
+        url = cache.get(key)
+        if url is None:
+            url = super().url(name, parameters, expire, http_method)
+            # Kedaluwarsa di akhir jendela, tidak melewati batas tanda tangan
+            cache.set(key, url, jendela - sekarang % jendela)
+        return url
+
+
+class HashedStaticStorage(CompressedManifestStaticFilesStorage):
+    """
+    Static lokal untuk STATIC_BACKEND=whitenoise: nama file ber-hash
+    (cache-busting) plus varian .gz/.br (brotli bila paket brotli terpasang).
+    """
+    _tidak_ditemukan = set()
+
+    def hashed_name(self, name, content=None, filename=None):
+        try:
+            return super().hashed_name(name, content, filename)
+        except ValueError:
+            # CSS vendor (mis. argon.min.css) dan beberapa template merujuk file yang
+            # tidak ikut dikirim; biarkan apa adanya daripada menggagalkan collectstatic
+            if name not in self._tidak_ditemukan:
+                self._tidak_ditemukan.add(name)
+                logger.warning("File static %s tidak ditemukan, referensi dibiarkan tanpa hash.", name)
+            return name
+
+
+class MediaStorage(CachedPresignedUrlMixin, S3Boto3Storage):
     location = 'hr_cesgs_dev/media'
 
     # 1. Pastikan file selalu privat
@@ -17,4 +85,45 @@ class MediaStorage(S3Boto3Storage):
     # 3. download file secara otomatis
     object_parameters = {
         'ContentDisposition': 'attachment',
-    }
\ No newline at end of file
+    }
+
+    def __init__(self, **kwargs):
+        # AWS_S3_CUSTOM_DOMAIN (dipakai StaticStorage) mematikan presigned URL;
+        # media memakai domain sendiri yang defaultnya kosong
+        kwargs.setdefault('custom_domain', getattr(settings, 'AWS_MEDIA_CUSTOM_DOMAIN', None))
+        super().__init__(**kwargs)
+
+class LocalS3StandIn(FileSystemStorage):
+    """
+    Pengganti MediaStorage untuk benchmark/staging tanpa kredensial AWS.
+
+    File disimpan di MEDIA_ROOT, tetapi setiap operasi yang di S3 berupa
+    round-trip jaringan (simpan, buka, cek ada, ukuran, hapus) ditahan
+    STORAGE_STANDIN_LATENCY_MS agar profil worker Gunicorn dibandingkan pada
+    beban I/O yang mendekati produksi.
+    """
+
+    def _latency(self):
+        delay = getattr(settings, 'STORAGE_STANDIN_LATENCY_MS', 0)
+        if delay:
+            time.sleep(delay / 1000)
+
+    def _save(self, name, content):
+        self._latency()
+        return super()._save(name, content)
+
+    def _open(self, name, mode='rb'):
+        self._latency()
+        return super()._open(name, mode)
+
+    def exists(self, name):
+        self._latency()
+        return super().exists(name)
+
+    def size(self, name):
+        self._latency()
+        return super().size(name)
+
+    def delete(self, name):
+        self._latency()
+        return super().delete(name)
@@ -0,0 +1,69 @@
+"""
+Fixture suite pytest-benchmark hot path HR (pasangan manage.py benchmark_hr).
+
+Dataset sintetis dibuat sekali per sesi di database test Django (SQLite atau
+PostgreSQL lokal, sesuai DJANGO_SETTINGS_MODULE) dan ikut terhapus bersama
+database test di akhir sesi. Ukuran dan isi dataset diatur lewat environment:
+
+- BENCHMARK_KARYAWAN: jumlah karyawan sintetis (default 50)
+- BENCHMARK_SEED: seed random dataset (default 42)
+- BENCHMARK_TAHUN / BENCHMARK_BULAN: periode data (default tahun/bulan sekarang)
+- BENCHMARK_ABSENSI_FILE: file Excel mesin absensi untuk process_absensi
+"""
+import os
+from datetime import datetime
+
+import django
+import pytest
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+django.setup()
+
+from django.test.utils import (  # noqa: E402
+    setup_databases,
+    setup_test_environment,
+    teardown_databases,
+    teardown_test_environment,
+)
+
+from apps.hrd.utils.benchmark import (  # noqa: E402
+    BenchmarkContext,
+    benchmark_meta,
+    get_benchmark_users,
+    seed_dataset,
+)
+
+_meta = {}
+
+
+@pytest.fixture(scope='session')
+def benchmark_ctx():
+    now = datetime.now()
+    jumlah_karyawan = int(os.environ.get('BENCHMARK_KARYAWAN', 50))
+    seed = int(os.environ.get('BENCHMARK_SEED', 42))
+    tahun = int(os.environ.get('BENCHMARK_TAHUN', now.year))
+    bulan = int(os.environ.get('BENCHMARK_BULAN', now.month if tahun == now.year else 12))
+
+    setup_test_environment()
+    old_config = setup_databases(verbosity=0, interactive=False)
+    try:
+        counts = seed_dataset(jumlah_karyawan, tahun, seed=seed)
+        _meta.update(benchmark_meta(jumlah_karyawan, tahun, seed, counts))
+        hr_user, karyawan_user, magang_user = get_benchmark_users()
+        yield BenchmarkContext(
+            tahun=tahun,
+            bulan=bulan,
+            hr_user=hr_user,
+            karyawan_user=karyawan_user or hr_user,
+            magang_user=magang_user or hr_user,
+            absensi_file=os.environ.get('BENCHMARK_ABSENSI_FILE'),
+        )
+    finally:
+        teardown_databases(old_config, verbosity=0)
+        teardown_test_environment()
+
+
+@pytest.hookimpl(optionalhook=True)
+def pytest_benchmark_update_json(config, benchmarks, output_json):
+    # Metadata dataset sama dengan output benchmark_hr agar hasil bisa dibandingkan
+    output_json['dataset'] = _meta
@@ -0,0 +1,72 @@
+"""
+Benchmark hot path HR dengan pytest-benchmark.
+
+    pip install pytest-benchmark
+    pytest --benchmark-json=bench.json
+    pytest --benchmark-compare  # bandingkan dengan run tersimpan (--benchmark-autosave)
+
+Daftar hot path sama dengan manage.py benchmark_hr (BENCHMARKS); setiap round
+di-rollback sehingga semua round melihat dataset yang sama.
+"""
+import os
+from datetime import date, time as dt_time
+from unittest import mock
+
+import pytest
+
+pytest.importorskip('pytest_benchmark')
+
+from django.db import transaction  # noqa: E402
+
+from apps.absensi.models import AbsensiMagang  # noqa: E402
+from apps.hrd.utils.benchmark import BENCHMARKS, SkipBenchmark, jalankan_sekali  # noqa: E402
+
+ROUNDS = int(os.environ.get('BENCHMARK_ROUNDS', 3))
+
+
+@pytest.fixture(autouse=True)
+def push_terkirim(benchmark_ctx):
+    """
+    Pastikan cron notifikasi yang di-benchmark tidak mengirim web push.
+
+    Dua user benchmark disiapkan agar cron benar-benar sampai ke jalur kirim:
+    karyawan_user punya subscription dan belum absen hari ini (checkin
+    reminder), magang_user sudah CI WFO tanpa CO (overtime alert). pywebpush
+    (lapisan paling bawah django-webpush) di-mock dan tidak boleh terpanggil.
+    Semua perubahan di-rollback setelah test.
+    """
+    from webpush.models import PushInformation, SubscriptionInfo
+
+    today = date.today()
+    with transaction.atomic():
+        for user in (benchmark_ctx.karyawan_user, benchmark_ctx.magang_user):
+            subscription = SubscriptionInfo.objects.create(
+                browser='chrome', endpoint=f'https://push.invalid/{user.pk}', auth='auth', p256dh='p256dh',
+            )
+            PushInformation.objects.create(user=user, subscription=subscription)
+        AbsensiMagang.objects.filter(id_karyawan__user=benchmark_ctx.karyawan_user, tanggal=today).delete()
+        AbsensiMagang.objects.update_or_create(
+            id_karyawan=benchmark_ctx.magang_user.karyawan,
+            tanggal=today,
+            defaults={'jam_masuk': dt_time(8, 0), 'jam_pulang': None, 'keterangan': 'WFO', 'overtime_alert_sent': False},
+        )
+        with mock.patch('webpush.utils.webpush') as webpush:
+            yield webpush
+        transaction.set_rollback(True)
+    assert not webpush.called, 'benchmark mengirim web push sungguhan'
+
+
+@pytest.mark.parametrize('name', list(BENCHMARKS))
+def test_hot_path(benchmark, benchmark_ctx, name):
+    try:
+        # Run pertama sekaligus pemanasan (cache import, template) dan cek prasyarat
+        jalankan_sekali(name, benchmark_ctx)
+    except SkipBenchmark as e:
+        pytest.skip(str(e))
+
+    _durasi, collector = benchmark.pedantic(jalankan_sekali, args=(name, benchmark_ctx), rounds=ROUNDS, iterations=1)
+    benchmark.extra_info.update(
+        queries=collector.count,
+        duplicate_queries=collector.duplicates,
+        db_ms=round(collector.db_time * 1000, 2),
+    )
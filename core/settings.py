@@ -4,6 +4,7 @@ Copyright (c) 2019 - present AppSeed.us
 """
 
 import os
+import sys
 from decouple import config
 from unipath import Path
 from dotenv import load_dotenv
@@ -54,6 +55,9 @@ CRON_CLASSES = [
     'apps.hrd.cron.PotongJatahCutiHMinus1',
     'apps.notifikasi.cron.ReminderScheduleCron',
     'apps.absensi.cron.AutoCheckoutCron', 
+    'apps.hrd.cron.ProsesExportJob',
+    'apps.hrd.cron.VerifikasiSisaCuti',
+    'apps.hrd.cron.VerifikasiUploadLangsung',
 ]
 
 # Web Push (django-webpush) - untuk reminder check-in/overtime
@@ -66,12 +70,13 @@ WEBPUSH_SETTINGS = {
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
-    'django.contrib.sessions.middleware.SessionMiddleware',
+    'apps.authentication.sessions.SlidingSessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'apps.hrd.middleware.RequestMetricsMiddleware',
     'apps.hrd.middleware.CheckKaryawanStatusMiddleware',
 ]
 
@@ -174,8 +179,59 @@ DATA_UPLOAD_MAX_NUMBER_FILES = 1000
 DATA_UPLOAD_MAX_NUMBER_FIELDS = None
 
 # Session Settings
+# Session dibaca dari cache 'sessions' dan hanya ditulis bila berubah atau sisa umurnya
+# di bawah SESSION_REFRESH_THRESHOLD (lihat apps/authentication/sessions.py)
+SESSION_ENGINE = 'apps.authentication.sessions'
+SESSION_CACHE_ALIAS = 'sessions'
 SESSION_COOKIE_AGE = 86400
-SESSION_SAVE_EVERY_REQUEST = True 
+SESSION_SAVE_EVERY_REQUEST = False
+SESSION_REFRESH_THRESHOLD = config('SESSION_REFRESH_THRESHOLD', default=SESSION_COOKIE_AGE // 2, cast=int)
+
+# Cache per subsistem (lihat apps/hrd/utils/cache.py)
+# file: dipakai bersama antar worker di satu host; redis: butuh django-redis; locmem: per proses (test)
+CACHE_BACKEND = config('CACHE_BACKEND', default='file')
+if 'test' in sys.argv or 'pytest' in sys.modules:
+    # manage.py test atau pytest (benchmarks/): jangan menulis ke CACHE_DIR repo
+    CACHE_BACKEND = 'locmem'
+CACHE_DIR = config('CACHE_DIR', default=os.path.join(BASE_DIR, '.cache'))
+CACHE_REDIS_URL = config('CACHE_REDIS_URL', default='redis://127.0.0.1:6379/1')
+CACHE_VERSION = config('CACHE_VERSION', default=1, cast=int)
+
+# Namespace -> timeout default (detik)
+CACHE_NAMESPACES = {
+    'default': 300,
+    'calendar': 24 * 3600,
+    'rules': 300,
+    'reports': 300,
+    'sessions': SESSION_COOKIE_AGE,
+    'geo': 7 * 24 * 3600,  # alamat reverse geocoding per koordinat
+    'media': 1800,  # presigned URL media; timeout nyata diatur per key (< AWS_QUERYSTRING_EXPIRE)
+}
+
+
+def _cache_alias(namespace, timeout):
+    alias = {'TIMEOUT': timeout, 'KEY_PREFIX': f'hr:{namespace}', 'VERSION': CACHE_VERSION}
+    if CACHE_BACKEND == 'redis':
+        alias.update({
+            'BACKEND': 'django_redis.cache.RedisCache',
+            'LOCATION': CACHE_REDIS_URL,
+            'OPTIONS': {'CLIENT_CLASS': 'django_redis.client.DefaultClient'},
+        })
+    elif CACHE_BACKEND == 'file':
+        alias.update({
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.path.join(CACHE_DIR, namespace),
+            'OPTIONS': {'MAX_ENTRIES': 10000},
+        })
+    else:
+        alias.update({
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': f'hr-{namespace}',
+        })
+    return alias
+
+
+CACHES = {namespace: _cache_alias(namespace, timeout) for namespace, timeout in CACHE_NAMESPACES.items()}
 
 
 # AWS S3 Configuration
@@ -190,6 +246,12 @@ AWS_S3_CUSTOM_DOMAIN = os.environ.get(
 
 # Nonaktifkan ACL karena bucket owner enforced
 AWS_DEFAULT_ACL = None
+AWS_QUERYSTRING_EXPIRE = config('AWS_QUERYSTRING_EXPIRE', default=3600, cast=int)  # detik, masa berlaku presigned URL media
+# Domain untuk URL media. Kosong (default) = presigned URL S3 biasa, yang di-cache
+# CachedPresignedUrlMixin. django-storages hanya menandatangani URL custom domain
+# lewat CloudFront signer (AWS_CLOUDFRONT_KEY/AWS_CLOUDFRONT_KEY_ID); isi hanya bila
+# signer itu dikonfigurasi, jika tidak URL media keluar tanpa tanda tangan.
+AWS_MEDIA_CUSTOM_DOMAIN = config('AWS_MEDIA_CUSTOM_DOMAIN', default=None)
 
 # Storage backends
 STATICFILES_STORAGE = 'apps.utils.storages.StaticStorage'
@@ -198,3 +260,53 @@ DEFAULT_FILE_STORAGE = 'apps.utils.storages.MediaStorage'
 # URLs untuk static dan media files
 STATIC_URL = f"https://{AWS_S3_CUSTOM_DOMAIN}/hr_cesgs_dev/static/"
 MEDIA_URL = f"https://{AWS_S3_CUSTOM_DOMAIN}/hr_cesgs_dev/media/"
+
+# Pengganti S3 lokal untuk benchmark/staging tanpa AWS (lihat benchmark_gunicorn)
+STORAGE_STANDIN = config('STORAGE_STANDIN', default=False, cast=bool)
+STORAGE_STANDIN_LATENCY_MS = config('STORAGE_STANDIN_LATENCY_MS', default=50, cast=int)
+if STORAGE_STANDIN:
+    STATICFILES_STORAGE = 'django.contrib.staticfiles.storage.StaticFilesStorage'
+    DEFAULT_FILE_STORAGE = 'apps.utils.storages.LocalS3StandIn'
+    STATIC_URL = '/static/'
+    MEDIA_URL = '/media/'
+
+# Pipeline static:
+# - s3 (default): collectstatic mengunggah semua file apa adanya ke StaticStorage
+# - whitenoise: collectstatic membuat file ber-hash + varian gzip/brotli di STATIC_ROOT,
+#   dilayani WhiteNoiseMiddleware dengan Cache-Control immutable. Isi STATIC_HOST
+#   (mis. custom domain S3/CDN) agar browser mengambil dari sana; file ber-hash
+#   disalin ke bucket dengan `manage.py sync_static_s3` (hanya file yang belum ada).
+STATIC_BACKEND = config('STATIC_BACKEND', default='s3')
+STATIC_HOST = config('STATIC_HOST', default='')
+if STATIC_BACKEND == 'whitenoise':
+    STATICFILES_STORAGE = 'apps.utils.storages.HashedStaticStorage'
+    STATIC_URL = f"{STATIC_HOST.rstrip('/')}/hr_cesgs_dev/static/" if STATIC_HOST else '/static/'
+    # File tanpa hash (mis. dirujuk langsung dari JS) tetap di-cache singkat
+    WHITENOISE_MAX_AGE = config('WHITENOISE_MAX_AGE', default=3600, cast=int)
+    # Referensi ke file yang tidak ada di manifest memakai nama asli, bukan error 500
+    WHITENOISE_MANIFEST_STRICT = False
+
+# Export job (ekspor Excel di background, artefak disimpan di MediaStorage)
+EXPORT_JOB_ASYNC = config('EXPORT_JOB_ASYNC', default=True, cast=bool)  # False: hanya diproses cron
+EXPORT_JOB_WORKERS = config('EXPORT_JOB_WORKERS', default=1, cast=int)
+EXPORT_JOB_MAX_AGE_HOURS = config('EXPORT_JOB_MAX_AGE_HOURS', default=6, cast=int)
+EXPORT_URL_EXPIRE = config('EXPORT_URL_EXPIRE', default=3600, cast=int)  # detik
+
+# Upload lampiran langsung dari browser ke bucket (lihat apps.hrd.utils.upload_langsung)
+DIRECT_UPLOAD_ENABLED = config('DIRECT_UPLOAD_ENABLED', default=True, cast=bool)
+DIRECT_UPLOAD_EXPIRE = config('DIRECT_UPLOAD_EXPIRE', default=600, cast=int)  # detik, masa berlaku presigned POST
+DIRECT_UPLOAD_VERIFY_ASYNC = config('DIRECT_UPLOAD_VERIFY_ASYNC', default=True, cast=bool)  # False: hanya diverifikasi cron
+DIRECT_UPLOAD_WORKERS = config('DIRECT_UPLOAD_WORKERS', default=1, cast=int)
+
+# Instrumentasi request (jumlah query & latensi per nama URL, lihat apps.hrd.middleware)
+REQUEST_METRICS_ENABLED = config('REQUEST_METRICS_ENABLED', default=True, cast=bool)
+REQUEST_METRICS_SLOW_MS = config('REQUEST_METRICS_SLOW_MS', default=1000, cast=int)
+# True: view yang melewati @query_budget melempar QueryBudgetExceeded (selalu aktif saat test)
+QUERY_BUDGET_STRICT = config('QUERY_BUDGET_STRICT', default=False, cast=bool)
+if 'test' in sys.argv:
+    QUERY_BUDGET_STRICT = True
+
+# Absensi fleksibel (lihat apps.absensi.checkin)
+ABSENSI_KONTEKS_CACHE_SECONDS = config('ABSENSI_KONTEKS_CACHE_SECONDS', default=300, cast=int)  # rule/WFA/kantor per hari
+ABSENSI_GEOCODE_ASYNC = config('ABSENSI_GEOCODE_ASYNC', default=True, cast=bool)  # False: geocode sinkron saat CI/CO
+ABSENSI_GEOCODE_WORKERS = config('ABSENSI_GEOCODE_WORKERS', default=2, cast=int)
@@ -8,5 +8,9 @@ if [ "$MODE" = "development" ]; then
 	python manage.py runserver 0.0.0.0:5005
 elif [ "$MODE" = "production" ]; then
     echo "Running Production Server...\n"
+	# Pipeline static lokal: file ber-hash + gzip/brotli di STATIC_ROOT, dilayani WhiteNoise
+	if [ "$STATIC_BACKEND" = "whitenoise" ]; then
+		python manage.py collectstatic --noinput
+	fi
 	gunicorn --config gunicorn-cfg.py core.wsgi
 fi
\ No newline at end of file
@@ -1,11 +1,124 @@
 # -*- encoding: utf-8 -*-
 """
 Copyright (c) 2019 - present AppSeed.us
+
+Profil serving Gunicorn, dipilih lewat env GUNICORN_PROFILE:
+
+- gthread (default): (CPU + 1) worker x GUNICORN_THREADS thread. Request yang
+  menunggu I/O (upload S3, geocoding, web push) hanya menahan satu thread,
+  bukan seluruh worker; cocok untuk check-in pagi dan upload dokumen.
+- sync: (2 x CPU + 1) worker sync, satu request per worker.
+- gevent: worker greenlet untuk beban I/O sangat tinggi. Butuh paket gevent
+  (dan psycogreen agar query psycopg2 tidak memblokir); bila tidak terpasang
+  otomatis kembali ke gthread.
+- single: perilaku lama (1 worker sync, log debug, stdout ditangkap) untuk
+  debugging di server.
+
+Setiap nilai bisa ditimpa env: GUNICORN_WORKERS, GUNICORN_THREADS,
+GUNICORN_WORKER_CONNECTIONS, GUNICORN_TIMEOUT, GUNICORN_MAX_REQUESTS,
+GUNICORN_MAX_REQUESTS_JITTER, GUNICORN_PRELOAD, GUNICORN_LOGLEVEL, GUNICORN_BIND.
+Perbandingan throughput antar profil: python manage.py benchmark_gunicorn.
 """
+import multiprocessing
+import os
+
+
+def _env_int(name, default):
+    value = os.environ.get(name)
+    return int(value) if value not in (None, '') else default
+
+
+def _env_bool(name, default):
+    value = os.environ.get(name)
+    if value in (None, ''):
+        return default
+    return value.lower() in ('1', 'true', 'yes', 'on')
+
+
+CPU_COUNT = multiprocessing.cpu_count()
+
+PROFILES = {
+    'gthread': {
+        'worker_class': 'gthread',
+        'workers': CPU_COUNT + 1,
+        'threads': 8,
+    },
+    'sync': {
+        'worker_class': 'sync',
+        'workers': CPU_COUNT * 2 + 1,
+        'threads': 1,
+    },
+    'gevent': {
+        'worker_class': 'gevent',
+        'workers': CPU_COUNT + 1,
+        'threads': 1,
+        'worker_connections': 200,
+        # Monkey patch gevent harus terjadi sebelum aplikasi di-import
+        'preload_app': False,
+    },
+    'single': {
+        'worker_class': 'sync',
+        'workers': 1,
+        'threads': 1,
+        'loglevel': 'debug',
+        'capture_output': True,
+        'preload_app': False,
+        'max_requests': 0,
+    },
+}
+
+profile_name = os.environ.get('GUNICORN_PROFILE', 'gthread')
+if profile_name not in PROFILES:
+    raise RuntimeError(f"GUNICORN_PROFILE tidak dikenal: {profile_name} (pilihan: {', '.join(PROFILES)})")
+
+if profile_name == 'gevent':
+    try:
+        import gevent  # noqa: F401
+    except ImportError:
+        print('GUNICORN_PROFILE=gevent tetapi gevent tidak terpasang; memakai profil gthread.')
+        profile_name = 'gthread'
+
+profile = PROFILES[profile_name]
+
+bind = os.environ.get('GUNICORN_BIND', f"0.0.0.0:{os.environ.get('PORT', '5005')}")
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', profile['worker_class'])
+workers = _env_int('GUNICORN_WORKERS', profile['workers'])
+threads = _env_int('GUNICORN_THREADS', profile['threads'])
+worker_connections = _env_int('GUNICORN_WORKER_CONNECTIONS', profile.get('worker_connections', 1000))
+
+# Restart worker secara berkala (dengan jitter agar tidak bersamaan) untuk meredam kebocoran memori
+max_requests = _env_int('GUNICORN_MAX_REQUESTS', profile.get('max_requests', 1000))
+max_requests_jitter = _env_int('GUNICORN_MAX_REQUESTS_JITTER', max(max_requests // 10, 0))
+
+# Import aplikasi sekali di master lalu fork: startup lebih cepat dan memori dibagi copy-on-write
+preload_app = _env_bool('GUNICORN_PRELOAD', profile.get('preload_app', True))
+
+timeout = _env_int('GUNICORN_TIMEOUT', 60)
+graceful_timeout = _env_int('GUNICORN_GRACEFUL_TIMEOUT', 30)
+keepalive = _env_int('GUNICORN_KEEPALIVE', 5)
 
-bind = '0.0.0.0:5005'
-workers = 1
 accesslog = '-'
-loglevel = 'debug'
-capture_output = True
+loglevel = os.environ.get('GUNICORN_LOGLEVEL', profile.get('loglevel', 'info'))
+capture_output = profile.get('capture_output', False)
 enable_stdio_inheritance = True
+
+
+def on_starting(server):
+    server.log.info(
+        'Profil %s: %s worker %s, %s thread, max_requests %s (+%s jitter), preload=%s',
+        profile_name, workers, worker_class, threads, max_requests, max_requests_jitter, preload_app,
+    )
+
+
+def post_fork(server, worker):
+    if worker_class == 'gevent':
+        try:
+            from psycogreen.gevent import patch_psycopg
+            patch_psycopg()
+        except ImportError:
+            server.log.warning('psycogreen tidak terpasang: query database akan memblokir worker gevent')
+
+    if preload_app:
+        # Koneksi DB yang terbuka di master saat preload tidak boleh dipakai bersama antar worker
+        from django.db import connections
+        connections.close_all()